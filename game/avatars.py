@@ -0,0 +1,227 @@
+# game/avatars.py
+"""
+Pipeline de avatares.
+
+No request só acontece a validação (formato, tamanho do arquivo, dimensões) e
+o upload cru é gravado. O resto roda num pool de threads, fora do request:
+  - regrava o original sem metadados (EXIF/GPS/XMP), já com a rotação aplicada;
+  - gera as miniaturas quadradas de tamanho fixo em WebP, uma por uso
+    (TAMANHOS_AVATAR), em avatars/thumbs/<user_id>/<chave>-<uso>.webp;
+  - grava `Profile.avatar_key` (hash do conteúdo) e atualiza o cache.
+
+Os templates nunca tocam o arquivo original: `url_avatar(user_id, chave, uso)`
+monta a URL da miniatura (memoizada) e `chaves_avatar(user_ids)` resolve as
+chaves pelo cache, indo ao banco só para quem não estiver lá.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.templatetags.static import static
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Profile
+
+logger = logging.getLogger(__name__)
+
+# uso -> lado (px) do arquivo gerado; ~2x o tamanho exibido p/ telas densas
+TAMANHOS_AVATAR = {
+    "header": 64,
+    "lista": 96,
+    "perfil": 256,
+}
+FORMATOS_ACEITOS = {"JPEG", "PNG", "WEBP", "GIF"}
+AVATAR_PADRAO = "game/img/avatar_padrao.svg"
+
+_CACHE_PREFIXO = "avatar:"
+_CACHE_TIMEOUT = 60 * 60
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+# ---------------------------
+# Validação (no request)
+# ---------------------------
+def validar_upload(arquivo):
+    """Levanta ValidationError se o arquivo não for uma imagem aceitável."""
+    max_bytes = _config("AVATAR_MAX_BYTES", 5 * 1024 * 1024)
+    max_lado = _config("AVATAR_MAX_LADO", 4096)
+    min_lado = max(TAMANHOS_AVATAR.values()) // 4
+
+    if arquivo.size > max_bytes:
+        raise ValidationError(f"Imagem muito grande (máximo {max_bytes // (1024 * 1024)} MB).")
+    try:
+        arquivo.seek(0)
+        with Image.open(arquivo) as img:
+            formato = img.format
+            largura, altura = img.size
+            img.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise ValidationError("Arquivo de imagem inválido.")
+    finally:
+        arquivo.seek(0)
+
+    if formato not in FORMATOS_ACEITOS:
+        raise ValidationError("Formato não suportado (use JPEG, PNG, WebP ou GIF).")
+    if max(largura, altura) > max_lado:
+        raise ValidationError(f"Imagem com dimensões grandes demais (máximo {max_lado}px).")
+    if min(largura, altura) < min_lado:
+        raise ValidationError(f"Imagem pequena demais (mínimo {min_lado}px).")
+
+
+# ---------------------------
+# Processamento (fora do request)
+# ---------------------------
+def _caminho_miniatura(user_id, chave, uso):
+    return f"avatars/thumbs/{user_id}/{chave}-{uso}.webp"
+
+
+def _sem_metadados(img, formato):
+    """
+    Re-encoda a imagem. O Pillow só grava EXIF/XMP/texto quando recebe no
+    save(), então basta não repassar o `info` do original; o perfil de cor fica.
+    """
+    buffer = BytesIO()
+    opcoes = {"icc_profile": img.info["icc_profile"]} if img.info.get("icc_profile") else {}
+    if formato == "JPEG":
+        img = img.convert("RGB")
+        opcoes.update(quality=90, optimize=True)
+    elif formato == "WEBP":
+        opcoes.update(quality=90)
+    img.save(buffer, formato, **opcoes)
+    return buffer.getvalue()
+
+
+def _miniatura(img, lado):
+    quadrada = ImageOps.fit(img, (lado, lado), Image.LANCZOS)
+    buffer = BytesIO()
+    quadrada.save(buffer, "WEBP", quality=82, method=6)
+    return buffer.getvalue()
+
+
+def _gravar(nome, conteudo):
+    if default_storage.exists(nome):
+        default_storage.delete(nome)
+    return default_storage.save(nome, ContentFile(conteudo))
+
+
+def processar_avatar(profile_id):
+    """Limpa o original e gera as miniaturas. Devolve a chave (ou None se não há avatar)."""
+    profile = Profile.objects.filter(pk=profile_id).only("id", "user_id", "avatar", "avatar_key").first()
+    if profile is None or not profile.avatar:
+        return None
+
+    with profile.avatar.open("rb") as f:
+        bruto = f.read()
+    chave = hashlib.sha256(bruto).hexdigest()[:16]
+
+    with Image.open(BytesIO(bruto)) as img:
+        formato = img.format
+        img.seek(0)  # GIF animado: só o primeiro quadro
+        img = ImageOps.exif_transpose(img)
+        img.load()
+
+    _gravar(profile.avatar.name, _sem_metadados(img, formato))
+
+    base = img.convert("RGBA") if img.mode in ("P", "LA", "RGBA") else img.convert("RGB")
+    for uso, lado in TAMANHOS_AVATAR.items():
+        _gravar(_caminho_miniatura(profile.user_id, chave, uso), _miniatura(base, lado))
+
+    anterior = profile.avatar_key
+    Profile.objects.filter(pk=profile.pk).update(avatar_key=chave)
+    cache.set(f"{_CACHE_PREFIXO}{profile.user_id}", chave, _CACHE_TIMEOUT)
+
+    if anterior and anterior != chave:
+        for uso in TAMANHOS_AVATAR:
+            nome = _caminho_miniatura(profile.user_id, anterior, uso)
+            if default_storage.exists(nome):
+                default_storage.delete(nome)
+    return chave
+
+
+_executor = None
+_executor_lock = Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_config("AVATAR_WORKERS", 2), thread_name_prefix="avatar",
+            )
+        return _executor
+
+
+def _tarefa(profile_id):
+    close_old_connections()
+    try:
+        return processar_avatar(profile_id)
+    except Exception:
+        logger.exception("Falha ao processar avatar do profile %s", profile_id)
+        raise
+    finally:
+        close_old_connections()
+
+
+def submeter(profile_id):
+    """Enfileira no pool e devolve o Future (usado direto pelo backfill)."""
+    return _pool().submit(_tarefa, profile_id)
+
+
+def agendar_processamento(profile_id):
+    """
+    Dispara o processamento depois do commit (o worker precisa enxergar o
+    upload gravado). Com AVATAR_SINCRONO=True roda na hora (testes/dev).
+    """
+    if _config("AVATAR_SINCRONO", False):
+        transaction.on_commit(lambda: processar_avatar(profile_id))
+    else:
+        transaction.on_commit(lambda: submeter(profile_id))
+
+
+# ---------------------------
+# Resolução de URL (templates/APIs)
+# ---------------------------
+@lru_cache(maxsize=4096)
+def url_avatar(user_id, chave, uso="header"):
+    if uso not in TAMANHOS_AVATAR:
+        raise ValueError(f"Uso de avatar desconhecido: {uso}")
+    if not chave:
+        return static(AVATAR_PADRAO)
+    return default_storage.url(_caminho_miniatura(user_id, chave, uso))
+
+
+def chaves_avatar(user_ids):
+    """{user_id: chave ("" = sem avatar processado)}; uma query só para os ausentes do cache."""
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+    em_cache = cache.get_many([f"{_CACHE_PREFIXO}{uid}" for uid in user_ids])
+    chaves = {uid: em_cache[f"{_CACHE_PREFIXO}{uid}"] for uid in user_ids if f"{_CACHE_PREFIXO}{uid}" in em_cache}
+    faltando = [uid for uid in user_ids if uid not in chaves]
+    if faltando:
+        do_banco = dict(Profile.objects.filter(user_id__in=faltando).values_list("user_id", "avatar_key"))
+        novos = {uid: do_banco.get(uid) or "" for uid in faltando}
+        cache.set_many({f"{_CACHE_PREFIXO}{uid}": chave for uid, chave in novos.items()}, _CACHE_TIMEOUT)
+        chaves.update(novos)
+    return chaves
+
+
+def avatar_do_usuario(user_id, uso="header"):
+    return url_avatar(user_id, chaves_avatar([user_id])[user_id], uso)
+
+
+def avatares_dos_usuarios(user_ids, uso="lista"):
+    return {uid: url_avatar(uid, chave, uso) for uid, chave in chaves_avatar(user_ids).items()}
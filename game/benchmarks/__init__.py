@@ -0,0 +1,71 @@
+"""
+Utilitários compartilhados pelos benchmarks / testes de carga do app.
+
+Os comandos em game/management/commands (loadtest, bench_*) usam estas funções
+para que os números saiam sempre no mesmo formato e possam ser comparados
+entre versões.
+"""
+import json
+import math
+import platform
+import subprocess
+from pathlib import Path
+
+from django.utils import timezone
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) com interpolação linear. `valores` não precisa estar ordenado."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    if len(ordenados) == 1:
+        return ordenados[0]
+    k = (len(ordenados) - 1) * (p / 100.0)
+    f = math.floor(k)
+    c = math.ceil(k)
+    if f == c:
+        return ordenados[int(k)]
+    return ordenados[f] + (ordenados[c] - ordenados[f]) * (k - f)
+
+
+def resumo_latencias(valores_ms):
+    """Resumo padrão (ms) usado em todos os relatórios."""
+    if not valores_ms:
+        return {"n": 0, "p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    return {
+        "n": len(valores_ms),
+        "p50": round(percentil(valores_ms, 50), 3),
+        "p95": round(percentil(valores_ms, 95), 3),
+        "p99": round(percentil(valores_ms, 99), 3),
+        "mean": round(sum(valores_ms) / len(valores_ms), 3),
+        "max": round(max(valores_ms), 3),
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def metadados():
+    """Cabeçalho gravado em todo JSON de resultado (para diffs entre commits)."""
+    return {
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "when": timezone.now().isoformat(),
+    }
+
+
+def gravar_json(caminho, dados):
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(dados, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
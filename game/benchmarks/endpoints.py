@@ -0,0 +1,443 @@
+"""
+Micro-benchmark das views com o test client do Django, sobre uma base semeada.
+
+Cada cenário mede a latência de uma view (sem rede, sem servidor) e conta as
+queries de uma execução. Há um cenário para cada view de game/urls.py, menos o
+upload de avatar (profile_avatar: o custo é o Pillow, não o banco); o register
+entra só com o GET, porque o POST é dominado pelo hash da senha.
+QUERY_BUDGETS é o teto de queries por endpoint: o comando bench_endpoints falha
+se algum cenário passar do orçamento e o EndpointQueryBudgetTest garante o
+mesmo na suíte de testes.
+
+`semear(alvo)` é incremental: chamar com 10, depois 10_000, depois 1_000_000 só
+insere a diferença entre as escalas.
+"""
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from unittest.mock import patch
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import estado_single, partida_local
+from .. import partida_rapida as fila
+from ..board import codificar_pulos, overlay_url
+from ..models import FriendRequest, GamePlayer, GameRoom, Profile, RoomInvite
+from ..services import aplicar_jogada, gerar_cobras_escadas_sem_overlaps, nova_partida
+from . import resumo_latencias
+
+PREFIXO_SEED = "seed"
+BENCH_USER = "bench"
+BENCH_SENHA = "Bench!Senha2024"
+BENCH_SALA = "BENCH01"
+BENCH_LOBBY = "BENCH02"  # do bench, em lobby: start, config, convite, saída
+BENCH_CONVITE = "BENCH03"  # de outro host, com convite para o bench: aceitar/recusar, entrar
+BENCH_PUBLICA = "BENCH04"  # pública, sem o bench: api_room_state de espectador
+
+_CONTROLE_TRANSACAO = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE SAVEPOINT")
+
+# Teto de queries por cenário (inclui sessão/usuário carregados pelos middlewares)
+QUERY_BUDGETS = {
+    "tela_inicial": 5,  # +1 com o cache de avatares frio (game/avatars.py)
+    "tela_instrucoes": 4,
+    "tela_tabuleiro": 4,
+    # estado fora da sessão (game/estado_single.py): 0, e 1 quando a jogada vai para o banco
+    "jogar_rodada_form": 1,
+    "jogar_rodada_xhr": 1,
+    "jogar_rodada_lote": 1,
+    "multiplayer_lobby": 6,  # +1 com a lista de partidas para assistir
+    "multiplayer_room": 6,
+    "api_room_info": 4,
+    "api_room_state": 5,
+    "api_room_move": 9,
+    "profile": 10,  # +2 com o histórico paginado e as estatísticas por tabuleiro
+    "friends_page": 7,
+    "ranking": 7,  # +1 com as árvores do ranking frias (game/ranking.py)
+    "ranking_amigos": 7,
+    "register": 4,
+    "board_overlay": 0,  # o mapa vem na query string, sem sessão nem banco
+    "iniciar_contra_maquina": 3,
+    "novo_jogo": 2,
+    "reiniciar_jogo": 1,
+    "partida_local_iniciar": 11,  # derrota provisória + ranking.atualizando
+    "partida_local_dados": 1,
+    "partida_local_finalizar": 12,  # vitória: placar + ranking + MatchResult/MatchParticipant
+    "multiplayer_create": 6,
+    "multiplayer_join": 8,
+    "multiplayer_config": 4,
+    "multiplayer_invite": 6,
+    "multiplayer_start": 7,
+    "multiplayer_leave": 8,
+    "room_invite_accept": 9,
+    "room_invite_reject": 4,
+    "api_room_state_espectador": 5,
+    "partida_rapida": 3,
+    "api_partida_rapida": 2,
+    "partida_rapida_sair": 3,
+    "friend_add": 4,
+    "friend_accept": 4,
+    "friend_request_accept": 4,
+    "friend_request_reject": 4,
+    "api_export": 4,
+}
+
+
+# ---------------------------
+# Semeadura
+# ---------------------------
+def semear(alvo: int, lote: int = 5000):
+    """Garante `alvo` usuários semeados (com profile, amizades e salas)."""
+    atual = User.objects.filter(username__startswith=PREFIXO_SEED).count()
+    if atual >= alvo:
+        return
+    senha = make_password(None)  # hash inutilizável, calculado uma vez só
+    status_salas = ("lobby", "active", "finished")
+
+    for ini in range(atual, alvo, lote):
+        fim = min(alvo, ini + lote)
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                [User(username=f"{PREFIXO_SEED}{i}", password=senha) for i in range(ini, fim)]
+            )
+            Profile.objects.bulk_create([
+                Profile(
+                    user=u, nickname=f"{PREFIXO_SEED}{i}",
+                    total_games=i % 40, wins=(i % 40) // 3, losses=(i % 40) - (i % 40) // 3,
+                )
+                for i, u in zip(range(ini, fim), users)
+            ])
+            FriendRequest.objects.bulk_create([
+                FriendRequest(
+                    requester=users[k], addressee=users[k - 1],
+                    status="accepted" if (ini + k) % 3 else "pending",
+                )
+                for k in range(1, len(users))
+            ])
+            salas = GameRoom.objects.bulk_create([
+                GameRoom(
+                    code=f"S{ini + k:07d}", host=users[k],
+                    status=status_salas[(ini + k) % 3],
+                    is_active=(ini + k) % 3 != 2,
+                    is_public=(ini + k) % 4 == 0,
+                    log_rounds=[[{"username": None, "order": None, "texto": "Sala criada."}]],
+                )
+                for k in range(0, len(users), 2)
+            ])
+            GamePlayer.objects.bulk_create(
+                [GamePlayer(room=s, user=users[k * 2], order=0) for k, s in enumerate(salas)]
+                + [
+                    GamePlayer(room=s, user=users[k * 2 + 1], order=1)
+                    for k, s in enumerate(salas) if k * 2 + 1 < len(users)
+                ]
+            )
+
+
+def preparar_contexto():
+    """Usuário/sala usados pelos cenários (idempotente)."""
+    user = User.objects.filter(username=BENCH_USER).first()
+    if user is None:
+        # staff para o cenário da exportação
+        user = User.objects.create_user(username=BENCH_USER, password=BENCH_SENHA, is_staff=True)
+        Profile.objects.create(user=user, nickname=BENCH_USER, total_games=10, wins=6, losses=4)
+        amigos = list(User.objects.filter(username__startswith=PREFIXO_SEED).order_by("id")[:6])
+        for k, amigo in enumerate(amigos):
+            if k % 2:
+                FriendRequest.objects.create(requester=user, addressee=amigo, status="accepted")
+            else:
+                FriendRequest.objects.create(requester=amigo, addressee=user, status="pending")
+    elif not user.is_staff:
+        # bases semeadas antes do cenário da exportação
+        User.objects.filter(pk=user.pk).update(is_staff=True)
+
+    cobras, escadas = gerar_cobras_escadas_sem_overlaps(100, qtd_cobras=5, qtd_escadas=5, seed=42)
+    log = [
+        [{"username": BENCH_USER, "order": 0, "texto": f"{BENCH_USER} rolou 3 e foi da casa 0 para 3."}]
+        for _ in range(30)
+    ]
+    sala, _ = GameRoom.objects.update_or_create(
+        code=BENCH_SALA,
+        defaults={
+            "host": user, "status": "active", "is_active": True, "board_size": "10x10",
+            "current_turn": user,
+            "board_data": codificar_pulos(cobras, escadas),
+            "log_rounds": log, "round_number": 30,
+        },
+    )
+    GamePlayer.objects.update_or_create(room=sala, user=user, defaults={"order": 0, "position": 0})
+
+    outros = list(User.objects.filter(username__startswith=PREFIXO_SEED).order_by("id")[:2])
+    salas = {}
+    for code, host, publica in ((BENCH_LOBBY, user, False), (BENCH_CONVITE, outros[0], False),
+                                (BENCH_PUBLICA, outros[0], True)):
+        salas[code], _ = GameRoom.objects.update_or_create(code=code, defaults={
+            "host": host, "status": "active" if publica else "lobby", "is_active": True, "is_public": publica,
+            "board_size": "10x10", "current_turn": host if publica else None,
+            "board_data": codificar_pulos(cobras, escadas), "log_rounds": log[:3],
+        })
+        for order, jogador in enumerate([host] + [u for u in outros if u != host][:1]):
+            GamePlayer.objects.get_or_create(room=salas[code], user=jogador, defaults={"order": order})
+    convite, _ = RoomInvite.objects.get_or_create(room=salas[BENCH_CONVITE], inviter=outros[0], invitee=user)
+    pedido = FriendRequest.objects.filter(addressee=user).order_by("id").first()
+    return {
+        "user": user, "room": sala, "lobby": salas[BENCH_LOBBY], "convite": convite, "pedido": pedido,
+        "overlay": overlay_url(10, 10, cobras, escadas),
+    }
+
+
+def _partida_single():
+    return {
+        "status": "andamento",
+        "jogador_atual": 0,
+        "posicoes": [0, 0],
+        "ultimo_dado": None,
+        "mensagem": "Partida iniciada.",
+        "cobras": {},
+        "escadas": {},
+        "streak_seis": [0, 0],
+        "log": ["Partida iniciada."],
+        "rodada_atual": 1,
+        "log_rodadas": [[{"jogador": None, "texto": "Partida iniciada."}]],
+        "ultimo_movimento": None,
+    }
+
+
+def _config_single():
+    return {
+        "modo": "contra_maquina", "linhas": 10, "colunas": 10, "casa_final": 100,
+        "qtd_maquinas": 1, "qtd_humanos": 1, "qtd_total_jogadores": 2,
+    }
+
+
+def _resetar_single(client, ctx, maquinas=1):
+    config = _config_single()
+    config.update(qtd_maquinas=maquinas, qtd_total_jogadores=1 + maquinas)
+    partida = _partida_single()
+    partida.update(posicoes=[0] * (1 + maquinas), streak_seis=[0] * (1 + maquinas))
+    estado_single.gravar(client.session.session_key, config, partida)
+
+
+def _resetar_single_3_maquinas(client, ctx):
+    _resetar_single(client, ctx, maquinas=3)
+
+
+def _resetar_sala(client, ctx):
+    GamePlayer.objects.filter(room=ctx["room"]).update(position=0)
+    GameRoom.objects.filter(pk=ctx["room"].pk).update(status="active", current_turn=ctx["user"])
+
+
+def _resetar_lobby(client, ctx):
+    GameRoom.objects.filter(pk=ctx["lobby"].pk).update(status="lobby", current_turn=None, is_active=True)
+    GamePlayer.objects.get_or_create(room=ctx["lobby"], user=ctx["user"], defaults={"order": 0})
+
+
+def _resetar_convite(client, ctx):
+    convite = ctx["convite"]
+    RoomInvite.objects.filter(pk=convite.pk).update(status="pending")
+    GamePlayer.objects.filter(room_id=convite.room_id, user=ctx["user"]).delete()
+
+
+def _resetar_pedido(client, ctx):
+    FriendRequest.objects.filter(pk=ctx["pedido"].pk).update(status="pending")
+
+
+def _fora_da_fila(client, ctx):
+    fila.sair(ctx["user"])
+
+
+def _na_fila(client, ctx):
+    fila.entrar(ctx["user"], "10x10", 4)
+
+
+def _iniciar_local(client, ctx):
+    _resetar_single(client, ctx)
+    client.post(reverse("game:partida_local_iniciar"))
+
+
+def _jogar_local(client, ctx):
+    # a partida inteira como o navegador jogaria, com os dados do seed da sessão;
+    # sempre uma vitória do bench, que é o caminho mais caro (e o que tem orçamento)
+    jogadas = []
+    while not jogadas or jogadas[-1]["jogador"] != 0:
+        _iniciar_local(client, ctx)
+        local = client.session["partida_local"]
+        cobras = {int(k): v for k, v in local["cobras"].items()}
+        escadas = {int(k): v for k, v in local["escadas"].items()}
+        partida = nova_partida(local["jogadores"], cobras, escadas)
+        fluxo = partida_local.fluxo_dados(local["seed"])
+        jogadas = []
+        while partida["status"] != "finalizado":
+            dado = next(fluxo)
+            m = aplicar_jogada(partida, dado, local["casa_final"], cobras, escadas)
+            jogadas.append({"jogador": m["jogador"], "dado": dado, "para": m["para"]})
+    ctx["jogadas_local"] = jogadas
+
+
+# ---------------------------
+# Cenários
+# ---------------------------
+@dataclass
+class Cenario:
+    nome: str
+    metodo: str
+    url: Callable[[dict], str]
+    status: int = 200
+    preparar: Optional[Callable] = None  # roda antes de cada repetição, fora da medição
+    headers: dict = field(default_factory=dict)
+    dados: dict = field(default_factory=dict)
+    corpo_json: Optional[Callable[[dict], dict]] = None  # POST com corpo JSON em vez de formulário
+
+
+XHR = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+CENARIOS = [
+    Cenario("tela_inicial", "GET", lambda c: reverse("game:tela_inicial")),
+    Cenario("tela_instrucoes", "GET", lambda c: reverse("game:tela_instrucoes")),
+    Cenario("tela_tabuleiro", "GET", lambda c: reverse("game:tela_tabuleiro"), preparar=_resetar_single),
+    Cenario("jogar_rodada_form", "POST", lambda c: reverse("game:jogar_rodada"), status=302,
+            preparar=_resetar_single),
+    Cenario("jogar_rodada_xhr", "POST", lambda c: reverse("game:jogar_rodada"),
+            preparar=_resetar_single, headers=XHR),
+    # humano + 3 máquinas resolvidos num request só (antes eram 4)
+    Cenario("jogar_rodada_lote", "POST", lambda c: reverse("game:jogar_rodada"),
+            preparar=_resetar_single_3_maquinas, headers=XHR, dados={"lote": "1"}),
+    Cenario("multiplayer_lobby", "GET", lambda c: reverse("game:multiplayer_lobby")),
+    Cenario("multiplayer_room", "GET", lambda c: reverse("game:multiplayer_room", args=[BENCH_SALA]),
+            preparar=_resetar_sala),
+    Cenario("api_room_info", "GET", lambda c: reverse("game:api_room_info", args=[BENCH_SALA])),
+    Cenario("api_room_state", "GET", lambda c: reverse("game:api_room_state", args=[BENCH_SALA]),
+            preparar=_resetar_sala),
+    Cenario("api_room_move", "POST", lambda c: reverse("game:api_room_move", args=[BENCH_SALA]),
+            preparar=_resetar_sala, headers=XHR),
+    Cenario("profile", "GET", lambda c: reverse("game:profile")),
+    Cenario("friends_page", "GET", lambda c: reverse("game:friends_page")),
+    Cenario("ranking", "GET", lambda c: reverse("game:ranking")),
+    Cenario("ranking_amigos", "GET", lambda c: reverse("game:ranking") + "?amigos=1"),
+    Cenario("register", "GET", lambda c: reverse("game:register")),
+    Cenario("board_overlay", "GET", lambda c: c["overlay"]),
+    # singleplayer: configuração, partida nova, reinício
+    Cenario("iniciar_contra_maquina", "POST", lambda c: reverse("game:iniciar_contra_maquina"), status=302,
+            dados={"tamanho_tabuleiro": "10x10", "qtd_maquinas": "1"}),
+    Cenario("novo_jogo", "GET", lambda c: reverse("game:novo_jogo"), status=302, preparar=_resetar_single),
+    Cenario("reiniciar_jogo", "GET", lambda c: reverse("game:reiniciar_jogo"), status=302,
+            preparar=_resetar_single),
+    # singleplayer no navegador (commit-reveal)
+    Cenario("partida_local_iniciar", "POST", lambda c: reverse("game:partida_local_iniciar"),
+            preparar=_resetar_single),
+    Cenario("partida_local_dados", "GET", lambda c: reverse("game:partida_local_dados") + "?de=512",
+            preparar=_iniciar_local),
+    Cenario("partida_local_finalizar", "POST", lambda c: reverse("game:partida_local_finalizar"),
+            preparar=_jogar_local, corpo_json=lambda c: {"jogadas": c["jogadas_local"]}),
+    # multiplayer: escritas das salas
+    Cenario("multiplayer_create", "POST", lambda c: reverse("game:multiplayer_create"), status=302),
+    Cenario("multiplayer_join", "POST", lambda c: reverse("game:multiplayer_join"), status=302,
+            preparar=_resetar_convite, dados={"code": BENCH_CONVITE}),
+    Cenario("multiplayer_config", "POST", lambda c: reverse("game:multiplayer_config", args=[BENCH_LOBBY]),
+            status=302, preparar=_resetar_lobby, dados={"board_size": "10x10"}),
+    Cenario("multiplayer_invite", "POST", lambda c: reverse("game:multiplayer_invite", args=[BENCH_LOBBY]),
+            status=302, preparar=_resetar_lobby, dados={"username": "seed1"}),
+    Cenario("multiplayer_start", "POST", lambda c: reverse("game:multiplayer_start", args=[BENCH_LOBBY]),
+            status=302, preparar=_resetar_lobby),
+    Cenario("multiplayer_leave", "GET", lambda c: reverse("game:multiplayer_leave", args=[BENCH_LOBBY]),
+            status=302, preparar=_resetar_lobby),
+    Cenario("room_invite_accept", "GET",
+            lambda c: reverse("game:room_invite_accept", args=[BENCH_CONVITE, c["convite"].pk]),
+            status=302, preparar=_resetar_convite),
+    Cenario("room_invite_reject", "GET",
+            lambda c: reverse("game:room_invite_reject", args=[BENCH_CONVITE, c["convite"].pk]),
+            status=302, preparar=_resetar_convite),
+    # espectador: sala pública sem o bench, servida pelo snapshot compartilhado
+    Cenario("api_room_state_espectador", "GET",
+            lambda c: reverse("game:api_room_state", args=[BENCH_PUBLICA]) + "?espectador=1"),
+    # partida rápida (fila em memória + MatchTicket)
+    Cenario("partida_rapida", "POST", lambda c: reverse("game:partida_rapida"), status=302,
+            preparar=_fora_da_fila, dados={"board_size": "10x10", "party_size": "4"}),
+    Cenario("api_partida_rapida", "GET", lambda c: reverse("game:api_partida_rapida"), preparar=_na_fila),
+    Cenario("partida_rapida_sair", "POST", lambda c: reverse("game:partida_rapida_sair"), status=302,
+            preparar=_na_fila),
+    # amigos
+    Cenario("friend_add", "POST", lambda c: reverse("game:friend_add"), status=302, dados={"username": "seed5"}),
+    Cenario("friend_accept", "GET", lambda c: reverse("game:friend_accept", args=[c["pedido"].pk]), status=302,
+            preparar=_resetar_pedido),
+    Cenario("friend_request_accept", "GET",
+            lambda c: reverse("game:friend_request_accept", args=[c["pedido"].pk]), status=302,
+            preparar=_resetar_pedido),
+    Cenario("friend_request_reject", "GET",
+            lambda c: reverse("game:friend_request_reject", args=[c["pedido"].pk]), status=302,
+            preparar=_resetar_pedido),
+    # exportação (staff), com o stream inteiro consumido
+    Cenario("api_export", "GET", lambda c: reverse("game:api_export", args=["games"])),
+]
+
+
+def _executar(client, cenario, ctx):
+    url = cenario.url(ctx)
+    if cenario.corpo_json is not None:
+        resp = client.post(url, json.dumps(cenario.corpo_json(ctx)), content_type="application/json",
+                           **cenario.headers)
+    elif cenario.metodo == "POST":
+        resp = client.post(url, cenario.dados, **cenario.headers)
+    else:
+        resp = client.get(url, **cenario.headers)
+    if resp.streaming:
+        # as queries de uma resposta em stream rodam enquanto ela é lida
+        b"".join(resp.streaming_content)
+    return resp
+
+
+def medir_cenario(client, cenario, ctx, repeticoes=30, aquecimento=3):
+    """Latências (ms) de `repeticoes` execuções + nº de queries de uma execução."""
+    for _ in range(aquecimento):
+        if cenario.preparar:
+            cenario.preparar(client, ctx)
+        _executar(client, cenario, ctx)
+
+    if cenario.preparar:
+        cenario.preparar(client, ctx)
+    # o queries_log é um deque limitado; cheio, o CaptureQueriesContext conta zero
+    reset_queries()
+    with CaptureQueriesContext(connection) as capturadas:
+        resp = _executar(client, cenario, ctx)
+    # conta já: o request_started dos próximos requests zera o queries_log.
+    # BEGIN/SAVEPOINT/COMMIT não entram (dependem de onde o atomic foi aberto)
+    queries = [q["sql"] for q in capturadas.captured_queries if not q["sql"].startswith(_CONTROLE_TRANSACAO)]
+    if resp.status_code != cenario.status:
+        raise AssertionError(f"{cenario.nome}: status {resp.status_code}, esperado {cenario.status}")
+
+    latencias = []
+    for _ in range(repeticoes):
+        if cenario.preparar:
+            cenario.preparar(client, ctx)
+        inicio = time.perf_counter()
+        _executar(client, cenario, ctx)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+    resultado = resumo_latencias(latencias)
+    resultado["queries"] = len(queries)
+    resultado["query_budget"] = QUERY_BUDGETS.get(cenario.nome)
+    return resultado
+
+
+def executar_suite(client, ctx, repeticoes=30, aquecimento=3, nomes=None):
+    """Roda os cenários (todos ou os de `nomes`). O dado é fixo em 1 para a partida não acabar."""
+    client.login(username=BENCH_USER, password=BENCH_SENHA)
+    resultados = {}
+    with patch("game.views.rolar_dado", return_value=1):
+        for cenario in CENARIOS:
+            if nomes and cenario.nome not in nomes:
+                continue
+            resultados[cenario.nome] = medir_cenario(client, cenario, ctx, repeticoes, aquecimento)
+    return resultados
+
+
+def estouros_de_orcamento(resultados):
+    """Lista de (cenário, queries, orçamento) acima do teto."""
+    return [
+        (nome, r["queries"], r["query_budget"])
+        for nome, r in resultados.items()
+        if r["query_budget"] is not None and r["queries"] > r["query_budget"]
+    ]
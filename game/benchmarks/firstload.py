@@ -0,0 +1,197 @@
+"""
+Relatório de bytes de primeira carga (e de visita repetida) das páginas.
+
+Renderiza cada página com o test client, como em produção (DEBUG=False, URLs
+com hash do manifest), e soma o HTML mais os assets que um navegador baixaria:
+  - css/js/img referenciados por src/href;
+  - em <picture>, o primeiro <source> (formato mais novo) e, dentro do srcset,
+    o menor candidato que cobre a largura de `sizes` x DPR;
+  - tamanho de transferência = .br > .gz > arquivo cru (o que o WhiteNoise serve).
+
+"Visita repetida" desconta o que o navegador já tem em cache para sempre:
+arquivos com hash no nome e respostas com Cache-Control immutable.
+"""
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from ..models import GameRoom
+from .endpoints import BENCH_SALA, BENCH_SENHA, BENCH_USER, _resetar_sala, _resetar_single
+
+_HASH_NO_NOME = re.compile(r"\.[0-9a-f]{12}\.\w+$")
+_PX = re.compile(r"(\d+(?:\.\d+)?)px")
+
+
+class _ColetorAssets(HTMLParser):
+    def __init__(self, dpr):
+        super().__init__(convert_charrefs=True)
+        self.dpr = dpr
+        self.urls = []
+        self.inline_scripts = 0
+        self.inline_bytes = 0
+        self._em_picture = False
+        self._picture_escolhido = False
+        self._em_script_inline = False
+
+    def _escolher_srcset(self, srcset, sizes):
+        candidatos = []
+        for item in srcset.split(","):
+            partes = item.split()
+            if not partes:
+                continue
+            largura = int(partes[1][:-1]) if len(partes) > 1 and partes[1].endswith("w") else 0
+            candidatos.append((largura, partes[0]))
+        if not candidatos:
+            return None
+        # último valor em px do `sizes` é o slot padrão (sem media query)
+        valores = _PX.findall(sizes or "")
+        alvo = float(valores[-1]) * self.dpr if valores else 0
+        candidatos.sort()
+        for largura, url in candidatos:
+            if largura >= alvo:
+                return url
+        return candidatos[-1][1]
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag == "picture":
+            self._em_picture, self._picture_escolhido = True, False
+        elif tag == "source" and self._em_picture and not self._picture_escolhido and a.get("srcset"):
+            url = self._escolher_srcset(a["srcset"], a.get("sizes"))
+            if url:
+                self.urls.append(url)
+                self._picture_escolhido = True
+        elif tag == "img" and a.get("src"):
+            if not (self._em_picture and self._picture_escolhido):
+                self.urls.append(a["src"])
+        elif tag == "script":
+            if a.get("src"):
+                self.urls.append(a["src"])
+            else:
+                self._em_script_inline = True
+                self.inline_scripts += 1
+        elif tag == "link" and a.get("href") and "stylesheet" in (a.get("rel") or ""):
+            self.urls.append(a["href"])
+
+    def handle_endtag(self, tag):
+        if tag == "picture":
+            self._em_picture = False
+        elif tag == "script":
+            self._em_script_inline = False
+
+    def handle_data(self, data):
+        if self._em_script_inline:
+            self.inline_bytes += len(data.encode())
+
+
+def coletar_assets(html, dpr=2):
+    """(urls, nº de scripts inline, bytes de script inline) de um documento."""
+    parser = _ColetorAssets(dpr)
+    parser.feed(html)
+    return parser.urls, parser.inline_scripts, parser.inline_bytes
+
+
+def _arquivo_estatico(caminho):
+    relativo = unquote(caminho[len(settings.STATIC_URL):])
+    arquivo = Path(settings.STATIC_ROOT) / relativo
+    if not arquivo.is_file():
+        return None
+    transferido = arquivo.stat().st_size
+    for ext in (".br", ".gz"):
+        comprimido = arquivo.with_name(arquivo.name + ext)
+        if comprimido.is_file():
+            transferido = min(transferido, comprimido.stat().st_size)
+            break
+    return {
+        "bytes": arquivo.stat().st_size,
+        "transfer": transferido,
+        "immutable": bool(_HASH_NO_NOME.search(arquivo.name)),
+    }
+
+
+def medir_asset(client, url):
+    partes = urlsplit(url)
+    if partes.netloc:
+        return {"url": url, "external": True}
+    if partes.path.startswith(settings.STATIC_URL):
+        info = _arquivo_estatico(partes.path)
+        if info is None:
+            return {"url": url, "missing": True}
+        return {"url": url, **info}
+    resp = client.get(url)
+    corpo = b"".join(resp.streaming_content) if resp.streaming else resp.content
+    return {
+        "url": url,
+        "bytes": len(corpo),
+        "transfer": len(corpo),
+        "immutable": "immutable" in resp.get("Cache-Control", ""),
+    }
+
+
+@dataclass
+class Pagina:
+    nome: str
+    url: Callable[[dict], str]
+    preparar: Optional[Callable] = None
+    login: bool = False
+
+
+def _sala_em_lobby(client, ctx):
+    GameRoom.objects.filter(pk=ctx["room"].pk).update(status="lobby")
+
+
+PAGINAS = [
+    Pagina("tela_inicial", lambda c: reverse("game:tela_inicial")),
+    Pagina("tela_instrucoes", lambda c: reverse("game:tela_instrucoes")),
+    Pagina("tela_tabuleiro", lambda c: reverse("game:tela_tabuleiro"), preparar=_resetar_single),
+    Pagina("multiplayer_lobby", lambda c: reverse("game:multiplayer_lobby"), login=True),
+    Pagina("room_lobby", lambda c: reverse("game:multiplayer_room", args=[BENCH_SALA]),
+           preparar=_sala_em_lobby, login=True),
+    Pagina("multiplayer_room", lambda c: reverse("game:multiplayer_room", args=[BENCH_SALA]),
+           preparar=_resetar_sala, login=True),
+]
+
+
+def medir_pagina(client, pagina, ctx, dpr=2):
+    if pagina.preparar:
+        pagina.preparar(client, ctx)
+    resp = client.get(pagina.url(ctx))
+    if resp.status_code != 200:
+        raise AssertionError(f"{pagina.nome}: status {resp.status_code}")
+    html = resp.content.decode()
+    urls, n_inline, inline_bytes = coletar_assets(html, dpr)
+
+    assets = [medir_asset(client, u) for u in dict.fromkeys(urls)]
+    contados = [a for a in assets if "transfer" in a]
+    html_bytes = len(resp.content)
+    return {
+        "html_bytes": html_bytes,
+        "inline_scripts": n_inline,
+        "inline_script_bytes": inline_bytes,
+        "assets": assets,
+        "first_load_bytes": html_bytes + sum(a["transfer"] for a in contados),
+        "repeat_load_bytes": html_bytes + sum(a["transfer"] for a in contados if not a["immutable"]),
+        "external_assets": sum(1 for a in assets if a.get("external")),
+    }
+
+
+def executar(client, ctx, dpr=2, nomes=None):
+    """Mede as páginas em modo produção (manifest com hash, sem DEBUG)."""
+    resultados = {}
+    with override_settings(DEBUG=False):
+        for pagina in PAGINAS:
+            if nomes and pagina.nome not in nomes:
+                continue
+            if pagina.login:
+                client.login(username=BENCH_USER, password=BENCH_SENHA)
+            else:
+                client.logout()
+            resultados[pagina.nome] = medir_pagina(client, pagina, ctx, dpr)
+    return resultados
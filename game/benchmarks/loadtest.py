@@ -0,0 +1,300 @@
+"""
+Gerador de carga para o fluxo multiplayer, via HTTP de verdade.
+
+Cada usuário virtual tem sua própria requests.Session (cookies de login + pool
+keep-alive). A orquestração é feita com asyncio: as chamadas bloqueantes rodam
+num ThreadPoolExecutor dimensionado para o número de usuários, então N usuários
+fazem requests de forma concorrente sem depender de um cliente HTTP assíncrono
+fora do requirements.txt.
+
+Fluxo de cada grupo (party_size usuários):
+  register -> host: multiplayer_create -> demais: multiplayer_join
+  -> host: multiplayer_start -> todos fazem polling em api_room_state a cada
+  `poll_interval` e quem estiver na vez chama api_room_move. Quando a partida
+  acaba o grupo abre outra sala, até o tempo acabar.
+
+Modo "single" (partidas contra a máquina, uma por usuário virtual, anônimos):
+  tela_inicial -> iniciar_contra_maquina -> novo_jogo -> jogar_rodada (XHR,
+  lote=1) a cada `poll_interval` até acabar, e outra partida, até o tempo
+  acabar. A latência de jogar_rodada é a do armazenamento do estado
+  (SINGLEPLAYER_STORE, game/estado_single.py) sob N partidas simultâneas.
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import resumo_latencias
+
+SENHA_PADRAO = "Carga!Teste2024"
+
+_CODIGO_SALA = re.compile(r"/room/([A-Z0-9]+)/")
+
+
+@dataclass
+class ConfigCarga:
+    base_url: str = "http://127.0.0.1:8000"
+    usuarios: int = 10
+    party_size: int = 2
+    duracao: float = 60.0
+    poll_interval: float = 1.5
+    timeout: float = 10.0
+    modo: str = "multi"  # multi | single
+
+
+class Coletor:
+    """Acumula latências e erros por endpoint (nome da url)."""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.erros = defaultdict(lambda: defaultdict(int))
+        self.movimentos = 0
+        self.partidas = 0
+        self._lock = threading.Lock()
+
+    def registrar(self, endpoint, ms, erro=None):
+        # chamado pelas threads do executor
+        with self._lock:
+            self.latencias[endpoint].append(ms)
+            if erro:
+                self.erros[endpoint][erro] += 1
+
+    def relatorio(self, duracao_s):
+        endpoints = {}
+        total_req = 0
+        total_erros = 0
+        locks = 0
+        for nome, valores in sorted(self.latencias.items()):
+            erros = dict(self.erros.get(nome, {}))
+            n_erros = sum(erros.values())
+            total_req += len(valores)
+            total_erros += n_erros
+            locks += erros.get("sqlite_locked", 0)
+            endpoints[nome] = {
+                **resumo_latencias(valores),
+                "errors": erros,
+                "error_rate": round(n_erros / len(valores), 4) if valores else 0.0,
+            }
+        return {
+            "duration_s": round(duracao_s, 3),
+            "requests": total_req,
+            "errors": total_erros,
+            "error_rate": round(total_erros / total_req, 4) if total_req else 0.0,
+            "sqlite_lock_errors": locks,
+            "moves": self.movimentos,
+            "moves_per_s": round(self.movimentos / duracao_s, 3) if duracao_s else 0.0,
+            "games_finished": self.partidas,
+            "endpoints": endpoints,
+        }
+
+
+def _classificar(resp):
+    # as views das salas respondem 409 com X-Corrida quando perdem a corrida
+    # para outro escritor; fora delas, um lock vira 500 e o texto só aparece
+    # na página de erro do DEBUG=True
+    corrida = resp.headers.get("X-Corrida") if resp.status_code == 409 else None
+    if corrida:
+        return "sqlite_locked" if corrida == "locked" else "conflito_versao"
+    if resp.status_code >= 500 and "database is locked" in resp.text:
+        return "sqlite_locked"
+    if resp.status_code >= 400:
+        return f"http_{resp.status_code}"
+    return None
+
+
+class JogadorVirtual:
+    def __init__(self, config: ConfigCarga, coletor: Coletor, username: str):
+        self.config = config
+        self.coletor = coletor
+        self.username = username
+        self.http = requests.Session()
+        # um pool keep-alive pequeno por usuário: polling + jogada podem se sobrepor
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+
+    # ---------- infraestrutura ----------
+    def _req(self, endpoint, metodo, caminho, **kwargs):
+        url = self.config.base_url.rstrip("/") + caminho
+        headers = kwargs.pop("headers", {})
+        if metodo == "POST":
+            headers["X-CSRFToken"] = self.http.cookies.get("csrftoken", "")
+            headers["Referer"] = url
+        inicio = time.perf_counter()
+        try:
+            resp = self.http.request(
+                metodo, url, headers=headers, allow_redirects=False,
+                timeout=self.config.timeout, **kwargs,
+            )
+        except requests.RequestException:
+            self.coletor.registrar(endpoint, (time.perf_counter() - inicio) * 1000, "conexao")
+            return None
+        self.coletor.registrar(endpoint, (time.perf_counter() - inicio) * 1000, _classificar(resp))
+        return resp
+
+    # ---------- passos do fluxo ----------
+    def registrar(self):
+        # GET para receber o cookie csrftoken
+        self._req("register", "GET", "/register/")
+        resp = self._req("register", "POST", "/register/", data={
+            "username": self.username,
+            "email": f"{self.username}@carga.local",
+            "nickname": self.username[:30],
+            "password1": SENHA_PADRAO,
+            "password2": SENHA_PADRAO,
+        })
+        return resp is not None and resp.status_code == 302
+
+    def criar_sala(self):
+        resp = self._req("multiplayer_create", "POST", "/multiplayer/create/")
+        if resp is None or resp.status_code != 302:
+            return None
+        achou = _CODIGO_SALA.search(resp.headers.get("Location", ""))
+        return achou.group(1) if achou else None
+
+    def entrar(self, code):
+        resp = self._req("multiplayer_join", "POST", "/multiplayer/join/", data={"code": code})
+        return resp is not None and resp.status_code == 302
+
+    def iniciar(self, code):
+        resp = self._req("multiplayer_start", "POST", f"/room/{code}/start/")
+        return resp is not None and resp.status_code == 302
+
+    def estado(self, code):
+        resp = self._req("api_room_state", "GET", f"/api/room/{code}/state/")
+        if resp is None or resp.status_code != 200:
+            return None
+        try:
+            return resp.json()
+        except ValueError:
+            return None
+
+    def mover(self, code):
+        resp = self._req(
+            "api_room_move", "POST", f"/api/room/{code}/move/",
+            headers={"X-Requested-With": "XMLHttpRequest"},
+        )
+        if resp is None or resp.status_code != 200:
+            return None
+        try:
+            return resp.json()
+        except ValueError:
+            return None
+
+    # ---------- singleplayer ----------
+    def comecar_single(self):
+        if not self.http.cookies.get("csrftoken"):
+            self._req("tela_inicial", "GET", "/")
+        resp = self._req("iniciar_contra_maquina", "POST", "/iniciar/", data={
+            "tamanho_tabuleiro": "10x10", "qtd_maquinas": "1",
+        })
+        if resp is None or resp.status_code != 302:
+            return False
+        resp = self._req("novo_jogo", "GET", "/jogo/")
+        return resp is not None and resp.status_code == 302
+
+    def jogar_single(self):
+        resp = self._req(
+            "jogar_rodada", "POST", "/jogar/", data={"lote": "1"},
+            headers={"X-Requested-With": "XMLHttpRequest"},
+        )
+        if resp is None or resp.status_code != 200:
+            return None
+        try:
+            return resp.json()
+        except ValueError:
+            return None
+
+
+async def _chamar(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+async def _jogar(jogador, code, fim, config, coletor):
+    loop = asyncio.get_running_loop()
+    # espalha o início para que os pollers não fiquem sincronizados
+    await asyncio.sleep(random.uniform(0, config.poll_interval))
+    while loop.time() < fim:
+        t0 = loop.time()
+        estado = await _chamar(jogador.estado, code)
+        if estado is not None:
+            if not estado.get("is_active"):
+                return
+            if estado.get("current_turn") == jogador.username:
+                resultado = await _chamar(jogador.mover, code)
+                if resultado and resultado.get("ok"):
+                    coletor.movimentos += 1
+                    if resultado.get("finished"):
+                        coletor.partidas += 1
+                        return
+        await asyncio.sleep(max(0.0, config.poll_interval - (loop.time() - t0)))
+
+
+async def _grupo(membros, fim, config, coletor):
+    loop = asyncio.get_running_loop()
+    registrados = await asyncio.gather(*(_chamar(m.registrar) for m in membros))
+    if not all(registrados):
+        return
+    host, convidados = membros[0], membros[1:]
+    while loop.time() < fim:
+        code = await _chamar(host.criar_sala)
+        if not code:
+            await asyncio.sleep(1.0)
+            continue
+        await asyncio.gather(*(_chamar(m.entrar, code) for m in convidados))
+        if not await _chamar(host.iniciar, code):
+            await asyncio.sleep(1.0)
+            continue
+        await asyncio.gather(*(_jogar(m, code, fim, config, coletor) for m in membros))
+
+
+async def _solo(jogador, fim, config, coletor):
+    loop = asyncio.get_running_loop()
+    await asyncio.sleep(random.uniform(0, config.poll_interval))
+    while loop.time() < fim:
+        if not await _chamar(jogador.comecar_single):
+            await asyncio.sleep(1.0)
+            continue
+        while loop.time() < fim:
+            t0 = loop.time()
+            resultado = await _chamar(jogador.jogar_single)
+            if resultado is not None:
+                coletor.movimentos += 1
+                if resultado.get("status") == "finalizado":
+                    coletor.partidas += 1
+                    break
+            await asyncio.sleep(max(0.0, config.poll_interval - (loop.time() - t0)))
+
+
+async def _executar(config: ConfigCarga, coletor: Coletor):
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=config.usuarios + 4))
+
+    rodada = uuid.uuid4().hex[:6]
+    jogadores = [
+        JogadorVirtual(config, coletor, f"lt{rodada}u{i}")
+        for i in range(config.usuarios)
+    ]
+    fim = loop.time() + config.duracao
+    if config.modo == "single":
+        await asyncio.gather(*(_solo(j, fim, config, coletor) for j in jogadores))
+        return
+
+    party = max(1, config.party_size)
+    grupos = [jogadores[i:i + party] for i in range(0, len(jogadores), party)]
+    await asyncio.gather(*(_grupo(g, fim, config, coletor) for g in grupos))
+
+
+def executar_carga(config: ConfigCarga) -> dict:
+    coletor = Coletor()
+    inicio = time.perf_counter()
+    asyncio.run(_executar(config, coletor))
+    return coletor.relatorio(time.perf_counter() - inicio)
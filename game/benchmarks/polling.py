@@ -0,0 +1,160 @@
+"""
+Quantos pollers de api_room_state um processo sustenta, sob WSGI e sob ASGI.
+
+Sem servidor nem rede: o handler do Django (get_wsgi_application /
+get_asgi_application) é chamado direto, com a pilha de middlewares inteira.
+Cada poller pede o estado da sala a cada `intervalo` segundos, como o
+tabuleiro_multi.js. Um processo de cada vez, porque o ASYNC_POLLING (que
+troca as views) é lido na importação do urls.py: o comando bench_polling
+roda um subprocesso por modo.
+
+  - wsgi: `workers` threads atendendo (worker sync do gunicorn = 1). Depois
+    da resposta o worker ainda fica `rtt_ms` preso entregando o corpo ao
+    cliente — é isso que limita os pollers por worker na vida real;
+  - asgi: tudo no event loop; a entrega dos `rtt_ms` é um await.
+
+Uma carga é "sustentada" quando sai pelo menos 95% dos polls esperados e o
+p95 da latência (fila incluída) fica abaixo do intervalo.
+"""
+import asyncio
+import io
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.urls import reverse
+
+from . import resumo_latencias
+
+MODOS = ("wsgi", "asgi")
+
+
+def _wsgi(app, caminho, cookie, rtt):
+    environ = {
+        "REQUEST_METHOD": "GET", "PATH_INFO": caminho, "QUERY_STRING": "", "SCRIPT_NAME": "",
+        "SERVER_NAME": "testserver", "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "testserver", "HTTP_COOKIE": cookie, "REMOTE_ADDR": "127.0.0.1",
+        "wsgi.input": io.BytesIO(b""), "wsgi.errors": io.StringIO(), "wsgi.url_scheme": "http",
+        "wsgi.version": (1, 0), "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+    }
+    status = []
+    corpo = b"".join(app(environ, lambda s, h, exc=None: status.append(s)))
+    time.sleep(rtt)  # worker preso escrevendo para o cliente
+    return int(status[0].split()[0]), corpo
+
+
+async def _asgi(app, caminho, cookie, rtt):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": caminho, "raw_path": caminho.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"testserver"), (b"cookie", cookie.encode())],
+        "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+    }
+    entregue = asyncio.Event()
+    enviado = False
+    status = []
+    partes = []
+
+    async def receive():
+        nonlocal enviado
+        if not enviado:
+            enviado = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await entregue.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(msg):
+        if msg["type"] == "http.response.start":
+            status.append(msg["status"])
+        elif msg["type"] == "http.response.body":
+            partes.append(msg.get("body", b""))
+            if not msg.get("more_body"):
+                await asyncio.sleep(rtt)  # entrega ao cliente, sem prender ninguém
+                entregue.set()
+
+    await app(scope, receive, send)
+    return status[0], b"".join(partes)
+
+
+async def _rodar(modo, app, caminho, cookie, pollers, segundos, intervalo, rtt, workers):
+    loop = asyncio.get_running_loop()
+    latencias = []
+    erros = 0
+    fim = loop.time() + segundos
+    executor = ThreadPoolExecutor(max_workers=workers) if modo == "wsgi" else None
+
+    async def pedir():
+        if executor is not None:
+            return await loop.run_in_executor(executor, _wsgi, app, caminho, cookie, rtt)
+        return await _asgi(app, caminho, cookie, rtt)
+
+    async def poller():
+        nonlocal erros
+        # espalha o início para que os pollers não fiquem sincronizados
+        await asyncio.sleep(random.uniform(0, intervalo))
+        while loop.time() < fim:
+            t0 = loop.time()
+            status, _ = await pedir()
+            latencias.append((loop.time() - t0) * 1000)
+            if status != 200:
+                erros += 1
+            await asyncio.sleep(max(0.0, intervalo - (loop.time() - t0)))
+
+    inicio = loop.time()
+    try:
+        await asyncio.gather(*(poller() for _ in range(pollers)))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    duracao = loop.time() - inicio
+    esperado = pollers * segundos / intervalo
+    lat = resumo_latencias(latencias)
+    return {
+        "pollers": pollers,
+        "polls": len(latencias),
+        "polls_per_s": round(len(latencias) / duracao, 1),
+        "expected_ratio": round(len(latencias) / esperado, 3) if esperado else 0.0,
+        "errors": erros,
+        "latency_ms": lat,
+        "sustained": sustentado(len(latencias), esperado, lat["p95"], intervalo, erros),
+    }
+
+
+def sustentado(polls, esperado, p95_ms, intervalo, erros=0):
+    return bool(polls) and not erros and polls >= 0.95 * esperado and p95_ms < intervalo * 1000
+
+
+def _aplicacao(modo):
+    if modo == "asgi":
+        from django.core.asgi import get_asgi_application
+        return get_asgi_application()
+    from django.core.wsgi import get_wsgi_application
+    return get_wsgi_application()
+
+
+def rampa(modo, cookie, code, cargas=(25, 50, 100, 200, 400, 800), segundos=6.0,
+          intervalo=1.5, rtt_ms=50.0, workers=1):
+    """
+    Mede cada carga até a primeira que não se sustenta. Roda no processo atual,
+    então o ASYNC_POLLING dele precisa bater com o `modo`.
+    """
+    if settings.ASYNC_POLLING != (modo == "asgi"):
+        raise RuntimeError(f"ASYNC_POLLING={settings.ASYNC_POLLING} não combina com o modo {modo}.")
+    app = _aplicacao(modo)
+    caminho = reverse("game:api_room_state", args=[code])
+    resultados = []
+    for pollers in cargas:
+        r = asyncio.run(_rodar(modo, app, caminho, cookie, pollers, segundos, intervalo, rtt_ms / 1000, workers))
+        resultados.append(r)
+        if not r["sustained"]:
+            break
+    sustentados = [r["pollers"] for r in resultados if r["sustained"]]
+    return {
+        "mode": modo,
+        "workers": workers if modo == "wsgi" else None,
+        "rtt_ms": rtt_ms,
+        "interval_s": intervalo,
+        "max_sustained_pollers": max(sustentados, default=0),
+        "loads": resultados,
+    }
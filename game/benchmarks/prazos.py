@@ -0,0 +1,89 @@
+"""
+Roda de tempo dos prazos de turno (game/prazos.py) com dezenas de milhares de
+salas, contra um heap com cancelamento preguiçoso (o jeito "óbvio": heapq +
+marca de cancelado, já que tirar do meio do heap é O(n)).
+
+Sem banco: `salas` salas com prazo de `prazo_s` segundos; a cada tick uma
+fração `jogam` delas joga (cancela e reagenda o prazo) e o relógio anda um
+tick, por `ticks` ticks. Mede o custo por reagendamento e por tick, quantos
+vencidos cada estrutura devolveu (têm que bater) e o tamanho final do heap
+(as entradas canceladas ficam lá até vencerem).
+"""
+import heapq
+import random
+import time
+
+from ..prazos import RodaDeTempo
+
+
+class HeapPreguicoso:
+    """heapq + versão por chave: cancelar só invalida, a entrada sai quando vence."""
+
+    def __init__(self):
+        self._heap = []
+        self._versao = {}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def agendar(self, chave, quando):
+        v = self._versao.get(chave, 0) + 1
+        self._versao[chave] = v
+        heapq.heappush(self._heap, (quando, v, chave))
+
+    def cancelar(self, chave):
+        self._versao[chave] = self._versao.get(chave, 0) + 1
+
+    def avancar(self, agora):
+        vencidos = []
+        while self._heap and self._heap[0][0] <= agora:
+            _, v, chave = heapq.heappop(self._heap)
+            if self._versao.get(chave) == v:
+                vencidos.append(chave)
+        return vencidos
+
+
+def _simular(estrutura, salas, prazo_s, ticks, jogam, tick, seed):
+    rnd = random.Random(seed)
+    inicio = 1_000_000.0
+    codigos = [f"S{i:06d}" for i in range(salas)]
+    t0 = time.perf_counter()
+    for i, code in enumerate(codigos):
+        estrutura.agendar(code, inicio + prazo_s * (i + 1) / salas)
+    carga_s = time.perf_counter() - t0
+
+    reagendar_s = avancar_s = 0.0
+    reagendados = vencidos = 0
+    por_tick = max(1, int(salas * jogam))
+    for n in range(1, ticks + 1):
+        agora = inicio + n * tick
+        escolhidas = rnd.sample(codigos, por_tick)
+        t0 = time.perf_counter()
+        for code in escolhidas:
+            estrutura.cancelar(code)
+            estrutura.agendar(code, agora + prazo_s)
+        reagendar_s += time.perf_counter() - t0
+        reagendados += por_tick
+        t0 = time.perf_counter()
+        saiu = estrutura.avancar(agora)
+        avancar_s += time.perf_counter() - t0
+        vencidos += len(saiu)
+        # quem venceu volta com prazo novo (a jogada automática), fora da medição
+        for code in saiu:
+            estrutura.agendar(code, agora + prazo_s)
+    return {
+        "load_ms": round(carga_s * 1000, 2),
+        "reschedule_us": round(reagendar_s / reagendados * 1e6, 3),
+        "tick_us": round(avancar_s / ticks * 1e6, 2),
+        "expired": vencidos,
+        "final_size": len(estrutura),
+    }
+
+
+def executar(salas=50_000, prazo_s=60.0, ticks=600, jogam=0.02, tick=1.0, seed=7):
+    roda = RodaDeTempo(tick=tick, inicio=1_000_000.0)
+    return {
+        "rooms": salas, "timeout_s": prazo_s, "ticks": ticks, "moving_per_tick": jogam,
+        "wheel": _simular(roda, salas, prazo_s, ticks, jogam, tick, seed),
+        "heap": _simular(HeapPreguicoso(), salas, prazo_s, ticks, jogam, tick, seed),
+    }
@@ -0,0 +1,112 @@
+"""
+Ranking com muitos perfis: top-N e ranking dos amigos pelo índice, "minha
+posição" pelas árvores (game/ranking.py) contra o COUNT(*) que faria o mesmo
+no banco, a atualização incremental de fim de partida e a reconstrução exata.
+
+Roda no banco atual (o comando bench_leaderboard cria um de teste).
+"""
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Q
+
+from .. import ranking
+from ..models import FriendRequest, Profile
+from . import resumo_latencias
+
+PREFIXO = "rank"
+
+
+def semear(perfis, lote=10000, seed=7):
+    """`perfis` usuários com partidas jogadas (incremental, como o semear dos endpoints)."""
+    atual = User.objects.filter(username__startswith=PREFIXO).count()
+    rnd = random.Random(seed + atual)
+    senha = make_password(None)
+    for ini in range(atual, perfis, lote):
+        fim = min(perfis, ini + lote)
+        with transaction.atomic():
+            users = User.objects.bulk_create([User(username=f"{PREFIXO}{i}", password=senha) for i in range(ini, fim)])
+            jogos = [rnd.randint(1, 400) for _ in users]
+            Profile.objects.bulk_create([
+                Profile(user=u, nickname=u.username, total_games=n, wins=(v := rnd.randint(0, n)), losses=n - v)
+                for u, n in zip(users, jogos)
+            ], batch_size=lote)
+
+
+def _amigos(user, n):
+    outros = list(Profile.objects.exclude(user=user).values_list("user_id", flat=True)[:n])
+    FriendRequest.objects.bulk_create(
+        [FriendRequest(requester=user, addressee_id=uid, status="accepted") for uid in outros],
+        ignore_conflicts=True,
+    )
+
+
+def _cronometrar(fn, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return resumo_latencias(tempos)
+
+
+def _posicao_sql(bp, wins):
+    return 1 + Profile.objects.filter(Q(win_rate_bp__gt=bp) | Q(win_rate_bp=bp, wins__gt=wins)).count()
+
+
+def executar(perfis, repeticoes=50, amigos=50):
+    t0 = time.perf_counter()
+    semear(perfis)
+    semeadura_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    errados = ranking.reconstruir()
+    reconstrucao_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    ranking.arvores()
+    carga_ms = (time.perf_counter() - t0) * 1000
+
+    rnd = random.Random(11)
+    amostra = list(
+        Profile.objects.filter(win_rate_bp__isnull=False).order_by("?").values_list("user_id", "win_rate_bp", "wins")[:repeticoes]
+    )
+    user = User.objects.get(pk=amostra[0][0])
+    _amigos(user, amigos)
+
+    # confere as duas contas antes de medir
+    for _, bp, wins in amostra[:10]:
+        assert ranking.arvores().posicao(bp, wins) == _posicao_sql(bp, wins)
+
+    def minha_arvore():
+        _, bp, wins = rnd.choice(amostra)
+        ranking.arvores().posicao(bp, wins)
+
+    def minha_sql():
+        _, bp, wins = rnd.choice(amostra)
+        _posicao_sql(bp, wins)
+
+    def fim_de_partida():
+        uid = rnd.choice(amostra)[0]
+        with ranking.atualizando([uid]):
+            Profile.objects.filter(user_id=uid).update(
+                total_games=F("total_games") + 1, wins=F("wins") + 1,
+            )
+
+    return {
+        "profiles": Profile.objects.filter(win_rate_bp__isnull=False).count(),
+        "buckets": len(ranking.contagem_exata()),
+        "seed_s": round(semeadura_s, 1),
+        "rebuild_ms": round(reconstrucao_ms, 1),
+        "rebuild_fixed_pairs": len(errados),
+        "tree_load_ms": round(carga_ms, 1),
+        "top50_ms": _cronometrar(lambda: ranking.top(50), repeticoes),
+        "my_rank_tree_ms": _cronometrar(minha_arvore, repeticoes),
+        "my_rank_sql_count_ms": _cronometrar(minha_sql, max(5, repeticoes // 5)),
+        "friends_ms": _cronometrar(lambda: ranking.dos_amigos(user), repeticoes),
+        "update_ms": _cronometrar(fim_de_partida, repeticoes),
+        "consistent_after_updates": not ranking.reconstruir(gravar=False),
+    }
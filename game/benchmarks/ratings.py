@@ -0,0 +1,21 @@
+"""
+Histórico sintético para medir o recompute_ratings sem banco: partidas de 2 a
+4 jogadores sorteados de uma população, no formato de ratings.carregar().
+"""
+import random
+from array import array
+
+from ..ratings import chave
+
+
+def sintetico(partidas, jogadores, seed=1):
+    rnd = random.Random(seed)
+    result_ids, user_ids, chaves = array("q"), array("q"), array("q")
+    for rid in range(1, partidas + 1):
+        n = rnd.randint(2, 4)
+        vencedor = rnd.randrange(n)
+        for k, uid in enumerate(rnd.sample(range(1, jogadores + 1), n)):
+            result_ids.append(rid)
+            user_ids.append(uid)
+            chaves.append(chave(k == vencedor, 100 if k == vencedor else rnd.randint(0, 99)))
+    return result_ids, user_ids, chaves
@@ -0,0 +1,176 @@
+"""
+Micro-benchmarks das primitivas de game.services (e da geometria do tabuleiro).
+
+Para cada caso:
+  - aquecimento fixo, depois calibração do nº de loops (estilo timeit.autorange)
+    até uma repetição levar ~`alvo_s`;
+  - `repeticoes` medições; ns/op reporta o mínimo e a mediana;
+  - memória via tracemalloc: bytes/blocos que sobram por operação (resultado
+    mantido vivo) e o pico transitório de uma chamada isolada.
+"""
+import gc
+import json
+import math
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+
+from .. import board, rng, services, views
+
+
+@dataclass
+class Caso:
+    nome: str
+    fn: Callable[[], object]
+    grupo: str = ""
+
+
+def _calibrar(fn, alvo_s):
+    loops = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - inicio >= alvo_s or loops >= 10_000_000:
+            return loops
+        loops *= 2
+
+
+def _memoria(fn, amostras=200):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        # pico de uma chamada isolada
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, pico = tracemalloc.get_traced_memory()
+        pico_bytes = max(0, pico - base)
+
+        # o que sobra por operação quando o resultado é mantido
+        vivos = [None] * amostras
+        antes = tracemalloc.take_snapshot()
+        for i in range(amostras):
+            vivos[i] = fn()
+        depois = tracemalloc.take_snapshot()
+        diff = depois.compare_to(antes, "filename")
+        blocos = sum(max(0, d.count_diff) for d in diff)
+        bytes_ = sum(max(0, d.size_diff) for d in diff)
+        del vivos
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_blocks_per_op": round(blocos / amostras, 2),
+        "alloc_bytes_per_op": round(bytes_ / amostras, 1),
+        "peak_bytes": pico_bytes,
+    }
+
+
+def medir(fn, repeticoes=7, aquecimento=100, alvo_s=0.1):
+    for _ in range(aquecimento):
+        fn()
+    loops = _calibrar(fn, alvo_s)
+    tempos = []
+    gc_ativo = gc.isenabled()
+    gc.disable()  # evita que uma coleta caia no meio de uma repetição
+    try:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter_ns()
+            for _ in range(loops):
+                fn()
+            tempos.append((time.perf_counter_ns() - inicio) / loops)
+    finally:
+        if gc_ativo:
+            gc.enable()
+    return {
+        "ns_per_op_min": round(min(tempos), 1),
+        "ns_per_op_median": round(statistics.median(tempos), 1),
+        "loops": loops,
+        "repeats": repeticoes,
+        **_memoria(fn),
+    }
+
+
+def _mapas(casa_final, fator=0.6, seed=1234):
+    qtd = max(2, int(math.sqrt(casa_final) * fator))
+    return services.gerar_cobras_escadas_sem_overlaps(casa_final, qtd, qtd, seed=seed)
+
+
+def casos():
+    lista = [Caso("rolar_dado", services.rolar_dado, "dado")]
+    fluxo = rng.FluxoDados(rng.novo_seed(), monitorar=False)
+    fluxo_monitorado = rng.FluxoDados(rng.novo_seed())
+    lista += [
+        Caso("rolar_dado[fluxo]", lambda: services.rolar_dado(fluxo), "dado"),
+        Caso("rolar_dado[fluxo+monitor]", lambda: services.rolar_dado(fluxo_monitorado), "dado"),
+    ]
+
+    cobras, escadas = _mapas(100)
+    cobras_str = {str(k): v for k, v in cobras.items()}
+    escadas_str = {str(k): v for k, v in escadas.items()}
+    alvo = next(iter(escadas))  # cai numa escada
+    lista += [
+        Caso("mover_peao[10x10,int]", lambda: services.mover_peao(alvo - 3, 3, 100, cobras, escadas), "movimento"),
+        Caso("mover_peao[10x10,str]", lambda: services.mover_peao(alvo - 3, 3, 100, cobras_str, escadas_str),
+             "movimento"),
+        Caso("aplicar_cobras_escadas[hit]", lambda: services.aplicar_cobras_escadas(alvo, cobras, escadas),
+             "movimento"),
+        Caso("aplicar_cobras_escadas[miss]", lambda: services.aplicar_cobras_escadas(0, cobras, escadas),
+             "movimento"),
+    ]
+
+    for casa_final in (25, 100, 400, 2500, 10000):
+        for fator in (0.3, 0.6, 1.2):
+            qtd = max(2, int(math.sqrt(casa_final) * fator))
+            lista.append(Caso(
+                f"gerar_cobras_escadas[{casa_final},{qtd}+{qtd}]",
+                lambda c=casa_final, q=qtd: services.gerar_cobras_escadas_sem_overlaps(c, q, q, seed=1234),
+                "gerador",
+            ))
+
+    for lado in (5, 10, 50):
+        lista.append(Caso(
+            f"_celulas_serpentina[{lado}x{lado}]",
+            lambda n=lado: views._celulas_serpentina(n, n),
+            "tabuleiro",
+        ))
+        # custo sem o cache (o que cada render pagava antes da memoização)
+        lista.append(Caso(
+            f"geometria[{lado}x{lado},sem cache]",
+            lambda n=lado: board.geometria.__wrapped__(n, n),
+            "tabuleiro",
+        ))
+
+    # decodificação dos mapas da sala por request: JSON com chaves str (antigo) x binário
+    for lado in (5, 10, 100):
+        casa_final = lado * lado
+        c, e = _mapas(casa_final)
+        json_c = json.dumps({str(k): v for k, v in c.items()})
+        json_e = json.dumps({str(k): v for k, v in e.items()})
+        binario = board.codificar_pulos(c, e)
+        lista += [
+            Caso(
+                f"mapas_sala[{lado}x{lado},json]",
+                lambda jc=json_c, je=json_e: (
+                    {int(k): int(v) for k, v in json.loads(jc).items()},
+                    {int(k): int(v) for k, v in json.loads(je).items()},
+                ),
+                "mapas",
+            ),
+            Caso(f"mapas_sala[{lado}x{lado},binario]", lambda b=binario: board.decodificar_pulos(b), "mapas"),
+        ]
+
+    lista.append(Caso("grade_html[10x10]", lambda: board.grade_html(10, 10), "tabuleiro"))
+    lista.append(Caso("grade_html[10x10,sem cache]", lambda: board.grade_html.__wrapped__(10, 10), "tabuleiro"))
+    return lista
+
+
+def executar(filtro="", repeticoes=7, alvo_s=0.1):
+    resultados = {}
+    for caso in casos():
+        if filtro and filtro not in caso.nome:
+            continue
+        resultados[caso.nome] = {"group": caso.grupo, **medir(caso.fn, repeticoes=repeticoes, alvo_s=alvo_s)}
+    return resultados
@@ -0,0 +1,124 @@
+"""
+Vazão de escrita de jogadas com 1, 2, 4... arquivos SQLite (game/shards.py).
+
+Direto no sqlite3 (sem Django/ORM, para medir só o lock de escrita): cada
+jogada é a mesma transação do api_room_move — UPDATE do jogador, dois INSERT
+de RoomEvent e UPDATE da sala — numa sala escolhida ao acaso, gravada no shard
+do crc32 do código. `escritores` threads escrevem ao mesmo tempo por
+`segundos`; cada thread tem sua conexão com cada shard. O sqlite3 solta o GIL
+enquanto espera disco/lock, então o teto é o writer lock de cada arquivo.
+"""
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from . import resumo_latencias
+
+_ESQUEMA = """
+CREATE TABLE sala (id INTEGER PRIMARY KEY, code TEXT UNIQUE, vez INTEGER, versao INTEGER);
+CREATE TABLE jogador (id INTEGER PRIMARY KEY, sala_id INTEGER, ordem INTEGER, posicao INTEGER);
+CREATE TABLE evento (id INTEGER PRIMARY KEY, sala_id INTEGER, seq INTEGER, kind TEXT, data TEXT,
+                     UNIQUE (sala_id, seq));
+"""
+
+
+def _conectar(caminho, sincrono):
+    con = sqlite3.connect(caminho, timeout=30, isolation_level=None, check_same_thread=False)
+    con.execute(f"PRAGMA synchronous={sincrono}")
+    return con
+
+
+def _preparar(diretorio, n_shards, salas, sincrono):
+    caminhos = [str(Path(diretorio) / f"shard{i}.sqlite3") for i in range(n_shards)]
+    for caminho in caminhos:
+        con = _conectar(caminho, sincrono)
+        con.executescript(_ESQUEMA)
+        con.close()
+    codigos = [f"S{i:05d}" for i in range(salas)]
+    por_shard = {}
+    for code in codigos:
+        por_shard.setdefault(zlib.crc32(code.encode()) % n_shards, []).append(code)
+    for i, lista in por_shard.items():
+        con = _conectar(caminhos[i], sincrono)
+        con.execute("BEGIN")
+        for code in lista:
+            sala_id = con.execute("INSERT INTO sala (code, vez, versao) VALUES (?, 0, 0)", (code,)).lastrowid
+            con.executemany("INSERT INTO jogador (sala_id, ordem, posicao) VALUES (?, ?, 0)",
+                            [(sala_id, 0), (sala_id, 1)])
+        con.execute("COMMIT")
+        con.close()
+    return caminhos, codigos
+
+
+def _jogada(con, code, rnd):
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        sala_id, vez, versao = con.execute("SELECT id, vez, versao FROM sala WHERE code = ?", (code,)).fetchone()
+        dado = rnd.randint(1, 6)
+        con.execute("UPDATE jogador SET posicao = (posicao + ?) % 100 WHERE sala_id = ? AND ordem = ?",
+                    (dado, sala_id, vez))
+        con.executemany("INSERT INTO evento (sala_id, seq, kind, data) VALUES (?, ?, ?, ?)", [
+            (sala_id, versao + 1, "roll", f'{{"dado":{dado}}}'),
+            (sala_id, versao + 2, "turn", f'{{"vez":{1 - vez}}}'),
+        ])
+        con.execute("UPDATE sala SET vez = ?, versao = ? WHERE id = ?", (1 - vez, versao + 2, sala_id))
+        con.execute("COMMIT")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+
+
+def medir(n_shards, escritores=8, segundos=2.0, salas=256, sincrono="FULL", diretorio=None):
+    """Jogadas/s e latência por jogada com `n_shards` arquivos."""
+    with tempfile.TemporaryDirectory(dir=diretorio) as tmp:
+        caminhos, codigos = _preparar(tmp, n_shards, salas, sincrono)
+        latencias = [[] for _ in range(escritores)]
+        erros = [0] * escritores
+        comecar = threading.Barrier(escritores + 1)
+        fim = [0.0]
+
+        def escritor(n):
+            rnd = random.Random(n)
+            cons = [_conectar(c, sincrono) for c in caminhos]
+            comecar.wait()
+            try:
+                while time.perf_counter() < fim[0]:
+                    code = rnd.choice(codigos)
+                    inicio = time.perf_counter()
+                    try:
+                        _jogada(cons[zlib.crc32(code.encode()) % n_shards], code, rnd)
+                    except sqlite3.OperationalError:
+                        erros[n] += 1
+                        continue
+                    latencias[n].append((time.perf_counter() - inicio) * 1000)
+            finally:
+                for con in cons:
+                    con.close()
+
+        threads = [threading.Thread(target=escritor, args=(n,)) for n in range(escritores)]
+        for t in threads:
+            t.start()
+        fim[0] = time.perf_counter() + segundos
+        comecar.wait()
+        inicio = time.perf_counter()
+        for t in threads:
+            t.join()
+        duracao = time.perf_counter() - inicio
+
+    todas = [x for lista in latencias for x in lista]
+    return {
+        "shards": n_shards,
+        "writers": escritores,
+        "moves": len(todas),
+        "moves_per_s": round(len(todas) / duracao, 1),
+        "errors": sum(erros),
+        "latency_ms": resumo_latencias(todas),
+    }
+
+
+def executar(contagens=(1, 2, 4), **kwargs):
+    return [medir(n, **kwargs) for n in contagens]
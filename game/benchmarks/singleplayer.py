@@ -0,0 +1,108 @@
+"""
+Latência por jogada do singleplayer com muitas partidas abertas ao mesmo
+tempo, para cada SINGLEPLAYER_STORE (game/estado_single.py).
+
+Sem servidor nem rede: `jogos` test clients anônimos começam uma partida cada
+e `threads` threads jogam (jogar_rodada XHR com lote=1) em partidas tiradas de
+uma fila — cada partida com uma jogada por vez, como um navegador — até
+`jogadas` jogadas no total. Partida que acaba recomeça fora da medição.
+O comando bench_singleplayer roda isto num banco SQLite em arquivo, para as
+escritas disputarem o mesmo lock que disputam em produção.
+"""
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.db import OperationalError, connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .. import estado_single
+from ..models import SinglePlayerState
+from . import resumo_latencias
+
+XHR = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+
+def _comecar(client):
+    client.post(reverse("game:iniciar_contra_maquina"), {"tamanho_tabuleiro": "10x10", "qtd_maquinas": "1"})
+    client.get(reverse("game:novo_jogo"))
+
+
+def _tamanho_estado(store, client):
+    """Bytes regravados por jogada: a sessão inteira ou só a parte "jogo"."""
+    chave = client.session.session_key
+    if store == "sessao":
+        return len(Session.objects.get(pk=chave).session_data)
+    jogo = estado_single._Cache().ler(chave)[1]
+    if jogo is None:
+        jogo = SinglePlayerState.objects.filter(pk=chave).values_list("state", flat=True).first()
+    return len(jogo or b"")
+
+
+def medir(store, jogos=1000, jogadas=20000, threads=16):
+    with override_settings(SINGLEPLAYER_STORE=store):
+        caches[settings.SINGLEPLAYER_CACHE].clear()
+        clientes = [Client() for _ in range(jogos)]
+        inicio = time.perf_counter()
+        for client in clientes:
+            _comecar(client)
+        preparo_s = time.perf_counter() - inicio
+
+        fila = queue.Queue()
+        for client in clientes:
+            fila.put(client)
+        restantes = [jogadas]
+        latencias, erros = [], {}
+        lock = threading.Lock()
+
+        def trabalhar():
+            try:
+                while True:
+                    with lock:
+                        if restantes[0] <= 0:
+                            return
+                        restantes[0] -= 1
+                    client = fila.get()
+                    t0 = time.perf_counter()
+                    try:
+                        resp = client.post(reverse("game:jogar_rodada"), {"lote": "1"}, **XHR)
+                        erro = None if resp.status_code == 200 else f"http_{resp.status_code}"
+                    except OperationalError:
+                        resp, erro = None, "sqlite_locked"
+                    ms = (time.perf_counter() - t0) * 1000
+                    try:
+                        if erro is None and resp.json()["status"] == "finalizado":
+                            _comecar(client)
+                    except OperationalError:
+                        pass  # tenta de novo na próxima vez que a partida sair da fila
+                    with lock:
+                        latencias.append(ms)
+                        if erro:
+                            erros[erro] = erros.get(erro, 0) + 1
+                    fila.put(client)
+            finally:
+                connection.close()
+
+        inicio = time.perf_counter()
+        pool = [threading.Thread(target=trabalhar) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        duracao = time.perf_counter() - inicio
+
+        return {
+            **resumo_latencias(latencias),
+            "errors": erros,
+            "rolls_per_s": round(len(latencias) / duracao, 1) if duracao else 0.0,
+            "setup_s": round(preparo_s, 2),
+            "state_bytes": _tamanho_estado(store, clientes[0]),
+        }
+
+
+def executar(stores=None, jogos=1000, jogadas=20000, threads=16):
+    return {store: medir(store, jogos, jogadas, threads) for store in stores or estado_single.BACKENDS}
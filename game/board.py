@@ -0,0 +1,228 @@
+# game/board.py
+"""
+Geometria do tabuleiro (ordem serpentina, coordenadas e âncoras de desenho) e o
+overlay SVG de cobras/escadas.
+
+A geometria depende só de (linhas, colunas), então é calculada uma vez por
+tamanho e reaproveitada por todas as requests do processo. O overlay depende
+também dos mapas e é servido por uma URL endereçada pelo hash do conteúdo.
+
+Os mapas das salas são gravados em binário (GameRoom.board_data): pares
+(origem, destino) ordenados, uint16 little-endian. Cobra desce, escada sobe,
+então um vetor só guarda os dois mapas.
+"""
+import hashlib
+import json
+import math
+import sys
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Tuple
+from urllib.parse import urlencode
+
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+
+@dataclass(frozen=True)
+class GeometriaTabuleiro:
+    linhas: int
+    colunas: int
+    # números das casas na ordem em que aparecem no grid (de cima p/ baixo, esq -> dir)
+    celulas: Tuple[int, ...]
+    # casa -> (linha visual, coluna), linha 0 = topo
+    coordenadas: Mapping[int, Tuple[int, int]]
+    # casa -> centro da casa em fração da largura/altura do grid (0..1)
+    ancoras: Mapping[int, Tuple[float, float]]
+
+    @property
+    def casa_final(self) -> int:
+        return self.linhas * self.colunas
+
+    def ancora(self, casa: int) -> Tuple[float, float]:
+        # a casa 0 (fora do tabuleiro) é desenhada sobre a casa 1
+        return self.ancoras[max(1, casa)]
+
+
+@lru_cache(maxsize=32)
+def geometria(linhas: int, colunas: int) -> GeometriaTabuleiro:
+    celulas = []
+    coordenadas = {}
+    ancoras = {}
+    for visual_row in range(linhas):
+        row_from_bottom = linhas - 1 - visual_row
+        even = (row_from_bottom % 2 == 0)
+        for col in range(colunas):
+            n = (row_from_bottom * colunas + (col + 1)) if even \
+                else (row_from_bottom * colunas + (colunas - col))
+            celulas.append(n)
+            coordenadas[n] = (visual_row, col)
+            ancoras[n] = ((col + 0.5) / colunas, (visual_row + 0.5) / linhas)
+    return GeometriaTabuleiro(
+        linhas=linhas,
+        colunas=colunas,
+        celulas=tuple(celulas),
+        coordenadas=MappingProxyType(coordenadas),
+        ancoras=MappingProxyType(ancoras),
+    )
+
+
+@lru_cache(maxsize=32)
+def grade_html(linhas: int, colunas: int):
+    """HTML estático das casas do grid (sem pinos/overlays, que o JS desenha)."""
+    html = render_to_string("game/tabuleiro_grade.html", {"celulas": geometria(linhas, colunas).celulas})
+    return mark_safe(html)
+
+
+# ---------------------------
+# Overlay SVG (cobras/escadas) renderizado no servidor
+# ---------------------------
+# Mudou o desenho? Incrementa: a chave muda e os caches imutáveis antigos morrem sozinhos.
+OVERLAY_VERSAO = 1
+# a rota é pública e renderiza o que vier na query: só os tabuleiros do jogo
+OVERLAY_TABULEIROS = {(5, 5), (10, 10)}
+OVERLAY_MAX_PARES = 20  # cobras + escadas
+
+# unidades do viewBox (0..100 nos dois eixos, esticado sobre o grid)
+_TRILHO = 1.6        # meia distância entre os trilhos da escada
+_DEGRAUS = 5
+_AMPLITUDE_MAX = 13  # curvatura máxima da cobra
+
+_ESTILO_SVG = (
+    ".cobra,.escada{stroke-linecap:round;stroke-linejoin:round;fill:none}"
+    ".cobra{stroke:#f97416c0;stroke-width:6px;opacity:.98;"
+    "filter:drop-shadow(0 0 6px rgba(248,113,113,.9))}"
+    ".escada{stroke:#4ade80c6;stroke-width:5px;opacity:.96;"
+    "filter:drop-shadow(0 0 6px rgba(74,222,128,.85))}"
+    ".escada.degrau{stroke-width:3px;opacity:.9}"
+)
+
+
+def _pares(mapa):
+    """dict (chaves int ou str) ou pares -> tupla ordenada de pares (origem, destino)."""
+    itens = mapa.items() if hasattr(mapa, "items") else (mapa or ())
+    return tuple(sorted((int(k), int(v)) for k, v in itens))
+
+
+def codificar_pulos(cobras, escadas) -> bytes:
+    """Mapas (chaves int ou str) -> bytes. Casas até 65535 (tabuleiros de até 255x255)."""
+    pares = sorted({**dict(_pares(cobras)), **dict(_pares(escadas))}.items())
+    vetor = array("H", [casa for par in pares for casa in par])
+    if sys.byteorder != "little":
+        vetor.byteswap()
+    return vetor.tobytes()
+
+
+def decodificar_pulos(dados) -> Tuple[dict, dict]:
+    """Inverso de codificar_pulos: (cobras, escadas) com chaves int."""
+    vetor = array("H")
+    vetor.frombytes(bytes(dados or b""))
+    if sys.byteorder != "little":
+        vetor.byteswap()
+    cobras, escadas = {}, {}
+    it = iter(vetor)
+    for origem, destino in zip(it, it):
+        (cobras if destino < origem else escadas)[origem] = destino
+    return cobras, escadas
+
+
+def chave_overlay(linhas, colunas, cobras, escadas) -> str:
+    """Hash do conteúdo do overlay (tamanho + mapas + versão do desenho)."""
+    payload = json.dumps(
+        [OVERLAY_VERSAO, linhas, colunas, _pares(cobras), _pares(escadas)],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def _codificar_pares(pares) -> str:
+    return ".".join(f"{a}-{b}" for a, b in pares)
+
+
+def decodificar_pares(texto: str):
+    """Inverso de _codificar_pares; ValueError se vier algo malformado."""
+    if not texto:
+        return ()
+    pares = []
+    for item in texto.split("."):
+        a, b = item.split("-")
+        pares.append((int(a), int(b)))
+    return tuple(sorted(pares))
+
+
+def overlay_url(linhas, colunas, cobras, escadas) -> str:
+    """
+    URL endereçada pelo conteúdo. A query carrega os mapas para que qualquer
+    processo consiga renderizar o SVG sem estado compartilhado; o hash no path
+    é o que garante que a URL só muda quando o desenho muda.
+    """
+    cobras_p = _pares(cobras)
+    escadas_p = _pares(escadas)
+    chave = chave_overlay(linhas, colunas, cobras_p, escadas_p)
+    query = urlencode({
+        "b": f"{linhas}x{colunas}",
+        "c": _codificar_pares(cobras_p),
+        "e": _codificar_pares(escadas_p),
+    })
+    return f"{reverse('game:board_overlay', args=[chave])}?{query}"
+
+
+def _fmt(v: float) -> str:
+    return f"{v:.2f}".rstrip("0").rstrip(".")
+
+
+@lru_cache(maxsize=256)
+def overlay_svg(linhas, colunas, cobras, escadas) -> str:
+    """
+    SVG com cobras e escadas em viewBox normalizado (0..100). Com
+    preserveAspectRatio="none" e traço que não escala, ele acompanha o grid
+    em qualquer tamanho de tela sem precisar redesenhar.
+
+    `cobras`/`escadas` são tuplas de pares (ver _pares) para serem hasheáveis.
+    """
+    geo = geometria(linhas, colunas)
+    partes = [
+        '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100" preserveAspectRatio="none">',
+        f"<style>{_ESTILO_SVG}</style>",
+    ]
+
+    def ponto(casa):
+        x, y = geo.ancora(casa)
+        return x * 100, y * 100
+
+    def linha(xa, ya, xb, yb, classe):
+        partes.append(
+            f'<line x1="{_fmt(xa)}" y1="{_fmt(ya)}" x2="{_fmt(xb)}" y2="{_fmt(yb)}" '
+            f'class="{classe}" vector-effect="non-scaling-stroke"/>'
+        )
+
+    for base, topo in escadas:
+        x1, y1 = ponto(base)
+        x2, y2 = ponto(topo)
+        comp = math.hypot(x2 - x1, y2 - y1) or 1
+        nx, ny = -(y2 - y1) / comp, (x2 - x1) / comp
+        ox, oy = nx * _TRILHO, ny * _TRILHO
+        linha(x1 + ox, y1 + oy, x2 + ox, y2 + oy, "escada")
+        linha(x1 - ox, y1 - oy, x2 - ox, y2 - oy, "escada")
+        for i in range(1, _DEGRAUS + 1):
+            t = i / (_DEGRAUS + 1)
+            cx, cy = x1 + (x2 - x1) * t, y1 + (y2 - y1) * t
+            linha(cx + ox, cy + oy, cx - ox, cy - oy, "escada degrau")
+
+    for cabeca, cauda in cobras:
+        x1, y1 = ponto(cabeca)
+        x2, y2 = ponto(cauda)
+        comp = math.hypot(x2 - x1, y2 - y1) or 1
+        nx, ny = -(y2 - y1) / comp, (x2 - x1) / comp
+        amp = min(_AMPLITUDE_MAX, comp * 0.25)
+        cx, cy = (x1 + x2) / 2 + nx * amp, (y1 + y2) / 2 + ny * amp
+        partes.append(
+            f'<path d="M {_fmt(x1)} {_fmt(y1)} Q {_fmt(cx)} {_fmt(cy)} {_fmt(x2)} {_fmt(y2)}" '
+            f'class="cobra" vector-effect="non-scaling-stroke"/>'
+        )
+
+    partes.append("</svg>")
+    return "".join(partes)
@@ -1,20 +1,27 @@
+from . import shards
 from .models import FriendRequest, RoomInvite
 
 def header_notifications(request):
     if not request.user.is_authenticated:
         return {}
 
-    friend_reqs = FriendRequest.objects.filter(
+    # listas avaliadas uma vez: o total sai do len() em vez de dois COUNT extras
+    friend_reqs = list(FriendRequest.objects.filter(
         addressee=request.user,
         status="pending",
-    )
+    ).select_related("requester"))
 
-    room_invites = RoomInvite.objects.filter(
-        invitee=request.user,
-        status="pending",
-    )
+    # convites ficam no shard da sala: um SELECT por shard (1 sem ROOM_SHARDS)
+    room_invites = [
+        inv
+        for lista in shards.em_todos(lambda alias: list(RoomInvite.objects.using(alias).filter(
+            invitee=request.user,
+            status="pending",
+        ).select_related("room", "inviter")))
+        for inv in lista
+    ]
 
-    total = friend_reqs.count() + room_invites.count()
+    total = len(friend_reqs) + len(room_invites)
 
     return {
         "header_friend_requests": friend_reqs,
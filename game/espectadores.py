@@ -0,0 +1,177 @@
+# game/espectadores.py
+"""
+Modo espectador: quem não joga na sala (e a sala é pública) acompanha pelo
+mesmo api_room_state, mas servido de um snapshot compartilhado.
+
+Para cada (sala, versão) existe no cache UM snapshot já serializado (bytes do
+JSON): N espectadores custam uma consulta ao banco e uma serialização por
+versão, não por poll. A versão atual vem de:
+  - salas em memória (HOT_ROOMS): direto do estado do processo;
+  - senão, da versão publicada pelo eventos.registrar (cache, TTL curto), e
+    na falta dela uma leitura só da state_version.
+
+Quando a versão muda, a leva de requests que chega junto não vira uma leva de
+leituras: `_um_so` deixa só um request (por processo, e entre processos via
+cache.add) remontar; os outros esperam e reaproveitam o resultado.
+"""
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from . import eventos, salas_quentes
+from .models import GameRoom
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def _chave(code, versao):
+    return f"espect:{code}:{versao}"
+
+
+contadores = {"montagens": 0, "leituras_de_versao": 0}
+
+
+# ---------------------------
+# Single-flight
+# ---------------------------
+_travas = {}
+_travas_lock = threading.Lock()
+
+
+def _esperar(pronto, limite):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        time.sleep(0.01)
+        valor = pronto()
+        if valor is not None:
+            return valor
+    return None
+
+
+def _um_so(chave, pronto, construir):
+    """
+    `pronto()` lê o valor (None = não tem); `construir()` produz e guarda.
+    Só um chamador por chave constrói; os outros esperam e releem.
+    """
+    valor = pronto()
+    if valor is not None:
+        return valor
+    with _travas_lock:
+        trava = _travas.setdefault(chave, threading.Lock())
+    try:
+        with trava:
+            valor = pronto()
+            if valor is not None:
+                return valor
+            # outro processo remontando? espera um pouco antes de remontar junto
+            chave_lock = f"{chave}:lock"
+            dono = cache.add(chave_lock, 1, timeout=5)
+            if not dono:
+                valor = _esperar(pronto, _config("SPECTATOR_WAIT", 0.5))
+                if valor is not None:
+                    return valor
+            try:
+                return construir()
+            finally:
+                if dono:
+                    cache.delete(chave_lock)
+    finally:
+        with _travas_lock:
+            if not trava.locked():
+                _travas.pop(chave, None)
+
+
+# ---------------------------
+# Versão atual
+# ---------------------------
+def _ler_versao(code):
+    contadores["leituras_de_versao"] += 1
+    try:
+        versao = GameRoom.objects.values_list("state_version", flat=True).get(code=code, is_active=True)
+    except GameRoom.DoesNotExist:
+        return None
+    eventos.publicar_versao(code, versao, so_se_vazia=True)
+    return versao
+
+
+def versao_atual(code):
+    if salas_quentes.ativo():
+        versao = salas_quentes.versao(code)
+        if versao is not None:
+            return versao
+    return _um_so(f"espect:{code}:v", lambda: eventos.versao_publicada(code), lambda: _ler_versao(code))
+
+
+# ---------------------------
+# Snapshot
+# ---------------------------
+def _estado(code):
+    """(payload sem "you", is_public) do estado atual da sala, ou None."""
+    if salas_quentes.ativo():
+        r = salas_quentes.retrato(code)
+        if r is not None:
+            return r
+    try:
+        room = GameRoom.objects.get(code=code, is_active=True)
+    except GameRoom.DoesNotExist:
+        return None
+    players = list(room.players.select_related("user").order_by("order"))
+    vez = next((p.user.username for p in players if p.user_id == room.current_turn_id), None)
+    return {
+        "room_code": room.code,
+        "current_turn": vez,
+        "players": [{"username": p.user.username, "position": p.position, "order": p.order} for p in players],
+        "is_active": room.is_active and room.status == "active",
+        "log_rounds": room.log_rounds or [],
+        "round_number": room.round_number,
+        "version": room.state_version,
+        "turn_deadline": room.turn_deadline.isoformat() if room.turn_deadline else None,
+    }, room.is_public
+
+
+def _montar(code):
+    contadores["montagens"] += 1
+    r = _estado(code)
+    if r is None:
+        return None
+    data, publica = r
+    data.update(you=None, spectator=True)
+    snap = {
+        "versao": data["version"],
+        "publica": publica,
+        "jogadores": [p["username"] for p in data["players"]],
+        "corpo": json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode(),
+    }
+    cache.set(_chave(code, snap["versao"]), snap, timeout=_config("SPECTATOR_SNAPSHOT_TTL", 60))
+    return snap
+
+
+def snapshot(code):
+    """
+    Snapshot da versão atual: {"versao", "publica", "jogadores", "corpo"}
+    ("corpo" = JSON pronto do api_room_state), ou None se a sala não existe.
+    """
+    versao = versao_atual(code)
+    if versao is None:
+        return None
+    chave = _chave(code, versao)
+    return _um_so(chave, lambda: cache.get(chave), lambda: _montar(code))
+
+
+async def asnapshot(code):
+    """snapshot() para as views async: versão e snapshot já no cache saem sem
+    passar pela thread do ORM; o resto (remontar) cai no snapshot() sync."""
+    versao = salas_quentes.versao(code) if salas_quentes.ativo() else None
+    if versao is None:
+        versao = await eventos.aversao_publicada(code)
+    if versao is not None:
+        snap = await cache.aget(_chave(code, versao))
+        if snap is not None:
+            return snap
+    return await sync_to_async(snapshot)(code)
@@ -0,0 +1,382 @@
+# game/estado_single.py
+"""
+Estado das partidas singleplayer (configuração, partida e cursor do dado)
+fora da sessão de login. SINGLEPLAYER_STORE escolhe onde ele fica:
+
+  cache_banco  (padrão) cache + tabela SinglePlayerState: lê do cache; grava
+               no cache a cada jogada e no banco no começo, no fim e a cada
+               SINGLEPLAYER_DB_EVERY dados; sem a entrada no cache, lê do banco;
+  cache        só o cache (o mais rápido; some junto com o cache);
+  banco        só a tabela, toda jogada;
+  sessao       como era antes: tudo em request.session.
+
+Fora do "sessao", a chave é o session_key do cookie, e ler o session_key não
+carrega a sessão: uma jogada não faz o SELECT + UPDATE do django_session nem
+regrava o blob inteiro (login, CSRF, partida local...). O estado vai em duas
+partes, em JSON compacto (zlib acima de COMPRIMIR_ACIMA bytes):
+
+  tabuleiro  config + cobras/escadas, gravado uma vez por partida;
+  jogo       o resto da partida + (seed, offset) do dado, a cada jogada.
+
+O banco pode ficar até SINGLEPLAYER_DB_EVERY dados atrás do cache, mas partida
+e cursor do dado são gravados juntos: voltar para a cópia do banco repete os
+mesmos dados (game/rng.py), não dá para "rolar de novo". Com mais de um
+processo, o cache precisa ser compartilhado (o LocMem é por processo).
+
+A sessão guarda só um marcador com a chave usada (MARCADOR), gravado no início
+da partida. O login troca o session_key (cycle_key): quando a chave do cookie
+não acha nada, o marcador diz onde o estado está e ele é levado para a chave
+nova. Sessões de antes disto (partida inteira em request.session) são
+migradas do mesmo jeito na primeira leitura.
+"""
+import json
+import zlib
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from . import rng
+from .models import SinglePlayerState
+
+BACKENDS = ("cache_banco", "cache", "banco", "sessao")
+MARCADOR = "estado_single"
+# chaves de quando a partida ficava na sessão (e do backend "sessao")
+CHAVE_CONFIG = "configuracao_jogo"
+CHAVE_PARTIDA = "partida"
+COMPRIMIR_ACIMA = 1024
+_PREFIXO_CACHE = "sp:"
+_DO_TABULEIRO = ("cobras", "escadas")
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def _codificar(doc) -> bytes:
+    dados = json.dumps(doc, separators=(",", ":")).encode("utf-8")
+    if len(dados) > COMPRIMIR_ACIMA:
+        return b"z" + zlib.compress(dados, 1)
+    return dados
+
+
+def _decodificar(dados):
+    if dados is None:
+        return None
+    dados = bytes(dados)
+    if dados[:1] == b"z":
+        dados = zlib.decompress(dados[1:])
+    return json.loads(dados)
+
+
+def _jogo(partida, fluxo, gravado):
+    jogo = {k: v for k, v in partida.items() if k not in _DO_TABULEIRO}
+    jogo["rng"] = [fluxo.seed, fluxo.offset] if fluxo else None
+    jogo["g"] = gravado  # offset do dado na última gravação no banco
+    return jogo
+
+
+# ---------------------------
+# Onde os bytes ficam
+# ---------------------------
+class _Cache:
+    def _cache(self):
+        return caches[_config("SINGLEPLAYER_CACHE", "default")]
+
+    def _chaves(self, chave):
+        return f"{_PREFIXO_CACHE}{chave}:t", f"{_PREFIXO_CACHE}{chave}:j"
+
+    def ler(self, chave):
+        t, j = self._chaves(chave)
+        valores = self._cache().get_many([t, j])
+        return valores.get(t), valores.get(j)
+
+    def gravar_tudo(self, chave, tabuleiro, jogo):
+        t, j = self._chaves(chave)
+        cache = self._cache()
+        cache.set(t, tabuleiro, timeout=settings.SESSION_COOKIE_AGE)
+        if jogo is None:
+            cache.delete(j)
+        else:
+            cache.set(j, jogo, timeout=settings.SESSION_COOKIE_AGE)
+
+    def gravar_jogo(self, chave, jogo, duravel=True):
+        self._cache().set(self._chaves(chave)[1], jogo, timeout=settings.SESSION_COOKIE_AGE)
+
+    def apagar_jogo(self, chave):
+        self._cache().delete(self._chaves(chave)[1])
+
+    def apagar(self, chave):
+        self._cache().delete_many(self._chaves(chave))
+
+
+class _Banco:
+    def ler(self, chave):
+        linha = SinglePlayerState.objects.filter(pk=chave).values_list("board", "state").first()
+        if linha is None:
+            return None, None
+        tabuleiro, jogo = linha
+        return bytes(tabuleiro), None if jogo is None else bytes(jogo)
+
+    def gravar_tudo(self, chave, tabuleiro, jogo):
+        # upsert num comando só: o update_or_create (SELECT e depois escrita na mesma
+        # transação) dá "database is locked" no SQLite com muitas partidas começando juntas
+        SinglePlayerState.objects.bulk_create(
+            [SinglePlayerState(session_key=chave, board=tabuleiro, state=jogo, updated_at=timezone.now())],
+            update_conflicts=True, unique_fields=["session_key"], update_fields=["board", "state", "updated_at"],
+        )
+
+    def gravar_jogo(self, chave, jogo, duravel=True):
+        SinglePlayerState.objects.filter(pk=chave).update(state=jogo, updated_at=timezone.now())
+
+    def apagar_jogo(self, chave):
+        self.gravar_jogo(chave, None)
+
+    def apagar(self, chave):
+        SinglePlayerState.objects.filter(pk=chave).delete()
+
+
+class _CacheBanco:
+    def __init__(self):
+        self.cache = _Cache()
+        self.banco = _Banco()
+
+    def ler(self, chave):
+        tabuleiro, jogo = self.cache.ler(chave)
+        if tabuleiro is None or jogo is None:
+            # fora do cache (ou só com a config, antes do novo_jogo): vale o banco
+            tabuleiro, jogo = self.banco.ler(chave)
+            if tabuleiro is not None:
+                self.cache.gravar_tudo(chave, tabuleiro, jogo)
+        return tabuleiro, jogo
+
+    def gravar_tudo(self, chave, tabuleiro, jogo):
+        self.banco.gravar_tudo(chave, tabuleiro, jogo)
+        self.cache.gravar_tudo(chave, tabuleiro, jogo)
+
+    def gravar_jogo(self, chave, jogo, duravel=True):
+        if duravel:
+            self.banco.gravar_jogo(chave, jogo)
+        self.cache.gravar_jogo(chave, jogo)
+
+    def apagar_jogo(self, chave):
+        self.banco.apagar_jogo(chave)
+        self.cache.apagar_jogo(chave)
+
+    def apagar(self, chave):
+        self.banco.apagar(chave)
+        self.cache.apagar(chave)
+
+
+# ---------------------------
+# Backends
+# ---------------------------
+class _PorChave:
+    """Estado fora da sessão, pela chave da sessão (cache, banco ou os dois)."""
+
+    def __init__(self, armazem, sempre_duravel=False):
+        self.armazem = armazem
+        self.sempre_duravel = sempre_duravel
+
+    def _montar(self, tabuleiro, jogo):
+        """(config, partida, fluxo, gravado) a partir dos bytes guardados."""
+        tabuleiro, jogo = _decodificar(tabuleiro), _decodificar(jogo)
+        if tabuleiro is None:
+            return None, None, None, 0
+        if jogo is None:
+            return tabuleiro["config"], None, None, 0
+        estado_rng = jogo.pop("rng", None)
+        gravado = jogo.pop("g", 0)
+        partida = {**jogo, **{k: tabuleiro.get(k, {}) for k in _DO_TABULEIRO}}
+        fluxo = rng.FluxoDados(*estado_rng) if estado_rng else rng.FluxoDados(rng.novo_seed())
+        return tabuleiro["config"], partida, fluxo, gravado
+
+    def ler(self, chave):
+        return self._montar(*self.armazem.ler(chave))[:3]
+
+    def _chave(self, request):
+        # sessão nova ainda não tem chave: cria (só no começo da partida)
+        if request.session.session_key is None:
+            request.session.save()
+        return request.session.session_key
+
+    def _marcar(self, request, chave):
+        if request.session.get(MARCADOR) != chave:
+            request.session[MARCADOR] = chave
+
+    def _recuperar(self, request):
+        """Estado de outra chave (login trocou o session_key) ou da sessão antiga; move para a chave atual."""
+        sessao = request.session
+        antiga = sessao.get(MARCADOR)
+        if antiga and antiga != sessao.session_key:
+            tabuleiro, jogo = self.armazem.ler(antiga)
+            if tabuleiro is not None:
+                chave = self._chave(request)
+                self.armazem.gravar_tudo(chave, tabuleiro, jogo)
+                self.armazem.apagar(antiga)
+                self._marcar(request, chave)
+                return chave, tabuleiro, jogo
+        config = sessao.get(CHAVE_CONFIG)
+        if not config:
+            return None, None, None
+        partida = sessao.pop(CHAVE_PARTIDA, None)
+        estado_rng = sessao.pop(rng.CHAVE_SESSAO, None)
+        del sessao[CHAVE_CONFIG]
+        chave = self._chave(request)
+        tabuleiro = {"config": config}
+        jogo = None
+        if partida:
+            tabuleiro.update({k: partida.get(k, {}) for k in _DO_TABULEIRO})
+            fluxo = rng.FluxoDados(estado_rng["seed"], estado_rng["offset"]) if estado_rng else None
+            jogo = _codificar(_jogo(partida, fluxo, fluxo.offset if fluxo else 0))
+        tabuleiro = _codificar(tabuleiro)
+        self.armazem.gravar_tudo(chave, tabuleiro, jogo)
+        self._marcar(request, chave)
+        return chave, tabuleiro, jogo
+
+    def carregar(self, request):
+        chave = request.session.session_key
+        tabuleiro = jogo = None
+        if chave:
+            tabuleiro, jogo = self.armazem.ler(chave)
+        if tabuleiro is None:
+            chave, tabuleiro, jogo = self._recuperar(request)
+        config, partida, fluxo, gravado = self._montar(tabuleiro, jogo)
+        request._estado_single = (chave, gravado)
+        return config, partida, fluxo
+
+    def configurar(self, request, config):
+        chave = self._chave(request)
+        self.armazem.gravar_tudo(chave, _codificar({"config": config}), None)
+        self._marcar(request, chave)
+
+    def gravar(self, chave, config, partida, fluxo):
+        tabuleiro = {"config": config, **{k: partida[k] for k in _DO_TABULEIRO}}
+        self.armazem.gravar_tudo(chave, _codificar(tabuleiro), _codificar(_jogo(partida, fluxo, fluxo.offset)))
+
+    def comecar(self, request, config, partida, fluxo):
+        chave = self._chave(request)
+        self.gravar(chave, config, partida, fluxo)
+        self._marcar(request, chave)
+        request._estado_single = (chave, fluxo.offset)
+
+    def salvar(self, request, partida, fluxo=None):
+        chave, gravado = getattr(request, "_estado_single", (request.session.session_key, 0))
+        offset = fluxo.offset if fluxo else 0
+        duravel = (
+            self.sempre_duravel or partida.get("status") == "finalizado"
+            or offset - gravado >= _config("SINGLEPLAYER_DB_EVERY", 10)
+        )
+        if duravel:
+            gravado = offset
+        self.armazem.gravar_jogo(chave, _codificar(_jogo(partida, fluxo, gravado)), duravel)
+        request._estado_single = (chave, gravado)
+
+    def descartar(self, request):
+        chave = request.session.session_key
+        if chave:
+            self.armazem.apagar_jogo(chave)
+
+
+class _Sessao:
+    """O jeito antigo: config, partida e cursor do dado dentro da sessão."""
+
+    def _sessao(self, chave):
+        return import_module(settings.SESSION_ENGINE).SessionStore(chave)
+
+    def ler(self, chave):
+        sessao = self._sessao(chave)
+        partida = sessao.get(CHAVE_PARTIDA)
+        return sessao.get(CHAVE_CONFIG), partida, rng.fluxo_da_sessao(sessao) if partida else None
+
+    def gravar(self, chave, config, partida, fluxo):
+        sessao = self._sessao(chave)
+        sessao.update({CHAVE_CONFIG: config, CHAVE_PARTIDA: partida})
+        rng.salvar_na_sessao(sessao, fluxo)
+        sessao.save()
+
+    def carregar(self, request):
+        sessao = request.session
+        partida = sessao.get(CHAVE_PARTIDA)
+        return sessao.get(CHAVE_CONFIG), partida, rng.fluxo_da_sessao(sessao) if partida else None
+
+    def configurar(self, request, config):
+        request.session[CHAVE_CONFIG] = config
+
+    def comecar(self, request, config, partida, fluxo):
+        request.session[CHAVE_CONFIG] = config
+        self.salvar(request, partida, fluxo)
+
+    def salvar(self, request, partida, fluxo=None):
+        request.session[CHAVE_PARTIDA] = partida
+        if fluxo:
+            rng.salvar_na_sessao(request.session, fluxo)
+        request.session.modified = True
+
+    def descartar(self, request):
+        request.session.pop(CHAVE_PARTIDA, None)
+
+
+_backends = {}
+
+
+def _backend():
+    nome = _config("SINGLEPLAYER_STORE", "cache_banco")
+    if nome not in _backends:
+        if nome == "sessao":
+            _backends[nome] = _Sessao()
+        elif nome == "cache":
+            _backends[nome] = _PorChave(_Cache())
+        elif nome == "banco":
+            _backends[nome] = _PorChave(_Banco(), sempre_duravel=True)
+        elif nome == "cache_banco":
+            _backends[nome] = _PorChave(_CacheBanco())
+        else:
+            raise ImproperlyConfigured(f"SINGLEPLAYER_STORE inválido: {nome!r} (opções: {', '.join(BACKENDS)})")
+    return _backends[nome]
+
+
+# ---------------------------
+# API das views
+# ---------------------------
+def carregar(request):
+    """(config, partida, fluxo do dado) da sessão; None no que não houver."""
+    return _backend().carregar(request)
+
+
+def configurar(request, config):
+    """Nova configuração (tela inicial); a partida anterior, se houver, sai."""
+    _backend().configurar(request, config)
+
+
+def comecar(request, config, partida, fluxo):
+    _backend().comecar(request, config, partida, fluxo)
+
+
+def salvar(request, partida, fluxo=None):
+    """Depois das jogadas: regrava só a parte "jogo" (o tabuleiro não muda)."""
+    _backend().salvar(request, partida, fluxo)
+
+
+def descartar(request):
+    _backend().descartar(request)
+
+
+def ler(chave):
+    """(config, partida, fluxo) de uma chave de sessão, sem request (testes, comandos)."""
+    return _backend().ler(chave)
+
+
+def gravar(chave, config, partida, fluxo=None):
+    """Partida pronta numa chave de sessão, sem request (testes, benchmarks)."""
+    _backend().gravar(chave, config, partida, fluxo or rng.FluxoDados(rng.novo_seed()))
+
+
+def limpar_expirados(idade=None):
+    """Apaga da tabela os estados sem gravação há mais de `idade` (padrão: SESSION_COOKIE_AGE)."""
+    idade = idade if idade is not None else timedelta(seconds=settings.SESSION_COOKIE_AGE)
+    apagados, _ = SinglePlayerState.objects.filter(updated_at__lt=timezone.now() - idade).delete()
+    return apagados
@@ -0,0 +1,234 @@
+# game/eventos.py
+"""
+Histórico de eventos das salas multiplayer (RoomEvent) com snapshots
+periódicos (RoomSnapshot).
+
+Todo o estado de uma sala sai da sequência de eventos:
+  join   {"user_id", "username", "order"}
+  leave  {"user_id"}
+  start  {"board": hex de board_data, "dice_seed", "vez": user_id}
+  roll   {"user_id", "dado", "de", "para", "pre_salto"}
+  turn   {"vez": user_id, "rodada"}
+  finish {"vencedor": user_id | None}
+
+`aplicar` é o redutor (puro, sobre um dict JSON). `registrar` grava os eventos
+com números de sequência consecutivos (GameRoom.state_version é o último) e,
+a cada SNAPSHOT_A_CADA eventos, um snapshot do estado. `estado_em(room, seq)`
+parte do snapshot mais próximo e aplica no máximo ~K eventos.
+
+As colunas GamePlayer.position / GameRoom.current_turn continuam sendo
+gravadas na mesma transação: são a projeção "quente" lida pelas telas e APIs.
+"""
+import copy
+import gzip
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import shards
+from .models import GameRoom, RoomEvent, RoomSnapshot
+
+TIPOS = ("join", "leave", "start", "roll", "turn", "finish")
+
+
+def _snapshot_a_cada():
+    return getattr(settings, "ROOM_SNAPSHOT_EVERY", 50)
+
+
+def estado_inicial() -> dict:
+    return {
+        "seq": 0,
+        "status": "lobby",
+        "jogadores": [],
+        "vez": None,
+        "rodada": 1,
+        "vencedor": None,
+        "board": "",
+        "dice_seed": 0,
+        "dice_offset": 0,
+    }
+
+
+def _jogador(estado, user_id):
+    return next((j for j in estado["jogadores"] if j["user_id"] == user_id), None)
+
+
+def aplicar(estado: dict, tipo: str, dados: dict) -> dict:
+    """Aplica um evento sobre `estado` (alterado no lugar) e devolve o próprio estado."""
+    if tipo == "join":
+        if _jogador(estado, dados["user_id"]) is None:
+            estado["jogadores"].append({
+                "user_id": dados["user_id"], "username": dados["username"],
+                "order": dados["order"], "position": 0,
+            })
+            estado["jogadores"].sort(key=lambda j: (j["order"], j["user_id"]))
+    elif tipo == "leave":
+        estado["jogadores"] = [j for j in estado["jogadores"] if j["user_id"] != dados["user_id"]]
+    elif tipo == "start":
+        estado.update(status="active", board=dados["board"], dice_seed=dados["dice_seed"],
+                      dice_offset=0, vez=dados["vez"])
+    elif tipo == "roll":
+        jogador = _jogador(estado, dados["user_id"])
+        if jogador is not None:
+            jogador["position"] = dados["para"]
+        estado["dice_offset"] += 1
+    elif tipo == "turn":
+        estado["vez"] = dados["vez"]
+        estado["rodada"] = dados["rodada"]
+    elif tipo == "finish":
+        estado.update(status="finished", vencedor=dados.get("vencedor"), vez=None)
+    else:
+        raise ValueError(f"Tipo de evento desconhecido: {tipo}")
+    return estado
+
+
+# ---------------------------
+# Gravação
+# ---------------------------
+class VersaoConflitante(Exception):
+    """Outro escritor gravou eventos da sala depois que `room` foi lido."""
+
+
+def registrar(room, *eventos):
+    """
+    Grava os eventos ((tipo, dados), ...) em sequência e atualiza
+    room.state_version (na instância e no banco). Chame dentro da mesma
+    transação que atualiza a projeção.
+
+    A versão sobe com um UPDATE condicional (state_version ainda igual à lida):
+    com dois escritores na mesma sala só o primeiro passa; o outro recebe
+    VersaoConflitante e deve desfazer a transação e reler a sala. Não dá para
+    contar com select_for_update, que no SQLite não trava nada.
+    """
+    if not eventos:
+        return room.state_version
+    for tipo, _dados in eventos:
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de evento desconhecido: {tipo}")
+
+    with shards.atomico():
+        inicio, fim = room.state_version, room.state_version + len(eventos)
+        if not GameRoom.objects.filter(pk=room.pk, state_version=inicio).update(state_version=fim):
+            raise VersaoConflitante(f"sala {room.code or room.pk} não está mais na versão {inicio}")
+        RoomEvent.objects.bulk_create([
+            RoomEvent(room_id=room.pk, seq=inicio + n, kind=tipo, data=dados)
+            for n, (tipo, dados) in enumerate(eventos, start=1)
+        ])
+        room.state_version = fim
+
+        k = _snapshot_a_cada()
+        if inicio // k != room.state_version // k:
+            salvar_snapshot(room.pk, room.state_version)
+        if room.code:
+            code, versao = room.code, room.state_version
+            transaction.on_commit(lambda: publicar_versao(code, versao), using=shards.shard_atual() or "default")
+    return room.state_version
+
+
+# ---------------------------
+# Versão publicada (cache)
+# ---------------------------
+# Última state_version de cada sala, para quem só precisa saber se algo mudou
+# (espectadores: game/espectadores.py). Com TTL curto, então um cache por
+# processo (LocMem) também converge: no máximo SPECTATOR_VERSION_TTL atrasado.
+def _chave_versao(code):
+    return f"sala:{code}:versao"
+
+
+def publicar_versao(code, versao, so_se_vazia=False):
+    timeout = getattr(settings, "SPECTATOR_VERSION_TTL", 2)
+    if so_se_vazia:
+        cache.add(_chave_versao(code), versao, timeout=timeout)
+    else:
+        cache.set(_chave_versao(code), versao, timeout=timeout)
+
+
+def versao_publicada(code):
+    return cache.get(_chave_versao(code))
+
+
+async def aversao_publicada(code):
+    return await cache.aget(_chave_versao(code))
+
+
+def salvar_snapshot(room_id, seq=None):
+    estado = estado_em(room_id, seq)
+    RoomSnapshot.objects.update_or_create(room_id=room_id, seq=estado["seq"], defaults={"state": estado})
+    return estado
+
+
+# ---------------------------
+# Leitura / reconstrução
+# ---------------------------
+def estado_em(room_id, seq=None) -> dict:
+    """Estado da sala depois do evento `seq` (None = o último)."""
+    snaps = RoomSnapshot.objects.filter(room_id=room_id)
+    eventos = RoomEvent.objects.filter(room_id=room_id)
+    if seq is not None:
+        snaps = snaps.filter(seq__lte=seq)
+        eventos = eventos.filter(seq__lte=seq)
+
+    snap = snaps.order_by("-seq").values_list("seq", "state").first()
+    if snap:
+        base, estado = snap[0], copy.deepcopy(snap[1])
+    else:
+        base, estado = 0, estado_inicial()
+
+    for ev_seq, tipo, dados in eventos.filter(seq__gt=base).order_by("seq").values_list("seq", "kind", "data"):
+        aplicar(estado, tipo, dados)
+        estado["seq"] = ev_seq
+    return estado
+
+
+def reduzir(eventos, estado=None) -> dict:
+    """Redutor sobre um iterável de (seq, tipo, dados) — ex.: um arquivo de `arquivar`."""
+    estado = estado or estado_inicial()
+    for ev_seq, tipo, dados in eventos:
+        aplicar(estado, tipo, dados)
+        estado["seq"] = ev_seq
+    return estado
+
+
+def divergencias(room) -> list:
+    """Diferenças entre a projeção (colunas) e o estado refeito dos eventos."""
+    estado = estado_em(room.pk)
+    problemas = []
+    if estado["seq"] != room.state_version:
+        problemas.append(f"state_version {room.state_version} != último evento {estado['seq']}")
+    if estado["status"] != room.status:
+        problemas.append(f"status {room.status} != {estado['status']}")
+    if room.status == "active" and estado["vez"] != room.current_turn_id:
+        problemas.append(f"vez {room.current_turn_id} != {estado['vez']}")
+    posicoes = dict(room.players.values_list("user_id", "position"))
+    refeitas = {j["user_id"]: j["position"] for j in estado["jogadores"]}
+    if posicoes != refeitas:
+        problemas.append(f"posições {posicoes} != {refeitas}")
+    return problemas
+
+
+# ---------------------------
+# Armazenamento frio (salas finalizadas)
+# ---------------------------
+def arquivar(room, caminho):
+    """
+    Grava todos os eventos da sala em JSON lines (gzip), deixa só o snapshot
+    final no banco e apaga os eventos e snapshots intermediários.
+    """
+    with shards.atomico():
+        final = salvar_snapshot(room.pk)
+        eventos = RoomEvent.objects.filter(room_id=room.pk).order_by("seq")
+        with gzip.open(caminho, "wt", encoding="utf-8") as f:
+            for ev_seq, tipo, dados in eventos.values_list("seq", "kind", "data").iterator(chunk_size=1000):
+                f.write(json.dumps({"seq": ev_seq, "kind": tipo, "data": dados}, separators=(",", ":")) + "\n")
+        n, _ = eventos.delete()
+        RoomSnapshot.objects.filter(room_id=room.pk, seq__lt=final["seq"]).delete()
+    return n
+
+
+def ler_arquivo(caminho):
+    with gzip.open(caminho, "rt", encoding="utf-8") as f:
+        for linha in f:
+            ev = json.loads(linha)
+            yield ev["seq"], ev["kind"], ev["data"]
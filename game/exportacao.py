@@ -0,0 +1,187 @@
+# game/exportacao.py
+"""
+Exportação em massa para análise, em NDJSON ou CSV (opcionalmente gzip):
+
+  games  uma linha por sala (GameRoom + jogadores, sem o log);
+  rolls  uma linha por jogada (RoomEvent "roll");
+  logs   uma linha por entrada de GameRoom.log_rounds.
+
+Tudo é gerador: as queries andam com iterator(chunk_size=...) shard por shard
+e as linhas saem em pedaços de ~64 KB, então a memória não cresce com o número
+de linhas — nem com o tamanho dos logs, que só são lidos no tipo "logs", de
+poucas salas por vez. Usado pela view api_export (staff) e pelo comando
+export_games.
+
+Os rolls de salas já arquivadas (archive_rooms) não estão mais no banco: ficam
+nos .jsonl.gz do ROOM_ARCHIVE_DIR, no mesmo formato dos eventos.
+"""
+import csv
+import json
+import zlib
+from datetime import datetime, time as dtime
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import shards
+from .models import GamePlayer, GameRoom, RoomEvent
+
+TIPOS = ("games", "rolls", "logs")
+FORMATOS = ("ndjson", "csv")
+
+# linhas por ida ao banco; salas por ida no "logs" (cada uma traz o log inteiro)
+LOTE = 2000
+LOTE_LOGS = 50
+PEDACO = 64 * 1024
+
+COLUNAS = {
+    "games": ("code", "shard", "status", "board_size", "is_public", "created_at", "round_number",
+              "host_id", "players"),
+    "rolls": ("code", "seq", "created_at", "user_id", "dado", "de", "para", "pre_salto"),
+    "logs": ("code", "rodada", "order", "username", "texto"),
+}
+
+
+def ler_momento(valor, fim=False):
+    """'2026-01-31' ou ISO completo -> datetime com fuso; data pura vale o dia inteiro."""
+    if not valor:
+        return None
+    momento = parse_datetime(valor)
+    if momento is None:
+        dia = parse_date(valor)
+        if dia is None:
+            raise ValueError(f"Data inválida: {valor!r}")
+        momento = datetime.combine(dia, dtime.max if fim else dtime.min)
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+def _periodo(qs, campo, desde, ate):
+    if desde:
+        qs = qs.filter(**{f"{campo}__gte": desde})
+    if ate:
+        qs = qs.filter(**{f"{campo}__lte": ate})
+    return qs
+
+
+# ---------------------------
+# Registros (dicts), shard por shard
+# ---------------------------
+def _games(alias, desde, ate):
+    jogadores = Prefetch("players", queryset=GamePlayer.objects.using(alias).only(
+        "room_id", "user_id", "order", "position",
+    ))
+    salas = _periodo(GameRoom.objects.using(alias), "created_at", desde, ate)
+    salas = salas.defer("log_rounds", "board_data").prefetch_related(jogadores).order_by("pk")
+    for room in salas.iterator(chunk_size=LOTE):
+        yield {
+            "code": room.code, "shard": alias, "status": room.status, "board_size": room.board_size,
+            "is_public": room.is_public, "created_at": room.created_at.isoformat(),
+            "round_number": room.round_number, "host_id": room.host_id,
+            "players": [
+                {"user_id": p.user_id, "order": p.order, "position": p.position} for p in room.players.all()
+            ],
+        }
+
+
+def _rolls(alias, desde, ate):
+    eventos = _periodo(RoomEvent.objects.using(alias).filter(kind="roll"), "created_at", desde, ate)
+    linhas = eventos.order_by("room_id", "seq").values_list("room__code", "seq", "created_at", "data")
+    for code, seq, criado, dados in linhas.iterator(chunk_size=LOTE):
+        yield {
+            "code": code, "seq": seq, "created_at": criado.isoformat(),
+            "user_id": dados.get("user_id"), "dado": dados.get("dado"), "de": dados.get("de"),
+            "para": dados.get("para"), "pre_salto": dados.get("pre_salto"),
+        }
+
+
+def _logs(alias, desde, ate):
+    salas = _periodo(GameRoom.objects.using(alias), "created_at", desde, ate).order_by("pk")
+    for code, log in salas.values_list("code", "log_rounds").iterator(chunk_size=LOTE_LOGS):
+        for rodada, entradas in enumerate(log or [], start=1):
+            for e in entradas:
+                yield {
+                    "code": code, "rodada": rodada, "order": e.get("order"),
+                    "username": e.get("username"), "texto": e.get("texto"),
+                }
+
+
+_FONTES = {"games": _games, "rolls": _rolls, "logs": _logs}
+
+
+def registros(tipo, desde=None, ate=None):
+    for alias in shards.aliases():
+        yield from _FONTES[tipo](alias, desde, ate)
+
+
+# ---------------------------
+# Formatos
+# ---------------------------
+class _Eco:
+    """'Arquivo' do csv.writer que só devolve o que recebeu."""
+
+    def write(self, valor):
+        return valor
+
+
+def _csv(tipo, regs):
+    escritor = csv.writer(_Eco())
+    colunas = COLUNAS[tipo]
+    yield escritor.writerow(colunas)
+    for r in regs:
+        if tipo == "games":
+            r = {**r, "players": ";".join(f"{p['user_id']}:{p['order']}:{p['position']}" for p in r["players"])}
+        yield escritor.writerow([r[c] for c in colunas])
+
+
+def _ndjson(regs):
+    for r in regs:
+        yield json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def linhas(tipo, formato="ndjson", desde=None, ate=None):
+    regs = registros(tipo, desde, ate)
+    return _csv(tipo, regs) if formato == "csv" else _ndjson(regs)
+
+
+def em_pedacos(linhas, comprimir=False):
+    """Junta as linhas em pedaços de bytes de ~PEDACO (gzip incremental se pedido)."""
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None
+    buffer, tamanho = [], 0
+    for linha in linhas:
+        buffer.append(linha)
+        tamanho += len(linha)
+        if tamanho >= PEDACO:
+            dados = "".join(buffer).encode("utf-8")
+            buffer, tamanho = [], 0
+            if gz is not None:
+                dados = gz.compress(dados)
+            if dados:
+                yield dados
+    dados = "".join(buffer).encode("utf-8")
+    if gz is not None:
+        dados = gz.compress(dados) + gz.flush()
+    if dados:
+        yield dados
+
+
+def exportar(tipo, formato="ndjson", desde=None, ate=None, comprimir=False):
+    """Gerador de bytes do export inteiro."""
+    return em_pedacos(linhas(tipo, formato, desde, ate), comprimir)
+
+
+async def assincrono(pedacos):
+    """
+    O mesmo gerador para o StreamingHttpResponse sob ASGI: com um iterador sync
+    o Django juntaria a resposta inteira na memória antes de mandar. Cada
+    pedaço sai do banco numa thread (sync_to_async), um de cada vez.
+    """
+    proximo = sync_to_async(next, thread_sensitive=True)
+    while True:
+        pedaco = await proximo(pedacos, None)
+        if pedaco is None:
+            return
+        yield pedaco
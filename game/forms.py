@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
+from .avatars import validar_upload
 from .models import Profile
 
 class RegisterForm(UserCreationForm):
@@ -20,3 +21,12 @@ class RegisterForm(UserCreationForm):
             nickname=self.cleaned_data["nickname"],
         )
         return user
+
+
+class AvatarForm(forms.Form):
+    avatar = forms.ImageField(label="Avatar")
+
+    def clean_avatar(self):
+        arquivo = self.cleaned_data["avatar"]
+        validar_upload(arquivo)
+        return arquivo
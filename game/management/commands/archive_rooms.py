@@ -0,0 +1,44 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from game import shards
+from game.eventos import arquivar
+from game.models import GameRoom
+
+
+class Command(BaseCommand):
+    help = (
+        "Move os eventos das salas finalizadas para arquivos JSON lines (gzip), "
+        "deixando no banco só o snapshot final de cada uma."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=None, help="Diretório dos arquivos (padrão: ROOM_ARCHIVE_DIR).")
+        parser.add_argument("--older-than-days", type=int, default=7, help="Só salas criadas antes disso.")
+        parser.add_argument("--dry-run", action="store_true", help="Só lista as salas.")
+
+    def handle(self, *args, **opts):
+        destino = opts["dir"] or settings.ROOM_ARCHIVE_DIR
+        limite = timezone.now() - timedelta(days=opts["older_than_days"])
+        if not opts["dry_run"]:
+            os.makedirs(destino, exist_ok=True)
+
+        total = 0
+        for alias in shards.aliases():
+            salas = (
+                GameRoom.objects.using(alias)
+                .filter(status="finished", created_at__lt=limite, events__isnull=False)
+                .distinct().order_by("pk")
+            )
+            with shards.no_shard(alias):
+                for room in salas.iterator(chunk_size=200):
+                    caminho = os.path.join(destino, f"{room.code}-{room.pk}.jsonl.gz")
+                    if opts["dry_run"]:
+                        self.stdout.write(f"{room.code} -> {caminho}")
+                        continue
+                    total += arquivar(room, caminho)
+        self.stdout.write(self.style.SUCCESS(f"{total} eventos arquivados em {destino}."))
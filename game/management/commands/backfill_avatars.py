@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import wait
+
+from django.core.management.base import BaseCommand
+
+from game.avatars import processar_avatar, submeter
+from game.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Processa (limpa metadados + gera miniaturas) os avatares já enviados, em lotes. "
+        "Por padrão só os que ainda não têm miniatura."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Profiles por lote.")
+        parser.add_argument("--force", action="store_true", help="Reprocessa também os já processados.")
+        parser.add_argument("--sync", action="store_true", help="Processa no próprio processo, sem o pool.")
+
+    def handle(self, *args, **opts):
+        qs = Profile.objects.exclude(avatar="").exclude(avatar__isnull=True)
+        if not opts["force"]:
+            qs = qs.filter(avatar_key="")
+
+        inicio = time.perf_counter()
+        ok = falhas = 0
+        ultimo_id = 0
+        while True:
+            # paginação por chave: o filtro avatar_key="" muda enquanto o lote é processado
+            ids = list(qs.filter(pk__gt=ultimo_id).order_by("pk").values_list("pk", flat=True)[:opts["batch_size"]])
+            if not ids:
+                break
+            ultimo_id = ids[-1]
+
+            if opts["sync"]:
+                for pk in ids:
+                    try:
+                        processar_avatar(pk)
+                        ok += 1
+                    except Exception as e:
+                        falhas += 1
+                        self.stderr.write(f"profile {pk}: {e}")
+            else:
+                futuros = {submeter(pk): pk for pk in ids}
+                wait(futuros)
+                for futuro, pk in futuros.items():
+                    if futuro.exception():
+                        falhas += 1
+                        self.stderr.write(f"profile {pk}: {futuro.exception()}")
+                    else:
+                        ok += 1
+            self.stdout.write(f"... {ok + falhas} processados (até o profile {ultimo_id})")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{ok} avatares processados, {falhas} falhas em {time.perf_counter() - inicio:.1f}s."
+        ))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from game.benchmarks import gravar_json, metadados
+from game.benchmarks.endpoints import (
+    estouros_de_orcamento, executar_suite, preparar_contexto, semear,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede as views com o test client em várias escalas de dados e confere o "
+        "orçamento de queries. Usa um banco de teste descartável."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scales", default="10,10000,1000000",
+                            help="Escalas (nº de usuários semeados), separadas por vírgula.")
+        parser.add_argument("--reps", type=int, default=30, help="Repetições medidas por cenário.")
+        parser.add_argument("--warmup", type=int, default=3, help="Execuções de aquecimento.")
+        parser.add_argument("--only", default="", help="Cenários a rodar, separados por vírgula.")
+        parser.add_argument("--output", default=None, help="Arquivo JSON de resultado.")
+        parser.add_argument("--keepdb", action="store_true",
+                            help="Mantém o banco de teste (evita re-semear 1M linhas).")
+
+    def handle(self, *args, **opts):
+        escalas = sorted(int(x) for x in opts["scales"].split(",") if x.strip())
+        nomes = {x.strip() for x in opts["only"].split(",") if x.strip()} or None
+
+        setup_test_environment()
+        nome_original = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=opts["keepdb"])
+        resultado = {"meta": metadados(), "scales": {}}
+        estouros = []
+        try:
+            for escala in escalas:
+                inicio = time.perf_counter()
+                semear(escala)
+                ctx = preparar_contexto()
+                self.stdout.write(f"\n== escala {escala} (semeado em {time.perf_counter() - inicio:.1f}s)")
+
+                res = executar_suite(Client(), ctx, opts["reps"], opts["warmup"], nomes)
+                resultado["scales"][str(escala)] = res
+                for nome, r in res.items():
+                    marca = ""
+                    if r["query_budget"] is not None and r["queries"] > r["query_budget"]:
+                        marca = "  <-- ACIMA DO ORÇAMENTO"
+                    self.stdout.write(
+                        f"{nome:<20} p50={r['p50']:>8.2f}ms p95={r['p95']:>8.2f}ms "
+                        f"queries={r['queries']:>3}/{r['query_budget']}{marca}"
+                    )
+                estouros += [(escala, *e) for e in estouros_de_orcamento(res)]
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0, keepdb=opts["keepdb"])
+            teardown_test_environment()
+
+        if opts["output"]:
+            gravar_json(opts["output"], resultado)
+            self.stdout.write(f"\nResultado gravado em {opts['output']}")
+
+        if estouros:
+            linhas = ", ".join(f"{nome}@{esc}: {q} > {b}" for esc, nome, q, b in estouros)
+            raise CommandError(f"Orçamento de queries estourado: {linhas}")
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from game.benchmarks import gravar_json, metadados
+from game.benchmarks.ranking import executar
+
+
+class Command(BaseCommand):
+    help = (
+        "Ranking com muitos perfis (padrão 1M): top-N, minha posição (árvores x COUNT no "
+        "banco), ranking dos amigos, atualização de fim de partida e reconstrução. "
+        "Usa um banco de teste descartável."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", type=int, default=1_000_000, help="Perfis semeados.")
+        parser.add_argument("--repeat", type=int, default=50, help="Repetições por medição.")
+        parser.add_argument("--friends", type=int, default=50, help="Amigos do usuário medido.")
+        parser.add_argument("--output", default=None, help="Arquivo JSON de resultado.")
+
+    def handle(self, *args, **opts):
+        setup_test_environment()
+        nome_original = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            res = executar(opts["profiles"], repeticoes=opts["repeat"], amigos=opts["friends"])
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{res['profiles']:,} perfis em {res['buckets']:,} pares (taxa, vitórias); "
+            f"semeadura {res['seed_s']}s, reconstrução {res['rebuild_ms']:.0f}ms, "
+            f"carga das árvores {res['tree_load_ms']:.0f}ms"
+        )
+        self.stdout.write(f"{'medição':<22} {'p50':>9} {'p95':>9}")
+        for nome in ("top50_ms", "my_rank_tree_ms", "my_rank_sql_count_ms", "friends_ms", "update_ms"):
+            lat = res[nome]
+            self.stdout.write(f"{nome[:-3]:<22} {lat['p50']:>7.3f}ms {lat['p95']:>7.3f}ms")
+        self.stdout.write(f"consistente depois das atualizações: {'sim' if res['consistent_after_updates'] else 'NÃO'}")
+
+        if opts["output"]:
+            gravar_json(opts["output"], {"meta": metadados(), "results": res})
+            self.stdout.write(f"Resultado gravado em {opts['output']}")
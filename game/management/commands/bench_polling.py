@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from game.benchmarks import gravar_json, metadados
+from game.benchmarks.endpoints import BENCH_SALA, BENCH_SENHA, BENCH_USER, preparar_contexto
+from game.benchmarks.polling import MODOS, rampa
+
+
+class Command(BaseCommand):
+    help = (
+        "Pollers de api_room_state sustentados por processo, sob WSGI (views sync) e "
+        "sob ASGI (views async). Um subprocesso por modo, com banco de teste descartável."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modes", default=",".join(MODOS), help="Modos, separados por vírgula.")
+        parser.add_argument("--loads", default="25,50,100,200,400,800",
+                            help="Números de pollers, em ordem; para na primeira carga não sustentada.")
+        parser.add_argument("--seconds", type=float, default=6.0, help="Duração de cada carga.")
+        parser.add_argument("--interval", type=float, default=1.5, help="Intervalo do polling (s).")
+        parser.add_argument("--rtt-ms", type=float, default=50.0,
+                            help="Tempo de entrega da resposta ao cliente (rede simulada).")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Threads atendendo no modo wsgi (worker sync do gunicorn = 1).")
+        parser.add_argument("--output", default=None, help="Arquivo JSON de resultado.")
+        parser.add_argument("--child", default=None, choices=MODOS, help="(interno) mede um modo só.")
+
+    def handle(self, *args, **opts):
+        if opts["child"]:
+            self.stdout.write(json.dumps(self._medir(opts["child"], opts)))
+            return
+
+        resultados = [self._subprocesso(modo.strip(), opts) for modo in opts["modes"].split(",") if modo.strip()]
+
+        self.stdout.write(f"{'modo':<6} {'pollers':>8} {'polls/s':>9} {'p50':>9} {'p95':>9} {'ok':>4}")
+        for res in resultados:
+            for r in res["loads"]:
+                lat = r["latency_ms"]
+                self.stdout.write(
+                    f"{res['mode']:<6} {r['pollers']:>8} {r['polls_per_s']:>9.1f} "
+                    f"{lat['p50'] or 0:>8.1f}ms {lat['p95'] or 0:>8.1f}ms {'sim' if r['sustained'] else 'não':>4}"
+                )
+        self.stdout.write("")
+        for res in resultados:
+            self.stdout.write(f"{res['mode']}: {res['max_sustained_pollers']} pollers sustentados por processo")
+
+        if opts["output"]:
+            gravar_json(opts["output"], {"meta": metadados(), "results": resultados})
+            self.stdout.write(f"Resultado gravado em {opts['output']}")
+
+    def _subprocesso(self, modo, opts):
+        if modo not in MODOS:
+            raise CommandError(f"Modo desconhecido: {modo}")
+        env = {**os.environ, "ASYNC_POLLING": "1" if modo == "asgi" else "0"}
+        cmd = [
+            sys.executable, "-m", "django", "bench_polling", "--child", modo,
+            "--loads", opts["loads"], "--seconds", str(opts["seconds"]), "--interval", str(opts["interval"]),
+            "--rtt-ms", str(opts["rtt_ms"]), "--workers", str(opts["workers"]),
+        ]
+        self.stdout.write(f"medindo {modo}...")
+        saida = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        if saida.returncode != 0:
+            raise CommandError(f"{modo} falhou:\n{saida.stderr}")
+        return json.loads(saida.stdout.strip().splitlines()[-1])
+
+    def _medir(self, modo, opts):
+        setup_test_environment()
+        nome_original = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            preparar_contexto()
+            client = Client()
+            client.login(username=BENCH_USER, password=BENCH_SENHA)
+            cookie = "; ".join(f"{k}={v.value}" for k, v in client.cookies.items())
+            cargas = [int(x) for x in opts["loads"].split(",") if x.strip()]
+            return rampa(
+                modo, cookie, BENCH_SALA, cargas=cargas, segundos=opts["seconds"],
+                intervalo=opts["interval"], rtt_ms=opts["rtt_ms"], workers=opts["workers"],
+            )
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            teardown_test_environment()
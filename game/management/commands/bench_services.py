@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from game.benchmarks import gravar_json, metadados
+from game.benchmarks.services import executar
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmarks (ns/op, alocações, pico de memória) das primitivas de game.services."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filter", default="", help="Só roda casos cujo nome contém este texto.")
+        parser.add_argument("--repeat", type=int, default=7, help="Repetições medidas por caso.")
+        parser.add_argument("--target", type=float, default=0.1, help="Duração alvo de cada repetição (s).")
+        parser.add_argument("--output", default=None, help="Arquivo JSON de resultado.")
+
+    def handle(self, *args, **opts):
+        res = executar(opts["filter"], opts["repeat"], opts["target"])
+
+        self.stdout.write(
+            f"{'caso':<44} {'ns/op(min)':>12} {'ns/op(med)':>12} {'blocos/op':>10} {'bytes/op':>10} {'pico':>9}"
+        )
+        for nome, r in res.items():
+            self.stdout.write(
+                f"{nome:<44} {r['ns_per_op_min']:>12,.0f} {r['ns_per_op_median']:>12,.0f} "
+                f"{r['alloc_blocks_per_op']:>10} {r['alloc_bytes_per_op']:>10,.0f} {r['peak_bytes']:>9,}"
+            )
+
+        if opts["output"]:
+            gravar_json(opts["output"], {"meta": metadados(), "results": res})
+            self.stdout.write(f"Resultado gravado em {opts['output']}")
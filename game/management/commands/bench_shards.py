@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from game.benchmarks import gravar_json, metadados
+from game.benchmarks.shards import executar
+
+
+class Command(BaseCommand):
+    help = (
+        "Vazão de escrita de jogadas com as salas espalhadas por 1, 2, 4... arquivos "
+        "SQLite (ROOM_SHARDS). Roda em arquivos temporários, não mexe no banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shards", default="1,2,4", help="Números de shards, separados por vírgula.")
+        parser.add_argument("--writers", type=int, default=8, help="Threads escrevendo ao mesmo tempo.")
+        parser.add_argument("--seconds", type=float, default=3.0, help="Duração de cada medição.")
+        parser.add_argument("--rooms", type=int, default=256, help="Salas semeadas.")
+        parser.add_argument("--synchronous", default="FULL", choices=["OFF", "NORMAL", "FULL"],
+                            help="PRAGMA synchronous dos arquivos (FULL = padrão do SQLite).")
+        parser.add_argument("--dir", default=None, help="Onde criar os arquivos (padrão: tmp do sistema).")
+        parser.add_argument("--output", default=None, help="Arquivo JSON de resultado.")
+
+    def handle(self, *args, **opts):
+        contagens = [int(x) for x in opts["shards"].split(",") if x.strip()]
+        res = executar(
+            contagens, escritores=opts["writers"], segundos=opts["seconds"], salas=opts["rooms"],
+            sincrono=opts["synchronous"], diretorio=opts["dir"],
+        )
+
+        base = res[0]["moves_per_s"] or 1
+        self.stdout.write(f"{'shards':>6} {'jogadas/s':>10} {'x':>6} {'p50':>8} {'p95':>8} {'erros':>6}")
+        for r in res:
+            lat = r["latency_ms"]
+            self.stdout.write(
+                f"{r['shards']:>6} {r['moves_per_s']:>10,.1f} {r['moves_per_s'] / base:>6.2f} "
+                f"{lat['p50'] or 0:>8.2f} {lat['p95'] or 0:>8.2f} {r['errors']:>6}"
+            )
+
+        if opts["output"]:
+            gravar_json(opts["output"], {"meta": metadados(), "results": res})
+            self.stdout.write(f"Resultado gravado em {opts['output']}")
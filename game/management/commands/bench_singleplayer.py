@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from game import estado_single
+from game.benchmarks import gravar_json, metadados
+from game.benchmarks.singleplayer import executar
+
+
+class Command(BaseCommand):
+    help = (
+        "Latência por jogada do singleplayer com N partidas simultâneas (padrão 1000), "
+        "para cada SINGLEPLAYER_STORE. Usa um banco de teste descartável, em arquivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=1000, help="Partidas abertas ao mesmo tempo.")
+        parser.add_argument("--rolls", type=int, default=20000, help="Jogadas medidas por backend.")
+        parser.add_argument("--threads", type=int, default=16, help="Threads jogando (workers).")
+        parser.add_argument("--stores", default=",".join(estado_single.BACKENDS),
+                            help="Backends, separados por vírgula.")
+        parser.add_argument("--output", default=None, help="Arquivo JSON de resultado.")
+
+    def handle(self, *args, **opts):
+        stores = [s.strip() for s in opts["stores"].split(",") if s.strip()]
+        desconhecidos = set(stores) - set(estado_single.BACKENDS)
+        if desconhecidos:
+            raise CommandError(f"Backends desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+        setup_test_environment()
+        nome_original = connection.settings_dict["NAME"]
+        # em arquivo: no SQLite em memória as threads não disputam o lock de escrita do arquivo
+        pasta = tempfile.mkdtemp(prefix="bench_single_")
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(pasta, "bench.sqlite3")
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            res = executar(stores, opts["games"], opts["rolls"], opts["threads"])
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            teardown_test_environment()
+            os.rmdir(pasta)
+
+        self.stdout.write(
+            f"{opts['games']} partidas, {opts['rolls']} jogadas por backend, {opts['threads']} threads"
+        )
+        self.stdout.write(f"{'backend':<12} {'p50':>9} {'p95':>9} {'p99':>9} {'jog/s':>8} {'bytes':>7}  erros")
+        for store, r in res.items():
+            self.stdout.write(
+                f"{store:<12} {r['p50']:>7.2f}ms {r['p95']:>7.2f}ms {r['p99']:>7.2f}ms "
+                f"{r['rolls_per_s']:>8.1f} {r['state_bytes']:>7}  {r['errors'] or '-'}"
+            )
+
+        if opts["output"]:
+            gravar_json(opts["output"], {"meta": metadados(), "config": opts, "results": res})
+            self.stdout.write(f"Resultado gravado em {opts['output']}")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from game.benchmarks import gravar_json, metadados
+from game.benchmarks.prazos import executar
+
+
+class Command(BaseCommand):
+    help = (
+        "Roda de tempo dos prazos de turno (game/prazos.py) com muitas salas ativas, "
+        "contra um heap com cancelamento preguiçoso. Só memória, sem banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+        parser.add_argument("--timeout", type=float, default=60.0, help="Prazo do turno (s).")
+        parser.add_argument("--ticks", type=int, default=600, help="Ticks simulados (1 s cada).")
+        parser.add_argument("--moving", type=float, default=0.02,
+                            help="Fração das salas que joga (reagenda) a cada tick.")
+        parser.add_argument("--output", default=None, help="Arquivo JSON de resultado.")
+
+    def handle(self, *args, **opts):
+        resultados = []
+        self.stdout.write(f"{'salas':>8} {'estrutura':<6} {'reagendar':>11} {'tick':>10} {'vencidos':>9} {'tamanho':>9}")
+        for salas in opts["rooms"]:
+            res = executar(salas, opts["timeout"], opts["ticks"], opts["moving"])
+            resultados.append(res)
+            for nome in ("wheel", "heap"):
+                r = res[nome]
+                self.stdout.write(
+                    f"{salas:>8,} {nome:<6} {r['reschedule_us']:>9.3f}µs {r['tick_us']:>8.1f}µs "
+                    f"{r['expired']:>9,} {r['final_size']:>9,}"
+                )
+        if opts["output"]:
+            gravar_json(opts["output"], {"meta": metadados(), "results": resultados})
+            self.stdout.write(f"Resultado gravado em {opts['output']}")
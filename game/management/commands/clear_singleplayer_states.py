@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from game import estado_single
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga as partidas singleplayer (SinglePlayerState) sem jogada há mais que a "
+        "idade da sessão: o equivalente do clearsessions para game/estado_single.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=float, default=None, help="Idade mínima (padrão: SESSION_COOKIE_AGE).")
+
+    def handle(self, *args, **opts):
+        idade = timedelta(days=opts["days"]) if opts["days"] is not None else None
+        apagados = estado_single.limpar_expirados(idade)
+        self.stdout.write(f"{apagados} partidas singleplayer apagadas.")
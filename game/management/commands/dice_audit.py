@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from game.rng import FluxoDados, monitor, novo_seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Qui-quadrado das faces e teste de sequências (alto/baixo) dos dados rolados. "
+        "Lê os contadores do cache: com LocMem só enxerga o próprio processo, "
+        "então use --simulate para auditar o gerador isoladamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--simulate", type=int, default=0, help="Rola N dados antes de medir.")
+        parser.add_argument("--streams", type=int, default=100, help="Fluxos (seeds) usados no --simulate.")
+        parser.add_argument("--reset", action="store_true", help="Zera os contadores antes.")
+
+    def handle(self, *args, **opts):
+        if opts["reset"]:
+            monitor.zerar()
+        if opts["simulate"]:
+            fluxos = [FluxoDados(novo_seed()) for _ in range(max(1, opts["streams"]))]
+            for i in range(opts["simulate"]):
+                fluxos[i % len(fluxos)].proximo()
+
+        r = monitor.estatisticas()
+        if not r["total"]:
+            self.stdout.write("Nenhum dado registrado.")
+            return
+
+        self.stdout.write(f"{r['total']:,} dados")
+        for face, n in r["faces"].items():
+            self.stdout.write(f"  {face}: {n:>10,}  ({n * 100 / r['total']:.2f}%)")
+        self.stdout.write(f"qui-quadrado = {r['qui2']:.3f} (5 gl), p = {r['qui2_p']:.4f}")
+        if "sequencias_z" in r:
+            self.stdout.write(
+                f"sequências: {r['trocas']:,} trocas em {r['pares']:,} pares, "
+                f"z = {r['sequencias_z']:.3f}, p = {r['sequencias_p']:.4f}"
+            )
+        suspeito = r["qui2_p"] < 0.001 or r.get("sequencias_p", 1) < 0.001
+        if suspeito:
+            self.stdout.write(self.style.WARNING("Distribuição suspeita (p < 0.001)."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Sem evidência de viés."))
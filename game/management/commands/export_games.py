@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game import exportacao
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta salas (games), jogadas (rolls) ou logs das salas em NDJSON ou CSV, "
+        "em streaming (memória constante). Mesmo conteúdo do /api/export/<tipo>/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("tipo", choices=exportacao.TIPOS)
+        parser.add_argument("--format", default="ndjson", choices=exportacao.FORMATOS)
+        parser.add_argument("--since", default=None, help="created_at a partir de (data ou ISO).")
+        parser.add_argument("--until", default=None, help="created_at até (data ou ISO; data = dia inteiro).")
+        parser.add_argument("--gzip", action="store_true", help="Comprime (automático se --output termina em .gz).")
+        parser.add_argument("--output", default=None, help="Arquivo de saída (padrão: stdout).")
+
+    def handle(self, *args, **opts):
+        try:
+            desde = exportacao.ler_momento(opts["since"])
+            ate = exportacao.ler_momento(opts["until"], fim=True)
+        except ValueError as e:
+            raise CommandError(str(e))
+        comprimir = opts["gzip"] or (opts["output"] or "").endswith(".gz")
+
+        pedacos = exportacao.exportar(opts["tipo"], opts["format"], desde, ate, comprimir)
+        if not opts["output"]:
+            for pedaco in pedacos:
+                sys.stdout.buffer.write(pedaco)
+            sys.stdout.buffer.flush()
+            return
+        total = 0
+        with open(opts["output"], "wb") as f:
+            for pedaco in pedacos:
+                f.write(pedaco)
+                total += len(pedaco)
+        self.stderr.write(f"{total:,} bytes gravados em {opts['output']}")
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from game.benchmarks import gravar_json, metadados
+from game.benchmarks.endpoints import preparar_contexto
+from game.benchmarks.firstload import executar
+
+
+class Command(BaseCommand):
+    help = (
+        "Bytes de primeira carga e de visita repetida por página (HTML + assets), "
+        "como servido em produção. Rode depois do collectstatic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dpr", type=float, default=2, help="Densidade de pixels usada para escolher do srcset.")
+        parser.add_argument("--only", default="", help="Páginas a medir, separadas por vírgula.")
+        parser.add_argument("--assets", action="store_true", help="Lista cada asset baixado.")
+        parser.add_argument("--output", default=None, help="Arquivo JSON de resultado.")
+
+    def handle(self, *args, **opts):
+        nomes = {x.strip() for x in opts["only"].split(",") if x.strip()} or None
+
+        setup_test_environment()
+        nome_original = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            res = executar(Client(), preparar_contexto(), opts["dpr"], nomes)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{'página':<18} {'html':>8} {'inline js':>14} {'1ª carga':>11} {'repetida':>10}"
+        )
+        for nome, r in res.items():
+            self.stdout.write(
+                f"{nome:<18} {r['html_bytes']:>8,} {r['inline_scripts']:>4}x{r['inline_script_bytes']:>8,} "
+                f"{r['first_load_bytes']:>11,} {r['repeat_load_bytes']:>10,}"
+            )
+            if opts["assets"]:
+                for a in r["assets"]:
+                    if "transfer" in a:
+                        marca = "imutável" if a["immutable"] else "revalida"
+                        self.stdout.write(f"    {a['transfer']:>10,}  {marca:<8}  {a['url']}")
+                    else:
+                        self.stdout.write(f"    {'-':>10}  {'externo' if a.get('external') else 'ausente':<8}  {a['url']}")
+
+        if opts["output"]:
+            gravar_json(opts["output"], {"meta": metadados(), "pages": res})
+            self.stdout.write(f"Resultado gravado em {opts['output']}")
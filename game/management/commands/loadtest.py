@@ -0,0 +1,66 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from game.benchmarks import gravar_json, metadados
+from game.benchmarks.loadtest import ConfigCarga, executar_carga
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga do multiplayer (ou do singleplayer, com --mode single) contra um "
+        "servidor já rodando (ex.: python manage.py runserver ou gunicorn). Os locks do "
+        "SQLite nas salas chegam como 409 (header X-Corrida); nas outras views viram 500 "
+        "e só entram em sqlite_locked com o servidor em DEBUG=True."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--users", type=int, default=10, help="Usuários simulados.")
+        parser.add_argument("--party-size", type=int, default=2, help="Jogadores por sala.")
+        parser.add_argument("--duration", type=float, default=60.0, help="Duração em segundos.")
+        parser.add_argument("--poll-interval", type=float, default=1.5, help="Intervalo do polling (s).")
+        parser.add_argument("--timeout", type=float, default=10.0, help="Timeout por request (s).")
+        parser.add_argument("--mode", default="multi", choices=("multi", "single"),
+                            help="multi: salas de --party-size; single: uma partida contra a máquina por usuário.")
+        parser.add_argument("--output", default=None, help="Grava o relatório em JSON neste caminho.")
+
+    def handle(self, *args, **opts):
+        config = ConfigCarga(
+            base_url=opts["base_url"],
+            usuarios=opts["users"],
+            party_size=opts["party_size"],
+            duracao=opts["duration"],
+            poll_interval=opts["poll_interval"],
+            timeout=opts["timeout"],
+            modo=opts["mode"],
+        )
+        formato = "partidas singleplayer" if config.modo == "single" else f"salas de {config.party_size}"
+        self.stdout.write(
+            f"Carga: {config.usuarios} usuários, {formato}, "
+            f"{config.duracao:.0f}s contra {config.base_url}"
+        )
+        # o logger raiz fica em DEBUG no ambiente local; o urllib3 logaria cada request
+        logging.getLogger("urllib3").setLevel(logging.WARNING)
+        rel = executar_carga(config)
+
+        self.stdout.write("")
+        self.stdout.write(f"{'endpoint':<20} {'n':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'erros':>7}")
+        for nome, e in rel["endpoints"].items():
+            self.stdout.write(
+                f"{nome:<20} {e['n']:>7} {e['p50']:>8.1f}ms {e['p95']:>8.1f}ms "
+                f"{e['p99']:>8.1f}ms {e['error_rate']:>6.1%}"
+            )
+        self.stdout.write("")
+        self.stdout.write(
+            f"requests={rel['requests']}  erros={rel['errors']} ({rel['error_rate']:.1%})  "
+            f"sqlite_locked={rel['sqlite_lock_errors']}"
+        )
+        self.stdout.write(
+            f"jogadas={rel['moves']}  jogadas/s={rel['moves_per_s']}  "
+            f"partidas finalizadas={rel['games_finished']}"
+        )
+
+        if opts["output"]:
+            gravar_json(opts["output"], {"meta": metadados(), "config": vars(config), "result": rel})
+            self.stdout.write(f"Relatório gravado em {opts['output']}")
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from game.benchmarks import gravar_json, metadados, resumo_latencias
+from game.models import MatchTicket
+
+
+class Command(BaseCommand):
+    help = (
+        "Fila da partida rápida pelos MatchTicket do banco: quantos esperam, taxa de "
+        "casamento (casados / casados + desistências) e tempo até a sala, por fila."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=24.0, help="Janela (pelo created_at dos tickets).")
+        parser.add_argument("--output", default=None, help="Arquivo JSON de resultado.")
+
+    def handle(self, *args, **opts):
+        desde = timezone.now() - timedelta(hours=opts["hours"])
+        filas = {}
+        tickets = MatchTicket.objects.filter(created_at__gte=desde).values_list(
+            "board_size", "party_size", "status", "created_at", "matched_at",
+        )
+        for board_size, party_size, status, criado, casado in tickets.iterator():
+            f = filas.setdefault(f"{board_size}/{party_size}", {"waiting": 0, "matched": 0, "cancelled": 0, "_esperas": []})
+            f[status] = f.get(status, 0) + 1
+            if status == "matched" and casado:
+                f["_esperas"].append((casado - criado).total_seconds() * 1000)
+
+        resultado = {}
+        self.stdout.write(f"{'fila':<10} {'esperando':>9} {'casados':>8} {'desist.':>8} {'taxa':>6} {'p50':>9} {'p95':>9}")
+        for nome, f in sorted(filas.items()):
+            esperas = resumo_latencias(f.pop("_esperas"))
+            saidas = f["matched"] + f["cancelled"]
+            f["match_rate"] = round(f["matched"] / saidas, 3) if saidas else None
+            f["wait_ms"] = esperas
+            resultado[nome] = f
+            self.stdout.write(
+                f"{nome:<10} {f['waiting']:>9} {f['matched']:>8} {f['cancelled']:>8} "
+                f"{f['match_rate'] if f['match_rate'] is not None else '-':>6} "
+                f"{(esperas['p50'] or 0) / 1000:>8.1f}s {(esperas['p95'] or 0) / 1000:>8.1f}s"
+            )
+        if not filas:
+            self.stdout.write("Nenhum ticket na janela.")
+
+        if opts["output"]:
+            gravar_json(opts["output"], {"meta": metadados(), "hours": opts["hours"], "queues": resultado})
+            self.stdout.write(f"Resultado gravado em {opts['output']}")
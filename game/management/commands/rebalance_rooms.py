@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from game import shards
+from game.models import GameRoom, GamePlayer, RoomEvent, RoomInvite, RoomSnapshot
+
+RELACIONADOS = (GamePlayer, RoomInvite, RoomEvent, RoomSnapshot)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move as salas finalizadas que não estão no shard do próprio código "
+        "(depois de mudar ROOM_SHARDS) para o shard certo, com jogadores, convites, "
+        "eventos e snapshots. Salas em lobby/ativas ficam onde estão até terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Só lista as salas.")
+
+    def handle(self, *args, **opts):
+        movidas = 0
+        for origem in shards.aliases():
+            fora = [
+                (pk, code)
+                for pk, code in GameRoom.objects.using(origem).filter(status="finished").values_list("pk", "code")
+                if shards.shard_do_codigo(code) != origem
+            ]
+            for pk, code in fora:
+                destino = shards.shard_do_codigo(code)
+                self.stdout.write(f"{code}: {origem} -> {destino}")
+                if not opts["dry_run"]:
+                    mover(pk, origem, destino)
+                    movidas += 1
+        self.stdout.write(self.style.SUCCESS(f"{movidas} salas movidas."))
+
+
+def mover(pk, origem, destino):
+    """
+    Copia a sala para `destino` (pks novos) e só então apaga da origem. Se cair
+    entre as duas transações, a cópia já é a que o hash acha; rodar de novo só
+    termina de apagar a origem.
+    """
+    room = GameRoom.objects.using(origem).get(pk=pk)
+    with transaction.atomic(using=destino):
+        if not GameRoom.objects.using(destino).filter(code=room.code).exists():
+            relacionados = [
+                (model, list(model.objects.using(origem).filter(room_id=pk).order_by("pk")))
+                for model in RELACIONADOS
+            ]
+            room.pk = None
+            room._state.adding = True
+            room.save(using=destino)
+            for model, objs in relacionados:
+                for obj in objs:
+                    obj.pk = None
+                    obj.room_id = room.pk
+                model.objects.using(destino).bulk_create(objs, batch_size=500)
+    with transaction.atomic(using=origem):
+        GameRoom.objects.using(origem).filter(pk=pk).delete()
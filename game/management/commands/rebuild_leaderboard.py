@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from game import ranking
+
+
+class Command(BaseCommand):
+    help = (
+        "Refaz a contagem do ranking (RankBucket) a partir dos perfis, com um GROUP BY "
+        "exato. Com --check só compara e falha se houver diferença."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Não grava; sai com erro se estiver diferente.")
+
+    def handle(self, *args, **opts):
+        errados = ranking.reconstruir(gravar=not opts["check"])
+        for bp, wins in errados[:20]:
+            self.stdout.write(f"  taxa {bp / 100:.2f}% / {wins} vitórias")
+        if len(errados) > 20:
+            self.stdout.write(f"  ... e mais {len(errados) - 20}")
+        if opts["check"]:
+            if errados:
+                raise CommandError(f"{len(errados)} pares (taxa, vitórias) fora do lugar.")
+            self.stdout.write("Ranking confere com os perfis.")
+        else:
+            self.stdout.write(f"Ranking refeito ({len(errados)} pares corrigidos).")
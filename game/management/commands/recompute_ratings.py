@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game import ratings
+from game.benchmarks import gravar_json, metadados
+from game.benchmarks.ratings import sintetico
+
+
+class Command(BaseCommand):
+    help = (
+        "Refaz o rating multiplayer de todos os perfis repetindo o histórico (MatchResult) "
+        "em ordem cronológica. Vetorizado com NumPy quando instalado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--k", type=float, default=None, help="Fator K (padrão: RATING_K).")
+        parser.add_argument("--scale", type=float, default=None, help="Escala do Elo (padrão: RATING_ESCALA).")
+        parser.add_argument("--initial", type=float, default=None, help="Rating inicial (padrão: RATING_INICIAL).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Só calcula e mostra o acerto do favorito; não grava.")
+        parser.add_argument("--python", action="store_true", help="Força o caminho sem NumPy.")
+        parser.add_argument("--synthetic", type=int, default=0,
+                            help="Mede a conta com N partidas sintéticas, sem banco.")
+        parser.add_argument("--players", type=int, default=1_000_000, help="População do --synthetic.")
+        parser.add_argument("--output", default=None, help="Arquivo JSON de resultado.")
+
+    def handle(self, *args, **opts):
+        params = ratings.parametros(k=opts["k"], escala=opts["scale"], inicial=opts["initial"])
+        vetorizado = False if opts["python"] else None
+        if vetorizado is None and ratings.np is None:
+            self.stderr.write("NumPy não instalado: recalculando partida a partida.")
+
+        if opts["synthetic"]:
+            stats = self._sintetico(opts["synthetic"], opts["players"], params, vetorizado)
+        else:
+            stats = ratings.recalcular_tudo(params, gravar=not opts["dry_run"], vetorizado=vetorizado)
+
+        acerto = stats["favorite_won"]
+        self.stdout.write(
+            f"{stats['results']:,} partidas, {stats['players']:,} jogadores "
+            f"({'NumPy' if stats['vectorized'] else 'Python'}): carga {stats['load_s']}s, "
+            f"conta {stats['compute_s']}s"
+            + (f", gravação {stats['write_s']}s" if "write_s" in stats else "")
+        )
+        self.stdout.write(
+            f"k={params['k']:g} escala={params['escala']:g} inicial={params['inicial']:g}: "
+            f"favorito venceu {acerto * 100:.1f}% das partidas" if acerto is not None else "Nenhuma partida."
+        )
+        if stats.get("late_results"):
+            self.stdout.write(f"{stats['late_results']} partidas terminadas durante a conta aplicadas por cima.")
+
+        if opts["output"]:
+            gravar_json(opts["output"], {"meta": metadados(), "results": stats})
+            self.stdout.write(f"Resultado gravado em {opts['output']}")
+
+    def _sintetico(self, partidas, jogadores, params, vetorizado):
+        if partidas < 1 or jogadores < 4:
+            raise CommandError("--synthetic precisa de partidas e pelo menos 4 jogadores.")
+        t0 = time.perf_counter()
+        linhas = sintetico(partidas, jogadores)
+        carga_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        notas, _, acertos = ratings.recalcular(*linhas, params=params, vetorizado=vetorizado)
+        return {
+            "results": partidas,
+            "players": len(notas),
+            "vectorized": ratings.np is not None if vetorizado is None else vetorizado,
+            "load_s": round(carga_s, 2),
+            "compute_s": round(time.perf_counter() - t0, 2),
+            "favorite_won": round(acertos / partidas, 4),
+            "params": params,
+        }
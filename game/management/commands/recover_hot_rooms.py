@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from game.salas_quentes import recuperar
+
+
+class Command(BaseCommand):
+    help = (
+        "Reaplica no banco as jogadas do diário das salas em memória (HOT_ROOM_JOURNAL) "
+        "que não chegaram a ser gravadas. Rode com o servidor parado."
+    )
+
+    def handle(self, *args, **opts):
+        n = recuperar()
+        self.stdout.write(self.style.SUCCESS(f"{n} jogadas recuperadas do diário."))
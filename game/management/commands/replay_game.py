@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from game import shards
+from game.models import GameRoom, RoomEvent
+from game.rng import reconstruir_sala
+
+
+class Command(BaseCommand):
+    help = (
+        "Refaz uma partida multiplayer pelos eventos da sala, conferindo cada dado com o "
+        "fluxo do seed, e compara o resultado com as posições gravadas no banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("code", help="Código da sala.")
+        parser.add_argument("--moves", action="store_true", help="Lista cada jogada refeita.")
+
+    def handle(self, *args, **opts):
+        try:
+            room = GameRoom.objects.get(code=opts["code"])
+        except GameRoom.DoesNotExist:
+            raise CommandError(f"Sala {opts['code']} não encontrada.")
+        if not room.dice_seed:
+            raise CommandError("Sala sem fluxo de dados (iniciada antes dos seeds ou ainda no lobby).")
+        with shards.no_shard(room._state.db):
+            self._refazer(room, opts)
+
+    def _refazer(self, room, opts):
+        historico = RoomEvent.objects.filter(room=room).order_by("seq").values_list("seq", "kind", "data")
+        casa_final = 25 if room.board_size == "5x5" else 100
+        estado, movimentos, erros = reconstruir_sala(historico, casa_final, room.snakes_map, room.ladders_map)
+
+        if opts["moves"]:
+            for n, m in enumerate(movimentos, start=1):
+                self.stdout.write(f"{n:>4}  {m['username']:<16} dado {m['dado']}  {m['de']:>3} -> {m['para']:>3}")
+
+        self.stdout.write(f"seed={room.dice_seed} offset={room.dice_offset} jogadas={len(movimentos)}")
+        if estado["dice_seed"] != room.dice_seed or estado["dice_offset"] != room.dice_offset:
+            erros.append(f"fluxo: banco ({room.dice_seed}, {room.dice_offset}), "
+                         f"eventos ({estado['dice_seed']}, {estado['dice_offset']})")
+        posicoes = dict(room.players.values_list("user_id", "position"))
+        for j in estado["jogadores"]:
+            gravada = posicoes.pop(j["user_id"], None)
+            if gravada != j["position"]:
+                erros.append(f"{j['username']}: banco {gravada}, replay {j['position']}")
+        for user_id in posicoes:
+            erros.append(f"jogador {user_id} está no banco e não nos eventos")
+        for erro in erros:
+            self.stderr.write(erro)
+        if estado["vencedor"] is not None:
+            vencedor = next((j["username"] for j in estado["jogadores"] if j["user_id"] == estado["vencedor"]), None)
+            self.stdout.write(f"Vencedor no replay: {vencedor or estado['vencedor']}")
+        if erros:
+            raise CommandError("Replay diverge do estado gravado.")
+        self.stdout.write(self.style.SUCCESS("Replay confere com o banco."))
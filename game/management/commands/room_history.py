@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game import shards
+from game.eventos import divergencias, estado_em, ler_arquivo, reduzir
+from game.models import GameRoom, RoomEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Estado de uma sala multiplayer refeito a partir dos eventos, em qualquer "
+        "ponto do histórico (--at), e conferência com as colunas (--check)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("code", help="Código da sala.")
+        parser.add_argument("--at", type=int, default=None, help="Número de sequência (padrão: o último).")
+        parser.add_argument("--events", action="store_true", help="Lista os eventos até --at.")
+        parser.add_argument("--check", action="store_true", help="Compara o estado refeito com a projeção.")
+        parser.add_argument("--archive", default=None, help="Lê os eventos de um arquivo de archive_rooms.")
+
+    def handle(self, *args, **opts):
+        try:
+            room = GameRoom.objects.get(code=opts["code"])
+        except GameRoom.DoesNotExist:
+            raise CommandError(f"Sala {opts['code']} não encontrada.")
+        with shards.no_shard(room._state.db):
+            self._mostrar(room, opts)
+
+    def _mostrar(self, room, opts):
+        ate = opts["at"]
+
+        if opts["archive"]:
+            historico = [ev for ev in ler_arquivo(opts["archive"]) if ate is None or ev[0] <= ate]
+            estado = reduzir(historico)
+        else:
+            historico = RoomEvent.objects.filter(room=room).order_by("seq")
+            if ate is not None:
+                historico = historico.filter(seq__lte=ate)
+            historico = historico.values_list("seq", "kind", "data")  # só roda com --events
+            estado = estado_em(room.pk, ate)
+
+        if opts["events"]:
+            for ev_seq, tipo, dados in historico:
+                self.stdout.write(f"{ev_seq:>6}  {tipo:<7} {json.dumps(dados, ensure_ascii=False)}")
+        self.stdout.write(json.dumps(estado, ensure_ascii=False, indent=2))
+
+        if opts["check"]:
+            problemas = divergencias(room)
+            for p in problemas:
+                self.stderr.write(p)
+            if problemas:
+                raise CommandError("Projeção diverge dos eventos.")
+            self.stdout.write(self.style.SUCCESS(f"Projeção confere com os eventos (versão {room.state_version})."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from game import prazos
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker dos prazos de turno das salas multiplayer (game/prazos.py) num processo à parte, "
+        "para servidores com TURN_WORKER=off. --once resolve o que já venceu e sai (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Uma passada só: relê os prazos e resolve os vencidos.")
+
+    def handle(self, *args, **opts):
+        if not prazos.ativo():
+            raise CommandError("TURN_TIMEOUT=0: prazo de turno desligado.")
+        if opts["once"]:
+            agendados = prazos.ressincronizar()
+            vencidos = prazos.processar()
+            self.stdout.write(self.style.SUCCESS(f"{agendados} prazos lidos, {vencidos} turnos vencidos resolvidos."))
+            return
+        self.stdout.write("Resolvendo turnos vencidos (Ctrl+C para sair)...")
+        try:
+            prazos.executar()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,41 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from game.slowqueries import agregar_por_formato, ler_log
+
+
+class Command(BaseCommand):
+    help = "Ranking dos formatos de query lentos (por tempo total) a partir do SLOW_QUERY_LOG_FILE."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default=None, help="Arquivo de log (padrão: SLOW_QUERY_LOG_FILE).")
+        parser.add_argument("--limit", type=int, default=20, help="Quantos formatos mostrar.")
+        parser.add_argument("--reset", action="store_true", help="Apaga o log depois de mostrar o relatório.")
+
+    def handle(self, *args, **opts):
+        caminho = opts["file"] or settings.SLOW_QUERY_LOG_FILE
+        if not os.path.exists(caminho):
+            self.stdout.write(f"Nenhum log em {caminho}. Ative com SLOW_QUERY_LOG=1.")
+            return
+
+        grupos = agregar_por_formato(ler_log(caminho))
+        if not grupos:
+            self.stdout.write("Log vazio.")
+        for pos, g in enumerate(grupos[: opts["limit"]], start=1):
+            media = g["total_ms"] / g["count"]
+            views = ", ".join(f"{v} ({n})" for v, n in sorted(g["views"].items(), key=lambda i: -i[1]))
+            self.stdout.write(
+                f"#{pos}  total={g['total_ms']:.1f}ms  n={g['count']}  "
+                f"media={media:.2f}ms  max={g['max_ms']:.1f}ms"
+            )
+            self.stdout.write(f"    views: {views}")
+            self.stdout.write(f"    sql:   {g['sql']}")
+            for linha in g["plan"] or ["(sem plano capturado)"]:
+                alerta = "  <-- full scan" if " SCAN " in f" {linha} " and "USING" not in linha else ""
+                self.stdout.write(f"    plan:  {linha}{alerta}")
+
+        if opts["reset"]:
+            open(caminho, "w").close()
+            self.stdout.write("Log zerado.")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_profile_losses_profile_total_games_profile_wins'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='avatar_key',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+    ]
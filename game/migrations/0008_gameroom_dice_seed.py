@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_profile_avatar_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameroom',
+            name='dice_offset',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gameroom',
+            name='dice_seed',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
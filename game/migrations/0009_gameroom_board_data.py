@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:45
+
+import sys
+from array import array
+
+from django.db import migrations, models
+
+
+# cópia congelada do formato de game.board: a migration não pode mudar se o
+# módulo mudar depois (uint16 little-endian, pares origem/destino)
+def codificar_pulos(cobras, escadas):
+    pares = sorted({int(k): int(v) for mapa in (cobras, escadas) for k, v in mapa.items()}.items())
+    vetor = array("H", [casa for par in pares for casa in par])
+    if sys.byteorder != "little":
+        vetor.byteswap()
+    return vetor.tobytes()
+
+
+def decodificar_pulos(dados):
+    vetor = array("H")
+    vetor.frombytes(bytes(dados or b""))
+    if sys.byteorder != "little":
+        vetor.byteswap()
+    cobras, escadas = {}, {}
+    it = iter(vetor)
+    for origem, destino in zip(it, it):
+        (cobras if destino < origem else escadas)[origem] = destino
+    return cobras, escadas
+
+
+def mapas_para_binario(apps, schema_editor):
+    GameRoom = apps.get_model("game", "GameRoom")
+    salas = GameRoom.objects.only("id", "snakes_map", "ladders_map")
+    for sala in salas.iterator(chunk_size=500):
+        sala.board_data = codificar_pulos(sala.snakes_map or {}, sala.ladders_map or {})
+        sala.save(update_fields=["board_data"])
+
+
+def binario_para_mapas(apps, schema_editor):
+    GameRoom = apps.get_model("game", "GameRoom")
+    for sala in GameRoom.objects.only("id", "board_data").iterator(chunk_size=500):
+        cobras, escadas = decodificar_pulos(sala.board_data)
+        sala.snakes_map = {str(k): v for k, v in cobras.items()}
+        sala.ladders_map = {str(k): v for k, v in escadas.items()}
+        sala.save(update_fields=["snakes_map", "ladders_map"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_gameroom_dice_seed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameroom',
+            name='board_data',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.RunPython(mapas_para_binario, binario_para_mapas),
+        migrations.RemoveField(
+            model_name='gameroom',
+            name='snakes_map',
+        ),
+        migrations.RemoveField(
+            model_name='gameroom',
+            name='ladders_map',
+        ),
+    ]
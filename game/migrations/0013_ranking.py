@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:03
+
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+
+
+def preencher_buckets(apps, schema_editor):
+    Profile = apps.get_model("game", "Profile")
+    RankBucket = apps.get_model("game", "RankBucket")
+    grupos = (
+        Profile.objects.filter(win_rate_bp__isnull=False)
+        .values("win_rate_bp", "wins").annotate(n=models.Count("id")).order_by()
+    )
+    RankBucket.objects.bulk_create(
+        [RankBucket(win_rate_bp=g["win_rate_bp"], wins=g["wins"], total=g["n"]) for g in grupos],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0012_match_ticket'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('win_rate_bp', models.PositiveIntegerField()),
+                ('wins', models.PositiveIntegerField()),
+                ('total', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='win_rate_bp',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(models.Q(('losses', 0), ('wins', 0)), then=models.Value(None)), default=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('wins'), '*', models.Value(10000)), '/', django.db.models.expressions.CombinedExpression(models.F('wins'), '+', models.F('losses')))), output_field=models.IntegerField(null=True)),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['-win_rate_bp', '-wins', 'id'], name='profile_ranking'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='rankbucket',
+            unique_together={('win_rate_bp', 'wins')},
+        ),
+        migrations.RunPython(preencher_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0013_ranking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(max_length=8)),
+                ('board_size', models.CharField(max_length=10)),
+                ('room_code', models.CharField(blank=True, default='', max_length=8)),
+                ('players', models.PositiveSmallIntegerField()),
+                ('rounds', models.PositiveIntegerField(default=0)),
+                ('finished_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MatchParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveSmallIntegerField()),
+                ('final_position', models.PositiveSmallIntegerField()),
+                ('won', models.BooleanField()),
+                ('board_size', models.CharField(max_length=10)),
+                ('finished_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_history', to=settings.AUTH_USER_MODEL)),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='game.matchresult')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-finished_at', '-id'], name='participant_historico')],
+                'constraints': [models.UniqueConstraint(fields=('result', 'user'), name='participant_unico')],
+            },
+        ),
+    ]
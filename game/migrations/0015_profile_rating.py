@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0014_match_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='rated_games',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='rating',
+            field=models.FloatField(default=1500.0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0015_profile_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SinglePlayerState',
+            fields=[
+                ('session_key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('board', models.BinaryField()),
+                ('state', models.BinaryField(null=True)),
+                ('updated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0016_singleplayer_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameroom',
+            name='auto_moves',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gameroom',
+            name='turn_deadline',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -4,6 +4,9 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from .board import codificar_pulos, decodificar_pulos
+from .shards import ShardManager
+
 # Modelo de Perfil
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -11,10 +14,29 @@ class Profile(models.Model):
     avatar = models.ImageField(
         upload_to="avatars/", blank=True, null=True
     )
+    # hash do avatar já processado (miniaturas prontas); vazio = usa o padrão
+    avatar_key = models.CharField(max_length=16, blank=True, default="")
 
     total_games = models.PositiveIntegerField(default=0)
     wins = models.PositiveIntegerField(default=0)
     losses = models.PositiveIntegerField(default=0)
+    # Elo das partidas multiplayer (game/ratings.py)
+    rating = models.FloatField(default=1500.0)
+    rated_games = models.PositiveIntegerField(default=0)
+
+    # taxa de vitórias em pontos-base (0..10000), calculada pelo próprio banco a
+    # cada escrita; NULL sem partidas. Ordenável/indexável (ranking: game/ranking.py)
+    win_rate_bp = models.GeneratedField(
+        expression=models.Case(
+            models.When(models.Q(wins=0, losses=0), then=models.Value(None)),
+            default=models.F("wins") * 10000 / (models.F("wins") + models.F("losses")),
+        ),
+        output_field=models.IntegerField(null=True),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=["-win_rate_bp", "-wins", "id"], name="profile_ranking")]
 
     def __str__(self):
         return self.nickname or self.user.username
@@ -29,7 +51,9 @@ class Profile(models.Model):
 # -------------- Modo Multiplayer --------------
 class GameRoom(models.Model):
     code = models.CharField(max_length=8, unique=True, db_index=True)
-    host = models.ForeignKey(User, on_delete=models.CASCADE, related_name="hosted_rooms")
+    # FKs para User sem constraint: com ROOM_SHARDS>1 a sala pode estar num arquivo
+    # diferente do auth_user (game/shards.py)
+    host = models.ForeignKey(User, on_delete=models.CASCADE, related_name="hosted_rooms", db_constraint=False)
     # 'lobby' enquanto aguardando configurações/jogadores, 'active' durante a partida, 'finished' ao final
     status = models.CharField(max_length=16, default="lobby")
     is_active = models.BooleanField(default=True)
@@ -37,29 +61,72 @@ class GameRoom(models.Model):
 
     board_size = models.CharField(max_length=10, default="10x10")  # "10x10" | "5x5"
     current_turn = models.ForeignKey(
-        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="current_turn_rooms"
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="current_turn_rooms",
+        db_constraint=False,
     )
 
-    # Mapas fixados quando a partida é iniciada (todos os jogadores veem o mesmo)
-    snakes_map = models.JSONField(null=True, blank=True, default=dict)
-    ladders_map = models.JSONField(null=True, blank=True, default=dict)
+    # Mapas fixados quando a partida é iniciada (todos os jogadores veem o mesmo),
+    # em binário (board.codificar_pulos); leia/escreva por snakes_map/ladders_map
+    board_data = models.BinaryField(default=b"", blank=True)
 
     # Evento: {"username": str|None, "order": int|None, "texto": str}
     log_rounds = models.JSONField(null=True, blank=True, default=list)
     round_number = models.IntegerField(default=1)
 
+    # fluxo de dados da partida (game/rng.py): o replay refaz tudo a partir daqui
+    dice_seed = models.BigIntegerField(default=0)
+    dice_offset = models.PositiveIntegerField(default=0)
+
+    # seq do último RoomEvent (game/eventos.py); muda a cada alteração de estado
+    state_version = models.PositiveIntegerField(default=0)
+
+    # prazo do turno atual (game/prazos.py) e jogadas automáticas seguidas desde
+    # a última jogada de alguém de verdade
+    turn_deadline = models.DateTimeField(null=True, blank=True, db_index=True)
+    auto_moves = models.PositiveIntegerField(default=0)
+
     created_at = models.DateTimeField(default=timezone.now)
 
+    objects = ShardManager()
+
     def __str__(self):
         return f"Room {self.code} ({self.status})"
 
+    def _mapas(self):
+        # decodifica uma vez por instância; refaz só se board_data for trocado
+        dados = self.board_data
+        memo = self.__dict__.get("_mapas_memo")
+        if memo is None or memo[0] is not dados:
+            memo = (dados, decodificar_pulos(dados))
+            self.__dict__["_mapas_memo"] = memo
+        return memo[1]
+
+    # dicts {casa: destino} com chaves int; compartilhados pela instância, não alterar
+    @property
+    def snakes_map(self):
+        return self._mapas()[0]
+
+    @snakes_map.setter
+    def snakes_map(self, valor):
+        self.board_data = codificar_pulos(valor or {}, self.ladders_map)
+
+    @property
+    def ladders_map(self):
+        return self._mapas()[1]
+
+    @ladders_map.setter
+    def ladders_map(self, valor):
+        self.board_data = codificar_pulos(self.snakes_map, valor or {})
+
 
 class GamePlayer(models.Model):
     room = models.ForeignKey(GameRoom, related_name="players", on_delete=models.CASCADE)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
     order = models.PositiveIntegerField(default=0)  # ordem de jogo
     position = models.PositiveIntegerField(default=0)
 
+    objects = ShardManager()
+
     class Meta:
         unique_together = ("room", "user")
         ordering = ("order", "id")
@@ -68,6 +135,40 @@ class GamePlayer(models.Model):
         return f"{self.room.code} - {self.user} (ordem {self.order})"
 
 
+class RoomEvent(models.Model):
+    """Evento do histórico da sala; kind/data descritos em game/eventos.py."""
+    room = models.ForeignKey(GameRoom, related_name="events", on_delete=models.CASCADE)
+    seq = models.PositiveIntegerField()
+    kind = models.CharField(max_length=16)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = ShardManager()
+
+    class Meta:
+        unique_together = ("room", "seq")
+        ordering = ("room", "seq")
+
+    def __str__(self):
+        return f"{self.room_id}#{self.seq} {self.kind}"
+
+
+class RoomSnapshot(models.Model):
+    """Estado reduzido da sala depois do evento `seq`."""
+    room = models.ForeignKey(GameRoom, related_name="snapshots", on_delete=models.CASCADE)
+    seq = models.PositiveIntegerField()
+    state = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = ShardManager()
+
+    class Meta:
+        unique_together = ("room", "seq")
+
+    def __str__(self):
+        return f"snapshot {self.room_id}@{self.seq}"
+
+
 # ---------------- Amigos & Convites ----------------
 
 class FriendRequest(models.Model):
@@ -85,13 +186,112 @@ class FriendRequest(models.Model):
 
 class RoomInvite(models.Model):
     room = models.ForeignKey(GameRoom, related_name="invites", on_delete=models.CASCADE)
-    inviter = models.ForeignKey(User, related_name="room_invites_sent", on_delete=models.CASCADE)
-    invitee = models.ForeignKey(User, related_name="room_invites_received", on_delete=models.CASCADE)
+    inviter = models.ForeignKey(User, related_name="room_invites_sent", on_delete=models.CASCADE, db_constraint=False)
+    invitee = models.ForeignKey(
+        User, related_name="room_invites_received", on_delete=models.CASCADE, db_constraint=False
+    )
     status = models.CharField(max_length=16, default="pending")  # pending | accepted | declined
     created_at = models.DateTimeField(default=timezone.now)
 
+    objects = ShardManager()
+
     class Meta:
         unique_together = ("room", "invitee")
 
     def __str__(self):
-        return f"Invite {self.room.code}: {self.inviter} -> {self.invitee} ({self.status})"
\ No newline at end of file
+        return f"Invite {self.room.code}: {self.inviter} -> {self.invitee} ({self.status})"
+
+# ---------------- Partida rápida ----------------
+
+class MatchTicket(models.Model):
+    """Lugar na fila da partida rápida (game/partida_rapida.py); fica no banco default."""
+    user = models.ForeignKey(User, related_name="match_tickets", on_delete=models.CASCADE)
+    board_size = models.CharField(max_length=10, default="10x10")  # "10x10" | "5x5"
+    party_size = models.PositiveSmallIntegerField(default=2)
+    status = models.CharField(max_length=16, default="waiting")  # waiting | matched | cancelled
+    # a sala vive no shard dela: guarda só o código
+    room_code = models.CharField(max_length=8, blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    matched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # no máximo um lugar na fila por usuário
+            models.UniqueConstraint(fields=["user"], condition=models.Q(status="waiting"),
+                                    name="matchticket_um_por_usuario"),
+        ]
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"{self.user} {self.board_size}/{self.party_size} ({self.status})"
+
+
+class RankBucket(models.Model):
+    """
+    Quantos perfis têm cada (win_rate_bp, wins): o material do ranking
+    (game/ranking.py). Atualizado junto com o Profile no fim de cada partida;
+    `manage.py rebuild_leaderboard` refaz do zero.
+    """
+    win_rate_bp = models.PositiveIntegerField()
+    wins = models.PositiveIntegerField()
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("win_rate_bp", "wins")
+
+    def __str__(self):
+        return f"{self.win_rate_bp}bp/{self.wins}v: {self.total}"
+
+
+# ---------------- Histórico de partidas ----------------
+
+class MatchResult(models.Model):
+    """Partida terminada, gravada uma vez no fim (game/resultados.py); fica no banco default."""
+    mode = models.CharField(max_length=8)  # single | local | multi
+    board_size = models.CharField(max_length=10)  # "10x10" | "5x5"
+    # a sala vive no shard dela (e pode ser arquivada): guarda só o código
+    room_code = models.CharField(max_length=8, blank=True, default="")
+    players = models.PositiveSmallIntegerField()
+    rounds = models.PositiveIntegerField(default=0)
+    # None = venceu uma máquina (singleplayer)
+    winner = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    finished_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.mode} {self.board_size} ({self.finished_at:%Y-%m-%d %H:%M})"
+
+
+class MatchParticipant(models.Model):
+    """Um usuário numa MatchResult (máquinas não entram)."""
+    result = models.ForeignKey(MatchResult, related_name="participants", on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name="match_history", on_delete=models.CASCADE)
+    order = models.PositiveSmallIntegerField()
+    final_position = models.PositiveSmallIntegerField()
+    won = models.BooleanField()
+    # cópias do MatchResult: histórico e estatísticas do perfil saem só do índice abaixo
+    board_size = models.CharField(max_length=10)
+    finished_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["result", "user"], name="participant_unico")]
+        indexes = [models.Index(fields=["user", "-finished_at", "-id"], name="participant_historico")]
+
+    def __str__(self):
+        return f"{self.user} em {self.result_id} ({'vitória' if self.won else 'derrota'})"
+
+
+# ---------------- Estado do singleplayer ----------------
+
+class SinglePlayerState(models.Model):
+    """
+    Partida singleplayer de uma sessão, fora do django_session
+    (game/estado_single.py). `board` = config + cobras/escadas, gravado uma vez
+    por partida; `state` = o resto da partida + cursor do dado. JSON compacto.
+    """
+    session_key = models.CharField(max_length=40, primary_key=True)
+    board = models.BinaryField()
+    state = models.BinaryField(null=True)
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.session_key} ({self.updated_at:%Y-%m-%d %H:%M})"
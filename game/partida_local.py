@@ -0,0 +1,108 @@
+# game/partida_local.py
+"""
+Singleplayer jogado no navegador, com dados comprometidos (commit-reveal).
+
+Fluxo (dois requests por partida):
+  1. iniciar: o servidor sorteia um seed secreto, guarda na sessão e manda o
+     compromisso sha256(seed) junto com a sequência de dados derivada dele.
+     O navegador roda as regras localmente (static/game/js/regras.js).
+  2. finalizar: o navegador manda a lista de jogadas; o servidor refaz a
+     partida inteira com as mesmas regras (services.aplicar_jogada) e os dados
+     do seed. Só se tudo bater a vitória conta. O seed é revelado na resposta,
+     e o cliente confere sha256(seed) == compromisso e os dados recebidos.
+
+Como não há decisão do jogador em cobras e escadas, saber os dados de antemão
+não ajuda a trapacear nas jogadas; o que ajudaria seria abandonar as partidas
+perdidas. Por isso `iniciar` já conta a partida como derrota provisória, e o
+`finalizar` verificado com vitória converte para vitória.
+
+Dados: HMAC-SHA256(seed, contador de 64 bits) gera blocos de 32 bytes; cada
+byte < 252 vira (byte % 6) + 1 (rejeição para não enviesar). É o mesmo
+esquema que o JS usa para conferir depois da revelação.
+"""
+import hashlib
+import hmac
+import secrets
+from itertools import islice
+
+from .services import aplicar_jogada, nova_partida
+
+# dados mandados de cada vez (uma partida 10x10 com 4 jogadores usa ~150)
+LOTE_DADOS = 512
+MAX_JOGADAS = 20_000
+
+
+class PartidaInvalida(ValueError):
+    pass
+
+
+def novo_seed() -> str:
+    return secrets.token_hex(32)
+
+
+def compromisso(seed: str) -> str:
+    return hashlib.sha256(bytes.fromhex(seed)).hexdigest()
+
+
+def fluxo_dados(seed: str):
+    """Gerador infinito (e determinístico) de dados 1..6 a partir do seed."""
+    chave = bytes.fromhex(seed)
+    contador = 0
+    while True:
+        bloco = hmac.new(chave, contador.to_bytes(8, "big"), hashlib.sha256).digest()
+        for b in bloco:
+            if b < 252:
+                yield b % 6 + 1
+        contador += 1
+
+
+def dados(seed: str, inicio: int = 0, quantidade: int = LOTE_DADOS):
+    return list(islice(fluxo_dados(seed), inicio, inicio + quantidade))
+
+
+def iniciar(qtd_jogadores: int, casa_final: int, cobras: dict, escadas: dict) -> dict:
+    """Estado guardado na sessão (com o seed, que só sai na revelação)."""
+    seed = novo_seed()
+    return {
+        "seed": seed,
+        "commit": compromisso(seed),
+        "jogadores": qtd_jogadores,
+        "casa_final": casa_final,
+        "cobras": {str(k): int(v) for k, v in cobras.items()},
+        "escadas": {str(k): int(v) for k, v in escadas.items()},
+    }
+
+
+def verificar(local: dict, jogadas) -> dict:
+    """
+    Refaz a partida com os dados do seed e confere cada jogada enviada
+    ({"jogador", "dado", "para"}). Devolve a partida final (formato da sessão)
+    ou levanta PartidaInvalida.
+    """
+    if not isinstance(jogadas, list) or not jogadas:
+        raise PartidaInvalida("Lista de jogadas vazia.")
+    if len(jogadas) > MAX_JOGADAS:
+        raise PartidaInvalida("Partida longa demais.")
+
+    cobras = {int(k): int(v) for k, v in local["cobras"].items()}
+    escadas = {int(k): int(v) for k, v in local["escadas"].items()}
+    partida = nova_partida(local["jogadores"], cobras, escadas)
+    fluxo = fluxo_dados(local["seed"])
+
+    for n, jogada in enumerate(jogadas, start=1):
+        if partida["status"] == "finalizado":
+            raise PartidaInvalida(f"Jogada {n} depois do fim da partida.")
+        if not isinstance(jogada, dict):
+            raise PartidaInvalida(f"Jogada {n} malformada.")
+        dado = next(fluxo)
+        if jogada.get("jogador") != partida["jogador_atual"]:
+            raise PartidaInvalida(f"Jogada {n}: não era a vez do jogador {jogada.get('jogador')}.")
+        if jogada.get("dado") != dado:
+            raise PartidaInvalida(f"Jogada {n}: dado não confere.")
+        movimento = aplicar_jogada(partida, dado, local["casa_final"], cobras, escadas)
+        if jogada.get("para") != movimento["para"]:
+            raise PartidaInvalida(f"Jogada {n}: destino não confere.")
+
+    if partida["status"] != "finalizado":
+        raise PartidaInvalida("A partida não terminou.")
+    return partida
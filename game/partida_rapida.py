@@ -0,0 +1,223 @@
+# game/partida_rapida.py
+"""
+Partida rápida: fila de matchmaking por (tabuleiro, jogadores por sala).
+
+Cada fila é um heap (heapq) de Entrada(criado, ticket_id, ...): entrar e tirar
+da frente custam O(log n), então milhares de usuários esperando num processo
+não pesam. Sair da fila é preguiçoso: o ticket sai do índice `_vivos` e a
+entrada morta é descartada quando chega ao topo (ou numa compactação, se as
+mortas passarem das vivas).
+
+A verdade fica no banco (MatchTicket): a memória é só o índice ordenado.
+Um processo que sobe reconstrói as filas dos tickets "waiting" antes do
+primeiro uso, então reiniciar não tira ninguém da fila. Como o HOT_ROOMS,
+pressupõe um processo só casando jogadores.
+
+`entrar` devolve os grupos fechados; quem chamou (views.partida_rapida) cria
+e inicia a sala de cada um e confirma com `casados` — ou devolve os
+jogadores para a frente da fila com `devolver`, se algo falhar.
+"""
+import heapq
+import logging
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .benchmarks import resumo_latencias
+from .models import MatchTicket
+
+logger = logging.getLogger(__name__)
+
+TABULEIROS = ("10x10", "5x5")
+JOGADORES = (2, 3, 4)
+
+# ordena por (criado, ticket_id): o ticket_id é único, o resto nunca é comparado
+Entrada = namedtuple("Entrada", "criado ticket_id user_id username")
+
+
+class Filas:
+    """As filas em memória. Não é thread-safe: o módulo usa o `_lock`."""
+
+    def __init__(self):
+        self._heaps = defaultdict(list)
+        self._tamanho = defaultdict(int)
+        self._vivos = {}        # ticket_id -> chave
+        self._por_usuario = {}  # user_id -> (chave, Entrada)
+
+    def __len__(self):
+        return len(self._vivos)
+
+    def tamanho(self, chave):
+        return self._tamanho[chave]
+
+    def tamanhos(self):
+        return {chave: n for chave, n in self._tamanho.items() if n}
+
+    def do_usuario(self, user_id):
+        return self._por_usuario.get(user_id)
+
+    def entrar(self, chave, entrada):
+        heapq.heappush(self._heaps[chave], entrada)
+        self._vivos[entrada.ticket_id] = chave
+        self._por_usuario[entrada.user_id] = (chave, entrada)
+        self._tamanho[chave] += 1
+
+    def sair(self, user_id):
+        achado = self._por_usuario.pop(user_id, None)
+        if achado is None:
+            return None
+        chave, entrada = achado
+        del self._vivos[entrada.ticket_id]
+        self._tamanho[chave] -= 1
+        heap = self._heaps[chave]
+        if len(heap) > 2 * self._tamanho[chave] + 64:
+            # muitas entradas mortas: refaz o heap só com as vivas (O(n), amortizado)
+            heap[:] = [e for e in heap if e.ticket_id in self._vivos]
+            heapq.heapify(heap)
+        return entrada
+
+    def grupos(self, chave):
+        """Tira da frente da fila `chave` todos os grupos completos que houver."""
+        por_sala = chave[1]
+        heap = self._heaps[chave]
+        fechados = []
+        while self._tamanho[chave] >= por_sala:
+            grupo = []
+            while len(grupo) < por_sala:
+                entrada = heapq.heappop(heap)
+                if self._vivos.get(entrada.ticket_id) != chave:
+                    continue  # saiu da fila
+                del self._vivos[entrada.ticket_id]
+                del self._por_usuario[entrada.user_id]
+                self._tamanho[chave] -= 1
+                grupo.append(entrada)
+            fechados.append(grupo)
+        return fechados
+
+
+_filas = Filas()
+_lock = threading.Lock()
+_carregado = False
+
+contadores = {"entradas": 0, "cancelados": 0, "casados": 0, "salas": 0}
+_esperas_ms = deque(maxlen=2000)
+
+
+def _carregar():
+    """Refaz as filas a partir dos tickets em espera (chamar com o _lock)."""
+    global _carregado
+    if _carregado:
+        return
+    tickets = MatchTicket.objects.filter(status="waiting").values_list(
+        "id", "user_id", "user__username", "board_size", "party_size", "created_at",
+    )
+    n = 0
+    for ticket_id, user_id, username, board_size, party_size, criado in tickets.iterator():
+        _filas.entrar((board_size, party_size), Entrada(criado.timestamp(), ticket_id, user_id, username))
+        n += 1
+    if n:
+        logger.info("partida rápida: %d tickets de volta à fila", n)
+    _carregado = True
+
+
+def limpar():
+    """Esquece a memória (testes / simular reinício); o banco fica como está."""
+    global _carregado, _filas
+    with _lock:
+        _filas = Filas()
+        _carregado = False
+        _esperas_ms.clear()
+        for k in contadores:
+            contadores[k] = 0
+
+
+def entrar(user, board_size, party_size):
+    """
+    Põe `user` na fila (board_size, party_size) e devolve (ticket_id, grupos):
+    os grupos completos que se formaram, cada um uma lista de Entrada na ordem
+    de chegada. Já na mesma fila, só devolve o ticket atual.
+    """
+    chave = (board_size, party_size)
+    with _lock:
+        _carregar()
+        atual = _filas.do_usuario(user.id)
+        if atual is not None and atual[0] == chave:
+            return atual[1].ticket_id, []
+        with transaction.atomic():
+            if atual is not None:
+                # trocou de fila: o lugar antigo é cancelado
+                MatchTicket.objects.filter(pk=atual[1].ticket_id).update(status="cancelled")
+                _filas.sair(user.id)
+            ticket = MatchTicket.objects.create(user=user, board_size=board_size, party_size=party_size)
+        _filas.entrar(chave, Entrada(ticket.created_at.timestamp(), ticket.pk, user.id, user.username))
+        contadores["entradas"] += 1
+        return ticket.pk, _filas.grupos(chave)
+
+
+def sair(user):
+    with _lock:
+        _carregar()
+        entrada = _filas.sair(user.id)
+    if entrada is None:
+        return False
+    MatchTicket.objects.filter(pk=entrada.ticket_id, status="waiting").update(status="cancelled")
+    contadores["cancelados"] += 1
+    return True
+
+
+def casados(grupo, code):
+    """Confirma no banco que `grupo` foi para a sala `code`."""
+    agora = timezone.now()
+    MatchTicket.objects.filter(pk__in=[e.ticket_id for e in grupo]).update(
+        status="matched", room_code=code, matched_at=agora,
+    )
+    with _lock:
+        contadores["casados"] += len(grupo)
+        contadores["salas"] += 1
+        _esperas_ms.extend((agora.timestamp() - e.criado) * 1000 for e in grupo)
+    logger.info("partida rápida: sala %s com %d jogadores", code, len(grupo))
+
+
+def devolver(grupo, chave):
+    """Volta o grupo para a fila (mesmo lugar: a ordem é pelo horário de entrada)."""
+    with _lock:
+        for entrada in grupo:
+            _filas.entrar(chave, entrada)
+
+
+def situacao(user):
+    """
+    {"status": "waiting", "na_fila", "espera_s"} enquanto espera;
+    {"status": "matched", "room_code"} / {"status": "none"} pelo último ticket.
+    """
+    with _lock:
+        _carregar()
+        achado = _filas.do_usuario(user.id)
+        if achado is not None:
+            chave, entrada = achado
+            return {
+                "status": "waiting", "board_size": chave[0], "party_size": chave[1],
+                "na_fila": _filas.tamanho(chave), "espera_s": round(time.time() - entrada.criado, 1),
+            }
+    ultimo = MatchTicket.objects.filter(user=user).order_by("-created_at").first()
+    if ultimo is not None and ultimo.status == "matched":
+        return {"status": "matched", "room_code": ultimo.room_code}
+    return {"status": "none"}
+
+
+def metricas():
+    """Tamanho das filas, taxa de casamento e tempo de espera (deste processo)."""
+    with _lock:
+        tamanhos = {f"{b}/{p}": n for (b, p), n in sorted(_filas.tamanhos().items())}
+        esperas = list(_esperas_ms)
+        c = dict(contadores)
+    saidas = c["casados"] + c["cancelados"]
+    return {
+        "na_fila": tamanhos,
+        **c,
+        "taxa_de_casamento": round(c["casados"] / saidas, 3) if saidas else None,
+        "espera_ms": resumo_latencias(esperas),
+    }
@@ -0,0 +1,295 @@
+# game/prazos.py
+"""
+Prazo de turno das salas multiplayer. Com TURN_TIMEOUT > 0 o início da
+partida e cada jogada gravam GameRoom.turn_deadline (agora + TURN_TIMEOUT);
+se o jogador da vez não jogar até lá, o worker joga por ele pelo mesmo caminho
+do api_room_move (views.jogar_turno_vencido) — ou passa a vez, se ele já saiu
+da sala. Depois de TURN_ABANDON_AFTER rodadas seguidas só de jogadas
+automáticas a sala é encerrada sem vencedor: não tem ninguém olhando.
+
+Os prazos ficam numa roda de tempo hierárquica (RodaDeTempo): agendar e
+cancelar são O(1) — um dict por posição da roda e um índice código -> posição
+— e cada tick olha uma posição só do primeiro nível; prazos distantes descem
+de nível conforme o tempo passa. Dezenas de milhares de salas custam o mesmo
+por tick que dez.
+
+O worker é uma thread do processo (TURN_WORKER=thread), iniciada depois do
+commit da primeira jogada ou consulta de estado; com TURN_WORKER=off ela não
+sobe e o comando run_turn_deadlines faz o serviço num processo à parte.
+O prazo está no banco: ao subir, e a cada TURN_RESYNC_SECONDS, o worker
+(re)agenda o que vence até a próxima ressincronização — processo reiniciado
+ou prazo agendado por outro processo não se perdem. Disparar duas vezes não
+joga duas vezes: jogar_turno_vencido confere o prazo gravado dentro da
+transação, e a versão da sala só sobe se ninguém gravou no meio
+(eventos.registrar). Perdeu a corrida para a jogada do próprio jogador? Ela
+já agendou o prazo novo; o worker só desiste.
+"""
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import eventos, shards
+from .models import GameRoom
+
+logger = logging.getLogger(__name__)
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def ativo() -> bool:
+    return _config("TURN_TIMEOUT", 0) > 0
+
+
+def novo_prazo(agora=None):
+    """Prazo do turno que começa agora; None com TURN_TIMEOUT=0."""
+    if not ativo():
+        return None
+    return (agora or timezone.now()) + timedelta(seconds=_config("TURN_TIMEOUT", 0))
+
+
+def limite_automaticas(jogadores: int) -> int:
+    """Jogadas automáticas seguidas que encerram a sala (TURN_ABANDON_AFTER rodadas)."""
+    return _config("TURN_ABANDON_AFTER", 3) * jogadores
+
+
+# ---------------------------
+# Roda de tempo
+# ---------------------------
+class RodaDeTempo:
+    """
+    Roda de tempo hierárquica (Varghese & Lauck): `niveis` rodas de `posicoes`
+    posições; no nível n cada posição cobre posicoes**n ticks de `tick`
+    segundos. Prazo além do último nível fica na última posição alcançável e é
+    reposto quando ela desce.
+    """
+
+    def __init__(self, tick=1.0, posicoes=64, niveis=4, inicio=None):
+        self.tick = tick
+        self.posicoes = posicoes
+        self.niveis = niveis
+        self.atual = int((time.time() if inicio is None else inicio) // tick)
+        self._rodas = [[{} for _ in range(posicoes)] for _ in range(niveis)]
+        self._vencidos = {}  # agendados para o passado: saem no próximo avancar
+        self._onde = {}  # chave -> (nivel, posicao); nivel -1 = _vencidos
+
+    def __len__(self):
+        return len(self._onde)
+
+    def __contains__(self, chave):
+        return chave in self._onde
+
+    def _inserir(self, chave, alvo):
+        delta = alvo - self.atual
+        if delta <= 0:
+            self._vencidos[chave] = alvo
+            self._onde[chave] = (-1, 0)
+            return
+        nivel, alcance = 0, self.posicoes
+        while delta >= alcance and nivel < self.niveis - 1:
+            nivel += 1
+            alcance *= self.posicoes
+        # alcance = posicoes**(nivel+1): além disso a posição daria a volta
+        posicao = (min(alvo, self.atual + alcance - 1) // (alcance // self.posicoes)) % self.posicoes
+        self._rodas[nivel][posicao][chave] = alvo
+        self._onde[chave] = (nivel, posicao)
+
+    def agendar(self, chave, quando):
+        """Agenda (ou reagenda) `chave` para o instante `quando` (epoch, segundos)."""
+        self.cancelar(chave)
+        self._inserir(chave, math.ceil(quando / self.tick))
+
+    def cancelar(self, chave):
+        onde = self._onde.pop(chave, None)
+        if onde is None:
+            return False
+        nivel, posicao = onde
+        (self._vencidos if nivel < 0 else self._rodas[nivel][posicao]).pop(chave, None)
+        return True
+
+    def _passo(self, vencidos):
+        self.atual += 1
+        # níveis que viraram neste tick, do mais alto para o mais baixo: o que
+        # desce cai em posições que ainda serão esvaziadas neste mesmo passo
+        viraram, tamanho = [], self.posicoes
+        for nivel in range(1, self.niveis):
+            if self.atual % tamanho:
+                break
+            viraram.append((nivel, tamanho))
+            tamanho *= self.posicoes
+        for nivel, tamanho in reversed(viraram):
+            posicao = (self.atual // tamanho) % self.posicoes
+            descendo, self._rodas[nivel][posicao] = self._rodas[nivel][posicao], {}
+            for chave, alvo in descendo.items():
+                self._inserir(chave, alvo)
+        if self._vencidos:
+            vencidos.extend(self._vencidos)
+            for chave in self._vencidos:
+                del self._onde[chave]
+            self._vencidos = {}
+        posicao = self.atual % self.posicoes
+        if self._rodas[0][posicao]:
+            for chave in self._rodas[0][posicao]:
+                del self._onde[chave]
+            vencidos.extend(self._rodas[0][posicao])
+            self._rodas[0][posicao] = {}
+
+    def avancar(self, agora=None):
+        """Anda até `agora` (epoch) e devolve as chaves vencidas, tick a tick."""
+        alvo = int((time.time() if agora is None else agora) // self.tick)
+        vencidos = list(self._vencidos)
+        for chave in vencidos:
+            del self._onde[chave]
+        self._vencidos = {}
+        while self.atual < alvo:
+            self._passo(vencidos)
+        return vencidos
+
+
+# ---------------------------
+# Estado do processo
+# ---------------------------
+_lock = threading.Lock()
+_roda = None
+_worker = None
+
+
+def _obter_roda():
+    global _roda
+    if _roda is None:
+        _roda = RodaDeTempo(tick=_config("TURN_WHEEL_TICK", 1.0))
+    return _roda
+
+
+def agendar(code, prazo):
+    """Prazo (datetime) do turno atual da sala; None cancela."""
+    if prazo is None:
+        return cancelar(code)
+    with _lock:
+        _obter_roda().agendar(code, prazo.timestamp())
+    garantir()
+
+
+def cancelar(code):
+    with _lock:
+        if _roda is not None:
+            _roda.cancelar(code)
+
+
+def agendar_apos_commit(code, prazo):
+    """agendar() depois do commit da jogada (rollback não deixa prazo órfão na roda)."""
+    if not ativo():
+        return
+    transaction.on_commit(lambda: agendar(code, prazo), using=shards.shard_atual() or "default")
+
+
+def agendados() -> int:
+    with _lock:
+        return len(_roda) if _roda is not None else 0
+
+
+def limpar():
+    """Esquece a roda (testes). O worker, se estiver rodando, segue com a roda nova."""
+    global _roda
+    with _lock:
+        _roda = None
+
+
+# ---------------------------
+# Worker
+# ---------------------------
+def ressincronizar(horizonte=None, agora=None) -> int:
+    """
+    Agenda os prazos gravados das salas ativas, de todos os shards; com
+    `horizonte` (segundos) só os que vencem até lá. Devolve quantos.
+    """
+    if not ativo():
+        return 0
+    agora = agora or timezone.now()
+    total = 0
+    for alias in shards.aliases():
+        salas = GameRoom.objects.using(alias).filter(is_active=True, status="active", turn_deadline__isnull=False)
+        if horizonte is not None:
+            salas = salas.filter(turn_deadline__lte=agora + timedelta(seconds=horizonte))
+        linhas = list(salas.values_list("code", "turn_deadline"))
+        with _lock:
+            roda = _obter_roda()
+            for code, prazo in linhas:
+                roda.agendar(code, prazo.timestamp())
+        total += len(linhas)
+    return total
+
+
+def processar(agora=None) -> int:
+    """Resolve os turnos vencidos até `agora` (datetime). Devolve quantos disparos."""
+    from .views import jogar_turno_vencido  # views importa este módulo
+
+    agora = agora or timezone.now()
+    with _lock:
+        vencidos = _obter_roda().avancar(agora.timestamp())
+    for code in vencidos:
+        try:
+            prazo = jogar_turno_vencido(code, agora)
+        except eventos.VersaoConflitante:
+            # a jogada de verdade chegou antes e agendou o prazo dela
+            logger.info("Turno vencido da sala %s já foi jogado", code)
+            continue
+        except Exception:
+            # o banco falhou: a próxima ressincronização reagenda pelo prazo gravado
+            logger.exception("Falha no turno vencido da sala %s", code)
+            continue
+        if prazo is not None:
+            agendar(code, prazo)
+    return len(vencidos)
+
+
+def executar(parar=None):
+    """Laço do worker: ressincroniza tudo, depois processa a cada tick."""
+    parar = parar or threading.Event()
+    tick = _config("TURN_WHEEL_TICK", 1.0)
+    intervalo = _config("TURN_RESYNC_SECONDS", 30.0)
+    close_old_connections()
+    try:
+        ressincronizar()
+    finally:
+        close_old_connections()
+    proxima = time.monotonic() + intervalo
+    while not parar.wait(tick):
+        close_old_connections()
+        try:
+            if time.monotonic() >= proxima:
+                ressincronizar(horizonte=2 * intervalo)
+                proxima = time.monotonic() + intervalo
+            processar()
+        except Exception:
+            logger.exception("Falha no worker de prazos")
+        finally:
+            close_old_connections()
+
+
+def garantir():
+    """Sobe a thread do worker (uma por processo) se TURN_WORKER=thread."""
+    global _worker
+    if _worker is not None or not ativo() or _config("TURN_WORKER", "thread") != "thread":
+        return
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(target=executar, name="prazos-turno", daemon=True)
+            _worker.start()
+
+
+def rodando() -> bool:
+    return _worker is not None
+
+
+def garantir_apos_commit():
+    """garantir() das views de consulta: fora de transação roda na hora (testes nunca commitam)."""
+    if _worker is None and ativo():
+        transaction.on_commit(garantir, using=shards.shard_atual() or "default")
@@ -0,0 +1,126 @@
+# game/presenca.py
+"""
+Quem está de fato olhando uma sala multiplayer. Cada poll de um jogador
+(api_room_state, api_room_info) renova o heartbeat dele no cache — nunca no
+banco. A sala tem uma entrada só, {username: último heartbeat}, com TTL:
+jogador sem heartbeat há PRESENCE_TTL segundos está offline, e a entrada de
+uma sala abandonada some sozinha do cache.
+
+Para não regravar a entrada a cada poll (o front consulta a cada ~1 s), cada
+processo lembra quando renovou cada (sala, jogador) e só regrava depois de
+PRESENCE_REFRESH segundos. Não há lock no cache: dois heartbeats da mesma
+sala no mesmo instante podem se sobrescrever, e o perdido volta no próximo
+refresh, bem antes do TTL.
+
+GamePlayer continua dizendo quem está na sala; isto diz só quem está olhando.
+Com mais de um processo, PRESENCE_CACHE precisa ser compartilhado.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+_renovados = {}  # (code, username) -> último heartbeat gravado por este processo
+_lock = threading.Lock()
+LIMITE_MEMO = 50000
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def _cache():
+    return caches[_config("PRESENCE_CACHE", "default")]
+
+
+def _chave(code):
+    return f"presenca:{code}"
+
+
+def _vivos(entrada, agora):
+    limite = agora - _config("PRESENCE_TTL", 30)
+    return {nome for nome, visto in (entrada or {}).items() if visto > limite}
+
+
+def _vencido(code, username, agora):
+    """True se está na hora de regravar o heartbeat (e já marca como regravado)."""
+    with _lock:
+        ultimo = _renovados.get((code, username))
+        if ultimo is not None and agora - ultimo < _config("PRESENCE_REFRESH", 10):
+            return False
+        if len(_renovados) >= LIMITE_MEMO:
+            velho = agora - _config("PRESENCE_REFRESH", 10)
+            for k in [k for k, v in _renovados.items() if v < velho]:
+                del _renovados[k]
+        _renovados[(code, username)] = agora
+        return True
+
+
+def _renovar(entrada, username, agora):
+    limite = agora - _config("PRESENCE_TTL", 30)
+    entrada = {nome: visto for nome, visto in (entrada or {}).items() if visto > limite}
+    entrada[username] = agora
+    return entrada
+
+
+def _timeout():
+    # a entrada vive um pouco mais que o heartbeat mais novo dela
+    return _config("PRESENCE_TTL", 30) * 2
+
+
+def marcar(code, username, agora=None):
+    """Heartbeat de `username` na sala; devolve quem está online nela (set de usernames)."""
+    agora = time.time() if agora is None else agora
+    cache = _cache()
+    entrada = cache.get(_chave(code))
+    if _vencido(code, username, agora):
+        entrada = _renovar(entrada, username, agora)
+        cache.set(_chave(code), entrada, _timeout())
+    return _vivos(entrada, agora)
+
+
+async def amarcar(code, username, agora=None):
+    agora = time.time() if agora is None else agora
+    cache = _cache()
+    entrada = await cache.aget(_chave(code))
+    if _vencido(code, username, agora):
+        entrada = _renovar(entrada, username, agora)
+        await cache.aset(_chave(code), entrada, _timeout())
+    return _vivos(entrada, agora)
+
+
+def online(code, agora=None):
+    """Quem está online na sala, sem marcar ninguém."""
+    return _vivos(_cache().get(_chave(code)), time.time() if agora is None else agora)
+
+
+async def aonline(code, agora=None):
+    return _vivos(await _cache().aget(_chave(code)), time.time() if agora is None else agora)
+
+
+def contagens(codes, agora=None):
+    """{code: jogadores online} de várias salas numa ida só ao cache (lobby)."""
+    agora = time.time() if agora is None else agora
+    entradas = _cache().get_many([_chave(c) for c in codes])
+    return {c: len(_vivos(entradas.get(_chave(c)), agora)) for c in codes}
+
+
+async def acontagens(codes, agora=None):
+    agora = time.time() if agora is None else agora
+    entradas = await _cache().aget_many([_chave(c) for c in codes])
+    return {c: len(_vivos(entradas.get(_chave(c)), agora)) for c in codes}
+
+
+def limpar():
+    """Esquece os heartbeats deste processo e do cache (testes)."""
+    with _lock:
+        _renovados.clear()
+    _cache().clear()
+
+
+def ocultar_vazias(valor=None) -> bool:
+    """?ocultar_vazias=1|0 do lobby; sem o parâmetro vale LOBBY_HIDE_EMPTY."""
+    if valor in ("0", "1"):
+        return valor == "1"
+    return _config("LOBBY_HIDE_EMPTY", False)
@@ -0,0 +1,269 @@
+# game/ranking.py
+"""
+Ranking por taxa de vitórias: Profile.win_rate_bp (coluna gerada, em pontos-base)
+desc, depois vitórias desc. Perfis sem partida ficam de fora; empates de
+(taxa, vitórias) dividem a posição (1, 2, 2, 4...).
+
+  - top-N e ranking dos amigos saem do banco pelo índice profile_ranking;
+  - "minha posição" é 1 + quantos estão à frente, contado em árvores de
+    Fenwick: uma por taxa (10001 faixas) e, dentro de cada faixa, uma por
+    vitórias. O(log n), sem COUNT(*) varrendo o índice.
+
+O material das árvores é o RankBucket (quantos perfis por (taxa, vitórias)),
+poucas linhas mesmo com milhões de perfis. `atualizando(user_ids)` envolve as
+escritas de fim de partida: lê o par de cada perfil antes e depois, move os
+contadores no banco (mesma transação) e, depois do commit, nas árvores deste
+processo. Outros processos recarregam a cada RANKING_TTL segundos.
+`manage.py rebuild_leaderboard` refaz os RankBucket a partir dos perfis.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import FriendRequest, Profile, RankBucket
+
+MAX_BP = 10000
+ORDEM = ("-win_rate_bp", "-wins", "id")
+
+
+class Fenwick:
+    """Somas de prefixo com atualização pontual, ambas O(log n)."""
+
+    __slots__ = ("arv",)
+
+    def __init__(self, n=0):
+        self.arv = [0] * (n + 1)
+
+    @classmethod
+    def de(cls, valores):
+        f = cls(len(valores))
+        arv = f.arv
+        arv[1:] = valores
+        for i in range(1, len(arv)):
+            j = i + (i & -i)
+            if j < len(arv):
+                arv[j] += arv[i]
+        return f
+
+    def __len__(self):
+        return len(self.arv) - 1
+
+    def somar(self, i, delta):
+        i += 1
+        while i < len(self.arv):
+            self.arv[i] += delta
+            i += i & -i
+
+    def prefixo(self, i):
+        """Soma das posições [0, i)."""
+        soma = 0
+        while i > 0:
+            soma += self.arv[i]
+            i -= i & -i
+        return soma
+
+
+class _Faixa:
+    """Perfis de uma mesma taxa, por número de vitórias."""
+
+    __slots__ = ("vitorias", "qtd", "arv")
+
+    def __init__(self, vitorias=(), qtd=()):
+        self.vitorias = list(vitorias)
+        self.qtd = list(qtd)
+        self.arv = Fenwick.de(self.qtd)
+
+    def somar(self, wins, delta):
+        i = bisect_left(self.vitorias, wins)
+        if i < len(self.vitorias) and self.vitorias[i] == wins:
+            self.qtd[i] += delta
+            self.arv.somar(i, delta)
+        else:
+            # número de vitórias novo nesta taxa: refaz só a faixa (O(k), raro)
+            self.vitorias.insert(i, wins)
+            self.qtd.insert(i, delta)
+            self.arv = Fenwick.de(self.qtd)
+
+    def acima(self, wins):
+        return self.arv.prefixo(len(self.qtd)) - self.arv.prefixo(bisect_right(self.vitorias, wins))
+
+
+class Arvores:
+    def __init__(self, buckets=()):
+        """`buckets`: iterável de (win_rate_bp, wins, total)."""
+        por_taxa = [0] * (MAX_BP + 1)
+        por_faixa = {}
+        for bp, wins, total in sorted(buckets):
+            if not total:
+                continue
+            por_taxa[bp] += total
+            vitorias, qtd = por_faixa.setdefault(bp, ([], []))
+            vitorias.append(wins)
+            qtd.append(total)
+        self.taxas = Fenwick.de(por_taxa)
+        self.faixas = {bp: _Faixa(v, q) for bp, (v, q) in por_faixa.items()}
+
+    def total(self):
+        return self.taxas.prefixo(MAX_BP + 1)
+
+    def somar(self, bp, wins, delta):
+        self.taxas.somar(bp, delta)
+        self.faixas.setdefault(bp, _Faixa()).somar(wins, delta)
+
+    def posicao(self, bp, wins):
+        a_frente = self.total() - self.taxas.prefixo(bp + 1)
+        faixa = self.faixas.get(bp)
+        if faixa is not None:
+            a_frente += faixa.acima(wins)
+        return 1 + a_frente
+
+
+_arvores = None
+_carregado_em = 0.0
+_lock = threading.Lock()
+
+
+def _ttl():
+    return getattr(settings, "RANKING_TTL", 30)
+
+
+def arvores():
+    global _arvores, _carregado_em
+    with _lock:
+        if _arvores is None or time.monotonic() - _carregado_em > _ttl():
+            _arvores = Arvores(RankBucket.objects.filter(total__gt=0).values_list("win_rate_bp", "wins", "total"))
+            _carregado_em = time.monotonic()
+        return _arvores
+
+
+def limpar():
+    global _arvores
+    with _lock:
+        _arvores = None
+
+
+# ---------------------------
+# Consultas
+# ---------------------------
+def _linhas(perfis):
+    return [
+        {"user_id": p["user_id"], "username": p["user__username"], "nickname": p["nickname"],
+         "win_rate": p["win_rate_bp"] / 100, "wins": p["wins"], "losses": p["losses"],
+         "win_rate_bp": p["win_rate_bp"]}
+        for p in perfis.values("user_id", "user__username", "nickname", "win_rate_bp", "wins", "losses")
+    ]
+
+
+def _numerar(linhas, primeira):
+    # posições globais: empate com a linha anterior repete a posição dela
+    anterior = None
+    for i, linha in enumerate(linhas):
+        par = (linha["win_rate_bp"], linha["wins"])
+        if anterior is not None and par == anterior[0]:
+            linha["posicao"] = anterior[1]
+        else:
+            linha["posicao"] = primeira(linha, i)
+        anterior = (par, linha["posicao"])
+    return linhas
+
+
+def top(n=50):
+    linhas = _linhas(Profile.objects.filter(win_rate_bp__isnull=False).order_by(*ORDEM)[:n])
+    if not linhas:
+        return linhas
+    inicio = arvores().posicao(linhas[0]["win_rate_bp"], linhas[0]["wins"])
+    return _numerar(linhas, lambda linha, i: inicio + i)
+
+
+def dos_amigos(user):
+    """O usuário e os amigos dele, na ordem do ranking, com a posição global."""
+    pares = FriendRequest.objects.filter(
+        Q(requester=user) | Q(addressee=user), status="accepted",
+    ).values_list("requester_id", "addressee_id")
+    ids = {uid for par in pares for uid in par} | {user.id}
+    linhas = _linhas(Profile.objects.filter(user_id__in=ids, win_rate_bp__isnull=False).order_by(*ORDEM))
+    arv = arvores()
+    return _numerar(linhas, lambda linha, i: arv.posicao(linha["win_rate_bp"], linha["wins"]))
+
+
+def posicao(user):
+    """{"posicao", "de", "win_rate", "wins"} do usuário, ou None sem partidas."""
+    par = Profile.objects.filter(user=user, win_rate_bp__isnull=False).values_list("win_rate_bp", "wins").first()
+    if par is None:
+        return None
+    arv = arvores()
+    return {"posicao": arv.posicao(*par), "de": arv.total(), "win_rate": par[0] / 100, "wins": par[1]}
+
+
+# ---------------------------
+# Atualização
+# ---------------------------
+def _pares(user_ids):
+    return {
+        uid: (bp, wins)
+        for uid, bp, wins in Profile.objects.filter(user_id__in=user_ids, win_rate_bp__isnull=False)
+        .values_list("user_id", "win_rate_bp", "wins")
+    }
+
+
+def _aplicar(mudancas):
+    with _lock:
+        if _arvores is not None:
+            for (bp, wins), delta in mudancas.items():
+                _arvores.somar(bp, wins, delta)
+
+
+@contextmanager
+def atualizando(user_ids):
+    """Envolve as escritas em Profile de `user_ids` e leva a mudança para o ranking."""
+    user_ids = list(user_ids)
+    with transaction.atomic():
+        antes = _pares(user_ids)
+        yield
+        depois = _pares(user_ids)
+        mudancas = Counter()
+        for uid in user_ids:
+            if antes.get(uid) != depois.get(uid):
+                if uid in antes:
+                    mudancas[antes[uid]] -= 1
+                if uid in depois:
+                    mudancas[depois[uid]] += 1
+        mudancas = {par: d for par, d in mudancas.items() if d}
+        for (bp, wins), delta in mudancas.items():
+            if not RankBucket.objects.filter(win_rate_bp=bp, wins=wins).update(total=F("total") + delta):
+                RankBucket.objects.create(win_rate_bp=bp, wins=wins, total=delta)
+        if mudancas:
+            transaction.on_commit(lambda: _aplicar(mudancas))
+
+
+def contagem_exata():
+    """{(win_rate_bp, wins): perfis}, direto dos perfis."""
+    grupos = (
+        Profile.objects.filter(win_rate_bp__isnull=False)
+        .values("win_rate_bp", "wins").annotate(n=Count("id")).order_by()
+        .values_list("win_rate_bp", "wins", "n")
+    )
+    return {(bp, wins): n for bp, wins, n in grupos.iterator()}
+
+
+def reconstruir(gravar=True):
+    """Refaz os RankBucket a partir dos perfis. Devolve os pares que estavam errados."""
+    with transaction.atomic():
+        certos = contagem_exata()
+        atuais = {(bp, wins): n for bp, wins, n in RankBucket.objects.values_list("win_rate_bp", "wins", "total")}
+        errados = sorted(par for par in certos.keys() | atuais.keys() if certos.get(par, 0) != atuais.get(par, 0))
+        if gravar and errados:
+            RankBucket.objects.all().delete()
+            RankBucket.objects.bulk_create(
+                [RankBucket(win_rate_bp=bp, wins=wins, total=n) for (bp, wins), n in certos.items()],
+                batch_size=5000,
+            )
+    if gravar:
+        limpar()
+    return errados
@@ -0,0 +1,260 @@
+# game/ratings.py
+"""
+Rating das partidas multiplayer: Elo de todos contra todos. Uma partida de
+N jogadores conta como N-1 confrontos para cada um: o vencedor fica à frente
+de todos e os outros se ordenam pela casa final (empate = meio ponto).
+
+    esperado_i = Σ_j 1 / (1 + 10^((r_j - r_i) / escala))
+    pontos_i   = Σ_j [i à frente de j] + ½ [empate]
+    r_i       += k * (pontos_i - esperado_i) / (N - 1)
+
+A soma das variações é zero. Fica em Profile.rating (e rated_games), ao lado
+de wins/losses; `apos_partida` atualiza no fim de cada partida
+(views._registrar_resultado_sala). Parâmetros em RATING_INICIAL, RATING_K e
+RATING_ESCALA.
+
+`manage.py recompute_ratings` refaz tudo do histórico (MatchResult) em ordem
+cronológica, para quando os parâmetros mudam. Com NumPy as partidas vão em
+"ondas": uma partida entra na onda seguinte à última onda de cada um dos seus
+jogadores, então ninguém aparece duas vezes na mesma onda e a onda inteira é
+uma conta vetorizada — com o mesmo resultado da repetição partida a partida
+(que é o caminho sem NumPy).
+"""
+import logging
+import time
+from array import array
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import MatchParticipant, Profile
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+def parametros(**sobrescritos):
+    base = {
+        "inicial": float(getattr(settings, "RATING_INICIAL", 1500)),
+        "k": float(getattr(settings, "RATING_K", 32)),
+        "escala": float(getattr(settings, "RATING_ESCALA", 400)),
+    }
+    base.update({nome: float(v) for nome, v in sobrescritos.items() if v is not None})
+    return base
+
+
+def chave(won, posicao):
+    """Maior = melhor colocado: o vencedor na frente, depois a casa final."""
+    return (1000 if won else 0) + posicao
+
+
+def variacoes(ratings, chaves, k, escala):
+    """Variação de cada jogador de uma partida (mesma ordem das listas)."""
+    n = len(ratings)
+    if n < 2:
+        return [0.0] * n
+    deltas = []
+    for i in range(n):
+        saldo = 0.0
+        for j in range(n):
+            if i == j:
+                continue
+            pontos = 1.0 if chaves[i] > chaves[j] else 0.5 if chaves[i] == chaves[j] else 0.0
+            saldo += pontos - 1.0 / (1.0 + 10 ** ((ratings[j] - ratings[i]) / escala))
+        deltas.append(k * saldo / (n - 1))
+    return deltas
+
+
+def apos_partida(perfis, jogadores, vencedor_id, params=None):
+    """
+    Aplica a partida em `perfis` ({user_id: Profile}, sem salvar).
+    `jogadores`: [(user_id, order, position)].
+    """
+    params = params or parametros()
+    presentes = [(uid, pos) for uid, _, pos in jogadores if uid in perfis]
+    deltas = variacoes(
+        [perfis[uid].rating for uid, _ in presentes],
+        [chave(uid == vencedor_id, pos) for uid, pos in presentes],
+        params["k"], params["escala"],
+    )
+    for (uid, _), delta in zip(presentes, deltas):
+        perfis[uid].rating += delta
+        perfis[uid].rated_games += 1
+
+
+# ---------------------------
+# Recálculo do histórico
+# ---------------------------
+def carregar(ate_id=None):
+    """
+    Participações das partidas multiplayer em ordem cronológica:
+    (result_ids, user_ids, chaves), arrays paralelos, cada partida contígua.
+    array("q") e não list: 8 bytes por valor, com dezenas de milhões de linhas.
+    """
+    qs = MatchParticipant.objects.filter(result__mode="multi")
+    if ate_id is not None:
+        qs = qs.filter(result_id__lte=ate_id)
+    result_ids, user_ids, chaves = array("q"), array("q"), array("q")
+    linhas = qs.order_by("finished_at", "result_id").values_list("result_id", "user_id", "won", "final_position")
+    for result_id, user_id, won, posicao in linhas.iterator(chunk_size=20000):
+        result_ids.append(result_id)
+        user_ids.append(user_id)
+        chaves.append(chave(won, posicao))
+    return result_ids, user_ids, chaves
+
+
+def _partidas(result_ids):
+    """[(início, fim)] de cada partida nos arrays paralelos."""
+    limites = []
+    inicio = 0
+    for i in range(1, len(result_ids) + 1):
+        if i == len(result_ids) or result_ids[i] != result_ids[inicio]:
+            limites.append((inicio, i))
+            inicio = i
+    return limites
+
+
+def _recalcular_python(result_ids, user_ids, chaves, params):
+    ratings, jogos = {}, {}
+    acertos = 0
+    for ini, fim in _partidas(result_ids):
+        uids = user_ids[ini:fim]
+        atuais = [ratings.get(u, params["inicial"]) for u in uids]
+        ch = chaves[ini:fim]
+        acertos += ch[atuais.index(max(atuais))] == max(ch)
+        for u, r, d in zip(uids, atuais, variacoes(atuais, ch, params["k"], params["escala"])):
+            ratings[u] = r + d
+            jogos[u] = jogos.get(u, 0) + 1
+    return ratings, jogos, acertos
+
+
+def _recalcular_numpy(result_ids, user_ids, chaves, params):
+    resultado = np.asarray(result_ids, dtype=np.int64)
+    usuarios, indice = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+    inicio = np.r_[True, resultado[1:] != resultado[:-1]]
+    partida = np.cumsum(inicio) - 1
+    inicios = np.flatnonzero(inicio)
+    vaga = np.arange(len(resultado)) - inicios[partida]
+    total = len(inicios)
+    largura = int(vaga.max()) + 1
+
+    # partidas como linhas de uma matriz (jogador -1 = vaga vazia)
+    quem = np.full((total, largura), -1, dtype=np.int64)
+    colocacao = np.full((total, largura), -1, dtype=np.int64)
+    quem[partida, vaga] = indice
+    colocacao[partida, vaga] = np.asarray(chaves, dtype=np.int64)
+
+    # onda de cada partida: uma depois da última onda de cada jogador dela.
+    # Sequencial por natureza; roda sobre arrays compactos, não listas
+    jogador = array("q", indice.astype(np.int64).tobytes())
+    limites = array("q", np.r_[inicios, len(resultado)].astype(np.int64).tobytes())
+    ultima = array("q", bytes(8 * len(usuarios)))
+    ondas = array("q", bytes(8 * total))
+    for g in range(total):
+        da_partida = jogador[limites[g]:limites[g + 1]]
+        onda = 1 + max(ultima[u] for u in da_partida)
+        for u in da_partida:
+            ultima[u] = onda
+        ondas[g] = onda
+    ondas = np.frombuffer(ondas, dtype=np.int64)
+
+    ratings = np.full(len(usuarios), params["inicial"], dtype=np.float64)
+    ordem = np.argsort(ondas, kind="stable")
+    cortes = np.flatnonzero(np.diff(ondas[ordem])) + 1
+    acertos = 0
+    for grupo in np.split(ordem, cortes):
+        q, c = quem[grupo], colocacao[grupo]
+        valido = q >= 0
+        r = np.where(valido, ratings[np.where(valido, q, 0)], 0.0)
+        par = valido[:, :, None] & valido[:, None, :]
+        par &= ~np.eye(largura, dtype=bool)
+        esperado = 1.0 / (1.0 + 10 ** ((r[:, None, :] - r[:, :, None]) / params["escala"]))
+        pontos = (c[:, :, None] > c[:, None, :]) + 0.5 * (c[:, :, None] == c[:, None, :])
+        n = valido.sum(axis=1, keepdims=True)
+        delta = params["k"] * np.where(par, pontos - esperado, 0.0).sum(axis=2) / np.maximum(n - 1, 1)
+        favorito = np.where(valido, r, -np.inf).argmax(axis=1)
+        acertos += int((c[np.arange(len(grupo)), favorito] == c.max(axis=1)).sum())
+        ratings[q[valido]] += delta[valido]
+
+    jogos = np.bincount(indice, minlength=len(usuarios))
+    uids = usuarios.tolist()
+    return dict(zip(uids, ratings.tolist())), dict(zip(uids, jogos.tolist())), acertos
+
+
+def recalcular(result_ids, user_ids, chaves, params=None, vetorizado=None):
+    """({user_id: rating}, {user_id: partidas}, acertos do favorito)."""
+    params = params or parametros()
+    if not result_ids:
+        return {}, {}, 0
+    if vetorizado is None:
+        vetorizado = np is not None
+    if vetorizado:
+        return _recalcular_numpy(result_ids, user_ids, chaves, params)
+    return _recalcular_python(result_ids, user_ids, chaves, params)
+
+
+def recalcular_tudo(params=None, gravar=True, vetorizado=None):
+    """
+    Refaz os ratings de todos os perfis a partir do histórico. A conta roda
+    fora de transação; na hora de gravar, as partidas que terminaram nesse
+    meio-tempo são aplicadas por cima (partida a partida) antes do commit.
+    """
+    params = params or parametros()
+    ate_id = MatchParticipant.objects.filter(result__mode="multi").order_by("-result_id") \
+        .values_list("result_id", flat=True).first()
+    t0 = time.perf_counter()
+    linhas = carregar(ate_id)
+    carga_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    ratings, jogos, acertos = recalcular(*linhas, params=params, vetorizado=vetorizado)
+    conta_s = time.perf_counter() - t0
+    partidas = len(set(linhas[0]))
+    stats = {
+        "results": partidas,
+        "players": len(ratings),
+        "vectorized": np is not None if vetorizado is None else vetorizado,
+        "load_s": round(carga_s, 2),
+        "compute_s": round(conta_s, 2),
+        "favorite_won": round(acertos / partidas, 4) if partidas else None,
+        "params": params,
+    }
+    if not gravar:
+        return stats
+
+    t0 = time.perf_counter()
+    with transaction.atomic():
+        Profile.objects.update(rating=params["inicial"], rated_games=0)
+        tabela = connection.ops.quote_name(Profile._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {tabela} SET rating = %s, rated_games = %s WHERE user_id = %s",
+                [(r, jogos[uid], uid) for uid, r in ratings.items()],
+            )
+        novas = _partidas_depois(ate_id)
+        for result_id, jogadores, vencedor_id in novas:
+            perfis = {p.user_id: p for p in Profile.objects.filter(user_id__in=[j[0] for j in jogadores])}
+            apos_partida(perfis, jogadores, vencedor_id, params)
+            Profile.objects.bulk_update(perfis.values(), ["rating", "rated_games"])
+    stats["write_s"] = round(time.perf_counter() - t0, 2)
+    stats["late_results"] = len(novas)
+    logger.info("ratings refeitos: %d partidas, %d jogadores", partidas, len(ratings))
+    return stats
+
+
+def _partidas_depois(ate_id):
+    """[(result_id, [(user_id, order, position)], vencedor_id)] depois de `ate_id`."""
+    qs = MatchParticipant.objects.filter(result__mode="multi")
+    if ate_id is not None:
+        qs = qs.filter(result_id__gt=ate_id)
+    novas = {}
+    for result_id, user_id, order, posicao, won in qs.order_by("finished_at", "result_id").values_list(
+        "result_id", "user_id", "order", "final_position", "won",
+    ):
+        jogadores, vencedor = novas.get(result_id, ([], None))
+        jogadores.append((user_id, order, posicao))
+        novas[result_id] = (jogadores, user_id if won else vencedor)
+    return [(rid, jogadores, vencedor) for rid, (jogadores, vencedor) in novas.items()]
@@ -0,0 +1,106 @@
+# game/resultados.py
+"""
+Histórico de partidas: um MatchResult por partida terminada, com um
+MatchParticipant por usuário, gravados uma vez no fim (views de jogar_rodada,
+partida_local_finalizar e api_room_move), na mesma transação do Profile.
+
+O histórico do perfil é paginado por chave (keyset): a página seguinte começa
+depois do (finished_at, id) da última linha, direto no índice
+participant_historico, então a página 500 custa o mesmo que a primeira — com
+OFFSET o banco percorreria e descartaria todas as linhas anteriores.
+"""
+from datetime import datetime, timedelta, timezone as tz
+
+from django.db.models import Count, FloatField, Max, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import MatchParticipant, MatchResult
+
+POR_PAGINA = 20
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=tz.utc)
+
+
+def registrar_single(user, partida, board_size, jogadores, modo="single"):
+    """Partida contra as máquinas: só o humano (jogador 0) é participante."""
+    venceu = partida["ultimo_movimento"]["jogador"] == 0
+    agora = timezone.now()
+    resultado = MatchResult.objects.create(
+        mode=modo, board_size=board_size, players=jogadores,
+        rounds=partida.get("rodada_atual", 1), winner=user if venceu else None, finished_at=agora,
+    )
+    MatchParticipant.objects.create(
+        result=resultado, user=user, order=0, final_position=partida["posicoes"][0],
+        won=venceu, board_size=board_size, finished_at=agora,
+    )
+    return resultado
+
+
+def registrar_sala(code, board_size, rodadas, jogadores, vencedor_id):
+    """`jogadores`: [(user_id, order, position)] da sala que acabou de terminar."""
+    agora = timezone.now()
+    resultado = MatchResult.objects.create(
+        mode="multi", board_size=board_size, room_code=code, players=len(jogadores),
+        rounds=rodadas or 1, winner_id=vencedor_id, finished_at=agora,
+    )
+    MatchParticipant.objects.bulk_create([
+        MatchParticipant(
+            result=resultado, user_id=user_id, order=order, final_position=position,
+            won=user_id == vencedor_id, board_size=board_size, finished_at=agora,
+        )
+        for user_id, order, position in jogadores
+    ])
+    return resultado
+
+
+# ---------------------------
+# Consultas do perfil
+# ---------------------------
+def cursor(participante):
+    micros = (participante.finished_at - _EPOCA) // timedelta(microseconds=1)
+    return f"{micros}-{participante.pk}"
+
+
+def _ler_cursor(valor):
+    # vem da query string: data fora do alcance do datetime ou pk maior que o
+    # INTEGER do banco também é "inválido" (OverflowError não é ValueError)
+    try:
+        micros, pk = (int(x) for x in valor.split("-"))
+        if not 0 <= pk < 2 ** 63:
+            return None
+        return _EPOCA + timedelta(microseconds=micros), pk
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def pagina(user, antes=None, n=POR_PAGINA):
+    """
+    (participações, cursor da próxima página ou None), da mais recente para a
+    mais antiga. `antes` é o cursor devolvido pela página anterior; inválido =
+    primeira página.
+    """
+    qs = MatchParticipant.objects.filter(user=user)
+    chave = _ler_cursor(antes) if antes else None
+    if chave is not None:
+        quando, pk = chave
+        qs = qs.filter(Q(finished_at__lt=quando) | Q(finished_at=quando, pk__lt=pk))
+    linhas = list(qs.select_related("result").order_by("-finished_at", "-id")[:n + 1])
+    if len(linhas) > n:
+        return linhas[:n], cursor(linhas[n - 1])
+    return linhas, None
+
+
+def por_tabuleiro(user):
+    """Partidas, vitórias e % por tamanho de tabuleiro, agregados no banco."""
+    return list(
+        MatchParticipant.objects.filter(user=user)
+        .values("board_size")
+        .annotate(
+            partidas=Count("id"),
+            vitorias=Count("id", filter=Q(won=True)),
+            ultima=Max("finished_at"),
+        )
+        .annotate(taxa=Cast("vitorias", FloatField()) * 100 / Cast("partidas", FloatField()))
+        .order_by("board_size")
+    )
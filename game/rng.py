@@ -0,0 +1,246 @@
+# game/rng.py
+"""
+Fluxos de dados com seed: um por sala (GameRoom.dice_seed/dice_offset) e um
+por partida singleplayer (game/estado_single.py; no backend "sessao", chave
+"dados_rng" da sessão).
+
+Só (seed, offset) é persistido. O dado de índice `n` do fluxo é sempre o mesmo:
+fica no bloco n // TAMANHO_BLOCO, que é gerado de uma vez por um
+random.Random semeado com (seed, bloco) e memoizado. Então rolar é ler uma
+posição de uma tupla, pular para qualquer offset não exige regerar o começo,
+e refazer uma partida inteira a partir do seed é barato (ver `reconstruir_*`).
+
+O `monitor` acumula a distribuição das faces e as trocas alto/baixo entre
+dados consecutivos do mesmo fluxo, de todas as salas e sessões do processo,
+para o teste qui-quadrado e o teste de sequências (`estatisticas()`).
+"""
+import math
+import random
+import secrets
+from functools import lru_cache
+from threading import Lock
+
+from django.core.cache import cache
+
+from .eventos import aplicar, estado_inicial
+from .services import aplicar_jogada, calcular_destino, nova_partida
+
+TAMANHO_BLOCO = 256
+FACES = (1, 2, 3, 4, 5, 6)
+CHAVE_SESSAO = "dados_rng"
+
+
+def novo_seed() -> int:
+    # cabe num BigIntegerField (positivo)
+    return secrets.randbits(63)
+
+
+@lru_cache(maxsize=1024)
+def bloco(seed: int, indice: int) -> tuple:
+    """Dados [indice * TAMANHO_BLOCO, (indice + 1) * TAMANHO_BLOCO) do fluxo."""
+    rng = random.Random(seed * 2**32 + indice)
+    return tuple(rng.choices(FACES, k=TAMANHO_BLOCO))
+
+
+def dado_em(seed: int, offset: int) -> int:
+    return bloco(seed, offset // TAMANHO_BLOCO)[offset % TAMANHO_BLOCO]
+
+
+class FluxoDados:
+    """Cursor sobre o fluxo de um seed. `proximo()` rola e avança o offset."""
+
+    def __init__(self, seed: int, offset: int = 0, monitorar: bool = True):
+        self.seed = int(seed)
+        self.offset = int(offset)
+        self.monitorar = monitorar
+        self._anterior = dado_em(self.seed, self.offset - 1) if self.offset else None
+        self._indice = self._bloco = None
+
+    def proximo(self) -> int:
+        indice, pos = divmod(self.offset, TAMANHO_BLOCO)
+        if indice != self._indice:
+            self._indice, self._bloco = indice, bloco(self.seed, indice)
+        dado = self._bloco[pos]
+        if self.monitorar:
+            monitor.registrar(dado, self._anterior)
+        self._anterior = dado
+        self.offset += 1
+        return dado
+
+    def estado(self) -> dict:
+        return {"seed": self.seed, "offset": self.offset}
+
+    def __repr__(self):
+        return f"FluxoDados(seed={self.seed}, offset={self.offset})"
+
+
+# ---------------------------
+# Persistência (sessão / sala)
+# ---------------------------
+def novo_fluxo_na_sessao(session) -> FluxoDados:
+    fluxo = FluxoDados(novo_seed())
+    session[CHAVE_SESSAO] = fluxo.estado()
+    return fluxo
+
+
+def fluxo_da_sessao(session) -> FluxoDados:
+    # sessões de antes dos fluxos (ou zeradas por fora) ganham um seed na hora
+    estado = session.get(CHAVE_SESSAO)
+    if not estado:
+        return novo_fluxo_na_sessao(session)
+    return FluxoDados(estado["seed"], estado["offset"])
+
+
+def salvar_na_sessao(session, fluxo: FluxoDados) -> None:
+    session[CHAVE_SESSAO] = fluxo.estado()
+
+
+def fluxo_da_sala(room) -> FluxoDados:
+    if not room.dice_seed:
+        room.dice_seed, room.dice_offset = novo_seed(), 0
+    return FluxoDados(room.dice_seed, room.dice_offset)
+
+
+# ---------------------------
+# Monitor de justiça (qui-quadrado + sequências)
+# ---------------------------
+_CACHE_PREFIXO = "rng:"
+_CHAVE_FACE = {f: f"face{f}" for f in FACES}
+_CHAVES = tuple(_CHAVE_FACE.values()) + ("pares", "trocas")
+
+
+def _qui2_sf_5gl(x: float) -> float:
+    """P(X >= x) para qui-quadrado com 5 graus de liberdade (forma fechada, gl ímpar)."""
+    if x <= 0:
+        return 1.0
+    return math.erfc(math.sqrt(x / 2)) + math.sqrt(2 * x / math.pi) * math.exp(-x / 2) * (1 + x / 3)
+
+
+class MonitorDados:
+    """
+    Contadores em memória, despejados no cache (incr, compartilhado entre
+    threads/processos se o backend for compartilhado) a cada LOTE rolagens;
+    rolar continua sendo só somar em um dict.
+
+    Teste de sequências: cada dado é "alto" (4-6) ou "baixo" (1-3); para pares
+    consecutivos do mesmo fluxo, o número de trocas é Binomial(pares, 1/2).
+    """
+    LOTE = 1024
+
+    def __init__(self):
+        self._lock = Lock()
+        self._pendentes = dict.fromkeys(_CHAVES, 0)
+        self._n_pendentes = 0
+
+    def registrar(self, dado: int, anterior=None) -> None:
+        with self._lock:
+            self._pendentes[_CHAVE_FACE[dado]] += 1
+            if anterior is not None:
+                self._pendentes["pares"] += 1
+                if (dado > 3) != (anterior > 3):
+                    self._pendentes["trocas"] += 1
+            self._n_pendentes += 1
+            if self._n_pendentes < self.LOTE:
+                return
+            pendentes = self._descarregar()
+        self._enviar(pendentes)
+
+    def _descarregar(self):
+        pendentes = {k: v for k, v in self._pendentes.items() if v}
+        self._pendentes = dict.fromkeys(_CHAVES, 0)
+        self._n_pendentes = 0
+        return pendentes
+
+    def _enviar(self, pendentes):
+        for chave, n in pendentes.items():
+            chave = _CACHE_PREFIXO + chave
+            cache.add(chave, 0, timeout=None)
+            try:
+                cache.incr(chave, n)
+            except ValueError:  # expirou/foi despejada entre o add e o incr
+                cache.set(chave, n, timeout=None)
+
+    def flush(self) -> None:
+        with self._lock:
+            pendentes = self._descarregar()
+        self._enviar(pendentes)
+
+    def zerar(self) -> None:
+        with self._lock:
+            self._descarregar()
+        cache.delete_many([_CACHE_PREFIXO + k for k in _CHAVES])
+
+    def contagens(self) -> dict:
+        self.flush()
+        valores = cache.get_many([_CACHE_PREFIXO + k for k in _CHAVES])
+        return {k: valores.get(_CACHE_PREFIXO + k, 0) for k in _CHAVES}
+
+    def estatisticas(self) -> dict:
+        c = self.contagens()
+        faces = [c[f"face{f}"] for f in FACES]
+        total = sum(faces)
+        res = {"total": total, "faces": dict(zip(FACES, faces)), "pares": c["pares"], "trocas": c["trocas"]}
+        if total:
+            esperado = total / 6
+            qui2 = sum((o - esperado) ** 2 / esperado for o in faces)
+            res.update(qui2=qui2, qui2_p=_qui2_sf_5gl(qui2))
+        if c["pares"]:
+            z = (c["trocas"] - c["pares"] / 2) / math.sqrt(c["pares"] / 4)
+            res.update(sequencias_z=z, sequencias_p=math.erfc(abs(z) / math.sqrt(2)))
+        return res
+
+
+monitor = MonitorDados()
+
+
+# ---------------------------
+# Replay determinístico
+# ---------------------------
+def reconstruir_partida(seed: int, jogadas: int, qtd_jogadores: int, casa_final: int, cobras, escadas) -> dict:
+    """Refaz as `jogadas` primeiras rolagens de uma partida singleplayer (mesmo dict da sessão)."""
+    cobras = {int(k): int(v) for k, v in cobras.items()}
+    escadas = {int(k): int(v) for k, v in escadas.items()}
+    partida = nova_partida(qtd_jogadores, cobras, escadas)
+    fluxo = FluxoDados(seed, monitorar=False)
+    for _ in range(jogadas):
+        if partida["status"] == "finalizado":
+            break
+        aplicar_jogada(partida, fluxo.proximo(), casa_final, cobras, escadas)
+    return partida
+
+
+def reconstruir_sala(historico, casa_final: int, cobras, escadas):
+    """
+    Refaz uma partida multiplayer pelo histórico da sala ((seq, tipo, dados)
+    dos RoomEvent, do primeiro ao último). Entradas, saídas e passagens de vez
+    sem dado (jogador que saiu, turno vencido) vêm dos próprios eventos; cada
+    roll é conferido com o fluxo do seed (`dado_em`), com a vez e com o
+    tabuleiro. Devolve (estado, movimentos, erros).
+    """
+    cobras = {int(k): int(v) for k, v in cobras.items()}
+    escadas = {int(k): int(v) for k, v in escadas.items()}
+    estado = estado_inicial()
+    movimentos, erros = [], []
+    for ev_seq, tipo, dados in historico:
+        if ev_seq != estado["seq"] + 1:
+            erros.append(f"evento {estado['seq'] + 1} ausente (histórico arquivado?)")
+            break
+        if tipo == "roll":
+            jogador = next((j for j in estado["jogadores"] if j["user_id"] == dados["user_id"]), None)
+            esperado = dado_em(estado["dice_seed"], estado["dice_offset"])
+            _pre, destino = calcular_destino(dados["de"], dados["dado"], casa_final, cobras, escadas)
+            if jogador is None or estado["vez"] != dados["user_id"]:
+                erros.append(f"evento {ev_seq}: jogada fora da vez")
+            elif jogador["position"] != dados["de"]:
+                erros.append(f"evento {ev_seq}: saiu da casa {dados['de']}, estava na {jogador['position']}")
+            if dados["dado"] != esperado:
+                erros.append(f"evento {ev_seq}: dado {dados['dado']}, o fluxo dá {esperado}")
+            if dados["para"] != destino:
+                erros.append(f"evento {ev_seq}: foi para {dados['para']}, o tabuleiro dá {destino}")
+            movimentos.append({
+                "username": jogador["username"] if jogador else f"#{dados['user_id']}",
+                "dado": dados["dado"], "de": dados["de"], "para": dados["para"],
+            })
+        aplicar(estado, tipo, dados)
+        estado["seq"] = ev_seq
+    return estado, movimentos, erros
@@ -0,0 +1,455 @@
+# game/salas_quentes.py
+"""
+Salas ativas em memória com gravação atrasada (write-behind). Liga com
+HOT_ROOMS=1.
+
+Com isso ligado, api_room_move e api_room_state de uma sala ativa trabalham
+só sobre o estado em memória (posições, vez, rodada, log, cursor do dado).
+Cada jogada:
+  1. altera o estado sob o lock da sala;
+  2. acrescenta uma linha no diário (JSON lines, append-only) com os eventos
+     da jogada (os mesmos de game/eventos.py) e o delta da projeção;
+  3. acumula os eventos como pendentes.
+Uma thread grava os pendentes em GameRoom/GamePlayer/RoomEvent a cada
+HOT_ROOM_FLUSH_MOVES jogadas de uma sala ou HOT_ROOM_FLUSH_SECONDS segundos;
+fim de partida grava na hora (as estatísticas do Profile dependem disso).
+O prazo do turno (game/prazos.py) anda junto com o estado; a jogada automática
+de turno vencido descarrega a sala e vai pelo banco, por isso toda jogada
+daqui zera GameRoom.auto_moves.
+
+Queda do processo: o que não foi gravado está no diário. `recuperar()` (roda
+sozinho antes da primeira sala carregada e pelo comando recover_hot_rooms)
+reaplica no banco as linhas com versão maior que GameRoom.state_version.
+O diário é truncado quando não sobra nada pendente.
+
+O armazenamento é um dict do processo: use com um processo só
+(runserver, ou gunicorn --workers 1 --threads N).
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import eventos, prazos, rng, shards
+from .board import decodificar_pulos
+from .models import GameRoom, GamePlayer
+from .services import calcular_destino
+
+logger = logging.getLogger(__name__)
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def ativo() -> bool:
+    return _config("HOT_ROOMS", False)
+
+
+class _Sala:
+    __slots__ = ("lock", "estado")
+
+    def __init__(self, estado):
+        self.lock = threading.Lock()
+        self.estado = estado
+
+
+_salas = {}
+_lock = threading.Lock()
+_recuperado = False
+
+
+# ---------------------------
+# Diário (append-only)
+# ---------------------------
+_diario_lock = threading.Lock()
+
+
+def _caminho_diario():
+    return str(_config("HOT_ROOM_JOURNAL", "hot_rooms.journal"))
+
+
+def _anotar(linha: dict):
+    dados = json.dumps(linha, separators=(",", ":"), ensure_ascii=False) + "\n"
+    with _diario_lock:
+        with open(_caminho_diario(), "a", encoding="utf-8") as f:
+            f.write(dados)
+            if _config("HOT_ROOM_FSYNC", False):
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def _truncar_diario_se_limpo():
+    with _diario_lock:
+        if any(s.estado["pendentes"] for s in list(_salas.values())):
+            return
+        if os.path.exists(_caminho_diario()):
+            open(_caminho_diario(), "w").close()
+
+
+def recuperar() -> int:
+    """Reaplica no banco as jogadas do diário ainda não gravadas. Devolve quantas."""
+    caminho = _caminho_diario()
+    if not os.path.exists(caminho):
+        return 0
+    with open(caminho, encoding="utf-8") as f:
+        linhas = [json.loads(l) for l in f if l.strip()]
+
+    aplicadas = 0
+    versoes = {}
+    for linha in linhas:
+        room_id, code = linha["room_id"], linha["code"]
+        escopo = shards.no_shard(linha["shard"]) if linha.get("shard") else shards.na_sala(code)
+        with escopo:
+            # por código: com shards, room_id só é único dentro do arquivo
+            if code not in versoes:
+                versoes[code] = GameRoom.objects.filter(pk=room_id).values_list("state_version", flat=True).first()
+            atual = versoes[code]
+            evs = [tuple(ev) for ev in linha["eventos"]]
+            if atual is None or linha["v"] <= atual:
+                continue
+            if linha["v"] - len(evs) != atual:
+                logger.warning("Diário da sala %s pula da versão %s para %s; parando nela.", code, atual, linha["v"])
+                versoes[code] = None
+                continue
+            _reaplicar(room_id, linha, evs)
+        versoes[code] = linha["v"]
+        aplicadas += 1
+    _truncar_diario_se_limpo()
+    return aplicadas
+
+
+def _reaplicar(room_id, linha, evs):
+    with shards.atomico():
+        room = GameRoom.objects.select_for_update().get(pk=room_id)
+        eventos.registrar(room, *evs)
+        log_rounds = room.log_rounds or [[]]
+        log_rounds[-1].extend(linha["log"])
+        if linha["nova_rodada"]:
+            log_rounds.append([])
+        GameRoom.objects.filter(pk=room_id).update(
+            current_turn_id=linha["vez"], round_number=linha["rodada"], log_rounds=log_rounds,
+            dice_seed=linha["dice_seed"], dice_offset=linha["dice_offset"], status=linha["status"],
+            turn_deadline=_prazo_datetime(linha.get("prazo")), auto_moves=0,
+        )
+        user_id, posicao = linha["posicao"]
+        GamePlayer.objects.filter(room_id=room_id, user_id=user_id).update(position=posicao)
+
+
+# ---------------------------
+# Carga / gravação
+# ---------------------------
+def _prazo_datetime(prazo):
+    # o prazo do turno fica em epoch no estado (vai para o diário em JSON)
+    return datetime.fromtimestamp(prazo, tz=dt_timezone.utc) if prazo is not None else None
+
+
+def _carregar(code):
+    try:
+        room = GameRoom.objects.get(code=code, is_active=True, status="active")
+    except GameRoom.DoesNotExist:
+        return None
+    jogadores = [
+        {"gp_id": gp.pk, "user_id": gp.user_id, "username": gp.user.username, "order": gp.order,
+         "position": gp.position}
+        for gp in room.players.select_related("user").order_by("order")
+    ]
+    cobras, escadas = decodificar_pulos(room.board_data)
+    fluxo = rng.fluxo_da_sala(room)  # salas sem seed ganham um aqui
+    return {
+        "code": room.code,
+        "room_id": room.pk,
+        "shard": room._state.db,
+        "status": room.status,
+        "publica": room.is_public,
+        "casa_final": 25 if room.board_size == "5x5" else 100,
+        "cobras": cobras,
+        "escadas": escadas,
+        "jogadores": jogadores,
+        "vez": room.current_turn_id,
+        "rodada": room.round_number or 1,
+        "log_rounds": room.log_rounds or [[{"username": None, "order": None, "texto": "Partida iniciada."}]],
+        "dice_seed": fluxo.seed,
+        "dice_offset": fluxo.offset,
+        "prazo": room.turn_deadline.timestamp() if room.turn_deadline else None,
+        "versao": room.state_version,
+        "versao_gravada": room.state_version,
+        "pendentes": [],
+        "jogadas_pendentes": 0,
+    }
+
+
+def _obter(code):
+    global _recuperado
+    sala = _salas.get(code)
+    if sala is not None:
+        return sala
+    with _lock:
+        if not _recuperado:
+            recuperar()
+            _recuperado = True
+        sala = _salas.get(code)
+        if sala is None:
+            estado = _carregar(code)
+            if estado is None:
+                return None
+            sala = _salas[code] = _Sala(estado)
+    _iniciar_gravador()
+    return sala
+
+
+def _escrever(e):
+    """Grava os pendentes no banco (chamar com sala.lock). Devolve a versão gravada, ou None."""
+    if not e["pendentes"]:
+        return None
+    with shards.no_shard(e["shard"]), shards.atomico():
+        room = GameRoom(pk=e["room_id"], code=e["code"], state_version=e["versao_gravada"])
+        eventos.registrar(room, *e["pendentes"])
+        GameRoom.objects.filter(pk=e["room_id"]).update(
+            current_turn_id=e["vez"], round_number=e["rodada"], log_rounds=e["log_rounds"],
+            dice_seed=e["dice_seed"], dice_offset=e["dice_offset"], status=e["status"],
+            turn_deadline=_prazo_datetime(e["prazo"]), auto_moves=0,
+        )
+        GamePlayer.objects.bulk_update(
+            [GamePlayer(pk=j["gp_id"], position=j["position"]) for j in e["jogadores"]], ["position"],
+        )
+    return e["versao"]
+
+
+def _gravado_ate(e, versao):
+    # o que está no banco até `versao` sai dos pendentes
+    if versao is None or versao <= e["versao_gravada"]:
+        return
+    e["pendentes"] = e["pendentes"][versao - e["versao_gravada"]:]
+    e["versao_gravada"] = versao
+    if not e["pendentes"]:
+        e["jogadas_pendentes"] = 0
+
+
+def _gravar(sala):
+    """Grava os pendentes da sala (chamar com sala.lock, fora de transação)."""
+    _gravado_ate(sala.estado, _escrever(sala.estado))
+
+
+def _tirar_apos_commit(sala, versao):
+    """
+    A sala, gravada até `versao`, sai da memória no commit do shard dela (na
+    hora, fora de transação). No rollback ela fica, com os pendentes, para a
+    próxima gravação. Chamar sem sala.lock.
+    """
+    code = sala.estado["code"]
+
+    def tirar():
+        with sala.lock:
+            _gravado_ate(sala.estado, versao)
+            if _salas.get(code) is sala:
+                del _salas[code]
+        _truncar_diario_se_limpo()
+
+    transaction.on_commit(tirar, using=sala.estado["shard"])
+
+
+def gravar_todas():
+    for sala in list(_salas.values()):
+        with sala.lock:
+            try:
+                _gravar(sala)
+            except Exception:
+                logger.exception("Falha ao gravar a sala %s (fica no diário)", sala.estado["code"])
+    _truncar_diario_se_limpo()
+
+
+def descarregar(code):
+    """Grava e tira a sala da memória (antes de mexer nela direto no banco); em transação, sai no commit."""
+    sala = _salas.get(code)
+    if sala is None:
+        return
+    with sala.lock:
+        versao = _escrever(sala.estado)
+    _tirar_apos_commit(sala, versao)
+
+
+def limpar():
+    """Esquece tudo sem gravar (testes)."""
+    global _recuperado
+    with _lock:
+        _salas.clear()
+        _recuperado = False
+
+
+# ---------------------------
+# Gravador em segundo plano
+# ---------------------------
+_acordar = threading.Event()
+_gravador = None
+
+
+def _laco_gravador(intervalo):
+    while True:
+        _acordar.wait(intervalo)
+        _acordar.clear()
+        close_old_connections()
+        try:
+            gravar_todas()
+        finally:
+            close_old_connections()
+
+
+def _iniciar_gravador():
+    # HOT_ROOM_FLUSH_SECONDS=0 desliga a thread (gravação manual via gravar_todas)
+    global _gravador
+    intervalo = _config("HOT_ROOM_FLUSH_SECONDS", 2.0)
+    if not intervalo or _gravador is not None:
+        return
+    with _lock:
+        if _gravador is None:
+            _gravador = threading.Thread(
+                target=_laco_gravador, args=(intervalo,), name="salas-quentes", daemon=True,
+            )
+            _gravador.start()
+
+
+# ---------------------------
+# Operações das APIs
+# ---------------------------
+def _jogador(e, user_id):
+    return next((j for j in e["jogadores"] if j["user_id"] == user_id), None)
+
+
+def estado_api(code, username):
+    """Payload do api_room_state, ou None se a sala não está (ou não pode ficar) em memória."""
+    r = retrato(code)
+    if r is None:
+        return None
+    data, _publica = r
+    data["you"] = username
+    return data
+
+
+def retrato(code):
+    """(payload do api_room_state sem "you", is_public) da sala, ou None como no estado_api."""
+    sala = _obter(code)
+    if sala is None:
+        return None
+    with sala.lock:
+        e = sala.estado
+        vez = _jogador(e, e["vez"])
+        return {
+            "room_code": e["code"],
+            "current_turn": vez["username"] if vez else None,
+            "players": [
+                {"username": j["username"], "position": j["position"], "order": j["order"]}
+                for j in e["jogadores"]
+            ],
+            "is_active": e["status"] == "active",
+            "log_rounds": json.loads(json.dumps(e["log_rounds"])),
+            "round_number": e["rodada"],
+            "version": e["versao"],
+            "turn_deadline": _prazo_datetime(e["prazo"]).isoformat() if e["prazo"] is not None else None,
+        }, e["publica"]
+
+
+def versao(code):
+    """Versão da sala se ela já está em memória (não carrega)."""
+    sala = _salas.get(code)
+    return sala.estado["versao"] if sala is not None else None
+
+
+def jogar(code, user, rolar):
+    """
+    Jogada do api_room_move em memória. Devolve (http_status, payload, room_id),
+    ou None se a sala não está ativa (a view segue pelo banco).
+    `rolar(fluxo)` é o services.rolar_dado (passado pela view).
+    """
+    sala = _obter(code)
+    if sala is None:
+        return None
+    with sala.lock:
+        e = sala.estado
+        if e["status"] != "active":
+            return 400, {"ok": False, "error": "A partida não está ativa."}, e["room_id"]
+        if e["vez"] != user.id:
+            return 403, None, e["room_id"]
+
+        jogador = _jogador(e, user.id)
+        pos_atual = jogador["position"]
+        fluxo = rng.FluxoDados(e["dice_seed"], e["dice_offset"])
+        dado = rolar(fluxo)
+        e["dice_offset"] = fluxo.offset
+        pre_salto, destino = calcular_destino(pos_atual, dado, e["casa_final"], e["cobras"], e["escadas"])
+        jogador["position"] = destino
+
+        tipo_extra = ""
+        if destino != pre_salto:
+            tipo_extra = " (subiu por escada)" if destino > pre_salto else " (desceu por cobra)"
+        log = [{
+            "username": user.username, "order": jogador["order"],
+            "texto": f"{user.username} rolou {dado} e foi da casa {pos_atual} para {destino}{tipo_extra}.",
+        }]
+        historico = [("roll", {
+            "user_id": user.id, "dado": dado, "de": pos_atual, "para": destino, "pre_salto": pre_salto,
+        })]
+
+        finished = destino == e["casa_final"]
+        nova_rodada = False
+        next_turn = None
+        if finished:
+            e["status"] = "finished"
+            log.append({"username": None, "order": None, "texto": f"{user.username} venceu!"})
+            historico.append(("finish", {"vencedor": user.id}))
+        else:
+            if dado == 6:
+                proximo = jogador
+            else:
+                i = e["jogadores"].index(jogador)
+                proximo = e["jogadores"][(i + 1) % len(e["jogadores"])]
+                if proximo["order"] == 0:
+                    e["rodada"] += 1
+                    nova_rodada = True
+            e["vez"] = proximo["user_id"]
+            next_turn = proximo["username"]
+            historico.append(("turn", {"vez": e["vez"], "rodada": e["rodada"]}))
+
+        prazo = None if finished else prazos.novo_prazo()
+        e["prazo"] = prazo.timestamp() if prazo else None
+        prazos.agendar_apos_commit(code, prazo)
+
+        e["log_rounds"][-1].extend(log)
+        if nova_rodada:
+            e["log_rounds"].append([])
+        e["versao"] += len(historico)
+        e["pendentes"].extend(historico)
+        e["jogadas_pendentes"] += 1
+
+        _anotar({
+            "code": e["code"], "room_id": e["room_id"], "shard": e["shard"], "v": e["versao"],
+            "eventos": historico, "log": log, "nova_rodada": nova_rodada,
+            "vez": e["vez"], "rodada": e["rodada"], "status": e["status"],
+            "dice_seed": e["dice_seed"], "dice_offset": e["dice_offset"], "prazo": e["prazo"],
+            "posicao": [user.id, destino],
+        })
+
+        gravada = None
+        if finished:
+            # fim de partida grava na hora (na transação da view, junto com o
+            # Profile) e sai da memória só no commit
+            gravada = _escrever(e)
+        elif e["jogadas_pendentes"] >= _config("HOT_ROOM_FLUSH_MOVES", 20):
+            _acordar.set()
+
+        payload = {
+            "ok": True,
+            "dice": dado,
+            "new_position": destino,
+            "pre_jump": pre_salto,
+            "finished": finished,
+            "winner": user.username if finished else None,
+            "next_turn": next_turn,
+        }
+    if finished:
+        _tirar_apos_commit(sala, gravada)
+    return 200, payload, e["room_id"]
@@ -3,8 +3,10 @@ import math
 from typing import Dict, Tuple, Set, Optional
 
 
-def rolar_dado() -> int:
-    # gerador aleatorio para o dado
+def rolar_dado(fluxo=None) -> int:
+    # gerador aleatorio para o dado; com um fluxo (game/rng.py) a rolagem é reproduzível
+    if fluxo is not None:
+        return fluxo.proximo()
     return random.randint(1, 6)
 
 
@@ -132,3 +134,108 @@ def mover_peao(pos_atual: int, dado: int, casa_final: int, cobras: dict, escadas
     if destino in cobras:
         return cobras[destino]
     return destino
+
+
+# ---------------------------
+# Motor de jogada (singleplayer)
+# ---------------------------
+def calcular_destino(pos_atual: int, dado: int, casa_final: int,
+                     cobras: Dict[int, int], escadas: Dict[int, int]) -> Tuple[int, int]:
+    """
+    (pre_salto, destino) de uma rolagem. Acerto exato na casa final vence (sem
+    cobra/escada); passou do fim, rebate o excesso e aí aplica cobra/escada.
+    `cobras`/`escadas` já com chaves int.
+    """
+    destino_bruto = pos_atual + dado
+    if destino_bruto == casa_final:
+        return destino_bruto, destino_bruto
+    if destino_bruto < casa_final:
+        return destino_bruto, aplicar_cobras_escadas(destino_bruto, cobras, escadas)
+    rebatido = casa_final - (destino_bruto - casa_final)
+    return rebatido, aplicar_cobras_escadas(rebatido, cobras, escadas)
+
+
+def _registrar_evento(partida: dict, jogador: Optional[int], mensagem: str) -> None:
+    partida.setdefault("log", []).append(mensagem)
+    if not partida.get("log_rodadas"):
+        partida["log_rodadas"] = [[]]
+    partida["log_rodadas"][-1].append({"jogador": jogador, "texto": mensagem})
+
+
+def _passar_vez(partida: dict, i: int) -> None:
+    proximo = (i + 1) % len(partida["posicoes"])
+    partida["jogador_atual"] = proximo
+    if proximo == 0:
+        partida["rodada_atual"] = partida.get("rodada_atual", 1) + 1
+        partida["log_rodadas"].append([])
+
+
+def nova_partida(qtd_jogadores: int, cobras: Dict[int, int], escadas: Dict[int, int]) -> dict:
+    """Estado inicial da partida singleplayer (o mesmo dict que vai para a sessão)."""
+    return {
+        "status": "andamento",
+        "jogador_atual": 0,
+        "posicoes": [0] * qtd_jogadores,
+        "ultimo_dado": None,
+        "mensagem": "Partida iniciada.",
+        "cobras": cobras,
+        "escadas": escadas,
+        "streak_seis": [0] * qtd_jogadores,
+        "log": ["Partida iniciada."],
+        "rodada_atual": 1,
+        "log_rodadas": [[{"jogador": None, "texto": "Partida iniciada."}]],
+        "ultimo_movimento": None,
+    }
+
+
+def aplicar_jogada(partida: dict, dado: int, casa_final: int,
+                   cobras: Optional[Dict[int, int]] = None,
+                   escadas: Optional[Dict[int, int]] = None) -> dict:
+    """
+    Aplica a rolagem `dado` do jogador da vez sobre `partida` (o dict da
+    sessão, alterado no lugar) e devolve o movimento
+    {"jogador", "de", "para", "dado", "pre_salto"}.
+
+    Regras: 6 joga de novo; o terceiro 6 seguido volta ao início e passa a vez;
+    chegar exatamente na casa final encerra a partida.
+    """
+    if cobras is None:
+        cobras = {int(k): int(v) for k, v in partida.get("cobras", {}).items()}
+    if escadas is None:
+        escadas = {int(k): int(v) for k, v in partida.get("escadas", {}).items()}
+
+    i = partida["jogador_atual"]
+    posicoes = partida["posicoes"]
+    pos_atual = posicoes[i]
+
+    streak = partida.setdefault("streak_seis", [0] * len(posicoes))
+    streak[i] = streak[i] + 1 if dado == 6 else 0
+    penalizado = streak[i] >= 3
+
+    if penalizado:
+        streak[i] = 0
+        pre_salto, destino = None, 0
+        mensagem = f"Jogador {i+1} tirou 6 três vezes seguidas e foi penalizado: volta ao início."
+    else:
+        pre_salto, destino = calcular_destino(pos_atual, dado, casa_final, cobras, escadas)
+        tipo_extra = ""
+        if destino != pre_salto:
+            tipo_extra = " (subiu por escada)" if destino > pre_salto else " (desceu por cobra)"
+        mensagem = f"Jogador {i+1} rolou {dado} e foi da casa {pos_atual} para {destino}{tipo_extra}."
+        if destino == casa_final:
+            partida["status"] = "finalizado"
+            mensagem += f" Jogador {i+1} venceu!"
+
+    posicoes[i] = destino
+    partida["ultimo_dado"] = dado
+    partida["mensagem"] = mensagem
+    _registrar_evento(partida, i, mensagem)
+    movimento = {"jogador": i, "de": pos_atual, "para": destino, "dado": dado, "pre_salto": pre_salto}
+    partida["ultimo_movimento"] = movimento
+
+    if partida.get("status") != "finalizado":
+        if dado == 6 and not penalizado:
+            partida["mensagem"] += " Tirou 6 e joga novamente!"
+        else:
+            _passar_vez(partida, i)
+    return movimento
@@ -0,0 +1,203 @@
+# game/shards.py
+"""
+Shards das salas multiplayer: com ROOM_SHARDS=N, GameRoom, GamePlayer,
+RoomInvite, RoomEvent e RoomSnapshot ficam em N arquivos SQLite (o shard 0 é
+o próprio "default"), escolhidos pelo crc32 do código da sala. Cada arquivo
+tem seu próprio lock de escrita, então jogadas de salas em shards diferentes
+não fazem fila umas atrás das outras. Usuários, perfis e amizades continuam
+só no default.
+
+Como a sala certa é achada:
+  - ShardMiddleware põe o shard do `code` da URL (ou do POST) no contexto do
+    request; o RoomShardRouter manda as queries das tabelas de sala para lá;
+  - ShardQuerySet roteia sozinho `filter/get(code=...)` (get_object_or_404
+    incluído) e `filter(room=<sala>)`, e num get por código que não acha a
+    sala no shard do hash procura nos outros (salas de antes de um
+    rebalanceamento continuam achadas até o rebalance_rooms movê-las);
+  - instâncias carregadas levam o shard junto (related managers etc.).
+  - `em_todos(fn)` faz o fan-out (lobby, convites do cabeçalho).
+
+Cada conexão de shard anexa (ATTACH) o arquivo default como "global", então
+JOINs com auth_user (select_related("user"), etc.) continuam funcionando. Por
+isso as FKs para User não têm constraint no banco (db_constraint=False).
+"""
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.db.backends.signals import connection_created
+
+MODELOS_DA_SALA = {"gameroom", "gameplayer", "roominvite", "roomevent", "roomsnapshot"}
+
+_atual = ContextVar("shard_da_sala", default=None)
+
+
+def aliases():
+    return list(getattr(settings, "ROOM_SHARD_ALIASES", ["default"]))
+
+
+def ligado() -> bool:
+    return len(aliases()) > 1
+
+
+def shard_do_codigo(code: str, lista=None) -> str:
+    lista = lista or aliases()
+    if len(lista) == 1:
+        return lista[0]
+    return lista[zlib.crc32((code or "").upper().encode()) % len(lista)]
+
+
+def shard_atual():
+    return _atual.get()
+
+
+@contextmanager
+def no_shard(alias):
+    token = _atual.set(alias)
+    try:
+        yield alias
+    finally:
+        _atual.reset(token)
+
+
+def na_sala(code):
+    return no_shard(shard_do_codigo(code) if ligado() else None)
+
+
+def atomico(func=None):
+    """
+    transaction.atomic no shard do contexto (o atomic puro abre a transação
+    no default, que com shards não é onde a sala está). Decorador ou `with`.
+    """
+    if func is None:
+        return transaction.atomic(using=_atual.get() or "default")
+
+    @wraps(func)
+    def envolvida(*args, **kwargs):
+        with transaction.atomic(using=_atual.get() or "default"):
+            return func(*args, **kwargs)
+    return envolvida
+
+
+def em_todos(fn):
+    """[fn(alias) para cada shard] — fan-out para listagens que cruzam salas."""
+    return [fn(alias) for alias in aliases()]
+
+
+async def aem_todos(fn):
+    """em_todos com `fn` async (views de game/views_async.py)."""
+    return [await fn(alias) for alias in aliases()]
+
+
+def _da_sala(model) -> bool:
+    return model._meta.app_label == "game" and model._meta.model_name in MODELOS_DA_SALA
+
+
+# ---------------------------
+# Roteamento
+# ---------------------------
+class RoomShardRouter:
+    def _db(self, model, **hints):
+        if not _da_sala(model):
+            return "default"
+        instancia = hints.get("instance")
+        if instancia is not None and _da_sala(instancia) and instancia._state.db:
+            return instancia._state.db
+        return _atual.get() or "default"
+
+    db_for_read = _db
+    db_for_write = _db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == "default":
+            return True
+        return app_label == "game" and model_name in MODELOS_DA_SALA
+
+
+class ShardQuerySet(models.QuerySet):
+    def _roteado(self, kwargs):
+        if self._db is not None or not ligado():
+            return self
+        if kwargs.get("code"):
+            return self.using(shard_do_codigo(kwargs["code"]))
+        sala = kwargs.get("room")
+        if isinstance(sala, models.Model) and sala._state.db:
+            return self.using(sala._state.db)
+        return self
+
+    def filter(self, *args, **kwargs):
+        return super(ShardQuerySet, self._roteado(kwargs)).filter(*args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        qs = self._roteado(kwargs)
+        try:
+            return super(ShardQuerySet, qs).get(*args, **kwargs)
+        except self.model.DoesNotExist:
+            # sala ainda no shard antigo (antes do rebalance_rooms)
+            if not kwargs.get("code") or self._db is not None:
+                raise
+            for alias in aliases():
+                if alias != qs._db:
+                    achada = super(ShardQuerySet, self.using(alias)).filter(*args, **kwargs).first()
+                    if achada is not None:
+                        # o resto do request (filter(pk=...), eventos) segue a sala; quem
+                        # abriu o contexto (middleware / na_sala) desfaz no fim
+                        if _atual.get() is not None:
+                            _atual.set(alias)
+                        return achada
+            raise
+
+
+ShardManager = models.Manager.from_queryset(ShardQuerySet)
+
+
+class ShardMiddleware:
+    """Fixa o shard do request a partir do `code` da URL ou do POST."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            return self.get_response(request)
+        finally:
+            # a thread do worker atende o próximo request: não deixa o shard vazar
+            token = getattr(request, "_shard_token", None)
+            if token is not None:
+                _atual.reset(token)
+
+    async def __acall__(self, request):
+        # sob ASGI cada request é uma task com sua cópia do contexto, então não
+        # há o que desfazer (e o token do process_view nasceu na thread do
+        # sync_to_async, não valeria aqui)
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        code = view_kwargs.get("code") or (request.POST.get("code") if request.method == "POST" else None)
+        if code:
+            request._shard_token = _atual.set(shard_do_codigo(code.upper().strip()))
+
+
+def _anexar_global(sender, connection, **kwargs):
+    if connection.alias == "default" or connection.alias not in aliases() or connection.vendor != "sqlite":
+        return
+    nome = connections["default"].settings_dict["NAME"]
+    with connection.cursor() as cursor:
+        cursor.execute("ATTACH DATABASE %s AS global", [str(nome)])
+
+
+connection_created.connect(_anexar_global, dispatch_uid="game.shards.anexar_global")
@@ -0,0 +1,165 @@
+# game/slowqueries.py
+"""
+Log de queries lentas (opt-in).
+
+Liga com SLOW_QUERY_LOG=1. O middleware instala um execute_wrapper nas conexões
+durante cada request e toda query acima de SLOW_QUERY_THRESHOLD_MS vira uma linha
+JSON em SLOW_QUERY_LOG_FILE. Na primeira vez que um formato de query aparece no
+processo, o EXPLAIN QUERY PLAN dela é capturado junto.
+
+Relatório: python manage.py slowqueries
+"""
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger("game.slowqueries")
+
+# "IN (%s, %s, %s)" vira "IN (...)" para que listas de tamanhos diferentes caiam no mesmo formato
+_IN_LISTA = re.compile(r"IN \((?:%s, )*%s\)")
+_ESPACOS = re.compile(r"\s+")
+
+_EXPLICAVEIS = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+_planos_vistos = set()
+_lock_planos = threading.Lock()
+_lock_arquivo = threading.Lock()
+_local = threading.local()
+
+
+def formato_da_query(sql: str) -> str:
+    """SQL parametrizado normalizado (chave de agrupamento do relatório)."""
+    sql = _IN_LISTA.sub("IN (...)", sql)
+    return _ESPACOS.sub(" ", sql).strip()
+
+
+def _primeira_vez(formato: str) -> bool:
+    with _lock_planos:
+        if formato in _planos_vistos:
+            return False
+        _planos_vistos.add(formato)
+        return True
+
+
+def _explicar(conexao, sql, params):
+    prefixo = "EXPLAIN QUERY PLAN " if conexao.vendor == "sqlite" else "EXPLAIN "
+    _local.explicando = True
+    try:
+        with conexao.cursor() as cursor:
+            cursor.execute(prefixo + sql, params)
+            return [" ".join(str(c) for c in linha) for linha in cursor.fetchall()]
+    except Exception as exc:  # o EXPLAIN nunca pode quebrar a request original
+        return [f"(EXPLAIN falhou: {exc})"]
+    finally:
+        _local.explicando = False
+
+
+def _gravar(entrada: dict):
+    linha = json.dumps(entrada, ensure_ascii=False)
+    with _lock_arquivo:
+        with open(settings.SLOW_QUERY_LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(linha + "\n")
+
+
+class SlowQueryLogger:
+    """execute_wrapper que mede cada query e registra as que passam do limite."""
+
+    def __init__(self, request=None, threshold_ms=None):
+        self.request = request
+        if threshold_ms is None:
+            threshold_ms = settings.SLOW_QUERY_THRESHOLD_MS
+        self.threshold_ms = float(threshold_ms)
+
+    def view_name(self):
+        match = getattr(self.request, "resolver_match", None) if self.request else None
+        if match is None:
+            return None
+        return match.view_name
+
+    def __call__(self, execute, sql, params, many, context):
+        # o próprio EXPLAIN passa por aqui; não mede nem explica de novo
+        if getattr(_local, "explicando", False):
+            return execute(sql, params, many, context)
+
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            if duracao_ms >= self.threshold_ms:
+                self._registrar(sql, params, many, context, duracao_ms)
+
+    def _registrar(self, sql, params, many, context, duracao_ms):
+        formato = formato_da_query(sql)
+        plano = None
+        if not many and formato.upper().startswith(_EXPLICAVEIS) and _primeira_vez(formato):
+            plano = _explicar(context["connection"], sql, params)
+
+        entrada = {
+            "ts": timezone.now().isoformat(),
+            "view": self.view_name(),
+            "db": context["connection"].alias,
+            "ms": round(duracao_ms, 3),
+            "sql": formato,
+            "plan": plano,
+        }
+        logger.warning("query lenta (%.1f ms) em %s: %s", duracao_ms, entrada["view"], formato)
+        try:
+            _gravar(entrada)
+        except OSError:
+            logger.exception("não foi possível gravar o log de queries lentas")
+
+
+class SlowQueryMiddleware:
+    """Só fica ativo com SLOW_QUERY_LOG=True; caso contrário o Django o descarta."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SLOW_QUERY_LOG", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrapper = SlowQueryLogger(request)
+        with ExitStack() as stack:
+            for conexao in connections.all():
+                stack.enter_context(conexao.execute_wrapper(wrapper))
+            return self.get_response(request)
+
+
+def ler_log(caminho):
+    """Itera as entradas do arquivo de log, ignorando linhas corrompidas."""
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                yield json.loads(linha)
+            except ValueError:
+                continue
+
+
+def agregar_por_formato(entradas):
+    """Agrupa por formato de query, ordenando pelo tempo total (maior primeiro)."""
+    grupos = {}
+    for e in entradas:
+        g = grupos.setdefault(e["sql"], {
+            "sql": e["sql"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "views": {}, "plan": None,
+        })
+        g["count"] += 1
+        g["total_ms"] += e["ms"]
+        g["max_ms"] = max(g["max_ms"], e["ms"])
+        view = e.get("view") or "-"
+        g["views"][view] = g["views"].get(view, 0) + 1
+        if g["plan"] is None and e.get("plan"):
+            g["plan"] = e["plan"]
+    return sorted(grupos.values(), key=lambda g: g["total_ms"], reverse=True)
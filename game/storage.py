@@ -0,0 +1,134 @@
+# game/storage.py
+"""
+Storage de estáticos: o CompressedManifestStaticFilesStorage do WhiteNoise com
+um passo a mais no collectstatic, que gera variantes redimensionadas em
+WebP/AVIF das imagens raster (logo.png -> logo.w320.webp, logo.w320.avif, ...).
+
+As variantes entram no mesmo post_process dos demais arquivos, então ganham
+nome com hash, entrada no manifest e cache "para sempre" no WhiteNoise. A tag
+{% imagem_responsiva %} (game/templatetags/imagens.py) monta o <picture>.
+
+Pillow é opcional: sem ele (ou sem o codec), o collectstatic segue normal e a
+tag cai para o <img> original.
+
+StaticFilesMiddleware é o middleware do WhiteNoise que também roda em modo
+async: o original é só sync, e sob ASGI um middleware sync no topo da pilha
+faz o Django rodar o request inteiro (views async incluídas) numa thread.
+"""
+import logging
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.files.base import ContentFile
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    from PIL import Image, features
+except ImportError:  # pragma: no cover - depende do ambiente
+    Image = features = None
+
+logger = logging.getLogger(__name__)
+
+# larguras geradas (só as menores que a original)
+LARGURAS_VARIANTES = (160, 320, 640, 1280)
+EXTENSOES_RASTER = (".png", ".jpg", ".jpeg")
+# ordem de preferência no <picture>: o primeiro suportado pelo navegador ganha
+FORMATOS_VARIANTES = (
+    ("avif", "AVIF", {"quality": 55}),
+    ("webp", "WEBP", {"quality": 80, "method": 6}),
+)
+# estáticos de terceiros (admin etc.) ficam de fora
+PREFIXOS_IGNORADOS = ("admin/",)
+
+
+def nome_variante(nome, largura, ext):
+    caminho = PurePosixPath(nome)
+    return str(caminho.with_name(f"{caminho.stem}.w{largura}.{ext}"))
+
+
+def formatos_disponiveis():
+    if Image is None:
+        return ()
+    return tuple(f for f in FORMATOS_VARIANTES if features.check(f[0]))
+
+
+def larguras_para(largura_original):
+    return tuple(w for w in LARGURAS_VARIANTES if w < largura_original)
+
+
+def _redimensionar(imagem, largura):
+    altura = max(1, round(imagem.height * largura / imagem.width))
+    return imagem.resize((largura, altura), Image.LANCZOS)
+
+
+class OptimizedStaticFilesStorage(CompressedManifestStaticFilesStorage):
+
+    def _precisa_gerar(self, destino, origem_storage, origem):
+        if not self.exists(destino):
+            return True
+        try:
+            return self.get_modified_time(destino) < origem_storage.get_modified_time(origem)
+        except (NotImplementedError, OSError):
+            return True
+
+    def gerar_variantes(self, paths):
+        """Gera (ou reaproveita) as variantes e devolve {nome: (storage, nome)} delas."""
+        formatos = formatos_disponiveis()
+        if not formatos:
+            logger.info("Pillow/codecs indisponíveis; variantes de imagem não geradas.")
+            return {}
+
+        novos = {}
+        for nome, (origem_storage, origem) in paths.items():
+            if not nome.lower().endswith(EXTENSOES_RASTER) or nome.startswith(PREFIXOS_IGNORADOS):
+                continue
+            with origem_storage.open(origem) as f:
+                imagem = Image.open(f)
+                imagem.load()
+            larguras = larguras_para(imagem.width)
+            for largura in larguras:
+                reduzida = None
+                for ext, formato, opcoes in formatos:
+                    destino = nome_variante(nome, largura, ext)
+                    if self._precisa_gerar(destino, origem_storage, origem):
+                        if reduzida is None:
+                            reduzida = _redimensionar(imagem, largura)
+                        buffer = BytesIO()
+                        reduzida.save(buffer, formato, **opcoes)
+                        if self.exists(destino):
+                            self.delete(destino)
+                        self.save(destino, ContentFile(buffer.getvalue()))
+                    novos[destino] = (self, destino)
+        return novos
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = {**paths, **self.gerar_variantes(paths)}
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            # abre o arquivo (disco): fora do event loop
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
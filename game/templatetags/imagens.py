@@ -0,0 +1,61 @@
+"""
+{% imagem_responsiva "game/img/logo.png" alt="..." sizes="105px" class="brand-logo" %}
+
+Monta um <picture> com as variantes AVIF/WebP geradas no collectstatic (ver
+game/storage.py). Se não houver variantes (dev sem collectstatic, Pillow
+ausente), sai só o <img> original.
+
+{% avatar_url user.id "header" %} devolve a URL da miniatura do avatar (ver
+game/avatars.py), ou a do avatar padrão.
+"""
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from ..avatars import avatar_do_usuario
+from ..storage import FORMATOS_VARIANTES, LARGURAS_VARIANTES, nome_variante
+
+register = template.Library()
+
+
+@lru_cache(maxsize=64)
+def variantes(nome):
+    """((mime, ((largura, nome_variante), ...)), ...) das variantes existentes, na ordem de preferência."""
+    encontradas = []
+    for ext, _formato, _opcoes in FORMATOS_VARIANTES:
+        larguras = tuple(
+            (w, nome_variante(nome, w, ext))
+            for w in LARGURAS_VARIANTES
+            if staticfiles_storage.exists(nome_variante(nome, w, ext))
+        )
+        if larguras:
+            encontradas.append((f"image/{ext}", larguras))
+    return tuple(encontradas)
+
+
+@register.simple_tag
+def imagem_responsiva(nome, alt="", sizes="100vw", **attrs):
+    img = format_html(
+        '<img src="{}" alt="{}"{}>',
+        static(nome), alt,
+        format_html_join("", ' {}="{}"', sorted(attrs.items())),
+    )
+    fontes = variantes(nome)
+    if not fontes:
+        return img
+    sources = format_html_join(
+        "", '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (mime, ", ".join(f"{static(v)} {w}w" for w, v in larguras), sizes)
+            for mime, larguras in fontes
+        ),
+    )
+    return format_html("<picture>{}{}</picture>", sources, img)
+
+
+@register.simple_tag
+def avatar_url(user_id, uso="header"):
+    return avatar_do_usuario(user_id, uso)
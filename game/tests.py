@@ -1,14 +1,61 @@
-from django.test import SimpleTestCase, TestCase, RequestFactory
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.http import Http404
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, RequestFactory, Client, override_settings
+from django.utils.module_loading import import_string
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
 from django.contrib.sessions.middleware import SessionMiddleware
 from django.contrib.auth.models import AnonymousUser
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.db.models import Q
 from unittest.mock import patch
+from datetime import timedelta
+from io import BytesIO, StringIO
+import gzip
 import json
-
-from .services import mover_peao, rolar_dado, mapa_cobras_escadas
-from . import views
-from .models import GameRoom, GamePlayer, Profile, FriendRequest
+import random
+import unittest
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+from .services import aplicar_jogada, mover_peao, nova_partida, rolar_dado, mapa_cobras_escadas
+from . import espectadores, estado_single, eventos, exportacao, partida_local, partida_rapida, prazos, presenca, ranking, ratings, resultados, rng, salas_quentes, shards, views, views_async
+from .board import (
+    OVERLAY_MAX_PARES, chave_overlay, codificar_pulos, decodificar_pulos, geometria, grade_html, overlay_url,
+)
+from .models import (
+    GameRoom, GamePlayer, MatchParticipant, MatchResult, MatchTicket, Profile, FriendRequest, RoomEvent, RoomInvite,
+    RoomSnapshot, SinglePlayerState,
+)
+from .slowqueries import formato_da_query, ler_log
+from .benchmarks import percentil, resumo_latencias
+from .benchmarks.loadtest import Coletor, _classificar
+from .benchmarks.services import casos as casos_bench_services, medir
+from .benchmarks.polling import sustentado
+from .benchmarks.ratings import sintetico
+from .benchmarks.shards import medir as medir_shards
+from .benchmarks.firstload import coletar_assets
+from .benchmarks.prazos import HeapPreguicoso
+from .avatars import TAMANHOS_AVATAR, chaves_avatar, url_avatar
+from .storage import OptimizedStaticFilesStorage, formatos_disponiveis, nome_variante
+from .templatetags import imagens
+from .benchmarks.endpoints import (
+    QUERY_BUDGETS, estouros_de_orcamento, executar_suite, preparar_contexto, semear,
+)
 
 
 # --------------------------
@@ -22,6 +69,11 @@ def _add_session_to_request(request):
     return request
 
 
+def _estado_single(origem):
+    """(config, partida, fluxo) singleplayer da sessão de um request (RequestFactory) ou do test client."""
+    return estado_single.ler(origem.session.session_key)
+
+
 def _base_config(linhas=10, colunas=10, casa_final=100, total_jogadores=2):
     return {
         "modo": "contra_maquina",
@@ -131,7 +183,7 @@ class ViewsRulesTest(TestCase):  # << TestCase (usa DB de teste)
         resp = views.jogar_rodada(req)  # redirect esperado
         self.assertEqual(resp.status_code, 302)
 
-        p = req.session["partida"]
+        p = _estado_single(req)[1]
         self.assertEqual(p["posicoes"][0], 50)  # rebate + cobra aplicada
         self.assertIn("desceu por cobra", p["mensagem"])
         self.assertIsNotNone(p["ultimo_movimento"])
@@ -152,7 +204,7 @@ class ViewsRulesTest(TestCase):  # << TestCase (usa DB de teste)
         resp = views.jogar_rodada(req)
         self.assertEqual(resp.status_code, 302)
 
-        p = req.session["partida"]
+        p = _estado_single(req)[1]
         self.assertEqual(p["jogador_atual"], 0, "Deveria continuar sendo o jogador 0 (turno extra)")
         self.assertIn("joga novamente", p["mensagem"])
 
@@ -164,17 +216,17 @@ class ViewsRulesTest(TestCase):  # << TestCase (usa DB de teste)
         # 1º 6
         req1 = self._post_to_jogar({"configuracao_jogo": config, "partida": partida})
         views.jogar_rodada(req1)
-        p1 = req1.session["partida"]
+        p1 = _estado_single(req1)[1]
         self.assertEqual(p1["jogador_atual"], 0)  # turno extra
         # 2º 6 (ainda jogador 0)
         req2 = self._post_to_jogar({"configuracao_jogo": config, "partida": p1})
         views.jogar_rodada(req2)
-        p2 = req2.session["partida"]
+        p2 = _estado_single(req2)[1]
         self.assertEqual(p2["jogador_atual"], 0)  # ainda turno extra
         # 3º 6 -> penalidade aplica e passa a vez
         req3 = self._post_to_jogar({"configuracao_jogo": config, "partida": p2})
         views.jogar_rodada(req3)
-        p3 = req3.session["partida"]
+        p3 = _estado_single(req3)[1]
         self.assertEqual(p3["posicoes"][0], 0, "Penalidade deveria resetar para a casa 0")
         self.assertEqual(p3["jogador_atual"], 1, "Após penalidade, deveria passar a vez")
         self.assertIn("foi penalizado", p3["mensagem"])
@@ -190,7 +242,7 @@ class ViewsRulesTest(TestCase):  # << TestCase (usa DB de teste)
 
         req = self._post_to_jogar({"configuracao_jogo": config, "partida": partida})
         views.jogar_rodada(req)
-        p = req.session["partida"]
+        p = _estado_single(req)[1]
 
         self.assertEqual(p["posicoes"][0], 100)
         self.assertEqual(p["status"], "finalizado")
@@ -210,7 +262,7 @@ class ViewsRulesTest(TestCase):  # << TestCase (usa DB de teste)
 
         req = self._post_to_jogar({"configuracao_jogo": config, "partida": partida})
         views.jogar_rodada(req)
-        p = req.session["partida"]
+        p = _estado_single(req)[1]
 
         self.assertEqual(p["posicoes"][0], 38)
         self.assertEqual(p["ultimo_movimento"]["pre_salto"], 2)
@@ -227,13 +279,55 @@ class ViewsRulesTest(TestCase):  # << TestCase (usa DB de teste)
 
         req = self._post_to_jogar({"configuracao_jogo": config, "partida": partida})
         views.jogar_rodada(req)
-        p = req.session["partida"]
+        p = _estado_single(req)[1]
 
         self.assertEqual(p["posicoes"][0], 1)
         self.assertEqual(p["ultimo_movimento"]["pre_salto"], 3)
         self.assertIn("desceu por cobra", p["mensagem"])
 
 
+    @patch("game.views.rolar_dado", side_effect=[2, 6, 3, 1, 4])
+    def test_lote_resolve_todas_as_maquinas_num_request(self, _mock_dado):
+        config = _base_config(casa_final=100, total_jogadores=4)
+        partida = _base_partida(config)
+        req = self.rf.post("/game/jogar", {"lote": "1"}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        _add_session_to_request(req)
+        req.session.update({"configuracao_jogo": config, "partida": partida})
+        req.user = AnonymousUser()
+
+        data = json.loads(views.jogar_rodada(req).content)
+        # humano, máquina 1 (6 -> joga de novo), máquina 1, máquina 2, máquina 3
+        self.assertEqual([m["jogador"] for m in data["movimentos"]], [0, 1, 1, 2, 3])
+        self.assertEqual([m["dado"] for m in data["movimentos"]], [2, 6, 3, 1, 4])
+        self.assertEqual(data["posicoes"], [2, 9, 1, 4])
+        self.assertEqual(data["jogador_atual"], 0)
+        self.assertEqual(data["rodada_atual"], 2)
+        self.assertIn("joga novamente", data["movimentos"][1]["mensagem"])
+        self.assertEqual(_estado_single(req)[1]["ultimo_movimento"]["jogador"], 3)
+
+    @patch("game.views.rolar_dado", side_effect=[6])
+    def test_lote_para_quando_humano_tira_seis(self, _mock_dado):
+        config = _base_config(total_jogadores=3)
+        req = self._post_to_jogar({"configuracao_jogo": config, "partida": _base_partida(config)})
+        req.POST = req.POST.copy()
+        req.POST["lote"] = "1"
+        views.jogar_rodada(req)
+        self.assertEqual(_estado_single(req)[1]["jogador_atual"], 0)
+        self.assertEqual(_estado_single(req)[1]["posicoes"], [6, 0, 0])
+
+    @patch("game.views.rolar_dado", side_effect=[1, 2])
+    def test_lote_encerra_se_maquina_vence(self, _mock_dado):
+        config = _base_config(total_jogadores=3)
+        partida = _base_partida(config, posicoes=[10, 98, 0])
+        req = self._post_to_jogar({"configuracao_jogo": config, "partida": partida})
+        req.POST = req.POST.copy()
+        req.POST["lote"] = "1"
+        views.jogar_rodada(req)
+        p = _estado_single(req)[1]
+        self.assertEqual(p["status"], "finalizado")
+        self.assertEqual(p["posicoes"], [11, 100, 0])  # a máquina 2 nem joga
+
+
 # --------------------------
 # Testes de páginas básicas
 # --------------------------
@@ -261,8 +355,7 @@ class SingleplayerFlowTest(TestCase):
         self.assertEqual(resp.status_code, 302)
         self.assertEqual(resp["Location"].endswith(reverse("game:novo_jogo")), True)
 
-        session = self.client.session
-        config = session.get("configuracao_jogo")
+        config = _estado_single(self.client)[0]
         self.assertIsNotNone(config)
         self.assertEqual(config["casa_final"], 100)
         self.assertEqual(config["qtd_maquinas"], 2)
@@ -280,12 +373,263 @@ class SingleplayerFlowTest(TestCase):
         self.assertEqual(resp.status_code, 302)
         self.assertEqual(resp["Location"].endswith(reverse("game:tela_tabuleiro")), True)
 
-        partida = self.client.session.get("partida")
+        partida = _estado_single(self.client)[1]
         self.assertIsNotNone(partida)
         self.assertEqual(partida["status"], "andamento")
         self.assertEqual(len(partida["posicoes"]), config["qtd_total_jogadores"])
 
 
+def _dado_um(fluxo):
+    # avança o fluxo como o rolar_dado de verdade, mas sempre tira 1
+    fluxo.proximo()
+    return 1
+
+
+@patch("game.views.rolar_dado", side_effect=_dado_um)
+class EstadoSingleTest(TestCase):
+    def setUp(self):
+        self.cache = caches[settings.SINGLEPLAYER_CACHE]
+        self.cache.clear()
+        # tabuleiro sem cobras/escadas: as posições esperadas não dependem do sorteio
+        sem_pulos = patch("game.views.mapa_cobras_escadas", return_value=({}, {}))
+        sem_pulos.start()
+        self.addCleanup(sem_pulos.stop)
+
+    def _comecar(self, maquinas=1):
+        self.client.post(reverse("game:iniciar_contra_maquina"), {"qtd_maquinas": str(maquinas)})
+        self.client.get(reverse("game:novo_jogo"))
+
+    def _jogar(self):
+        return self.client.post(reverse("game:jogar_rodada"), {"lote": "1"}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+
+    def test_jogada_nao_toca_no_django_session(self, _dado):
+        self._comecar()
+        with CaptureQueriesContext(connection) as capturadas:
+            self.assertEqual(self._jogar().status_code, 200)
+        self.assertFalse([q for q in capturadas.captured_queries if "django_session" in q["sql"]])
+        self.assertEqual(_estado_single(self.client)[1]["posicoes"], [1, 1])
+
+    def test_tabuleiro_gravado_uma_vez_e_jogo_compacto(self, _dado):
+        self._comecar()
+        linha = SinglePlayerState.objects.get()
+        tabuleiro = estado_single._decodificar(linha.board)
+        self.assertEqual(set(tabuleiro), {"config", "cobras", "escadas"})
+        self._jogar()
+        jogo = estado_single._decodificar(self.cache.get(f"sp:{linha.session_key}:j"))
+        self.assertNotIn("cobras", jogo)
+        self.assertEqual(jogo["rng"][1], 2)
+        # log grande vai comprimido
+        partida = nova_partida(2, {}, {})
+        partida["log"] = ["Jogador 1 rolou 3."] * 200
+        self.assertEqual(estado_single._codificar(partida)[:1], b"z")
+        self.assertEqual(estado_single._decodificar(estado_single._codificar(partida)), partida)
+
+    @override_settings(SINGLEPLAYER_DB_EVERY=4)
+    def test_sem_cache_volta_para_o_banco_com_o_dado_junto(self, _dado):
+        self._comecar()
+        for _ in range(3):
+            self._jogar()
+        chave = self.client.session.session_key
+        # 6 dados: o banco ficou com a gravação dos 4 primeiros
+        self.assertEqual(_estado_single(self.client)[2].offset, 6)
+        self.cache.clear()
+        _config, partida, fluxo = _estado_single(self.client)
+        self.assertEqual((fluxo.offset, partida["posicoes"]), (4, [2, 2]))
+        self.assertIsNotNone(self.cache.get(f"sp:{chave}:j"))
+
+    def test_login_troca_a_chave_e_a_partida_vem_junto(self, _dado):
+        User.objects.create_user(username="sp", password="Senha!Forte123")
+        self._comecar()
+        self._jogar()
+        antiga = self.client.session.session_key
+        self.client.login(username="sp", password="Senha!Forte123")
+        self.assertNotEqual(self.client.session.session_key, antiga)
+
+        self.assertEqual(self._jogar().json()["posicoes"], [2, 2])
+        self.assertEqual(_estado_single(self.client)[1]["posicoes"], [2, 2])
+        self.assertEqual(estado_single.ler(antiga), (None, None, None))
+        self.assertEqual(self.client.session[estado_single.MARCADOR], self.client.session.session_key)
+
+    def test_partida_antiga_na_sessao_e_migrada(self, _dado):
+        session = self.client.session
+        config = _base_config()
+        session["configuracao_jogo"] = config
+        session["partida"] = _base_partida(config, posicoes=[3, 7])
+        session[rng.CHAVE_SESSAO] = {"seed": 42, "offset": 5}
+        session.save()
+
+        self.assertEqual(self._jogar().json()["posicoes"], [4, 8])
+        session = self.client.session
+        self.assertNotIn("partida", session)
+        self.assertNotIn("configuracao_jogo", session)
+        self.assertEqual(_estado_single(self.client)[2].estado(), {"seed": 42, "offset": 7})
+
+    @override_settings(SINGLEPLAYER_STORE="sessao")
+    def test_backend_sessao_guarda_tudo_na_sessao(self, _dado):
+        self._comecar()
+        self._jogar()
+        session = self.client.session
+        self.assertEqual(session["partida"]["posicoes"], [1, 1])
+        self.assertEqual(session[rng.CHAVE_SESSAO]["offset"], 2)
+        self.assertFalse(SinglePlayerState.objects.exists())
+
+    @override_settings(SINGLEPLAYER_STORE="banco")
+    def test_backend_banco_grava_toda_jogada(self, _dado):
+        self._comecar()
+        self._jogar()
+        self.cache.clear()
+        self.assertEqual(_estado_single(self.client)[1]["posicoes"], [1, 1])
+
+    def test_reiniciar_e_limpar_expirados(self, _dado):
+        self._comecar()
+        self._jogar()
+        self.client.get(reverse("game:reiniciar_jogo"), follow=True)
+        self.assertEqual(_estado_single(self.client)[1]["posicoes"], [0, 0])
+
+        SinglePlayerState.objects.update(updated_at=timezone.now() - timedelta(days=30))
+        out = StringIO()
+        call_command("clear_singleplayer_states", stdout=out)
+        self.assertIn("1 partidas", out.getvalue())
+        self.assertFalse(SinglePlayerState.objects.exists())
+
+    @override_settings(SINGLEPLAYER_STORE="redis")
+    def test_backend_invalido(self, _dado):
+        with self.assertRaises(ImproperlyConfigured):
+            self._comecar()
+
+
+def _jogar_local(local):
+    """Joga a partida local inteira como o navegador faria; devolve as jogadas."""
+    cobras = {int(k): v for k, v in local["cobras"].items()}
+    escadas = {int(k): v for k, v in local["escadas"].items()}
+    partida = nova_partida(local["jogadores"], cobras, escadas)
+    fluxo = partida_local.fluxo_dados(local["seed"])
+    jogadas = []
+    while partida["status"] != "finalizado":
+        dado = next(fluxo)
+        m = aplicar_jogada(partida, dado, local["casa_final"], cobras, escadas)
+        jogadas.append({"jogador": m["jogador"], "dado": dado, "para": m["para"]})
+    return jogadas
+
+
+class PartidaLocalTest(TestCase):
+    def test_dados_deterministicos_e_compromisso(self):
+        seed = "ab" * 32
+        dados = partida_local.dados(seed, 0, 200)
+        self.assertEqual(dados, partida_local.dados(seed)[:200])
+        self.assertEqual(partida_local.dados(seed, 50, 10), dados[50:60])
+        self.assertTrue(set(dados) <= set(range(1, 7)))
+        self.assertEqual(len(partida_local.compromisso(seed)), 64)
+        self.assertNotEqual(dados, partida_local.dados("cd" * 32, 0, 200))
+
+    def test_verificar_aceita_partida_valida_e_recusa_adulterada(self):
+        cobras, escadas = mapa_cobras_escadas(100)
+        local = partida_local.iniciar(3, 100, cobras, escadas)
+        jogadas = _jogar_local(local)
+        self.assertEqual(partida_local.verificar(local, jogadas)["status"], "finalizado")
+
+        adulteradas = [dict(j) for j in jogadas]
+        adulteradas[0]["dado"] = adulteradas[0]["dado"] % 6 + 1
+        with self.assertRaises(partida_local.PartidaInvalida):
+            partida_local.verificar(local, adulteradas)
+        with self.assertRaises(partida_local.PartidaInvalida):
+            partida_local.verificar(local, jogadas[:-1])
+        with self.assertRaises(partida_local.PartidaInvalida):
+            partida_local.verificar(local, jogadas + jogadas[-1:])
+
+    def _preparar(self):
+        user = User.objects.create_user(username="loc", password="Senha!Forte123")
+        Profile.objects.create(user=user, nickname="loc")
+        self.client.login(username="loc", password="Senha!Forte123")
+        session = self.client.session
+        session["configuracao_jogo"] = _base_config(total_jogadores=2)
+        session.save()
+        self.client.get(reverse("game:novo_jogo"))
+        return user.profile
+
+    def test_fluxo_iniciar_finalizar_conta_estatisticas(self):
+        profile = self._preparar()
+        resp = self.client.post(reverse("game:partida_local_iniciar"))
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        local = self.client.session["partida_local"]
+        self.assertEqual(data["commit"], partida_local.compromisso(local["seed"]))
+        self.assertNotIn(local["seed"], resp.content.decode())
+        self.assertEqual(data["dados"], partida_local.dados(local["seed"]))
+
+        # derrota provisória até o finalizar
+        profile.refresh_from_db()
+        self.assertEqual((profile.total_games, profile.losses), (1, 1))
+
+        resp = self.client.get(reverse("game:partida_local_dados"), {"de": 512})
+        self.assertEqual(resp.json()["dados"], partida_local.dados(local["seed"], 512))
+
+        jogadas = _jogar_local(local)
+        resp = self.client.post(
+            reverse("game:partida_local_finalizar"), json.dumps({"jogadas": jogadas}),
+            content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data["seed"], local["seed"])
+        self.assertNotIn("partida_local", self.client.session)
+        self.assertEqual(_estado_single(self.client)[1]["status"], "finalizado")
+
+        profile.refresh_from_db()
+        venceu = data["vencedor"] == 0
+        self.assertEqual((profile.total_games, profile.wins, profile.losses), (1, int(venceu), int(not venceu)))
+
+    def test_finalizar_adulterado_mantem_derrota(self):
+        profile = self._preparar()
+        self.client.post(reverse("game:partida_local_iniciar"))
+        jogadas = _jogar_local(self.client.session["partida_local"])
+        jogadas[-1]["para"] += 1
+        resp = self.client.post(
+            reverse("game:partida_local_finalizar"), json.dumps({"jogadas": jogadas}),
+            content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("destino", resp.json()["error"])
+        profile.refresh_from_db()
+        self.assertEqual((profile.total_games, profile.wins, profile.losses), (1, 0, 1))
+
+    def test_iniciada_anonima_nao_conta_depois_do_login(self):
+        # começa sem login, repete o iniciar até os dados darem a vitória ao humano e só então entra
+        for inicial in ((3, 0, 3), (0, 0, 0)):  # losses=0: o "losses - 1" quebraria o CHECK
+            with self.subTest(inicial=inicial):
+                self.client.logout()
+                user = User.objects.create_user(username=f"anon{inicial[0]}", password="Senha!Forte123")
+                profile = Profile.objects.create(user=user, nickname=user.username, total_games=inicial[0],
+                                                 wins=inicial[1], losses=inicial[2])
+                session = self.client.session
+                session["configuracao_jogo"] = _base_config(total_jogadores=2)
+                session.save()
+                self.client.get(reverse("game:novo_jogo"))
+                for _ in range(50):
+                    self.client.post(reverse("game:partida_local_iniciar"))
+                    jogadas = _jogar_local(self.client.session["partida_local"])
+                    if jogadas[-1]["jogador"] == 0:
+                        break
+
+                self.client.login(username=user.username, password="Senha!Forte123")
+                resp = self.client.post(
+                    reverse("game:partida_local_finalizar"), json.dumps({"jogadas": jogadas}),
+                    content_type="application/json",
+                )
+                self.assertEqual(resp.status_code, 200)
+                self.assertEqual(resp.json()["vencedor"], 0)
+                profile.refresh_from_db()
+                self.assertEqual((profile.total_games, profile.wins, profile.losses), inicial)
+                self.assertFalse(MatchParticipant.objects.filter(user=user).exists())
+
+    @patch("game.views.rolar_dado", side_effect=[2, 3])
+    def test_iniciar_recusa_partida_ja_jogada_no_servidor(self, _mock_dado):
+        self._preparar()
+        self.client.post(reverse("game:jogar_rodada"), {"lote": "1"})
+        resp = self.client.post(reverse("game:partida_local_iniciar"))
+        self.assertEqual(resp.status_code, 409)
+
+
 # --------------------------
 # Cadastro / autenticação
 # --------------------------
@@ -399,6 +743,1219 @@ class MultiplayerApiMoveTest(TestCase):
         self.assertEqual(self.player.position, 3)
 
 
+# --------------------------
+# Fluxos de dados com seed
+# --------------------------
+class FluxoDadosTest(TestCase):
+    def setUp(self):
+        rng.monitor.zerar()
+
+    def test_fluxo_deterministico_e_retomavel(self):
+        seed = 123456789
+        fluxo = rng.FluxoDados(seed, monitorar=False)
+        dados = [rolar_dado(fluxo) for _ in range(600)]
+        self.assertEqual(fluxo.offset, 600)
+        self.assertTrue(set(dados) <= set(range(1, 7)))
+        self.assertEqual(dados, [rng.dado_em(seed, i) for i in range(600)])
+        # retomar de (seed, offset) continua de onde parou, atravessando blocos
+        retomado = rng.FluxoDados(seed, 250, monitorar=False)
+        self.assertEqual([retomado.proximo() for _ in range(350)], dados[250:])
+
+    def test_monitor_qui_quadrado_e_sequencias(self):
+        for dado, anterior in [(1, None), (4, 1), (2, 4), (5, 2), (3, 5), (6, 3)]:
+            rng.monitor.registrar(dado, anterior)
+        r = rng.monitor.estatisticas()
+        self.assertEqual(r["total"], 6)
+        self.assertEqual(r["qui2"], 0)
+        self.assertAlmostEqual(r["qui2_p"], 1.0)
+        self.assertEqual((r["pares"], r["trocas"]), (5, 5))
+        self.assertAlmostEqual(rng._qui2_sf_5gl(11.0705), 0.05, places=4)
+
+    def test_replay_singleplayer_reconstroi_a_sessao(self):
+        session = self.client.session
+        session["configuracao_jogo"] = _base_config(total_jogadores=3)
+        session.save()
+        self.client.get(reverse("game:novo_jogo"))
+        for _ in range(8):
+            self.client.post(reverse("game:jogar_rodada"), {"lote": "1"})
+
+        _config, partida, fluxo = _estado_single(self.client)
+        self.assertGreaterEqual(fluxo.offset, 8)
+        refeita = rng.reconstruir_partida(
+            fluxo.seed, fluxo.offset, 3, 100, partida["cobras"], partida["escadas"],
+        )
+        for campo in ("posicoes", "jogador_atual", "status", "streak_seis", "log_rodadas", "ultimo_movimento"):
+            self.assertEqual(refeita[campo], partida[campo], campo)
+        self.assertGreaterEqual(rng.monitor.estatisticas()["total"], fluxo.offset)
+
+    def test_replay_game_confere_sala(self):
+        user = User.objects.create_user(username="host", password="abc12345")
+        self.client.login(username="host", password="abc12345")
+        # pelas views: o replay sai dos eventos (join/start/roll/turn)
+        self.client.post(reverse("game:multiplayer_create"))
+        room = GameRoom.objects.get(host=user)
+        self.client.post(reverse("game:multiplayer_config", args=[room.code]), {"board_size": "5x5"})
+        self.client.post(reverse("game:multiplayer_start", args=[room.code]))
+        for _ in range(6):
+            self.client.post(reverse("game:api_room_move", args=[room.code]))
+
+        room.refresh_from_db()
+        self.assertTrue(room.dice_seed)
+        self.assertGreater(room.dice_offset, 0)
+        out = StringIO()
+        call_command("replay_game", room.code, stdout=out)
+        self.assertIn("Replay confere", out.getvalue())
+
+    def test_replay_game_com_saidas_e_vez_passada(self):
+        clientes = {}
+        for nome in ("ana", "bia", "cid"):
+            User.objects.create_user(username=nome, password="Senha!Forte123")
+            clientes[nome] = Client()
+            clientes[nome].login(username=nome, password="Senha!Forte123")
+        clientes["ana"].post(reverse("game:multiplayer_create"))
+        room = GameRoom.objects.get()
+        for nome in ("bia", "cid"):
+            clientes[nome].post(reverse("game:multiplayer_join"), {"code": room.code})
+        clientes["ana"].post(reverse("game:multiplayer_start", args=[room.code]))
+
+        def jogar(vezes):
+            for _ in range(vezes):
+                room.refresh_from_db()
+                clientes[room.current_turn.username].post(reverse("game:api_room_move", args=[room.code]))
+            room.refresh_from_db()
+
+        jogar(4)
+        # sai na própria vez: a vez passa sem dado (evento turn)
+        clientes[room.current_turn.username].get(reverse("game:multiplayer_leave", args=[room.code]))
+        jogar(3)
+        # e um que sai fora da vez
+        fora = next(p.user.username for p in room.players.all() if p.user_id != room.current_turn_id)
+        clientes[fora].get(reverse("game:multiplayer_leave", args=[room.code]))
+        jogar(3)
+        self.assertEqual(room.players.count(), 1)
+
+        out = StringIO()
+        call_command("replay_game", room.code, "--moves", stdout=out)
+        self.assertIn("Replay confere", out.getvalue())
+        self.assertIn("jogadas=10", out.getvalue())
+
+        # dado adulterado no histórico: o fluxo do seed não confere
+        ev = RoomEvent.objects.filter(room=room, kind="roll").order_by("seq").first()
+        ev.data["dado"] = ev.data["dado"] % 6 + 1
+        ev.save()
+        err = StringIO()
+        with self.assertRaisesMessage(CommandError, "Replay diverge"):
+            call_command("replay_game", room.code, stdout=StringIO(), stderr=err)
+        self.assertIn("o fluxo dá", err.getvalue())
+
+
+# --------------------------
+# Histórico de eventos das salas
+# --------------------------
+@override_settings(ROOM_SNAPSHOT_EVERY=4)
+class RoomEventsTest(TestCase):
+    def setUp(self):
+        self.clientes = {}
+        for nome in ("ana", "bia"):
+            User.objects.create_user(username=nome, password="Senha!Forte123")
+            c = Client()
+            c.login(username=nome, password="Senha!Forte123")
+            self.clientes[nome] = c
+        self.clientes["ana"].post(reverse("game:multiplayer_create"))
+        self.room = GameRoom.objects.get()
+        self.clientes["bia"].post(reverse("game:multiplayer_join"), {"code": self.room.code})
+        self.clientes["ana"].post(reverse("game:multiplayer_start", args=[self.room.code]))
+
+    def _jogar(self, vezes):
+        for _ in range(vezes):
+            self.room.refresh_from_db()
+            if self.room.status != "active":
+                break
+            vez = self.room.current_turn.username
+            self.clientes[vez].post(reverse("game:api_room_move", args=[self.room.code]))
+        self.room.refresh_from_db()
+
+    def test_redutor(self):
+        estado = eventos.estado_inicial()
+        for tipo, dados in [
+            ("join", {"user_id": 1, "username": "a", "order": 0}),
+            ("join", {"user_id": 2, "username": "b", "order": 1}),
+            ("start", {"board": "", "dice_seed": 7, "vez": 1}),
+            ("roll", {"user_id": 1, "dado": 4, "de": 0, "para": 14, "pre_salto": 4}),
+            ("turn", {"vez": 2, "rodada": 1}),
+            ("leave", {"user_id": 1}),
+        ]:
+            eventos.aplicar(estado, tipo, dados)
+        self.assertEqual(estado["status"], "active")
+        self.assertEqual(estado["vez"], 2)
+        self.assertEqual(estado["dice_offset"], 1)
+        self.assertEqual([j["username"] for j in estado["jogadores"]], ["b"])
+        with self.assertRaises(ValueError):
+            eventos.aplicar(estado, "teleporte", {})
+
+    def test_escritor_atrasado_nao_repete_seq(self):
+        a, b = GameRoom.objects.get(pk=self.room.pk), GameRoom.objects.get(pk=self.room.pk)
+        eventos.registrar(a, ("turn", {"vez": a.current_turn_id, "rodada": 1}))
+        with self.assertRaises(eventos.VersaoConflitante):
+            eventos.registrar(b, ("turn", {"vez": b.current_turn_id, "rodada": 1}))
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.state_version, a.state_version)
+        self.assertEqual(RoomEvent.objects.filter(room=self.room).count(), a.state_version)
+
+    def test_jogada_que_perde_a_corrida_da_409(self):
+        self.room.refresh_from_db()
+        vez = self.room.current_turn.username
+        versao = self.room.state_version
+
+        def outro_escritor_no_meio(fluxo):
+            # a sala já foi lida quando outro processo grava um evento nela
+            outro = GameRoom.objects.get(pk=self.room.pk)
+            eventos.registrar(outro, ("turn", {"vez": outro.current_turn_id, "rodada": 1}))
+            return 3
+
+        with patch("game.views.rolar_dado", side_effect=outro_escritor_no_meio):
+            resp = self.clientes[vez].post(reverse("game:api_room_move", args=[self.room.code]))
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp["X-Corrida"], "versao")
+        self.assertFalse(resp.json()["ok"])
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.state_version, versao)
+        self.assertEqual(set(self.room.players.values_list("position", flat=True)), {0})
+
+    def test_entrada_que_perde_a_corrida_roda_de_novo(self):
+        User.objects.create_user(username="cris", password="Senha!Forte123")
+        c = Client()
+        c.login(username="cris", password="Senha!Forte123")
+        original, chamadas = eventos.registrar, []
+
+        def primeira_perde(room, *evs):
+            chamadas.append(room.state_version)
+            if len(chamadas) == 1:
+                raise eventos.VersaoConflitante("outra entrada ganhou")
+            return original(room, *evs)
+
+        with patch("game.eventos.registrar", side_effect=primeira_perde):
+            resp = c.post(reverse("game:multiplayer_join"), {"code": self.room.code})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(len(chamadas), 2)
+        self.assertEqual(GamePlayer.objects.filter(room=self.room, user__username="cris").count(), 1)
+        self.room.refresh_from_db()
+        self.assertEqual(eventos.divergencias(self.room), [])
+
+    def test_projecao_confere_e_reconstroi_em_qualquer_seq(self):
+        self._jogar(12)
+        self.assertEqual(self.room.state_version, RoomEvent.objects.filter(room=self.room).count())
+        self.assertEqual(eventos.divergencias(self.room), [])
+        self.assertTrue(RoomSnapshot.objects.filter(room=self.room).exists())
+
+        todos = list(RoomEvent.objects.filter(room=self.room).values_list("seq", "kind", "data"))
+        for seq in range(1, self.room.state_version + 1):
+            self.assertEqual(eventos.estado_em(self.room.pk, seq), eventos.reduzir(todos[:seq]), seq)
+
+        out = StringIO()
+        call_command("room_history", self.room.code, "--check", stdout=out)
+        self.assertIn("confere", out.getvalue())
+        data = self.clientes["ana"].get(reverse("game:api_room_state", args=[self.room.code])).json()
+        self.assertEqual(data["version"], self.room.state_version)
+
+    def test_arquivar_sala_finalizada(self):
+        self._jogar(5)
+        for nome in ("ana", "bia"):
+            self.clientes[nome].get(reverse("game:multiplayer_leave", args=[self.room.code]))
+        self.room.refresh_from_db()
+        final = eventos.estado_em(self.room.pk)
+        self.assertEqual(final["status"], "finished")
+
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, "sala.jsonl.gz")
+            n = eventos.arquivar(self.room, caminho)
+            self.assertEqual(n, self.room.state_version)
+            self.assertFalse(RoomEvent.objects.filter(room=self.room).exists())
+            self.assertEqual(RoomSnapshot.objects.filter(room=self.room).count(), 1)
+            self.assertEqual(eventos.estado_em(self.room.pk), final)
+            self.assertEqual(eventos.reduzir(eventos.ler_arquivo(caminho)), final)
+
+
+class SalasQuentesTest(TestCase):
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(self.pasta.cleanup)
+        self.diario = os.path.join(self.pasta.name, "hot.journal")
+        ajustes = override_settings(HOT_ROOMS=True, HOT_ROOM_FLUSH_SECONDS=0, HOT_ROOM_JOURNAL=self.diario)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        salas_quentes.limpar()
+        self.addCleanup(salas_quentes.limpar)
+
+        self.clientes = {}
+        for nome in ("ana", "bia"):
+            User.objects.create_user(username=nome, password="Senha!Forte123")
+            c = Client()
+            c.login(username=nome, password="Senha!Forte123")
+            self.clientes[nome] = c
+        self.clientes["ana"].post(reverse("game:multiplayer_create"))
+        self.room = GameRoom.objects.get()
+        self.clientes["bia"].post(reverse("game:multiplayer_join"), {"code": self.room.code})
+        self.clientes["ana"].post(reverse("game:multiplayer_start", args=[self.room.code]))
+        GameRoom.objects.filter(pk=self.room.pk).update(board_data=b"")  # sem cobras/escadas
+        self.room.refresh_from_db()
+        self.url_estado = reverse("game:api_room_state", args=[self.room.code])
+        self.url_jogada = reverse("game:api_room_move", args=[self.room.code])
+
+    @patch("game.views.rolar_dado", return_value=2)
+    def _jogar(self, vezes, _mock_dado):
+        for _ in range(vezes):
+            vez = self.clientes["ana"].get(self.url_estado).json()["current_turn"]
+            resp = self.clientes[vez].post(self.url_jogada)
+            self.assertEqual(resp.status_code, 200)
+
+    def test_jogadas_ficam_em_memoria_ate_gravar(self):
+        versao = self.room.state_version
+        self._jogar(4)
+        estado = self.clientes["bia"].get(self.url_estado).json()
+        self.assertEqual([p["position"] for p in estado["players"]], [4, 4])
+        self.assertEqual(estado["version"], versao + 8)
+
+        # banco ainda não viu nada
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.state_version, versao)
+        self.assertEqual(list(self.room.players.values_list("position", flat=True)), [0, 0])
+
+        salas_quentes.gravar_todas()
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.state_version, versao + 8)
+        self.assertEqual(eventos.divergencias(self.room), [])
+        self.assertEqual(os.path.getsize(self.diario), 0)
+
+    def test_jogada_em_memoria_nao_consulta_tabelas_das_salas(self):
+        self._jogar(1)
+        vez = self.clientes["ana"].get(self.url_estado).json()["current_turn"]
+        with CaptureQueriesContext(connection) as ctx:
+            self.clientes[vez].post(self.url_jogada)
+        self.assertFalse([q for q in ctx.captured_queries if "game_" in q["sql"]])
+
+    def test_recupera_do_diario_apos_queda(self):
+        self._jogar(3)
+        salas_quentes.limpar()  # "queda": memória perdida, nada gravado
+        self.assertEqual(salas_quentes.recuperar(), 3)
+        self.room.refresh_from_db()
+        self.assertEqual(eventos.divergencias(self.room), [])
+        self.assertEqual(sorted(self.room.players.values_list("position", flat=True)), [2, 4])
+        textos = [ev["texto"] for rodada in self.room.log_rounds for ev in rodada]
+        self.assertEqual(len([t for t in textos if " rolou " in t]), 3)
+        self.assertEqual(salas_quentes.recuperar(), 0)
+
+    def _quase_no_fim(self):
+        self._jogar(1)
+        sala = salas_quentes._salas[self.room.code]
+        vez = next(j for j in sala.estado["jogadores"] if j["user_id"] == sala.estado["vez"])
+        vez["position"] = 98
+        return sala, vez["username"]
+
+    @patch("game.views.rolar_dado", return_value=2)
+    def test_fim_de_partida_sai_da_memoria_so_no_commit(self, _mock_dado):
+        sala, vez = self._quase_no_fim()
+        with patch("game.views._registrar_resultado_sala", side_effect=RuntimeError("perfil")):
+            with self.assertRaises(RuntimeError):
+                self.clientes[vez].post(self.url_jogada)
+        # rollback: a jogada final continua na memória, pendente
+        self.assertIs(salas_quentes._salas.get(self.room.code), sala)
+        self.assertEqual(sala.estado["pendentes"][-1][0], "finish")
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.status, "active")
+
+        salas_quentes.gravar_todas()
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.status, "finished")
+        self.assertEqual(eventos.divergencias(self.room), [])
+
+    @patch("game.views.rolar_dado", return_value=2)
+    def test_fim_de_partida_gravado_sai_da_memoria(self, _mock_dado):
+        sala, vez = self._quase_no_fim()
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.clientes[vez].post(self.url_jogada)
+        self.assertTrue(resp.json()["finished"])
+        self.assertNotIn(self.room.code, salas_quentes._salas)
+        self.assertEqual(sala.estado["pendentes"], [])
+        self.room.refresh_from_db()
+        self.assertEqual(eventos.divergencias(self.room), [])
+        self.assertEqual(os.path.getsize(self.diario), 0)
+
+
+# --------------------------
+# Prazo de turno (roda de tempo + jogada automática)
+# --------------------------
+class RodaDeTempoTest(SimpleTestCase):
+    def test_vence_no_tick_certo_e_cancela(self):
+        roda = prazos.RodaDeTempo(tick=1, posicoes=4, niveis=3, inicio=0)
+        for chave, quando in (("a", 2), ("b", 5), ("c", 20), ("d", 70)):  # d passa de 4**3 ticks
+            roda.agendar(chave, quando)
+        self.assertTrue(roda.cancelar("b"))
+        self.assertFalse(roda.cancelar("b"))
+        self.assertEqual(roda.avancar(1), [])
+        self.assertEqual(roda.avancar(2), ["a"])
+        self.assertEqual(roda.avancar(19), [])
+        self.assertEqual(roda.avancar(20), ["c"])
+        self.assertEqual(roda.avancar(69), [])
+        self.assertEqual(roda.avancar(70), ["d"])
+        self.assertEqual(len(roda), 0)
+
+    def test_mesmos_vencidos_que_um_heap(self):
+        rnd = random.Random(3)
+        roda, heap = prazos.RodaDeTempo(tick=1, posicoes=8, niveis=3, inicio=0), HeapPreguicoso()
+        for i in range(2000):
+            quando = rnd.uniform(0, 900)
+            roda.agendar(i, quando)
+            heap.agendar(i, quando)
+        for agora in range(1, 1800):
+            for i in rnd.sample(range(2000), 5 if agora < 1000 else 0):  # reagenda/cancela no meio do caminho
+                quando = agora + rnd.uniform(-2, 700)
+                if i % 3:
+                    roda.agendar(i, quando)
+                    heap.agendar(i, quando)
+                else:
+                    roda.cancelar(i)
+                    heap.cancelar(i)
+            # o heap trabalha com o instante exato; a roda arredonda o prazo para o tick de cima
+            self.assertEqual(sorted(roda.avancar(agora)), sorted(heap.avancar(agora)))
+        self.assertEqual(len(roda), 0)
+
+
+@override_settings(TURN_TIMEOUT=30, TURN_ABANDON_AFTER=1)
+@patch("game.views.rolar_dado", side_effect=_dado_um)
+class PrazoTurnoTest(TestCase):
+    def setUp(self):
+        self.clientes = {}
+        for nome in ("ana", "bia"):
+            User.objects.create_user(username=nome, password="Senha!Forte123")
+            c = Client()
+            c.login(username=nome, password="Senha!Forte123")
+            self.clientes[nome] = c
+        self.clientes["ana"].post(reverse("game:multiplayer_create"))
+        self.room = GameRoom.objects.get()
+        self.clientes["bia"].post(reverse("game:multiplayer_join"), {"code": self.room.code})
+        self.clientes["ana"].post(reverse("game:multiplayer_start", args=[self.room.code]))
+        GameRoom.objects.filter(pk=self.room.pk).update(board_data=b"")  # sem cobras/escadas
+        self.room.refresh_from_db()
+        self.ana, self.bia = User.objects.get(username="ana"), User.objects.get(username="bia")
+
+    def _vencer(self):
+        self.room.refresh_from_db()
+        views.jogar_turno_vencido(self.room.code, self.room.turn_deadline + timedelta(seconds=1))
+        self.room.refresh_from_db()
+
+    def test_inicio_e_jogada_gravam_prazo(self, _mock_dado):
+        antes = timezone.now()
+        self.assertAlmostEqual((self.room.turn_deadline - antes).total_seconds(), 30, delta=5)
+        estado = self.clientes["ana"].get(reverse("game:api_room_state", args=[self.room.code])).json()
+        self.assertEqual(estado["turn_deadline"], self.room.turn_deadline.isoformat())
+
+        self.clientes["ana"].post(reverse("game:api_room_move", args=[self.room.code]))
+        prazo = self.room.turn_deadline
+        self.room.refresh_from_db()
+        self.assertGreaterEqual(self.room.turn_deadline, prazo)
+        self.assertEqual(self.room.current_turn_id, self.bia.id)
+
+    def test_prazo_vencido_joga_pelo_jogador_da_vez(self, _mock_dado):
+        self._vencer()
+        self.assertEqual(self.room.current_turn_id, self.bia.id)
+        self.assertEqual(self.room.auto_moves, 1)
+        self.assertEqual(self.room.players.get(user=self.ana).position, 1)
+        self.assertIn("Tempo esgotado", self.room.log_rounds[-1][-1]["texto"])
+        self.assertTrue(RoomEvent.objects.filter(room=self.room, kind="roll", data__auto=True).exists())
+        self.assertEqual(eventos.divergencias(self.room), [])
+
+        # jogada de verdade zera a contagem
+        self.clientes["bia"].post(reverse("game:api_room_move", args=[self.room.code]))
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.auto_moves, 0)
+
+    def test_prazo_ainda_nao_vencido_nao_joga(self, _mock_dado):
+        prazo = views.jogar_turno_vencido(self.room.code, self.room.turn_deadline - timedelta(seconds=1))
+        self.assertEqual(prazo, self.room.turn_deadline)
+        self.assertFalse(RoomEvent.objects.filter(room=self.room, kind="roll").exists())
+
+    def test_sala_so_de_jogadas_automaticas_e_encerrada(self, _mock_dado):
+        self._vencer()
+        self._vencer()
+        self.assertEqual(self.room.auto_moves, 2)
+        self._vencer()
+        self.assertEqual(self.room.status, "finished")
+        self.assertIsNone(self.room.turn_deadline)
+        self.assertIsNone(views.jogar_turno_vencido(self.room.code, timezone.now() + timedelta(days=1)))
+
+    def test_quem_sai_na_propria_vez_passa_a_vez(self, _mock_dado):
+        self.clientes["ana"].post(reverse("game:multiplayer_leave", args=[self.room.code]))
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.current_turn_id, self.bia.id)
+        self.assertEqual(eventos.divergencias(self.room), [])
+
+    def test_ressincronizar_le_prazos_do_banco(self, _mock_dado):
+        prazos.limpar()
+        self.addCleanup(prazos.limpar)
+        self.assertEqual(prazos.ressincronizar(), 1)
+        self.assertEqual(prazos.ressincronizar(horizonte=5), 0)
+        self.assertEqual(prazos.agendados(), 1)
+        with patch.object(prazos, "garantir"):
+            self.assertEqual(prazos.processar(self.room.turn_deadline + timedelta(seconds=2)), 1)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.current_turn_id, self.bia.id)
+
+    def test_jogada_que_perde_para_o_worker_da_409(self, mock_dado):
+        vencido = self.room.turn_deadline + timedelta(seconds=1)
+
+        def worker_no_meio(fluxo):
+            # a sala já foi lida pela jogada quando o worker joga o turno vencido
+            mock_dado.side_effect = _dado_um
+            views.jogar_turno_vencido(self.room.code, vencido)
+            return _dado_um(fluxo)
+
+        mock_dado.side_effect = worker_no_meio
+        resp = self.clientes["ana"].post(reverse("game:api_room_move", args=[self.room.code]))
+        self.assertEqual(resp.status_code, 409)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.current_turn_id, self.ana.id)
+        self.assertEqual(self.room.players.get(user=self.ana).position, 0)
+        self.assertEqual(eventos.divergencias(self.room), [])
+
+    def test_worker_que_perde_a_corrida_so_desiste(self, _mock_dado):
+        prazos.limpar()
+        self.addCleanup(prazos.limpar)
+        prazos.ressincronizar()
+        conflito = eventos.VersaoConflitante("jogada de verdade chegou antes")
+        with patch.object(prazos, "garantir"), patch("game.views.jogar_turno_vencido", side_effect=conflito):
+            with self.assertNoLogs(prazos.logger, "ERROR"):
+                self.assertEqual(prazos.processar(self.room.turn_deadline + timedelta(seconds=2)), 1)
+        self.assertEqual(prazos.agendados(), 0)
+
+
+# --------------------------
+# Presença (heartbeat no cache)
+# --------------------------
+@override_settings(PRESENCE_TTL=30, PRESENCE_REFRESH=10)
+class PresencaTest(TestCase):
+    def setUp(self):
+        presenca.limpar()
+        self.addCleanup(presenca.limpar)
+        self.clientes = {}
+        for nome in ("ana", "bia"):
+            User.objects.create_user(username=nome, password="Senha!Forte123")
+            c = Client()
+            c.login(username=nome, password="Senha!Forte123")
+            self.clientes[nome] = c
+        self.clientes["ana"].post(reverse("game:multiplayer_create"))
+        self.room = GameRoom.objects.get()
+        self.clientes["bia"].post(reverse("game:multiplayer_join"), {"code": self.room.code})
+        self.clientes["ana"].post(reverse("game:multiplayer_start", args=[self.room.code]))
+        self.url_estado = reverse("game:api_room_state", args=[self.room.code])
+
+    def test_poll_marca_online_sem_escrever_no_banco(self):
+        with CaptureQueriesContext(connection) as ctx:
+            estado = self.clientes["ana"].get(self.url_estado).json()
+        escritas = [q["sql"] for q in ctx.captured_queries if q["sql"].split()[0] in ("INSERT", "UPDATE", "DELETE")]
+        self.assertEqual(escritas, [])
+        self.assertEqual({p["username"]: p["online"] for p in estado["players"]}, {"ana": True, "bia": False})
+        self.assertEqual(estado["online_count"], 1)
+
+        self.clientes["bia"].get(reverse("game:api_room_info", args=[self.room.code]))
+        self.assertEqual(self.clientes["ana"].get(self.url_estado).json()["online_count"], 2)
+
+    def test_heartbeat_expira_e_nao_regrava_a_cada_poll(self):
+        code = self.room.code
+        self.assertEqual(presenca.marcar(code, "ana", agora=1000), {"ana"})
+        self.assertEqual(presenca.marcar(code, "bia", agora=1005), {"ana", "bia"})
+        presenca.marcar(code, "ana", agora=1008)  # dentro do PRESENCE_REFRESH: não regrava
+        self.assertEqual(presenca.online(code, agora=1031), {"bia"})
+        self.assertEqual(presenca.marcar(code, "ana", agora=1031), {"ana", "bia"})
+        self.assertEqual(presenca.contagens([code, "NADA"], agora=1034), {code: 2, "NADA": 0})
+
+    def test_muitas_salas_nao_derrubam_presenca(self):
+        # bem mais salas que as 300 entradas do LocMem padrão: nenhuma é descartada
+        codigos = [f"P{i:04d}" for i in range(1000)]
+        for code in codigos:
+            presenca.marcar(code, "ana", agora=1000)
+        sumidas = [c for c, n in presenca.contagens(codigos, agora=1001).items() if n != 1]
+        self.assertEqual(sumidas, [])
+
+    def test_lobby_conta_online_e_esconde_salas_vazias(self):
+        ana = User.objects.get(username="ana")
+        viva = GameRoom.objects.create(code="VIVA01", host=ana, is_public=True)
+        GameRoom.objects.create(code="VAZIA1", host=ana, is_public=True)
+        presenca.marcar("VIVA01", "ana")
+
+        url = reverse("game:multiplayer_lobby")
+        salas = self.clientes["ana"].get(url).context["public_rooms"]
+        self.assertEqual({r.code: r.online for r in salas}, {"VIVA01": 1, "VAZIA1": 0})
+        salas = self.clientes["ana"].get(url + "?ocultar_vazias=1").context["public_rooms"]
+        self.assertEqual([r.code for r in salas], [viva.code])
+        with override_settings(LOBBY_HIDE_EMPTY=True):
+            self.assertEqual(len(self.clientes["ana"].get(url).context["public_rooms"]), 1)
+            self.assertEqual(len(self.clientes["ana"].get(url + "?ocultar_vazias=0").context["public_rooms"]), 2)
+
+
+class PartidaRapidaTest(TestCase):
+    def setUp(self):
+        partida_rapida.limpar()
+        self.addCleanup(partida_rapida.limpar)
+        self.clientes = {}
+        for nome in ("ana", "bia", "caio"):
+            User.objects.create_user(username=nome, password="Senha!Forte123")
+            c = Client()
+            c.login(username=nome, password="Senha!Forte123")
+            self.clientes[nome] = c
+        self.url = reverse("game:partida_rapida")
+        self.url_api = reverse("game:api_partida_rapida")
+
+    def _entrar(self, nome, **opcoes):
+        return self.clientes[nome].post(self.url, {"board_size": "5x5", "party_size": 2, **opcoes})
+
+    def test_grupo_completo_vira_sala_iniciada(self):
+        resp = self._entrar("ana")
+        self.assertRedirects(resp, self.url)
+        self.assertEqual(self.clientes["ana"].get(self.url).status_code, 200)
+        self.assertEqual(self.clientes["ana"].get(self.url_api).json()["na_fila"], 1)
+
+        resp = self._entrar("bia")
+        room = GameRoom.objects.get()
+        self.assertRedirects(resp, reverse("game:multiplayer_room", args=[room.code]), fetch_redirect_response=False)
+        self.assertEqual((room.status, room.board_size, room.is_public), ("active", "5x5", True))
+        self.assertEqual([p.user.username for p in room.players.order_by("order")], ["ana", "bia"])
+        self.assertEqual(eventos.divergencias(room), [])
+
+        status = self.clientes["ana"].get(self.url_api).json()
+        self.assertEqual(status["status"], "matched")
+        self.assertEqual(status["url"], reverse("game:multiplayer_room", args=[room.code]))
+        m = partida_rapida.metricas()
+        self.assertEqual((m["casados"], m["salas"], m["taxa_de_casamento"]), (2, 1, 1.0))
+
+    def test_filas_separadas_e_saida(self):
+        self._entrar("ana")
+        self._entrar("bia", board_size="10x10")
+        self.assertFalse(GameRoom.objects.exists())
+
+        self.clientes["ana"].post(reverse("game:partida_rapida_sair"))
+        self.assertEqual(self.clientes["ana"].get(self.url_api).json()["status"], "none")
+        self.assertRedirects(self.clientes["ana"].get(self.url), reverse("game:multiplayer_lobby"))
+        self._entrar("caio")
+        self.assertFalse(GameRoom.objects.exists())
+        self.assertEqual(self._entrar("caio", party_size=5).status_code, 400)
+
+    def test_fila_sobrevive_ao_reinicio(self):
+        self._entrar("ana")
+        partida_rapida.limpar()  # "reinício": só o banco sobra
+        self._entrar("bia")
+        room = GameRoom.objects.get()
+        self.assertEqual(sorted(room.players.values_list("user__username", flat=True)), ["ana", "bia"])
+        self.assertEqual(MatchTicket.objects.filter(status="waiting").count(), 0)
+
+
+class FilasPartidaRapidaTest(SimpleTestCase):
+    def test_milhares_na_fila(self):
+        filas = partida_rapida.Filas()
+        chave = ("10x10", 4)
+        for i in range(5000):
+            filas.entrar(chave, partida_rapida.Entrada(float(i), i, i, f"u{i}"))
+        for user_id in range(0, 5000, 2):  # metade desiste
+            filas.sair(user_id)
+        self.assertEqual(filas.tamanho(chave), 2500)
+        self.assertLess(len(filas._heaps[chave]), 2 * 2500 + 65)  # compactou as entradas mortas
+
+        grupos = filas.grupos(chave)
+        self.assertEqual(len(grupos), 625)
+        self.assertEqual([e.user_id for e in grupos[0]], [1, 3, 5, 7])  # ordem de chegada
+        self.assertEqual(len(filas), 0)
+        self.assertIsNone(filas.do_usuario(1))
+
+
+# --------------------------
+# Ranking
+# --------------------------
+class RankingTest(TestCase):
+    def setUp(self):
+        ranking.limpar()
+        self.addCleanup(ranking.limpar)
+        self.users = {}
+        # ana 80%, bia e duda 75% (3 vitórias), caio 60%, edu 0%, fabi sem partidas
+        for nome, (wins, losses) in {
+            "ana": (8, 2), "bia": (3, 1), "caio": (6, 4), "duda": (3, 1), "edu": (0, 5), "fabi": (0, 0),
+        }.items():
+            u = User.objects.create_user(username=nome, password="Senha!Forte123")
+            Profile.objects.create(user=u, nickname=nome, total_games=wins + losses, wins=wins, losses=losses)
+            self.users[nome] = u
+        ranking.reconstruir()  # perfis criados direto, fora do ranking.atualizando
+
+    def _posicao_sql(self, nome):
+        p = Profile.objects.get(user=self.users[nome])
+        return 1 + Profile.objects.filter(
+            Q(win_rate_bp__gt=p.win_rate_bp) | Q(win_rate_bp=p.win_rate_bp, wins__gt=p.wins)
+        ).count()
+
+    def test_top_e_posicoes(self):
+        self.assertEqual(
+            [(l["username"], l["posicao"]) for l in ranking.top(10)],
+            [("ana", 1), ("bia", 2), ("duda", 2), ("caio", 4), ("edu", 5)],
+        )
+        for nome in ("ana", "bia", "caio", "duda", "edu"):
+            self.assertEqual(ranking.posicao(self.users[nome])["posicao"], self._posicao_sql(nome))
+        self.assertEqual(ranking.posicao(self.users["ana"])["de"], 5)
+        self.assertIsNone(ranking.posicao(self.users["fabi"]))
+
+    @patch("game.views.rolar_dado", side_effect=[6])
+    def test_fim_de_partida_atualiza_sem_recarregar(self, _mock_dado):
+        ranking.arvores()  # carregadas antes da partida: a vitória entra incrementalmente
+        self.client.login(username="bia", password="Senha!Forte123")
+        config = _base_config(casa_final=100, total_jogadores=2)
+        session = self.client.session
+        session["configuracao_jogo"] = config
+        session["partida"] = _base_partida(config, posicoes=[94, 0])
+        session.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("game:jogar_rodada"))
+
+        # bia: 4/1 = 80%, atrás da ana só pelas vitórias; duda cai para 3º
+        self.assertEqual(ranking.posicao(self.users["bia"])["posicao"], 2)
+        self.assertEqual(ranking.posicao(self.users["duda"])["posicao"], 3)
+        for nome in ("ana", "bia", "caio", "duda", "edu"):
+            self.assertEqual(ranking.posicao(self.users[nome])["posicao"], self._posicao_sql(nome))
+        call_command("rebuild_leaderboard", "--check", stdout=StringIO())
+
+    def test_ranking_dos_amigos(self):
+        FriendRequest.objects.create(requester=self.users["caio"], addressee=self.users["ana"], status="accepted")
+        FriendRequest.objects.create(requester=self.users["ana"], addressee=self.users["bia"], status="pending")
+        self.client.login(username="ana", password="Senha!Forte123")
+        resp = self.client.get(reverse("game:ranking"), {"amigos": "1"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([(l["username"], l["posicao"]) for l in resp.context["linhas"]], [("ana", 1), ("caio", 4)])
+        self.assertEqual(resp.context["minha"]["posicao"], 1)
+        self.assertEqual(len(self.client.get(reverse("game:ranking")).context["linhas"]), 5)
+
+    def test_rebuild_corrige_desvio(self):
+        # escrita fora do ranking.atualizando: os contadores ficam para trás
+        Profile.objects.filter(user=self.users["edu"]).update(wins=9, total_games=14)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_leaderboard", "--check", stdout=StringIO())
+        call_command("rebuild_leaderboard", stdout=StringIO())
+        call_command("rebuild_leaderboard", "--check", stdout=StringIO())
+        self.assertEqual(ranking.posicao(self.users["edu"])["posicao"], 4)
+
+
+# --------------------------
+# Histórico de partidas
+# --------------------------
+class HistoricoPartidasTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="hist", password="Senha!Forte123")
+        Profile.objects.create(user=self.user, nickname="hist")
+        self.client.login(username="hist", password="Senha!Forte123")
+
+    @patch("game.views.rolar_dado", side_effect=[6])
+    def test_single_grava_resultado(self, _mock_dado):
+        config = _base_config(casa_final=100, total_jogadores=3)
+        session = self.client.session
+        session["configuracao_jogo"] = config
+        session["partida"] = _base_partida(config, posicoes=[94, 10, 20])
+        session.save()
+        self.client.post(reverse("game:jogar_rodada"))
+
+        resultado = MatchResult.objects.get()
+        self.assertEqual((resultado.mode, resultado.board_size, resultado.players, resultado.winner), ("single", "10x10", 3, self.user))
+        p = resultado.participants.get()
+        self.assertEqual((p.user, p.won, p.final_position), (self.user, True, 100))
+
+    @patch("game.views.rolar_dado", return_value=3)
+    def test_multiplayer_grava_todos_os_jogadores(self, _mock_dado):
+        outro = User.objects.create_user(username="outro", password="Senha!Forte123")
+        room = GameRoom.objects.create(code="HIST01", host=self.user, status="active", board_size="5x5",
+                                       current_turn=self.user, round_number=7)
+        GamePlayer.objects.create(room=room, user=self.user, order=0, position=22)
+        GamePlayer.objects.create(room=room, user=outro, order=1, position=12)
+        self.client.post(reverse("game:api_room_move", args=[room.code]))
+
+        resultado = MatchResult.objects.get()
+        self.assertEqual((resultado.mode, resultado.room_code, resultado.rounds, resultado.winner),
+                         ("multi", "HIST01", 7, self.user))
+        self.assertEqual(
+            sorted(resultado.participants.values_list("user__username", "won", "final_position", "board_size")),
+            [("hist", True, 25, "5x5"), ("outro", False, 12, "5x5")],
+        )
+
+    def test_paginacao_por_chave(self):
+        base = timezone.now()
+        # 45 partidas, com empates de horário para exercitar o desempate pelo id
+        for i in range(45):
+            board = "5x5" if i % 3 == 0 else "10x10"
+            quando = base - timedelta(minutes=i // 2)
+            r = MatchResult.objects.create(mode="single", board_size=board, players=2, finished_at=quando)
+            MatchParticipant.objects.create(result=r, user=self.user, order=0, final_position=0,
+                                            won=i % 2 == 0, board_size=board, finished_at=quando)
+        esperado = list(MatchParticipant.objects.order_by("-finished_at", "-id").values_list("id", flat=True))
+
+        vistos, antes, consultas = [], None, []
+        while True:
+            with CaptureQueriesContext(connection) as cap:
+                linhas, antes = resultados.pagina(self.user, antes)
+            consultas.append(cap.captured_queries[0]["sql"])
+            vistos += [p.pk for p in linhas]
+            if antes is None:
+                break
+        self.assertEqual(vistos, esperado)
+        self.assertEqual(len(consultas), 3)
+        self.assertFalse(any("OFFSET" in sql for sql in consultas))
+
+        stats = {t["board_size"]: t for t in resultados.por_tabuleiro(self.user)}
+        self.assertEqual((stats["5x5"]["partidas"], stats["5x5"]["vitorias"]), (15, 8))
+        self.assertEqual((stats["10x10"]["partidas"], stats["10x10"]["vitorias"]), (30, 15))
+        self.assertAlmostEqual(stats["10x10"]["taxa"], 50.0)
+
+        resp = self.client.get(reverse("game:profile"), {"antes": resultados.pagina(self.user)[1]})
+        self.assertEqual(len(resp.context["historico"]), 20)
+        self.assertContains(resp, "Mais recentes")
+        self.assertEqual(len(self.client.get(reverse("game:profile"), {"antes": "lixo"}).context["historico"]), 20)
+        # cursores fora do alcance (data ou pk) também caem na primeira página, sem 500
+        for ruim in ("300000000000000000-1", "-1-1", "1-" + "9" * 30):
+            resp = self.client.get(reverse("game:profile"), {"antes": ruim})
+            self.assertEqual(resp.status_code, 200, ruim)
+            self.assertEqual(len(resp.context["historico"]), 20, ruim)
+
+
+# --------------------------
+# Exportação para análise
+# --------------------------
+class ExportacaoTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username="analista", password="Senha!Forte123", is_staff=True)
+        User.objects.create_user(username="comum", password="Senha!Forte123")
+        self.room = GameRoom.objects.create(
+            code="EXP001", host=self.staff, status="finished", board_size="5x5",
+            log_rounds=[[{"username": None, "order": None, "texto": "Partida iniciada."}],
+                        [{"username": "analista", "order": 0, "texto": "analista rolou 4, foi da casa 0 para 4."}]],
+        )
+        GamePlayer.objects.create(room=self.room, user=self.staff, order=0, position=4)
+        eventos.registrar(self.room, ("roll", {"user_id": self.staff.id, "dado": 4, "de": 0, "para": 4, "pre_salto": 4}),
+                          ("roll", {"user_id": self.staff.id, "dado": 6, "de": 4, "para": 10, "pre_salto": 10}))
+        antiga = GameRoom.objects.create(code="EXP000", host=self.staff, created_at=timezone.now() - timedelta(days=40))
+        GamePlayer.objects.create(room=antiga, user=self.staff, order=0)
+
+    def _baixar(self, tipo, **params):
+        self.client.login(username="analista", password="Senha!Forte123")
+        resp = self.client.get(reverse("game:api_export", args=[tipo]), params)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        return resp, b"".join(resp.streaming_content)
+
+    def test_so_staff(self):
+        self.client.login(username="comum", password="Senha!Forte123")
+        self.assertEqual(self.client.get(reverse("game:api_export", args=["games"])).status_code, 403)
+
+    def test_rolls_ndjson_e_logs_csv(self):
+        _, corpo = self._baixar("rolls")
+        rolls = [json.loads(l) for l in corpo.decode().splitlines()]
+        self.assertEqual([(r["code"], r["seq"], r["dado"], r["para"]) for r in rolls], [("EXP001", 1, 4, 4), ("EXP001", 2, 6, 10)])
+
+        resp, corpo = self._baixar("logs", formato="csv")
+        self.assertTrue(resp["Content-Type"].startswith("text/csv"))
+        linhas = corpo.decode().splitlines()
+        self.assertEqual(linhas[0], "code,rodada,order,username,texto")
+        self.assertIn('EXP001,2,0,analista,"analista rolou 4, foi da casa 0 para 4."', linhas)
+
+    def test_games_gzip_com_periodo_sem_ler_logs(self):
+        with CaptureQueriesContext(connection) as cap:
+            resp, corpo = self._baixar("games", gzip="1", desde=(timezone.now() - timedelta(days=1)).date().isoformat())
+        self.assertEqual(resp["Content-Type"], "application/gzip")
+        salas = [json.loads(l) for l in gzip.decompress(corpo).decode().splitlines()]
+        self.assertEqual([s["code"] for s in salas], ["EXP001"])
+        self.assertEqual(salas[0]["players"], [{"user_id": self.staff.id, "order": 0, "position": 4}])
+        consulta = next(q["sql"] for q in cap.captured_queries if 'FROM "game_gameroom"' in q["sql"] and "created_at" in q["sql"])
+        self.assertNotIn("log_rounds", consulta)
+
+        self.assertEqual(self.client.get(reverse("game:api_export", args=["games"]), {"desde": "ontem"}).status_code, 400)
+
+    def test_comando_e_modo_async(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            caminho = os.path.join(tmp, "games.csv.gz")
+            call_command("export_games", "games", "--format", "csv", "--until", "2000-01-01",
+                         "--output", caminho, stderr=StringIO())
+            with gzip.open(caminho, "rt") as f:
+                self.assertEqual(f.read().splitlines(), [",".join(exportacao.COLUNAS["games"])])
+
+        async def juntar():
+            return [p async for p in exportacao.assincrono(exportacao.exportar("rolls", comprimir=True))]
+        self.assertEqual(len(gzip.decompress(b"".join(async_to_sync(juntar)())).splitlines()), 2)
+
+
+# --------------------------
+# Rating multiplayer
+# --------------------------
+class RatingsTest(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f"r{i}", password="Senha!Forte123") for i in range(5)]
+        for u in self.users:
+            Profile.objects.create(user=u, nickname=u.username)
+
+    @patch("game.views.rolar_dado", return_value=3)
+    def test_fim_de_partida_atualiza_rating(self, _mock_dado):
+        a, b = self.users[:2]
+        room = GameRoom.objects.create(code="ELO001", host=a, status="active", board_size="5x5", current_turn=a)
+        GamePlayer.objects.create(room=room, user=a, order=0, position=22)
+        GamePlayer.objects.create(room=room, user=b, order=1, position=3)
+        self.client.login(username=a.username, password="Senha!Forte123")
+        self.client.post(reverse("game:api_room_move", args=[room.code]))
+
+        pa, pb = Profile.objects.get(user=a), Profile.objects.get(user=b)
+        self.assertAlmostEqual(pa.rating, 1516.0)
+        self.assertAlmostEqual(pb.rating, 1484.0)
+        self.assertEqual((pa.rated_games, pb.rated_games), (1, 1))
+
+    def _jogar_historico(self):
+        # partidas de 2 a 4 jogadores, aplicadas como no fim de partida das views
+        rnd = random.Random(9)
+        for _ in range(30):
+            grupo = rnd.sample(self.users, rnd.randint(2, 4))
+            jogadores = [(u.id, k, rnd.randint(0, 24)) for k, u in enumerate(grupo)]
+            vencedor = rnd.choice(grupo).id
+            jogadores = [(uid, k, 25 if uid == vencedor else pos) for uid, k, pos in jogadores]
+            resultados.registrar_sala("X", "5x5", 3, jogadores, vencedor)
+            perfis = {p.user_id: p for p in Profile.objects.filter(user_id__in=[j[0] for j in jogadores])}
+            ratings.apos_partida(perfis, jogadores, vencedor)
+            for p in perfis.values():
+                p.save()
+        return dict(Profile.objects.values_list("user_id", "rating"))
+
+    def test_recompute_repete_o_incremental(self):
+        incremental = self._jogar_historico()
+        self.assertAlmostEqual(sum(incremental.values()), 1500.0 * len(self.users))
+
+        caminhos = ["--python"] + ([] if ratings.np is None else [None])
+        for caminho in caminhos:
+            Profile.objects.update(rating=0, rated_games=0)
+            call_command("recompute_ratings", *([caminho] if caminho else []), stdout=StringIO(), stderr=StringIO())
+            for uid, rating in Profile.objects.values_list("user_id", "rating"):
+                self.assertAlmostEqual(rating, incremental[uid], places=6)
+
+        # outros parâmetros: --dry-run não grava
+        call_command("recompute_ratings", "--k", "64", "--dry-run", stdout=StringIO(), stderr=StringIO())
+        self.assertAlmostEqual(Profile.objects.get(user=self.users[0]).rating, incremental[self.users[0].id], places=6)
+
+    @unittest.skipIf(ratings.np is None, "NumPy não instalado")
+    def test_ondas_vetorizadas_iguais_a_sequencial(self):
+        linhas = sintetico(3000, 200, seed=4)
+        seq, jogos_seq, acertos_seq = ratings.recalcular(*linhas, vetorizado=False)
+        vet, jogos_vet, acertos_vet = ratings.recalcular(*linhas, vetorizado=True)
+        self.assertEqual((jogos_seq, acertos_seq), (jogos_vet, acertos_vet))
+        for uid, rating in seq.items():
+            self.assertAlmostEqual(vet[uid], rating, places=6)
+
+
+class ArvoresRankingTest(SimpleTestCase):
+    def test_fenwick_confere_com_soma_direta(self):
+        rnd = random.Random(3)
+        valores = [rnd.randint(0, 9) for _ in range(300)]
+        f = ranking.Fenwick.de(valores)
+        for _ in range(200):
+            i = rnd.randrange(300)
+            delta = rnd.randint(-3, 3)
+            valores[i] += delta
+            f.somar(i, delta)
+            j = rnd.randint(0, 300)
+            self.assertEqual(f.prefixo(j), sum(valores[:j]))
+
+    def test_posicao_confere_com_contagem(self):
+        rnd = random.Random(5)
+        perfis = [(rnd.choice((0, 2500, 5000, 7500, 10000)), rnd.randint(0, 6)) for _ in range(400)]
+        arv = ranking.Arvores([(bp, w, 1) for bp, w in perfis])
+        for _ in range(100):  # partidas terminando: sai do par antigo, entra no novo
+            k = rnd.randrange(len(perfis))
+            novo = (rnd.choice((0, 3333, 5000, 10000)), rnd.randint(0, 9))
+            arv.somar(*perfis[k], -1)
+            arv.somar(*novo, 1)
+            perfis[k] = novo
+        self.assertEqual(arv.total(), 400)
+        for bp, w in set(perfis):
+            self.assertEqual(arv.posicao(bp, w), 1 + sum(1 for p in perfis if p[0] > bp or (p[0] == bp and p[1] > w)))
+
+
+class PollingAsyncTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="ana", password="Senha!Forte123")
+        outro = User.objects.create_user(username="bia", password="Senha!Forte123")
+        self.client.login(username="ana", password="Senha!Forte123")
+        self.room = GameRoom.objects.create(
+            code="ASYNC1", host=self.user, status="active", is_active=True, is_public=True,
+            current_turn=outro, log_rounds=[[{"username": None, "order": None, "texto": "Sala criada."}]],
+        )
+        GamePlayer.objects.create(room=self.room, user=self.user, order=0, position=4)
+        GamePlayer.objects.create(room=self.room, user=outro, order=1, position=9)
+
+    def _async(self, view, url, *args, user=None):
+        user = user or self.user
+        request = AsyncRequestFactory().get(url)
+        request.user = user
+
+        async def auser():
+            return user
+        request.auser = auser
+        return async_to_sync(view)(request, *args)
+
+    def test_mesmas_respostas_que_as_views_sync(self):
+        for nome in ("api_room_state", "api_room_info"):
+            url = reverse(f"game:{nome}", args=[self.room.code])
+            esperado = self.client.get(url).json()
+            resp = self._async(getattr(views_async, nome), url, self.room.code)
+            self.assertEqual(json.loads(resp.content), esperado, nome)
+
+    def test_espectador_e_sala_inexistente(self):
+        caio = User.objects.create_user(username="caio", password="Senha!Forte123")
+        url = reverse("game:api_room_state", args=[self.room.code])
+        estado = json.loads(self._async(views_async.api_room_state, url, self.room.code, user=caio).content)
+        self.assertTrue(estado["spectator"])
+        with self.assertRaises(Http404):
+            self._async(views_async.api_room_state, url, "NAOHA1")
+
+    def test_lobby_lista_salas(self):
+        resp = self._async(views_async.multiplayer_lobby, reverse("game:multiplayer_lobby"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(b"ASYNC1", resp.content)
+
+    def test_middlewares_rodam_em_modo_async(self):
+        # um middleware só-sync faria o Django levar o request inteiro para uma thread
+        for caminho in settings.MIDDLEWARE:
+            if caminho == "game.slowqueries.SlowQueryMiddleware":
+                continue  # opt-in (SLOW_QUERY_LOG); mede as conexões da própria thread
+            self.assertTrue(getattr(import_string(caminho), "async_capable", False), caminho)
+
+
+class EspectadoresTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.clientes = {}
+        for nome in ("ana", "bia", "caio", "duda"):
+            User.objects.create_user(username=nome, password="Senha!Forte123")
+            c = Client()
+            c.login(username=nome, password="Senha!Forte123")
+            self.clientes[nome] = c
+        self.clientes["ana"].post(reverse("game:multiplayer_create"))
+        self.room = GameRoom.objects.get()
+        self.clientes["bia"].post(reverse("game:multiplayer_join"), {"code": self.room.code})
+        self.clientes["ana"].post(reverse("game:multiplayer_start", args=[self.room.code]))
+        GameRoom.objects.filter(pk=self.room.pk).update(board_data=b"", is_public=True)
+        self.url_estado = reverse("game:api_room_state", args=[self.room.code])
+        self.url_sala = reverse("game:multiplayer_room", args=[self.room.code])
+
+    def test_espectador_assiste_sala_publica(self):
+        resp = self.clientes["caio"].get(self.url_sala)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.context["espectador"])
+        self.assertNotContains(resp, 'id="btn-rolar-mp"')
+
+        estado = self.clientes["caio"].get(self.url_estado).json()
+        self.assertTrue(estado["spectator"])
+        self.assertIsNone(estado["you"])
+        self.assertEqual([p["username"] for p in estado["players"]], ["ana", "bia"])
+
+        # jogador continua recebendo o próprio payload, mesmo com ?espectador=1
+        estado = self.clientes["ana"].get(self.url_estado, {"espectador": 1}).json()
+        self.assertEqual(estado["you"], "ana")
+
+    def test_sala_privada_nao_tem_espectador(self):
+        GameRoom.objects.filter(pk=self.room.pk).update(is_public=False)
+        self.assertEqual(self.clientes["caio"].get(self.url_sala).status_code, 403)
+        self.assertEqual(self.clientes["caio"].get(self.url_estado).status_code, 403)
+
+    @patch("game.views.rolar_dado", return_value=3)
+    def test_snapshot_por_versao(self, _mock_dado):
+        antes = self.clientes["caio"].get(self.url_estado, {"espectador": 1}).json()
+
+        # outros espectadores na mesma versão: nada das tabelas das salas
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.clientes["duda"].get(self.url_estado, {"espectador": 1})
+        self.assertEqual(resp.json(), antes)
+        self.assertFalse([q for q in ctx.captured_queries if "game_" in q["sql"]])
+
+        vez = antes["current_turn"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clientes[vez].post(reverse("game:api_room_move", args=[self.room.code]))
+        depois = self.clientes["duda"].get(self.url_estado, {"espectador": 1}).json()
+        self.assertGreater(depois["version"], antes["version"])
+        self.assertEqual(sorted(p["position"] for p in depois["players"]), [0, 3])
+
+
+class EspectadoresUmSoTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_leva_de_requests_monta_uma_vez(self):
+        def estado_lento(code):
+            time.sleep(0.05)
+            return {"players": [{"username": "ana"}], "version": 7}, True
+
+        eventos.publicar_versao("ABC123", 7)
+        antes = espectadores.contadores["montagens"]
+        with patch("game.espectadores._estado", side_effect=estado_lento):
+            threads = [threading.Thread(target=espectadores.snapshot, args=("ABC123",)) for _ in range(20)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(espectadores.contadores["montagens"] - antes, 1)
+        self.assertEqual(json.loads(espectadores.snapshot("ABC123")["corpo"])["version"], 7)
+
+
+@override_settings(ROOM_SHARD_ALIASES=["default", "rooms_1", "rooms_2"])
+class ShardsTest(SimpleTestCase):
+    # só roteamento (sem banco); com os dois bancos de teste: ShardsBancoTest
+
+    def test_hash_do_codigo(self):
+        codigos = [f"S{i:04d}" for i in range(3000)]
+        contagem = {}
+        for code in codigos:
+            contagem[shards.shard_do_codigo(code)] = contagem.get(shards.shard_do_codigo(code), 0) + 1
+        self.assertEqual(set(contagem), {"default", "rooms_1", "rooms_2"})
+        self.assertTrue(all(800 < n < 1200 for n in contagem.values()), contagem)
+        self.assertEqual(shards.shard_do_codigo("abc123"), shards.shard_do_codigo("ABC123"))
+        self.assertEqual(shards.shard_do_codigo("ABC123", ["default"]), "default")
+
+    def test_router(self):
+        router = shards.RoomShardRouter()
+        self.assertEqual(router.db_for_write(GameRoom), "default")
+        with shards.no_shard("rooms_2"):
+            self.assertEqual(router.db_for_write(GameRoom), "rooms_2")
+            self.assertEqual(router.db_for_read(RoomEvent), "rooms_2")
+            self.assertEqual(router.db_for_read(Profile), "default")
+            sala = GameRoom(code="X")
+            sala._state.db = "rooms_1"
+            self.assertEqual(router.db_for_read(GamePlayer, instance=sala), "rooms_1")
+            self.assertEqual(router.db_for_write(GamePlayer, instance=User(pk=1)), "rooms_2")
+        self.assertTrue(router.allow_migrate("rooms_1", "game", model_name="gameplayer"))
+        self.assertFalse(router.allow_migrate("rooms_1", "game", model_name="profile"))
+        self.assertFalse(router.allow_migrate("rooms_1", "auth", model_name="user"))
+        self.assertTrue(router.allow_migrate("default", "auth", model_name="user"))
+
+    def test_manager_e_middleware(self):
+        alias = shards.shard_do_codigo("ABC123")
+        self.assertEqual(GameRoom.objects.filter(code="ABC123").db, alias)
+        sala = GameRoom(pk=7, code="ABC123")
+        sala._state.db = alias
+        self.assertEqual(GamePlayer.objects.filter(room=sala).db, alias)
+
+        vistos = []
+        mw = shards.ShardMiddleware(lambda request: vistos.append(shards.shard_atual()))
+        request = RequestFactory().get("/room/abc123/")
+        mw.process_view(request, None, (), {"code": "abc123"})
+        mw(request)
+        self.assertEqual(vistos, [alias])
+        self.assertIsNone(shards.shard_atual())
+
+    def test_benchmark_escrita(self):
+        r = medir_shards(2, escritores=2, segundos=0.2, salas=16, sincrono="OFF")
+        self.assertEqual(r["shards"], 2)
+        self.assertGreater(r["moves"], 0)
+        self.assertEqual(r["errors"], 0)
+
+
+DOIS_SHARDS = ["default", "rooms_1"]
+
+
+def _codigo_no_shard(alias, prefixo):
+    codigos = (f"{prefixo}{i:03d}" for i in range(1000))
+    return next(c for c in codigos if shards.shard_do_codigo(c, DOIS_SHARDS) == alias)
+
+
+@unittest.skipUnless("rooms_1" in settings.DATABASES, "sem o rooms_1: rode com snake_ladders.settings_test")
+@override_settings(
+    ROOM_SHARD_ALIASES=DOIS_SHARDS,
+    MIDDLEWARE=[m for m in settings.MIDDLEWARE if m != "game.shards.ShardMiddleware"]
+    + ["game.shards.ShardMiddleware"],
+)
+class ShardsBancoTest(TestCase):
+    # banco de teste de verdade para o rooms_1 (snake_ladders/settings_test.py,
+    # que o `manage.py test` usa), com o default anexado como "global" como em produção
+    # (sem ele a classe é pulada, e o runner não pode pedir o banco de teste)
+    databases = {"default", "rooms_1"} & set(settings.DATABASES)
+
+    @classmethod
+    def setUpClass(cls):
+        # a conexão do rooms_1 nasceu na criação do banco de teste, antes do
+        # override: o ATTACH do connection_created não rodou. Fora de transação.
+        # read_uncommitted: o "global" é o mesmo banco em memória (cache
+        # compartilhado) e os usuários do teste nunca são commitados
+        with connections["rooms_1"].cursor() as cursor:
+            cursor.execute("ATTACH DATABASE %s AS global", [connections["default"].settings_dict["NAME"]])
+            cursor.execute("PRAGMA read_uncommitted = 1")
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connections["rooms_1"].cursor() as cursor:
+            cursor.execute("DETACH DATABASE global")
+
+    def setUp(self):
+        self.clientes = {}
+        for nome in ("ana", "bia", "cris"):
+            User.objects.create_user(username=nome, password="Senha!Forte123")
+            c = Client()
+            c.login(username=nome, password="Senha!Forte123")
+            self.clientes[nome] = c
+
+    def _salas(self, alias):
+        return set(GameRoom.objects.using(alias).values_list("code", flat=True))
+
+    def test_sala_no_segundo_shard_do_inicio_ao_fim(self):
+        code = _codigo_no_shard("rooms_1", "SHA")
+        with patch("game.views._generate_code", return_value=code):
+            self.clientes["ana"].post(reverse("game:multiplayer_create"))
+        self.assertEqual((self._salas("rooms_1"), self._salas("default")), ({code}, set()))
+
+        # entrada pelo código do POST; convite aceito pela URL com <code>
+        self.clientes["bia"].post(reverse("game:multiplayer_join"), {"code": code})
+        self.clientes["ana"].post(reverse("game:multiplayer_invite", args=[code]), {"username": "cris"})
+        convite = RoomInvite.objects.using("rooms_1").get(invitee__username="cris")
+        resp = self.clientes["cris"].get(reverse("game:room_invite_accept", args=[code, convite.pk]))
+        self.assertRedirects(resp, reverse("game:multiplayer_room", args=[code]), fetch_redirect_response=False)
+        self.assertEqual(GamePlayer.objects.using("rooms_1").count(), 3)
+
+        # select_related("user") da sala no rooms_1 passa pelo ATTACH do default
+        lobby = self.clientes["ana"].get(reverse("game:multiplayer_room", args=[code]))
+        self.assertEqual(sorted(p.user.username for p in lobby.context["players"]), ["ana", "bia", "cris"])
+
+        self.clientes["ana"].post(reverse("game:multiplayer_start", args=[code]))
+        vez = self.clientes["bia"].get(reverse("game:api_room_state", args=[code])).json()["current_turn"]
+        resp = self.clientes[vez].post(reverse("game:api_room_move", args=[code]))
+        self.assertEqual(resp.status_code, 200)
+        with shards.na_sala(code):
+            self.assertEqual(eventos.divergencias(GameRoom.objects.get(code=code)), [])
+        self.assertFalse(RoomEvent.objects.using("default").exists())
+
+    def test_sala_no_shard_antigo_e_achada_ate_o_rebalance(self):
+        # sala de antes de ligar o segundo shard: está no default, o hash diz rooms_1
+        code = _codigo_no_shard("rooms_1", "ANT")
+        ana = User.objects.get(username="ana")
+        with shards.no_shard("default"):
+            room = GameRoom.objects.create(code=code, host=ana, status="finished", board_size="5x5")
+            GamePlayer.objects.create(room=room, user=ana, order=0, position=25)
+            eventos.registrar(room, ("join", {"user_id": ana.id, "username": "ana", "order": 0}))
+
+        with shards.na_sala(code):
+            self.assertEqual(GameRoom.objects.get(code=code).pk, room.pk)  # fallback do ShardQuerySet.get
+            self.assertEqual(shards.shard_atual(), "default")
+        info = self.clientes["ana"].get(reverse("game:api_room_info", args=[code]))
+        self.assertEqual(info.status_code, 200)
+        self.assertEqual([p["username"] for p in info.json()["players"]], ["ana"])
+
+        out = StringIO()
+        call_command("rebalance_rooms", stdout=out)
+        self.assertIn(f"{code}: default -> rooms_1", out.getvalue())
+        self.assertEqual((self._salas("rooms_1"), self._salas("default")), ({code}, set()))
+        movida = GameRoom.objects.using("rooms_1").get(code=code)
+        self.assertEqual(RoomEvent.objects.using("rooms_1").filter(room=movida).count(), 1)
+
+        info = self.clientes["ana"].get(reverse("game:api_room_info", args=[code]))
+        self.assertEqual([p["username"] for p in info.json()["players"]], ["ana"])
+
+
 # --------------------------
 # Amigos
 # --------------------------
@@ -424,3 +1981,383 @@ class FriendsFlowTest(TestCase):
 
         fr.refresh_from_db()
         self.assertEqual(fr.status, "accepted")
+
+
+# --------------------------
+# Log de queries lentas
+# --------------------------
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        fd, self.log_path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        self.addCleanup(os.remove, self.log_path)
+        self.user = User.objects.create_user(username="lento", password="pw123456")
+
+    def test_middleware_registra_view_sql_e_plano(self):
+        with override_settings(SLOW_QUERY_LOG=True, SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_FILE=self.log_path):
+            client = Client()
+            client.login(username="lento", password="pw123456")
+            resp = client.get(reverse("game:multiplayer_lobby"))
+            self.assertEqual(resp.status_code, 200)
+
+            entradas = list(ler_log(self.log_path))
+            lobby = [e for e in entradas if e["view"] == "game:multiplayer_lobby" and "game_gameroom" in e["sql"]]
+            self.assertTrue(lobby)
+            self.assertIn("%s", lobby[0]["sql"])  # SQL parametrizado, sem valores
+            self.assertTrue(any(e["plan"] for e in lobby))
+
+            out = StringIO()
+            call_command("slowqueries", stdout=out)
+            self.assertIn("game:multiplayer_lobby", out.getvalue())
+            self.assertIn("#1", out.getvalue())
+
+    def test_desligado_por_padrao(self):
+        with override_settings(SLOW_QUERY_LOG=False, SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_FILE=self.log_path):
+            self.client.get(reverse("game:tela_inicial"))
+        with open(self.log_path) as f:
+            self.assertEqual(f.read(), "")
+
+    def test_formato_agrupa_listas_in(self):
+        a = formato_da_query('SELECT * FROM t WHERE id IN (%s, %s)')
+        b = formato_da_query('SELECT  *  FROM t WHERE id IN (%s, %s, %s)')
+        self.assertEqual(a, b)
+
+
+# --------------------------
+# Benchmarks / carga (helpers)
+# --------------------------
+class BenchmarkHelpersTest(SimpleTestCase):
+    def test_percentil_interpola(self):
+        valores = [10, 1, 5, 3, 7]
+        self.assertEqual(percentil(valores, 0), 1)
+        self.assertEqual(percentil(valores, 50), 5)
+        self.assertEqual(percentil(valores, 100), 10)
+        self.assertAlmostEqual(percentil([0, 10], 95), 9.5)
+        self.assertIsNone(percentil([], 50))
+
+    def test_polling_sustentado(self):
+        self.assertTrue(sustentado(100, 100, 80.0, 1.5))
+        self.assertFalse(sustentado(90, 100, 80.0, 1.5))    # polls atrasaram
+        self.assertFalse(sustentado(100, 100, 1600.0, 1.5))  # p95 passou do intervalo
+        self.assertFalse(sustentado(100, 100, 80.0, 1.5, erros=1))
+
+    def test_coletor_separa_erros_de_lock(self):
+        c = Coletor()
+        c.registrar("api_room_move", 10.0)
+        c.registrar("api_room_move", 30.0, "sqlite_locked")
+        c.registrar("api_room_state", 2.0, "http_403")
+        c.movimentos = 1
+        rel = c.relatorio(2.0)
+        self.assertEqual(rel["requests"], 3)
+        self.assertEqual(rel["sqlite_lock_errors"], 1)
+        self.assertEqual(rel["endpoints"]["api_room_move"]["error_rate"], 0.5)
+        self.assertEqual(rel["endpoints"]["api_room_move"]["p50"], resumo_latencias([10.0, 30.0])["p50"])
+        self.assertEqual(rel["moves_per_s"], 0.5)
+
+    def test_classifica_lock_sem_depender_do_debug(self):
+        def resposta(status, corpo="", **headers):
+            resp = requests.Response()
+            resp.status_code, resp._content = status, corpo.encode()
+            resp.headers.update(headers)
+            return resp
+
+        self.assertEqual(_classificar(resposta(409, **{"X-Corrida": "locked"})), "sqlite_locked")
+        self.assertEqual(_classificar(resposta(409, **{"X-Corrida": "versao"})), "conflito_versao")
+        self.assertEqual(_classificar(resposta(409)), "http_409")
+        self.assertEqual(_classificar(resposta(500, "OperationalError: database is locked")), "sqlite_locked")
+        self.assertEqual(_classificar(resposta(500, "Server Error (500)")), "http_500")
+        self.assertIsNone(_classificar(resposta(302)))
+
+    def test_medir_reporta_tempo_e_memoria(self):
+        r = medir(lambda: [0] * 64, repeticoes=2, aquecimento=1, alvo_s=0.001)
+        self.assertGreater(r["ns_per_op_min"], 0)
+        self.assertLessEqual(r["ns_per_op_min"], r["ns_per_op_median"])
+        self.assertGreater(r["alloc_bytes_per_op"], 0)
+        self.assertGreater(r["peak_bytes"], 0)
+
+    def test_casos_de_services_executam(self):
+        nomes = set()
+        for caso in casos_bench_services():
+            caso.fn()
+            nomes.add(caso.nome.split("[")[0])
+        self.assertTrue({"rolar_dado", "mover_peao", "aplicar_cobras_escadas",
+                         "gerar_cobras_escadas", "_celulas_serpentina"} <= nomes)
+
+
+# --------------------------
+# Orçamento de queries por endpoint
+# --------------------------
+class EndpointQueryBudgetTest(TestCase):
+    def test_endpoints_dentro_do_orcamento(self):
+        semear(10)
+        ctx = preparar_contexto()
+        res = executar_suite(self.client, ctx, repeticoes=1, aquecimento=0)
+        self.assertEqual(set(res), set(QUERY_BUDGETS))
+        self.assertEqual(estouros_de_orcamento(res), [])
+
+    def test_lobby_nao_cresce_com_numero_de_salas(self):
+        semear(10)
+        ctx = preparar_contexto()
+        antes = executar_suite(self.client, ctx, 1, 0, {"multiplayer_lobby"})["multiplayer_lobby"]["queries"]
+        semear(200)
+        depois = executar_suite(self.client, ctx, 1, 0, {"multiplayer_lobby"})["multiplayer_lobby"]["queries"]
+        self.assertEqual(antes, depois)
+
+
+# --------------------------
+# Geometria do tabuleiro
+# --------------------------
+class BoardGeometryTest(SimpleTestCase):
+    def test_ordem_serpentina_e_coordenadas(self):
+        g = geometria(10, 10)
+        self.assertEqual(g.celulas[:10], tuple(range(100, 90, -1)))  # topo: 100..91
+        self.assertEqual(g.celulas[-10:], tuple(range(1, 11)))       # base: 1..10
+        self.assertEqual(g.coordenadas[1], (9, 0))
+        self.assertEqual(g.coordenadas[11], (8, 9))
+        self.assertEqual(g.ancora(1), (0.05, 0.95))
+        self.assertEqual(g.ancora(0), g.ancora(1))
+        self.assertEqual(g.casa_final, 100)
+
+    def test_memoizada_por_tamanho(self):
+        self.assertIs(geometria(5, 5), geometria(5, 5))
+        self.assertIs(grade_html(5, 5), grade_html(5, 5))
+        self.assertEqual(grade_html(5, 5).count("data-casa="), 25)
+        self.assertEqual(list(views._celulas_serpentina(5, 5)), list(geometria(5, 5).celulas))
+
+
+class BoardDataTest(TestCase):
+    def test_codificacao_binaria_ida_e_volta(self):
+        cobras, escadas = {17: 4, "64": 60, 9999: 12}, {"2": 38, 51: 67}
+        dados = codificar_pulos(cobras, escadas)
+        self.assertEqual(len(dados), 5 * 4)
+        self.assertEqual(decodificar_pulos(dados), ({17: 4, 64: 60, 9999: 12}, {2: 38, 51: 67}))
+        self.assertEqual(decodificar_pulos(b""), ({}, {}))
+
+    def test_sala_decodifica_uma_vez_e_aceita_mapas_antigos(self):
+        user = User.objects.create_user(username="bd", password="x")
+        GameRoom.objects.create(code="BIN1", host=user, snakes_map={"17": 4}, ladders_map={"2": 38})
+        sala = GameRoom.objects.get(code="BIN1")
+        with patch("game.models.decodificar_pulos", wraps=decodificar_pulos) as decod:
+            self.assertEqual(sala.snakes_map, {17: 4})
+            self.assertEqual(sala.ladders_map, {2: 38})
+            self.assertEqual(decod.call_count, 1)
+        sala.ladders_map = {3: 40}
+        self.assertEqual((sala.snakes_map, sala.ladders_map), ({17: 4}, {3: 40}))
+
+
+class BoardPageTest(TestCase):
+    def test_tabuleiro_renderiza_grid_cacheado(self):
+        session = self.client.session
+        config = _base_config()
+        session["configuracao_jogo"] = config
+        session["partida"] = _base_partida(config)
+        session.save()
+
+        resp = self.client.get(reverse("game:tela_tabuleiro"))
+        self.assertEqual(resp.status_code, 200)
+        html = resp.content.decode()
+        self.assertEqual(html.count('class="celula"'), 100)
+        self.assertIn('data-casa="100"', html)
+        self.assertIn('id="camada-overlay"', html)
+
+
+class BoardOverlayTest(TestCase):
+    def test_svg_cacheavel_com_etag(self):
+        url = overlay_url(10, 10, {"16": 6}, {2: 38})
+        chave = chave_overlay(10, 10, {16: 6}, {"2": "38"})  # chaves str/int dão o mesmo hash
+        self.assertIn(chave, url)
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Type"], "image/svg+xml")
+        self.assertIn("immutable", resp["Cache-Control"])
+        self.assertEqual(resp["ETag"], f'"{chave}"')
+        svg = resp.content.decode()
+        self.assertIn('viewBox="0 0 100 100"', svg)
+        self.assertEqual(svg.count('class="cobra"'), 1)
+        self.assertEqual(svg.count('class="escada degrau"'), 5)
+
+        resp304 = self.client.get(url, HTTP_IF_NONE_MATCH=f'"{chave}"')
+        self.assertEqual(resp304.status_code, 304)
+
+    def test_query_adulterada_da_404(self):
+        url = overlay_url(10, 10, {16: 6}, {})
+        resp = self.client.get(url.replace("16-6", "17-6"))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_so_tabuleiros_do_jogo_e_pares_limitados(self):
+        # chave válida não basta: a rota é pública e renderizaria qualquer coisa
+        self.assertEqual(self.client.get(overlay_url(100, 100, {16: 6}, {})).status_code, 404)
+        self.assertEqual(self.client.get(overlay_url(5, 10, {16: 6}, {})).status_code, 404)
+        self.assertEqual(self.client.get(overlay_url(5, 5, {16: 6}, {2: 20})).status_code, 200)
+
+        escadas = {i: i + 50 for i in range(2, 2 + OVERLAY_MAX_PARES)}
+        self.assertEqual(self.client.get(overlay_url(10, 10, {99: 1}, escadas)).status_code, 404)
+        del escadas[2]
+        self.assertEqual(self.client.get(overlay_url(10, 10, {99: 1}, escadas)).status_code, 200)
+
+
+# --------------------------
+# Pipeline de estáticos (variantes de imagem, scripts extraídos)
+# --------------------------
+class StaticPipelineTest(SimpleTestCase):
+    def tearDown(self):
+        imagens.variantes.cache_clear()
+
+    @unittest.skipUnless(formatos_disponiveis(), "Pillow sem WebP/AVIF")
+    def test_collectstatic_gera_variantes_com_hash(self):
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as origem, tempfile.TemporaryDirectory() as destino:
+            os.makedirs(os.path.join(origem, "img"))
+            Image.new("RGBA", (700, 350), (200, 40, 40, 255)).save(os.path.join(origem, "img", "foto.png"))
+            storage = OptimizedStaticFilesStorage(location=destino, base_url="/static/")
+            list(storage.post_process({"img/foto.png": (FileSystemStorage(location=origem), "img/foto.png")}))
+
+            for ext, _formato, _opcoes in formatos_disponiveis():
+                for largura in (160, 320, 640):
+                    nome = nome_variante("img/foto.png", largura, ext)
+                    self.assertTrue(storage.exists(nome), nome)
+                    self.assertNotEqual(storage.stored_name(nome), nome)  # entrou no manifest com hash
+                self.assertFalse(storage.exists(nome_variante("img/foto.png", 1280, ext)))  # não amplia
+            with storage.open(nome_variante("img/foto.png", 320, "webp")) as f:
+                self.assertEqual(Image.open(f).size, (320, 160))
+
+    def test_tag_sem_variantes_cai_no_img(self):
+        tpl = Template('{% load imagens %}{% imagem_responsiva "game/img/logo.png" alt="Logo" class="brand-logo" %}')
+        with patch.object(imagens.staticfiles_storage, "exists", return_value=False):
+            html = tpl.render(Context())
+        self.assertNotIn("<picture>", html)
+        self.assertIn('alt="Logo"', html)
+        self.assertIn('class="brand-logo"', html)
+
+    def test_tag_monta_picture_com_srcset(self):
+        with patch.object(imagens.staticfiles_storage, "exists",
+                          side_effect=lambda nome: nome.endswith((".w160.webp", ".w320.webp"))), \
+                patch.object(imagens, "static", side_effect=lambda nome: f"/static/{nome}"):
+            html = imagens.imagem_responsiva("game/img/logo.png", alt="Logo", sizes="105px")
+        self.assertEqual(
+            html,
+            '<picture><source type="image/webp" srcset="/static/game/img/logo.w160.webp 160w, '
+            '/static/game/img/logo.w320.webp 320w" sizes="105px">'
+            '<img src="/static/game/img/logo.png" alt="Logo"></picture>',
+        )
+
+    def test_relatorio_escolhe_candidato_do_srcset(self):
+        html = (
+            '<picture><source type="image/avif" srcset="/a160.avif 160w, /a320.avif 320w" '
+            'sizes="(max-width: 640px) 54px, 105px"><source type="image/webp" srcset="/w.webp 160w">'
+            '<img src="/logo.png"></picture><script src="/x.js"></script><script>var a = 1;</script>'
+        )
+        urls, n_inline, inline_bytes = coletar_assets(html, dpr=2)
+        self.assertEqual(urls, ["/a320.avif", "/x.js"])  # 105px x 2 -> 320w
+        self.assertEqual((n_inline, inline_bytes), (1, 10))
+        self.assertEqual(coletar_assets(html, dpr=1)[0][0], "/a160.avif")
+
+
+class ExtractedScriptsTest(TestCase):
+    def test_paginas_sem_script_inline_executavel(self):
+        resp = self.client.get(reverse("game:tela_inicial"))
+        self.assertNotIn("<script>", resp.content.decode())
+        self.assertIn("game/js/notificacoes", resp.content.decode())
+
+        session = self.client.session
+        config = _base_config()
+        session["configuracao_jogo"] = config
+        session["partida"] = _base_partida(config, posicoes=[3, 7])
+        session.save()
+        html = self.client.get(reverse("game:tela_tabuleiro")).content.decode()
+        self.assertNotIn("<script>", html)
+        self.assertIn("game/js/tabuleiro_single", html)
+
+        inicio = html.index('<script id="js-tabuleiro" type="application/json">')
+        bloco = html[inicio:html.index("</script>", inicio)].split(">", 1)[1]
+        dados = json.loads(bloco)
+        self.assertEqual(dados["posicoes"], [3, 7])
+        self.assertEqual(dados["casa_final"], 100)
+
+
+# --------------------------
+# Avatares (validação, miniaturas, backfill)
+# --------------------------
+def _imagem(fmt="JPEG", tamanho=(300, 200), **kwargs):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", tamanho, (30, 120, 200)).save(buffer, fmt, **kwargs)
+    return buffer.getvalue()
+
+
+class AvatarPipelineTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=self.media.name, AVATAR_SINCRONO=True)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        cache.clear()
+        url_avatar.cache_clear()
+
+        self.user = User.objects.create_user(username="ana", password="Senha!Forte123")
+        self.profile = Profile.objects.create(user=self.user, nickname="ana")
+        self.client.login(username="ana", password="Senha!Forte123")
+
+    def _enviar(self, conteudo, nome="foto.jpg"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("game:profile_avatar"), {"avatar": SimpleUploadedFile(nome, conteudo)})
+
+    def test_upload_gera_miniaturas_e_remove_metadados(self):
+        from PIL import Image
+
+        exif = Image.Exif()
+        exif[0x0112] = 6            # orientação: girar 90°
+        exif[0x010F] = "CameraX"    # fabricante
+        resp = self._enviar(_imagem(exif=exif.tobytes()), nome="minha casa.jpg")
+        self.assertRedirects(resp, reverse("game:profile"), fetch_redirect_response=False)
+
+        self.profile.refresh_from_db()
+        self.assertTrue(self.profile.avatar_key)
+        self.assertNotIn("minha casa", self.profile.avatar.name)
+        with default_storage.open(self.profile.avatar.name) as f:
+            original = Image.open(f)
+            self.assertEqual(original.size, (200, 300))   # rotação aplicada
+            self.assertEqual(dict(original.getexif()), {})
+
+        for uso, lado in TAMANHOS_AVATAR.items():
+            url = url_avatar(self.user.id, self.profile.avatar_key, uso)
+            nome = url.removeprefix("/media/")
+            with default_storage.open(nome) as f:
+                mini = Image.open(f)
+                self.assertEqual((mini.format, mini.size), ("WEBP", (lado, lado)))
+
+        html = self.client.get(reverse("game:profile")).content.decode()
+        self.assertIn(url_avatar(self.user.id, self.profile.avatar_key, "perfil"), html)
+        self.assertIn(url_avatar(self.user.id, self.profile.avatar_key, "header"), html)
+        self.assertNotIn(self.profile.avatar.name, html)  # o original nunca vai para o template
+
+    def test_upload_invalido_volta_com_erro(self):
+        self.assertEqual(self._enviar(b"nao sou imagem", nome="x.jpg").status_code, 400)
+        self.assertEqual(self._enviar(_imagem(tamanho=(20, 20))).status_code, 400)
+        with override_settings(AVATAR_MAX_BYTES=100):
+            self.assertEqual(self._enviar(_imagem()).status_code, 400)
+        self.profile.refresh_from_db()
+        self.assertFalse(self.profile.avatar)
+
+    def test_resolver_usa_cache(self):
+        outro = User.objects.create_user(username="bia", password="x")
+        Profile.objects.create(user=outro, nickname="bia", avatar_key="abc123")
+        with self.assertNumQueries(1):
+            chaves = chaves_avatar([self.user.id, outro.id])
+        self.assertEqual(chaves, {self.user.id: "", outro.id: "abc123"})
+        with self.assertNumQueries(0):
+            chaves_avatar([self.user.id, outro.id])
+        self.assertIn("avatar_padrao", url_avatar(self.user.id, "", "lista"))
+
+    def test_backfill_processa_em_lotes(self):
+        default_storage.save("avatars/antigo.png", ContentFile(_imagem("PNG", (120, 120))))
+        Profile.objects.filter(pk=self.profile.pk).update(avatar="avatars/antigo.png")
+        out = StringIO()
+        call_command("backfill_avatars", "--sync", "--batch-size", "1", stdout=out)
+        self.profile.refresh_from_db()
+        self.assertEqual(len(self.profile.avatar_key), 16)
+        self.assertIn("1 avatares processados, 0 falhas", out.getvalue())
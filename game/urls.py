@@ -1,9 +1,13 @@
 # game/urls.py
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, views_async
 
 app_name = "game"
 
+# views de polling: async sob ASGI (ASYNC_POLLING), sync como sempre sob WSGI
+polling = views_async if settings.ASYNC_POLLING else views
+
 urlpatterns = [
     # Home e Instruções
     path("", views.tela_inicial, name="tela_inicial"),
@@ -15,28 +19,43 @@ urlpatterns = [
     path("tabuleiro/", views.tela_tabuleiro, name="tela_tabuleiro"),
     path("jogar/", views.jogar_rodada, name="jogar_rodada"),
     path("reiniciar/", views.reiniciar_jogo, name="reiniciar_jogo"),
+    # singleplayer rodando no navegador (commit-reveal dos dados)
+    path("jogo/local/iniciar/", views.partida_local_iniciar, name="partida_local_iniciar"),
+    path("jogo/local/dados/", views.partida_local_dados, name="partida_local_dados"),
+    path("jogo/local/finalizar/", views.partida_local_finalizar, name="partida_local_finalizar"),
+
+    # overlay SVG de cobras/escadas (endereçado pelo conteúdo)
+    path("board/overlay/<str:chave>.svg", views.board_overlay, name="board_overlay"),
 
     # auth / perfil
     path("register/", views.register, name="register"),
     path("profile/", views.profile, name="profile"),
+    path("profile/avatar/", views.profile_avatar, name="profile_avatar"),
+    path("ranking/", views.ranking_page, name="ranking"),
 
     # multiplayer — lobby global
-    path("multiplayer/", views.multiplayer_lobby, name="multiplayer_lobby"),
+    path("multiplayer/", polling.multiplayer_lobby, name="multiplayer_lobby"),
     path("multiplayer/create/", views.multiplayer_create, name="multiplayer_create"),
     path("multiplayer/join/", views.multiplayer_join, name="multiplayer_join"),
     path("multi/<str:code>/sair/", views.multiplayer_leave, name="multiplayer_leave"),
+    path("multiplayer/rapida/", views.partida_rapida, name="partida_rapida"),
+    path("multiplayer/rapida/sair/", views.partida_rapida_sair, name="partida_rapida_sair"),
+    path("api/rapida/", views.api_partida_rapida, name="api_partida_rapida"),
 
     # sala
     path("room/<str:code>/", views.multiplayer_room, name="multiplayer_room"),
     path("room/<str:code>/config/", views.multiplayer_config, name="multiplayer_config"),
     path("room/<str:code>/invite/", views.multiplayer_invite, name="multiplayer_invite"),
     path("room/<str:code>/start/", views.multiplayer_start, name="multiplayer_start"),
-    path("api/room/<str:code>/info/", views.api_room_info, name="api_room_info"),
+    path("api/room/<str:code>/info/", polling.api_room_info, name="api_room_info"),
 
     # APIs do jogo
-    path("api/room/<str:code>/state/", views.api_room_state, name="api_room_state"),
+    path("api/room/<str:code>/state/", polling.api_room_state, name="api_room_state"),
     path("api/room/<str:code>/move/", views.api_room_move, name="api_room_move"),
 
+    # exportação para análise (staff)
+    path("api/export/<str:tipo>/", views.api_export, name="api_export"),
+
     # Amigos
     path("friends/", views.friends_page, name="friends_page"),
     path("friends/add/", views.friend_add, name="friend_add"),
@@ -50,12 +69,12 @@ urlpatterns = [
     ),
 
     path(
-        "multi/invites/<int:pk>/accept/",
+        "multi/<str:code>/invites/<int:pk>/accept/",
         views.room_invite_accept,
         name="room_invite_accept",
     ),
     path(
-        "multi/invites/<int:pk>/reject/",
+        "multi/<str:code>/invites/<int:pk>/reject/",
         views.room_invite_reject,
         name="room_invite_reject",
     ),
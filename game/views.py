@@ -1,19 +1,38 @@
 # game/views.py
 import json
+import os
 import random
 import string
+import uuid
+from functools import wraps
 
 from django.contrib.auth import login, get_user_model
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponseForbidden, Http404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, HttpResponseForbidden, Http404, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
-from django.views.decorators.http import require_POST
-from django.db.models import Q
-
-from .forms import RegisterForm
+from django.views.decorators.http import etag, require_GET, require_POST
+from django.db import OperationalError
+from django.db.models import Count, F, Q
+
+from . import (
+    espectadores, estado_single, eventos, exportacao, partida_local, prazos, presenca, ranking, ratings, resultados,
+    rng, salas_quentes, shards,
+)
+from . import partida_rapida as fila
+from .avatars import agendar_processamento, avatares_dos_usuarios, url_avatar
+from .board import (
+    OVERLAY_MAX_PARES, OVERLAY_TABULEIROS, chave_overlay, codificar_pulos, decodificar_pares, geometria, grade_html,
+    overlay_svg, overlay_url,
+)
+from .forms import AvatarForm, RegisterForm
 from .models import GameRoom, GamePlayer, FriendRequest, RoomInvite, Profile
-from .services import rolar_dado, mapa_cobras_escadas, mover_peao, gerar_cobras_escadas_sem_overlaps
+from .services import (
+    aplicar_jogada, nova_partida, rolar_dado, mapa_cobras_escadas, mover_peao, gerar_cobras_escadas_sem_overlaps,
+)
 
 User = get_user_model()
 
@@ -23,15 +42,61 @@ def _generate_code(size=6):
     return "".join(random.choice(chars) for _ in range(size))
 
 def _celulas_serpentina(linhas: int, colunas: int):
-    resultado = []
-    for visual_row in range(linhas):
-        row_from_bottom = linhas - 1 - visual_row
-        even = (row_from_bottom % 2 == 0)
-        for col in range(colunas):
-            n = (row_from_bottom * colunas + (col + 1)) if even \
-                else (row_from_bottom * colunas + (colunas - col))
-            resultado.append(n)
-    return resultado
+    # memoizado por tamanho em game.board
+    return geometria(linhas, colunas).celulas
+
+def _overlay_do_request(request, chave):
+    """(linhas, colunas, cobras, escadas) da query do overlay, ou Http404 se não bater com a chave."""
+    c, e = request.GET.get("c", ""), request.GET.get("e", "")
+    # conta os pares antes de decodificar: query gigante não vira lista gigante
+    if sum(t.count(".") + 1 for t in (c, e) if t) > OVERLAY_MAX_PARES:
+        raise Http404("Overlay inválido.")
+    try:
+        linhas, colunas = (int(x) for x in request.GET.get("b", "").split("x"))
+        cobras = decodificar_pares(c)
+        escadas = decodificar_pares(e)
+    except ValueError:
+        raise Http404("Overlay inválido.")
+    casa_final = linhas * colunas
+    casas = [c for par in cobras + escadas for c in par]
+    if (linhas, colunas) not in OVERLAY_TABULEIROS or any(not 0 < c <= casa_final for c in casas):
+        raise Http404("Overlay inválido.")
+    if chave_overlay(linhas, colunas, cobras, escadas) != chave:
+        raise Http404("Overlay inválido.")
+    return linhas, colunas, cobras, escadas
+
+def _perdeu_corrida(exc):
+    # VersaoConflitante: outro escritor gravou eventos da sala depois que ela
+    # foi lida (game/eventos.py). "locked": no SQLite quem leu antes do outro
+    # escrever não consegue mais escrever na mesma transação.
+    return isinstance(exc, eventos.VersaoConflitante) or (
+        isinstance(exc, OperationalError) and "locked" in str(exc)
+    )
+
+def _resposta_corrida(resp, exc):
+    # X-Corrida diz ao loadtest (game/benchmarks/loadtest.py) qual corrida foi
+    # perdida: "locked" (SQLite) ou "versao" (VersaoConflitante), sem DEBUG
+    resp["X-Corrida"] = "versao" if isinstance(exc, eventos.VersaoConflitante) else "locked"
+    return resp
+
+def _repetir_se_perdeu_corrida(view, tentativas=3):
+    """
+    shards.atomico que roda a view de novo (transação nova, sala relida) se
+    ela perdeu a corrida para outro escritor da mesma sala; esgotadas as
+    tentativas, 409 em vez de 500.
+    """
+    @wraps(view)
+    def envolvida(request, *args, **kwargs):
+        for _ in range(tentativas):
+            try:
+                with shards.atomico():
+                    return view(request, *args, **kwargs)
+            except (eventos.VersaoConflitante, OperationalError) as exc:
+                if not _perdeu_corrida(exc):
+                    raise
+                perdida = exc
+        return _resposta_corrida(HttpResponse("A sala mudou ao mesmo tempo; tente de novo.", status=409), perdida)
+    return envolvida
 
 # --------- telas simples ---------
 def tela_inicial(request):
@@ -40,6 +105,15 @@ def tela_inicial(request):
 def tela_instrucoes(request):
     return render(request, "game/instrucoes.html")
 
+# o conteúdo é imutável para uma chave: ETag = chave, cache "para sempre"
+@require_GET
+@etag(lambda request, chave: chave)
+def board_overlay(request, chave):
+    svg = overlay_svg(*_overlay_do_request(request, chave))
+    resp = HttpResponse(svg, content_type="image/svg+xml")
+    resp["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
+
 # --------- singleplayer ---------
 @require_POST
 def iniciar_contra_maquina(request):
@@ -53,7 +127,7 @@ def iniciar_contra_maquina(request):
         linhas = colunas = 10
         casa_final = 100
 
-    request.session["configuracao_jogo"] = {
+    estado_single.configurar(request, {
         "modo": "contra_maquina",
         "linhas": linhas,
         "colunas": colunas,
@@ -61,48 +135,33 @@ def iniciar_contra_maquina(request):
         "qtd_maquinas": qtd_maquinas,
         "qtd_humanos": 1,
         "qtd_total_jogadores": 1 + qtd_maquinas,
-    }
+    })
     return redirect("game:novo_jogo")
 
 def novo_jogo(request):
-    config = request.session.get("configuracao_jogo")
+    config, _partida, _fluxo = estado_single.carregar(request)
     if not config:
         return redirect("game:tela_inicial")
 
     casa_final = config["casa_final"]
     cobras, escadas = mapa_cobras_escadas(casa_final)
-    posicoes = [0] * config["qtd_total_jogadores"]
-
-    request.session["partida"] = {
-        "status": "andamento",
-        "jogador_atual": 0,
-        "posicoes": posicoes,
-        "ultimo_dado": None,
-        "mensagem": "Partida iniciada.",
-        "cobras": cobras,
-        "escadas": escadas,
-        "streak_seis": [0] * len(posicoes),
-        "log": ["Partida iniciada."],
-        "rodada_atual": 1,
-        "log_rodadas": [[{"jogador": None, "texto": "Partida iniciada."}]],
-        "ultimo_movimento": None,
-    }
-    request.session.modified = True
+    partida = nova_partida(config["qtd_total_jogadores"], cobras, escadas)
+    estado_single.comecar(request, config, partida, rng.FluxoDados(rng.novo_seed()))
     return redirect("game:tela_tabuleiro")
 
 def tela_tabuleiro(request):
-    config = request.session.get("configuracao_jogo")
-    partida = request.session.get("partida")
+    config, partida, _fluxo = estado_single.carregar(request)
     if not config or not partida:
         return redirect("game:tela_inicial")
 
-    celulas = _celulas_serpentina(config["linhas"], config["colunas"])
-
     contexto = {
         "modo": "single",
         "config": config,
         "partida": partida,
-        "celulas": celulas,
+        "grade_html": grade_html(config["linhas"], config["colunas"]),
+        "overlay_url": overlay_url(
+            config["linhas"], config["colunas"], partida.get("cobras", {}), partida.get("escadas", {})
+        ),
         "eh_humano_a_vez": partida["jogador_atual"] == 0 and partida["status"] != "finalizado",
         "json_posicoes": mark_safe(json.dumps(partida.get("posicoes", []))),
         "json_cobras": mark_safe(json.dumps(partida.get("cobras", {}))),
@@ -113,126 +172,64 @@ def tela_tabuleiro(request):
         "json_casa_final": mark_safe(json.dumps(config.get("casa_final", 100))),
         "log_rodadas": partida.get("log_rodadas", []),
         "rodada_atual": partida.get("rodada_atual", 1),
+        # compromisso da partida local em andamento (o JS retoma do sessionStorage)
+        "local_commit": (request.session.get("partida_local") or {}).get("commit", ""),
     }
     return render(request, "game/tabuleiro.html", contexto)
 
+def _profile_do_usuario(request):
+    try:
+        return request.user.profile
+    except Profile.DoesNotExist:
+        return Profile.objects.create(user=request.user, nickname=request.user.username)
+
+def _registrar_resultado_single(request, config, partida):
+    if not request.user.is_authenticated:
+        return
+    with ranking.atualizando([request.user.id]):
+        profile = _profile_do_usuario(request)
+        profile.total_games += 1
+        if partida["ultimo_movimento"]["jogador"] == 0:
+            profile.wins += 1
+        else:
+            profile.losses += 1
+        profile.save()
+        resultados.registrar_single(
+            request.user, partida, f"{config['linhas']}x{config['colunas']}", config["qtd_total_jogadores"],
+        )
+
 @require_POST
 def jogar_rodada(request):
-    config = request.session.get("configuracao_jogo")
-    partida = request.session.get("partida")
+    # fora da sessão (game/estado_single.py): a jogada não carrega nem regrava o django_session
+    config, partida, fluxo = estado_single.carregar(request)
     if not config or not partida or partida.get("status") == "finalizado":
         return redirect("game:tela_inicial")
 
     casa_final = config["casa_final"]
-    i = partida["jogador_atual"]
-    dado = rolar_dado()
-
-    posicoes = partida["posicoes"]
-    pos_atual = posicoes[i]
     cobras = {int(k): int(v) for k, v in partida.get("cobras", {}).items()}
     escadas = {int(k): int(v) for k, v in partida.get("escadas", {}).items()}
 
-    streak = partida.setdefault("streak_seis", [0] * len(posicoes))
-    if dado == 6:
-        streak[i] += 1
-    else:
-        streak[i] = 0
-
-    if streak[i] >= 3:
-        streak[i] = 0
-        pre_salto = None
-        posicoes[i] = 0
-        destino_final = 0
-        mensagem = f"Jogador {i+1} tirou 6 três vezes seguidas e foi penalizado: volta ao início."
-
-        partida["posicoes"] = posicoes
-        partida["ultimo_dado"] = dado
-        partida["mensagem"] = mensagem
-        partida.setdefault("log", []).append(mensagem)
-        partida.setdefault("log_rodadas", [[]])
-        if not partida["log_rodadas"]:
-            partida["log_rodadas"] = [[]]
-        partida["log_rodadas"][-1].append({"jogador": i, "texto": mensagem})
-        partida["ultimo_movimento"] = {"jogador": i, "de": pos_atual, "para": destino_final, "dado": dado, "pre_salto": pre_salto}
-
-        proximo = (i + 1) % len(posicoes)
-        partida["jogador_atual"] = proximo
-        if proximo == 0:
-            partida["rodada_atual"] = partida.get("rodada_atual", 1) + 1
-            partida["log_rodadas"].append([])
-
-        request.session["partida"] = partida
-        request.session.modified = True
-        return redirect("game:tela_tabuleiro")
+    def jogar():
+        movimento = aplicar_jogada(partida, rolar_dado(fluxo), casa_final, cobras, escadas)
+        return {**movimento, "mensagem": partida["mensagem"]}
 
-    destino_bruto = pos_atual + dado
-    if destino_bruto == casa_final:
-        pre_salto = destino_bruto
-        destino_final = destino_bruto
-    elif destino_bruto < casa_final:
-        pre_salto = destino_bruto
-        destino_final = mover_peao(pos_atual, dado, casa_final, cobras, escadas)
-    else:
-        over = destino_bruto - casa_final
-        bounced = casa_final - over
-        pre_salto = bounced
-        destino_final = bounced
-        if destino_final in escadas:
-            destino_final = escadas[destino_final]
-        elif destino_final in cobras:
-            destino_final = cobras[destino_final]
+    movimentos = [jogar()]
+    # lote=1: resolve aqui mesmo as jogadas das máquinas que vêm em seguida
+    # (incluindo os 6 repetidos), até voltar a vez do humano ou acabar a partida
+    if request.POST.get("lote") == "1":
+        while partida["status"] != "finalizado" and partida["jogador_atual"] != 0:
+            movimentos.append(jogar())
 
-    tipo_extra = ""
-    if pre_salto is not None and destino_final != pre_salto:
-        tipo_extra = " (subiu por escada)" if destino_final > pre_salto else " (desceu por cobra)"
+    if partida["status"] == "finalizado":
+        _registrar_resultado_single(request, config, partida)
 
-    mensagem = f"Jogador {i+1} rolou {dado} e foi da casa {pos_atual} para {destino_final}{tipo_extra}."
-    if destino_final == casa_final:
-        partida["status"] = "finalizado"
-        mensagem += f" Jogador {i+1} venceu!"
-        if request.user.is_authenticated:
-            try:
-                profile = request.user.profile
-            except Profile.DoesNotExist:
-                profile = Profile.objects.create(user=request.user, nickname=request.user.username)
-
-            profile.total_games += 1
-            if i == 0:
-                profile.wins += 1
-            else:
-                profile.losses += 1
-            profile.save()
-
-    posicoes[i] = destino_final
-    partida["posicoes"] = posicoes
-    partida["ultimo_dado"] = dado
-    partida["mensagem"] = mensagem
-    partida.setdefault("log", []).append(mensagem)
-    partida.setdefault("log_rodadas", [[]])
-    if not partida["log_rodadas"]:
-        partida["log_rodadas"] = [[]]
-    partida["log_rodadas"][-1].append({"jogador": i, "texto": mensagem})
-
-    partida["ultimo_movimento"] = {"jogador": i, "de": pos_atual, "para": destino_final, "dado": dado, "pre_salto": pre_salto}
-
-    if partida["status"] != "finalizado":
-        if dado == 6:
-            partida["jogador_atual"] = i
-            partida["mensagem"] += " Tirou 6 e joga novamente!"
-        else:
-            proximo = (i + 1) % len(posicoes)
-            partida["jogador_atual"] = proximo
-            if proximo == 0:
-                partida["rodada_atual"] = partida.get("rodada_atual", 1) + 1
-                partida["log_rodadas"].append([])
-
-    request.session["partida"] = partida
-    request.session.modified = True
+    estado_single.salvar(request, partida, fluxo)
 
     if request.headers.get("x-requested-with") == "XMLHttpRequest":
         return JsonResponse({
             "posicoes": partida["posicoes"],
             "ultimo_movimento": partida.get("ultimo_movimento"),
+            "movimentos": movimentos,
             "status": partida.get("status", "andamento"),
             "jogador_atual": partida.get("jogador_atual", 0),
             "ultimo_dado": partida.get("ultimo_dado"),
@@ -244,9 +241,89 @@ def jogar_rodada(request):
     return redirect("game:tela_tabuleiro")
 
 
+# --------- singleplayer local (dados comprometidos, ver game/partida_local.py) ---------
+def _partida_nova(partida):
+    return bool(partida) and partida.get("status") == "andamento" and partida.get("ultimo_movimento") is None
+
+@require_POST
+def partida_local_iniciar(request):
+    config, partida, _fluxo = estado_single.carregar(request)
+    if not config or not partida:
+        return JsonResponse({"ok": False, "error": "Nenhuma partida configurada."}, status=400)
+    # só assume partidas ainda sem jogadas (o tabuleiro desenhado na tela é o mesmo)
+    if not _partida_nova(partida):
+        return JsonResponse({"ok": False, "error": "Partida já em andamento no servidor."}, status=409)
+
+    local = partida_local.iniciar(
+        config["qtd_total_jogadores"], config["casa_final"], partida["cobras"], partida["escadas"],
+    )
+    # o login mantém a sessão anônima: o finalizar só conta para quem levou a derrota provisória
+    local["user_id"] = request.user.id if request.user.is_authenticated else None
+    request.session["partida_local"] = local
+
+    # conta como derrota até o finalizar verificado: abandonar a partida não compensa
+    if request.user.is_authenticated:
+        with ranking.atualizando([request.user.id]):
+            profile = _profile_do_usuario(request)
+            Profile.objects.filter(pk=profile.pk).update(
+                total_games=F("total_games") + 1, losses=F("losses") + 1,
+            )
+
+    return JsonResponse({
+        "ok": True,
+        "commit": local["commit"],
+        "dados": partida_local.dados(local["seed"]),
+        "partida": partida,
+        "casa_final": local["casa_final"],
+    })
+
+@require_GET
+def partida_local_dados(request):
+    local = request.session.get("partida_local")
+    if not local:
+        return JsonResponse({"ok": False, "error": "Nenhuma partida local em andamento."}, status=400)
+    try:
+        inicio = int(request.GET.get("de", "0"))
+    except ValueError:
+        inicio = -1
+    if not 0 <= inicio <= partida_local.MAX_JOGADAS:
+        return JsonResponse({"ok": False, "error": "Parâmetro 'de' inválido."}, status=400)
+    return JsonResponse({"ok": True, "de": inicio, "dados": partida_local.dados(local["seed"], inicio)})
+
+@require_POST
+def partida_local_finalizar(request):
+    local = request.session.get("partida_local")
+    if not local:
+        return JsonResponse({"ok": False, "error": "Nenhuma partida local em andamento."}, status=400)
+    try:
+        jogadas = json.loads(request.body or b"{}").get("jogadas")
+    except (ValueError, AttributeError):
+        return JsonResponse({"ok": False, "error": "JSON inválido."}, status=400)
+
+    # uma tentativa só: depois da revelação o seed não vale mais nada
+    del request.session["partida_local"]
+    revelacao = {"seed": local["seed"], "commit": local["commit"]}
+    try:
+        partida = partida_local.verificar(local, jogadas)
+    except partida_local.PartidaInvalida as e:
+        return JsonResponse({"ok": False, "error": str(e), **revelacao}, status=400)
+
+    vencedor = partida["ultimo_movimento"]["jogador"]
+    if request.user.is_authenticated and local.get("user_id") == request.user.id:
+        with ranking.atualizando([request.user.id]):
+            if vencedor == 0:
+                Profile.objects.filter(user=request.user).update(wins=F("wins") + 1, losses=F("losses") - 1)
+            resultados.registrar_single(
+                request.user, partida, "5x5" if local["casa_final"] == 25 else "10x10", local["jogadores"],
+                modo="local",
+            )
+    estado_single.salvar(request, partida)
+
+    return JsonResponse({"ok": True, "vencedor": vencedor, "jogadas": len(jogadas), **revelacao})
+
+
 def reiniciar_jogo(request):
-    if "partida" in request.session:
-        del request.session["partida"]
+    estado_single.descartar(request)
     return redirect("game:novo_jogo")
 
 # --------- registro/perfil ---------
@@ -261,8 +338,7 @@ def register(request):
         form = RegisterForm()
     return render(request, "game/register.html", {"form": form})
 
-@login_required
-def profile(request):
+def _contexto_perfil(request, avatar_form=None):
     # Estatísticas
     profile = getattr(request.user, "profile", None)
     total = profile.total_games if profile else 0
@@ -286,6 +362,9 @@ def profile(request):
         status="accepted"
     ).select_related("requester", "addressee")
 
+    # histórico paginado por chave (?antes=<cursor>, ver game/resultados.py)
+    historico, proxima = resultados.pagina(request.user, request.GET.get("antes"))
+
     contexto = {
         "profile_obj": profile,
         "stats": {
@@ -293,26 +372,114 @@ def profile(request):
             "wins": wins,
             "losses": losses,
             "win_rate": win_rate,
+            "rating": round(profile.rating) if profile and profile.rated_games else None,
         },
         "incoming": incoming,
         "outgoing": outgoing,
         "friends": friends,
+        "historico": historico,
+        "historico_proxima": proxima,
+        "historico_pagina_inicial": "antes" in request.GET,
+        "por_tabuleiro": resultados.por_tabuleiro(request.user),
+        "avatar_form": avatar_form or AvatarForm(),
+        "avatar_url": url_avatar(request.user.id, profile.avatar_key if profile else "", "perfil"),
+        "avatar_processando": bool(profile and profile.avatar and not profile.avatar_key),
     }
-    return render(request, "game/profile.html", contexto)
+    return contexto
+
+
+@login_required
+def profile(request):
+    return render(request, "game/profile.html", _contexto_perfil(request))
+
+
+@login_required
+@require_POST
+def profile_avatar(request):
+    profile = get_object_or_404(Profile, user=request.user)
+    form = AvatarForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return render(request, "game/profile.html", _contexto_perfil(request, form), status=400)
+
+    arquivo = form.cleaned_data["avatar"]
+    ext = os.path.splitext(arquivo.name)[1].lower() or ".img"
+    anterior = profile.avatar.name if profile.avatar else None
+    # nome do arquivo do usuário não vai para o disco
+    profile.avatar.save(f"{request.user.id}-{uuid.uuid4().hex[:10]}{ext}", arquivo, save=False)
+    profile.save(update_fields=["avatar"])
+    if anterior:
+        profile.avatar.storage.delete(anterior)
+    # miniaturas saem no pool de threads; até lá o header continua com o avatar anterior
+    agendar_processamento(profile.pk)
+    return redirect("game:profile")
+
+
+def ranking_page(request):
+    # top-N de todo mundo ou só os amigos (?amigos=1); posições vêm de game/ranking.py
+    amigos = request.GET.get("amigos") == "1" and request.user.is_authenticated
+    linhas = ranking.dos_amigos(request.user) if amigos else ranking.top(50)
+    return render(request, "game/ranking.html", {
+        "linhas": linhas,
+        "amigos": amigos,
+        "minha": ranking.posicao(request.user) if request.user.is_authenticated else None,
+    })
 
 
 # --------- multiplayer: lobby global ---------
+# (chave no contexto, status, quantas salas)
+LISTAS_LOBBY = (("public_rooms", "lobby", 30), ("live_rooms", "active", 10))
+
+def _busca_lobby(limite, ocultar):
+    # escondendo as vazias, busca a mais para ainda encher a lista
+    return limite * 3 if ocultar else limite
+
+def _contexto_lobby(salas, online, ocultar):
+    """Anota room.online (game/presenca.py) e, se pedido, tira as salas sem ninguém online."""
+    contexto = {"ocultar_vazias": ocultar}
+    for nome, _status, limite in LISTAS_LOBBY:
+        lista = salas[nome]
+        for room in lista:
+            room.online = online.get(room.code, 0)
+        if ocultar:
+            lista = [room for room in lista if room.online]
+        contexto[nome] = lista[:limite]
+    return contexto
+
 @login_required
 def multiplayer_lobby(request):
-    # lista de salas públicas em lobby
-    public_rooms = GameRoom.objects.filter(status="lobby", is_public=True).order_by("-created_at")[:30]
-    return render(request, "game/multiplayer_lobby.html", {"public_rooms": public_rooms})
+    # salas públicas em lobby (para entrar) e em andamento (para assistir)
+    ocultar = presenca.ocultar_vazias(request.GET.get("ocultar_vazias"))
+    salas = {nome: _salas_publicas(status, _busca_lobby(limite, ocultar)) for nome, status, limite in LISTAS_LOBBY}
+    online = presenca.contagens([r.code for lista in salas.values() for r in lista])
+    return render(request, "game/multiplayer_lobby.html", _contexto_lobby(salas, online, ocultar))
+
+def _salas_publicas(status, limite):
+    # de todos os shards, as `limite` mais novas
+    return _mais_novas(shards.em_todos(lambda alias: list(_consulta_salas_publicas(alias, status, limite))), limite)
+
+def _consulta_salas_publicas(alias, status, limite):
+    return (
+        GameRoom.objects.using(alias).filter(status=status, is_public=True, is_active=True)
+        .select_related("host")
+        .annotate(num_players=Count("players"))
+        .order_by("-created_at")[:limite]
+    )
+
+def _mais_novas(por_shard, limite):
+    if len(por_shard) == 1:
+        return por_shard[0]
+    return sorted((r for lista in por_shard for r in lista), key=lambda r: r.created_at, reverse=True)[:limite]
 
 @login_required
 def multiplayer_create(request):
     if request.method != "POST":
         return HttpResponseForbidden("Método inválido")
     code = _generate_code()
+    with shards.na_sala(code), shards.atomico():
+        _criar_sala(request, code)
+    return redirect("game:multiplayer_room", code=code)
+
+def _criar_sala(request, code):
     room = GameRoom.objects.create(
         code=code,
         host=request.user,
@@ -323,17 +490,88 @@ def multiplayer_create(request):
         round_number=1,
     )
     GamePlayer.objects.create(room=room, user=request.user, order=0)
-    return redirect("game:multiplayer_room", code=code)
+    eventos.registrar(room, ("join", {"user_id": request.user.id, "username": request.user.username, "order": 0}))
 
+# --------- multiplayer: partida rápida (game/partida_rapida.py) ---------
 @login_required
+def partida_rapida(request):
+    if request.method != "POST":
+        # tela de espera; sem lugar na fila, volta para o lobby
+        situacao = fila.situacao(request.user)
+        if situacao["status"] != "waiting":
+            return redirect("game:multiplayer_lobby")
+        return render(request, "game/partida_rapida.html", {"situacao": situacao})
+
+    board_size = request.POST.get("board_size", "10x10")
+    try:
+        party_size = int(request.POST.get("party_size", 2))
+    except ValueError:
+        party_size = 0
+    if board_size not in fila.TABULEIROS or party_size not in fila.JOGADORES:
+        return HttpResponse("Opções inválidas.", status=400)
+
+    ticket_id, grupos = fila.entrar(request.user, board_size, party_size)
+    minha_sala = None
+    for grupo in grupos:
+        code = _abrir_sala_rapida(board_size, party_size, grupo)
+        if any(e.ticket_id == ticket_id for e in grupo):
+            minha_sala = code
+    if minha_sala:
+        return redirect("game:multiplayer_room", code=minha_sala)
+    return redirect("game:partida_rapida")
+
+def _abrir_sala_rapida(board_size, party_size, grupo):
+    # sala pública já com o grupo inteiro (em lote) e iniciada como no multiplayer_start
+    code = _generate_code()
+    try:
+        with shards.na_sala(code), shards.atomico():
+            room = GameRoom.objects.create(
+                code=code,
+                host_id=grupo[0].user_id,
+                board_size=board_size,
+                is_public=True,
+                status="lobby",
+                log_rounds=[[{"username": None, "order": None, "texto": "Sala criada pela partida rápida."}]],
+                round_number=1,
+            )
+            GamePlayer.objects.bulk_create([
+                GamePlayer(room=room, user_id=e.user_id, order=i) for i, e in enumerate(grupo)
+            ])
+            eventos.registrar(room, *[
+                ("join", {"user_id": e.user_id, "username": e.username, "order": i}) for i, e in enumerate(grupo)
+            ])
+            _iniciar_sala(room)
+    except Exception:
+        fila.devolver(grupo, (board_size, party_size))
+        raise
+    fila.casados(grupo, code)
+    return code
+
+@login_required
+@require_POST
+def partida_rapida_sair(request):
+    fila.sair(request.user)
+    return redirect("game:multiplayer_lobby")
+
+@login_required
+def api_partida_rapida(request):
+    situacao = fila.situacao(request.user)
+    if situacao["status"] == "matched":
+        situacao["url"] = reverse("game:multiplayer_room", args=[situacao["room_code"]])
+    return JsonResponse(situacao)
+
+@login_required
+@_repetir_se_perdeu_corrida
 def multiplayer_join(request):
     if request.method != "POST":
         return HttpResponseForbidden("Método inválido")
     code = (request.POST.get("code") or "").upper().strip()
+    salas_quentes.descarregar(code)
     room = get_object_or_404(GameRoom, code=code, status__in=["lobby", "active"], is_active=True)
     if not room.players.filter(user=request.user).exists():
         order = room.players.count()
         GamePlayer.objects.create(room=room, user=request.user, order=order)
+        eventos.registrar(room, ("join", {"user_id": request.user.id, "username": request.user.username, "order": order}))
     return redirect("game:multiplayer_room", code=code)
 
 @login_required
@@ -343,7 +581,10 @@ def multiplayer_room(request, code):
     # Enquanto em lobby, exibe tela de lobby da sala
     if room.status == "lobby":
         invites = room.invites.select_related("invitee").order_by("-created_at")
-        players = room.players.select_related("user").order_by("order")
+        players = list(room.players.select_related("user").order_by("order"))
+        avatares = avatares_dos_usuarios([p.user_id for p in players])
+        for p in players:
+            p.avatar_url = avatares[p.user_id]
         return render(request, "game/multiplayer_room_lobby.html", {
             "room": room,
             "invites": invites,
@@ -351,14 +592,17 @@ def multiplayer_room(request, code):
         })
 
     # Quando ativa, renderiza o mesmo tabuleiro do single, só que com 'modo=multi'
+    players = list(room.players.select_related("user").order_by("order"))
+    # quem não joga assiste (só em sala pública)
+    espectador = all(p.user_id != request.user.id for p in players)
+    if espectador and not room.is_public:
+        return HttpResponseForbidden("Sala privada.")
+
     linhas = colunas = 10 if room.board_size == "10x10" else 5
     casa_final = 100 if room.board_size == "10x10" else 25
-    celulas = _celulas_serpentina(linhas, colunas)
 
-    cobras = {int(k): int(v) for k, v in (room.snakes_map or {}).items()}
-    escadas = {int(k): int(v) for k, v in (room.ladders_map or {}).items()}
+    cobras, escadas = room.snakes_map, room.ladders_map
 
-    players = list(room.players.select_related("user").order_by("order"))
     posicoes = [p.position for p in players]
     try:
         idx_turno = next(i for i, p in enumerate(players) if room.current_turn_id == p.user_id)
@@ -368,8 +612,10 @@ def multiplayer_room(request, code):
     contexto = {
         "modo": "multi",
         "room": room,
+        "espectador": espectador,
         "config": {"linhas": linhas, "colunas": colunas, "casa_final": casa_final},
-        "celulas": celulas,
+        "grade_html": grade_html(linhas, colunas),
+        "overlay_url": overlay_url(linhas, colunas, cobras, escadas),
         "json_posicoes": mark_safe(json.dumps(posicoes)),
         "json_cobras": mark_safe(json.dumps(cobras)),
         "json_escadas": mark_safe(json.dumps(escadas)),
@@ -410,6 +656,7 @@ def multiplayer_invite(request, code):
 
 @login_required
 @require_POST
+@_repetir_se_perdeu_corrida
 def multiplayer_start(request, code):
     room = get_object_or_404(GameRoom, code=code, is_active=True)
     if room.host_id != request.user.id:
@@ -418,30 +665,53 @@ def multiplayer_start(request, code):
     if room.status != "lobby":
         return redirect("game:multiplayer_room", code=code)
 
+    _iniciar_sala(room)
+    return redirect("game:multiplayer_room", code=code)
+
+def _iniciar_sala(room):
+    # também usado pela partida rápida, quando o grupo fecha
     casa_final = 100 if room.board_size == "10x10" else 25
     cobras, escadas = gerar_cobras_escadas_sem_overlaps(casa_final, qtd_cobras=5, qtd_escadas=5)
-    room.snakes_map = {str(k): int(v) for k, v in cobras.items()}
-    room.ladders_map = {str(k): int(v) for k, v in escadas.items()}
+    room.board_data = codificar_pulos(cobras, escadas)
 
     # define o turno inicial como o jogador de ordem 0
     first = room.players.order_by("order").first()
-    room.current_turn = first.user if first else request.user
+    room.current_turn_id = first.user_id if first else room.host_id
+    room.dice_seed, room.dice_offset = rng.novo_seed(), 0
     room.status = "active"
+    room.turn_deadline, room.auto_moves = prazos.novo_prazo(), 0
+    eventos.registrar(room, ("start", {
+        "board": bytes(room.board_data).hex(), "dice_seed": room.dice_seed, "vez": room.current_turn_id,
+    }))
     room.save()
-    return redirect("game:multiplayer_room", code=code)
+    prazos.agendar_apos_commit(room.code, room.turn_deadline)
 
 @login_required
+@_repetir_se_perdeu_corrida
 def multiplayer_leave(request, code):
+    salas_quentes.descarregar(code)
     room = get_object_or_404(GameRoom, code=code)
 
     # Remove o jogador desta sala
-    GamePlayer.objects.filter(room=room, user=request.user).delete()
+    saindo = GamePlayer.objects.filter(room=room, user=request.user).values_list("order", flat=True).first()
+    removidos, _ = GamePlayer.objects.filter(room=room, user=request.user).delete()
+    historico = [("leave", {"user_id": request.user.id})] if removidos else []
 
     # Se não sobrou ninguém, pode encerrar ou deletar a sala
     if not room.players.exists():   # se 'players' for related_name
         room.is_active = False
+        if room.status != "finished":
+            historico.append(("finish", {"vencedor": None}))
         room.status = "finished"
+        eventos.registrar(room, *historico)
         room.save()
+    elif room.status == "active" and room.current_turn_id == request.user.id and saindo is not None:
+        # saiu na própria vez: a sala não fica esperando por ele
+        _passar_vez(room, list(room.players.order_by("order")), saindo, historico)
+        eventos.registrar(room, *historico)
+        room.save()
+    else:
+        eventos.registrar(room, *historico)
 
     return redirect("game:tela_inicial")
 
@@ -449,14 +719,53 @@ def multiplayer_leave(request, code):
 @login_required
 def api_room_info(request, code):
     room = get_object_or_404(GameRoom, code=code, is_active=True)
-    players = [{"username": p.user.username, "order": p.order} for p in room.players.select_related("user").order_by("order")]
-    return JsonResponse({"status": room.status, "players": players, "code": room.code, "is_public": room.is_public})
+    jogadores = list(room.players.select_related("user").order_by("order"))
+    avatares = avatares_dos_usuarios([p.user_id for p in jogadores])
+    players = [
+        {"username": p.user.username, "order": p.order, "avatar": avatares[p.user_id]}
+        for p in jogadores
+    ]
+    data = {"status": room.status, "players": players, "code": room.code, "is_public": room.is_public}
+    if any(p["username"] == request.user.username for p in players):
+        vivos = presenca.marcar(room.code, request.user.username)
+    else:
+        vivos = presenca.online(room.code)
+    return JsonResponse(_com_online(data, vivos))
+
+def _com_online(data, vivos):
+    # quem dos jogadores está olhando a sala agora (game/presenca.py)
+    for p in data["players"]:
+        p["online"] = p["username"] in vivos
+    data["online_count"] = sum(p["online"] for p in data["players"])
+    return data
 
 # ----- APIs de estado e jogada (multi em jogo) -----
+def _resposta_espectador(snap):
+    # um corpo JSON por (sala, versão), o mesmo para todos os espectadores
+    if snap is None:
+        raise Http404("Sala não encontrada.")
+    if not snap["publica"]:
+        return HttpResponseForbidden("Sala privada.")
+    return HttpResponse(snap["corpo"], content_type="application/json")
+
 @login_required
 def api_room_state(request, code):
+    prazos.garantir_apos_commit()
+    if request.GET.get("espectador"):
+        # tabuleiro aberto como espectador: nem toca no banco se o snapshot existe
+        snap = espectadores.snapshot(code)
+        if snap is None or request.user.username not in snap["jogadores"]:
+            return _resposta_espectador(snap)
+    if salas_quentes.ativo():
+        data = salas_quentes.estado_api(code, request.user.username)
+        if data is not None:
+            if all(p["username"] != request.user.username for p in data["players"]):
+                return _resposta_espectador(espectadores.snapshot(code))
+            return JsonResponse(_com_online(data, presenca.marcar(code, request.user.username)))
     room = get_object_or_404(GameRoom, code=code, is_active=True)
-    players = room.players.select_related("user").order_by("order")
+    players = list(room.players.select_related("user").order_by("order"))
+    if all(p.user_id != request.user.id for p in players):
+        return _resposta_espectador(espectadores.snapshot(code))
     data = {
         "room_code": room.code,
         "current_turn": room.current_turn.username if room.current_turn else None,
@@ -465,27 +774,89 @@ def api_room_state(request, code):
         "is_active": room.is_active and room.status == "active",
         "log_rounds": room.log_rounds or [],
         "round_number": room.round_number,
+        "version": room.state_version,
+        "turn_deadline": room.turn_deadline.isoformat() if room.turn_deadline else None,
     }
-    return JsonResponse(data)
+    return JsonResponse(_com_online(data, presenca.marcar(room.code, request.user.username)))
+
+def _registrar_resultado_sala(room_id, vencedor_id):
+    # só os ids vêm do shard da sala; usuários/perfis direto do default (um JOIN
+    # pelo ATTACH prenderia o arquivo default até o fim da transação da sala)
+    jogadores = list(GamePlayer.objects.filter(room_id=room_id).values_list("user_id", "order", "position"))
+    code, board_size, rodadas = GameRoom.objects.filter(pk=room_id).values_list(
+        "code", "board_size", "round_number",
+    ).get()
+    user_ids = [user_id for user_id, _, _ in jogadores]
+    with ranking.atualizando(user_ids):
+        resultados.registrar_sala(code, board_size, rodadas, jogadores, vencedor_id)
+        perfis = {}
+        for user in User.objects.filter(pk__in=user_ids).select_related("profile"):
+            try:
+                perfis[user.id] = user.profile
+            except Profile.DoesNotExist:
+                perfis[user.id] = Profile.objects.create(user=user, nickname=user.username)
+
+        ratings.apos_partida(perfis, jogadores, vencedor_id)
+        for user_id, profile in perfis.items():
+            profile.total_games += 1
+            if user_id == vencedor_id:
+                profile.wins += 1
+            else:
+                profile.losses += 1
+            profile.save()
 
 @login_required
 def api_room_move(request, code):
     if request.method != "POST":
         return HttpResponseForbidden("Método inválido")
+    try:
+        with shards.atomico():
+            status, payload = _jogar_na_sala(code, request.user)
+    except (eventos.VersaoConflitante, OperationalError) as exc:
+        # outra jogada (ou o worker de prazos) chegou antes: o dado desta não
+        # vale, o cliente relê o estado — repetir aqui jogaria duas vezes
+        if not _perdeu_corrida(exc):
+            raise
+        return _resposta_corrida(
+            JsonResponse({"ok": False, "error": "A sala mudou; atualize e tente de novo."}, status=409), exc,
+        )
+    if status == 403:
+        return HttpResponseForbidden("Não é seu turno!")
+    return JsonResponse(payload, status=status)
+
+def _jogar_na_sala(code, user, automatica=False):
+    """
+    Uma jogada de `user` na sala: (http_status, payload; None no 403). Corpo do
+    api_room_move e da jogada automática de turno vencido (jogar_turno_vencido),
+    que vai sempre pelo banco. Chame dentro da transação do shard da sala.
+    """
+    if salas_quentes.ativo() and not automatica:
+        # sala ativa em memória (game/salas_quentes.py); None = segue pelo banco
+        resultado = salas_quentes.jogar(code, user, rolar_dado)
+        if resultado is not None:
+            status, payload, room_id = resultado
+            if status == 200 and payload.get("finished"):
+                _registrar_resultado_sala(room_id, user.id)
+            return status, payload
+
     room = get_object_or_404(GameRoom, code=code, is_active=True)
     if room.status != "active":
-        return JsonResponse({"ok": False, "error": "A partida não está ativa."}, status=400)
-    if room.current_turn != request.user:
-        return HttpResponseForbidden("Não é seu turno!")
+        return 400, {"ok": False, "error": "A partida não está ativa."}
+    if room.current_turn_id != user.id:
+        return 403, None
 
-    player = room.players.get(user=request.user)
+    # sem select_related: com shards o JOIN com auth_user passa pelo ATTACH e prende
+    # o arquivo default até o fim da transação (o Profile é gravado nela)
+    players = list(room.players.order_by("order"))
+    player = next(p for p in players if p.user_id == user.id)
 
     casa_final = 25 if room.board_size == "5x5" else 100
-    cobras = {int(k): int(v) for k, v in (room.snakes_map or {}).items()}
-    escadas = {int(k): int(v) for k, v in (room.ladders_map or {}).items()}
+    cobras, escadas = room.snakes_map, room.ladders_map
 
     pos_atual = player.position
-    dado = rolar_dado()
+    fluxo = rng.fluxo_da_sala(room)
+    dado = rolar_dado(fluxo)
+    room.dice_offset = fluxo.offset
 
     destino_bruto = pos_atual + dado
     if destino_bruto == casa_final:
@@ -512,38 +883,25 @@ def api_room_move(request, code):
     tipo_extra = ""
     if pre_salto is not None and destino_final != pre_salto:
         tipo_extra = " (subiu por escada)" if destino_final > pre_salto else " (desceu por cobra)"
-    texto = f"{request.user.username} rolou {dado} e foi da casa {pos_atual} para {destino_final}{tipo_extra}."
+    texto = f"{user.username} rolou {dado} e foi da casa {pos_atual} para {destino_final}{tipo_extra}."
+    if automatica:
+        texto = "Tempo esgotado: " + texto
 
-    # identificamos a ordem do jogador para colorir no front
-    order_map = {p.user_id: p.order for p in room.players.all()}
-    log_rounds[-1].append({"username": request.user.username, "order": order_map.get(request.user.id, 0), "texto": texto})
+    # a ordem do jogador colore o log no front
+    log_rounds[-1].append({"username": user.username, "order": player.order, "texto": texto})
 
     winner = None
     finished = False
     if destino_final == casa_final:
         finished = True
-        winner = request.user.username
+        winner = user.username
         room.status = "finished"
         log_rounds[-1].append({"username": None, "order": None, "texto": f"{winner} venceu!"})
-
-        for gp in room.players.select_related("user"):
-            user = gp.user
-            try:
-                profile = user.profile
-            except Profile.DoesNotExist:
-                profile = Profile.objects.create(user=user, nickname=user.username)
-
-            profile.total_games += 1
-            if user.username == winner:
-                profile.wins += 1
-            else:
-                profile.losses += 1
-            profile.save()
+        _registrar_resultado_sala(room.pk, user.id)
 
     next_turn_username = None
     if not finished:
-        players = list(room.players.select_related("user").order_by("order"))
-        current_index = [i for i, p in enumerate(players) if p.user_id == request.user.id][0]
+        current_index = [i for i, p in enumerate(players) if p.user_id == user.id][0]
         if dado == 6:
             next_player = player
         else:
@@ -555,9 +913,21 @@ def api_room_move(request, code):
         next_turn_username = next_player.user.username
 
     room.log_rounds = log_rounds
+    room.turn_deadline = None if finished else prazos.novo_prazo()
+    room.auto_moves = room.auto_moves + 1 if automatica else 0
+    jogada = {"user_id": user.id, "dado": dado, "de": pos_atual, "para": destino_final, "pre_salto": pre_salto}
+    if automatica:
+        jogada["auto"] = True
+    historico = [("roll", jogada)]
+    if finished:
+        historico.append(("finish", {"vencedor": user.id}))
+    else:
+        historico.append(("turn", {"vez": room.current_turn_id, "rodada": room.round_number}))
+    eventos.registrar(room, *historico)
     room.save()
+    prazos.agendar_apos_commit(room.code, room.turn_deadline)
 
-    return JsonResponse({
+    return 200, {
         "ok": True,
         "dice": dado,
         "new_position": destino_final,
@@ -565,7 +935,61 @@ def api_room_move(request, code):
         "finished": finished,
         "winner": winner,
         "next_turn": next_turn_username,
-    })
+    }
+
+def _passar_vez(room, players, ordem, historico):
+    """Vez para o próximo jogador depois da `ordem` (de quem saiu da sala; -1 = o primeiro)."""
+    proximo = next((p for p in players if p.order > ordem), players[0])
+    log_rounds = room.log_rounds or [[]]
+    log_rounds[-1].append({"username": None, "order": None, "texto": f"Vez passada para {proximo.user.username}."})
+    if proximo.order <= ordem:
+        room.round_number = (room.round_number or 1) + 1
+        log_rounds.append([])
+    room.log_rounds = log_rounds
+    room.current_turn_id = proximo.user_id
+    room.turn_deadline = prazos.novo_prazo()
+    historico.append(("turn", {"vez": proximo.user_id, "rodada": room.round_number}))
+    prazos.agendar_apos_commit(room.code, room.turn_deadline)
+
+def jogar_turno_vencido(code, agora=None):
+    """
+    Turno vencido (game/prazos.py). Se o prazo gravado ainda é o que venceu —
+    ninguém jogou nesse meio-tempo —, joga pelo jogador da vez pelo mesmo
+    caminho do api_room_move; se ele não está mais na sala, passa a vez; com
+    TURN_ABANDON_AFTER rodadas seguidas só de jogadas automáticas, encerra a
+    sala sem vencedor. O prazo novo é agendado no commit; devolve o gravado
+    quando ele ainda não venceu (para reagendar), senão None.
+    """
+    agora = agora or timezone.now()
+    # o que só está na memória vai para o banco antes da conferência
+    salas_quentes.descarregar(code)
+    with shards.na_sala(code), shards.atomico():
+        room = GameRoom.objects.filter(code=code, is_active=True, status="active").first()
+        if room is None or room.turn_deadline is None:
+            return None
+        if room.turn_deadline > agora:
+            return room.turn_deadline
+
+        players = list(room.players.order_by("order"))
+        if not players:
+            return None
+        vez = next((p for p in players if p.user_id == room.current_turn_id), None)
+        if vez is None:
+            historico = []
+            _passar_vez(room, players, -1, historico)
+            eventos.registrar(room, *historico)
+            room.save()
+        elif room.auto_moves >= prazos.limite_automaticas(len(players)):
+            room.status = "finished"
+            room.turn_deadline = None
+            log_rounds = room.log_rounds or [[]]
+            log_rounds[-1].append({"username": None, "order": None, "texto": "Partida encerrada: ninguém jogou."})
+            room.log_rounds = log_rounds
+            eventos.registrar(room, ("finish", {"vencedor": None}))
+            room.save()
+        else:
+            _jogar_na_sala(code, vez.user, automatica=True)
+    return None
 
 # --------- amigos ---------
 @login_required
@@ -573,7 +997,7 @@ def friends_page(request):
     incoming = FriendRequest.objects.filter(addressee=request.user, status="pending").select_related("requester")
     outgoing = FriendRequest.objects.filter(requester=request.user, status="pending").select_related("addressee")
     friends = FriendRequest.objects.filter(
-        models.Q(requester=request.user) | models.Q(addressee=request.user),
+        Q(requester=request.user) | Q(addressee=request.user),
         status="accepted"
     ).select_related("requester", "addressee")
     return render(request, "game/friends.html", {
@@ -629,18 +1053,51 @@ def friend_request_reject(request, pk):
     return redirect("game:profile")
 
 @login_required
-def room_invite_accept(request, pk):
-    inv = get_object_or_404(RoomInvite, pk=pk, invitee=request.user, status="pending")
+@_repetir_se_perdeu_corrida
+def room_invite_accept(request, code, pk):
+    inv = get_object_or_404(RoomInvite, pk=pk, room__code=code, invitee=request.user, status="pending")
     room = inv.room
     # adiciona o usuário como jogador da sala
-    GamePlayer.objects.get_or_create(room=room, user=request.user)
+    gp, criado = GamePlayer.objects.get_or_create(room=room, user=request.user)
+    if criado:
+        eventos.registrar(room, ("join", {"user_id": request.user.id, "username": request.user.username, "order": gp.order}))
     inv.status = "accepted"
     inv.save()
     return redirect("game:multiplayer_room", code=room.code)
 
 @login_required
-def room_invite_reject(request, pk):
-    inv = get_object_or_404(RoomInvite, pk=pk, invitee=request.user, status="pending")
+def room_invite_reject(request, code, pk):
+    inv = get_object_or_404(RoomInvite, pk=pk, room__code=code, invitee=request.user, status="pending")
     inv.status = "rejected"
     inv.save()
-    return redirect("game:profile")
\ No newline at end of file
+    return redirect("game:profile")
+
+
+# --------- exportação para análise (staff) ---------
+@login_required
+@require_GET
+def api_export(request, tipo):
+    # ?formato=ndjson|csv &gzip=1 &desde=/&ate= (data ou ISO, pelo created_at); ver game/exportacao.py
+    if not request.user.is_staff:
+        return HttpResponseForbidden("Só para a equipe.")
+    formato = request.GET.get("formato", "ndjson")
+    if tipo not in exportacao.TIPOS or formato not in exportacao.FORMATOS:
+        return JsonResponse({"ok": False, "error": "Tipo ou formato inválido."}, status=400)
+    try:
+        desde = exportacao.ler_momento(request.GET.get("desde"))
+        ate = exportacao.ler_momento(request.GET.get("ate"), fim=True)
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+
+    comprimir = request.GET.get("gzip") == "1"
+    pedacos = exportacao.exportar(tipo, formato, desde, ate, comprimir)
+    if isinstance(request, ASGIRequest):
+        pedacos = exportacao.assincrono(pedacos)
+    nome = f"{tipo}.{formato}" + (".gz" if comprimir else "")
+    resp = StreamingHttpResponse(
+        pedacos,
+        content_type="application/gzip" if comprimir else
+        ("text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson"),
+    )
+    resp["Content-Disposition"] = f'attachment; filename="{nome}"'
+    return resp
@@ -0,0 +1,110 @@
+# game/views_async.py
+"""
+Versões async das views de polling (api_room_state, api_room_info e
+multiplayer_lobby), servidas quando ASYNC_POLLING está ligado — o
+snake_ladders/asgi.py liga. Sob WSGI o urls.py segue com as de views.py.
+
+O ORM async do Django ainda roda o SQL na thread do sync_to_async, mas o
+worker não fica preso: enquanto um poll espera o banco (ou o cliente), o
+event loop atende os outros. Respostas e queries são as mesmas das views sync.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+
+from . import espectadores, prazos, presenca, salas_quentes, shards
+from .avatars import avatares_dos_usuarios
+from .models import GameRoom
+from .views import (
+    LISTAS_LOBBY, _busca_lobby, _com_online, _consulta_salas_publicas, _contexto_lobby, _mais_novas,
+    _resposta_espectador,
+)
+
+User = get_user_model()
+
+
+async def _sala_ativa(code):
+    try:
+        return await GameRoom.objects.aget(code=code, is_active=True)
+    except GameRoom.DoesNotExist:
+        raise Http404("Sala não encontrada.")
+
+
+# --------- multiplayer: lobby global ---------
+async def _salas_publicas(status, limite):
+    async def salas(alias):
+        return [r async for r in _consulta_salas_publicas(alias, status, limite)]
+    return _mais_novas(await shards.aem_todos(salas), limite)
+
+
+@login_required
+async def multiplayer_lobby(request):
+    # o auser() do login_required não preenche o request.user (lazy, sync) que
+    # os context processors leem: sem isso o usuário seria buscado de novo
+    request.user = await request.auser()
+    ocultar = presenca.ocultar_vazias(request.GET.get("ocultar_vazias"))
+    salas = {
+        nome: await _salas_publicas(status, _busca_lobby(limite, ocultar)) for nome, status, limite in LISTAS_LOBBY
+    }
+    online = await presenca.acontagens([r.code for lista in salas.values() for r in lista])
+    contexto = _contexto_lobby(salas, online, ocultar)
+    # template + context processors (consultas sync) numa ida só à thread
+    return await sync_to_async(render)(request, "game/multiplayer_lobby.html", contexto)
+
+
+# ----- APIs de estado (multi) -----
+@login_required
+async def api_room_info(request, code):
+    room = await _sala_ativa(code)
+    jogadores = [p async for p in room.players.select_related("user").order_by("order")]
+    avatares = await sync_to_async(avatares_dos_usuarios)([p.user_id for p in jogadores])
+    players = [
+        {"username": p.user.username, "order": p.order, "avatar": avatares[p.user_id]}
+        for p in jogadores
+    ]
+    data = {"status": room.status, "players": players, "code": room.code, "is_public": room.is_public}
+    user = await request.auser()
+    if any(p["username"] == user.username for p in players):
+        vivos = await presenca.amarcar(room.code, user.username)
+    else:
+        vivos = await presenca.aonline(room.code)
+    return JsonResponse(_com_online(data, vivos))
+
+
+@login_required
+async def api_room_state(request, code):
+    user = await request.auser()
+    if not prazos.rodando():
+        await sync_to_async(prazos.garantir_apos_commit)()
+    if request.GET.get("espectador"):
+        snap = await espectadores.asnapshot(code)
+        if snap is None or user.username not in snap["jogadores"]:
+            return _resposta_espectador(snap)
+    if salas_quentes.ativo():
+        # pode carregar a sala do banco na primeira vez
+        data = await sync_to_async(salas_quentes.estado_api)(code, user.username)
+        if data is not None:
+            if all(p["username"] != user.username for p in data["players"]):
+                return _resposta_espectador(await espectadores.asnapshot(code))
+            return JsonResponse(_com_online(data, await presenca.amarcar(code, user.username)))
+    room = await _sala_ativa(code)
+    players = [p async for p in room.players.select_related("user").order_by("order")]
+    if all(p.user_id != user.id for p in players):
+        return _resposta_espectador(await espectadores.asnapshot(code))
+    vez = None
+    if room.current_turn_id is not None:
+        vez = (await User.objects.aget(pk=room.current_turn_id)).username
+    data = {
+        "room_code": room.code,
+        "current_turn": vez,
+        "players": [{"username": p.user.username, "position": p.position, "order": p.order} for p in players],
+        "you": user.username,
+        "is_active": room.is_active and room.status == "active",
+        "log_rounds": room.log_rounds or [],
+        "round_number": room.round_number,
+        "version": room.state_version,
+        "turn_deadline": room.turn_deadline.isoformat() if room.turn_deadline else None,
+    }
+    return JsonResponse(_com_online(data, await presenca.amarcar(room.code, user.username)))
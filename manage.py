@@ -6,7 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'snake_ladders.settings')
+    # a suíte roda com o segundo shard das salas (snake_ladders/settings_test.py)
+    padrao = 'snake_ladders.settings_test' if sys.argv[1:2] == ['test'] else 'snake_ladders.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', padrao)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
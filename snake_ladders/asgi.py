@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'snake_ladders.settings')
+# api_room_state / api_room_info / multiplayer_lobby em versão async
+# (game/views_async.py). Ex.: uvicorn snake_ladders.asgi:application
+os.environ.setdefault('ASYNC_POLLING', '1')
 
 application = get_asgi_application()
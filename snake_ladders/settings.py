@@ -79,18 +79,24 @@ INSTALLED_APPS = [
 # ---------- Middleware ----------
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "game.storage.StaticFilesMiddleware",  # WhiteNoise, também em modo async
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "game.slowqueries.SlowQueryMiddleware",  # só ativo com SLOW_QUERY_LOG=1
 ]
 
-# ---------- URLs / WSGI ----------
+# ---------- URLs / WSGI / ASGI ----------
 ROOT_URLCONF = "snake_ladders.urls"
 WSGI_APPLICATION = "snake_ladders.wsgi.application"
+ASGI_APPLICATION = "snake_ladders.asgi.application"
+# views de polling async (game/views_async.py); o snake_ladders/asgi.py liga
+# sozinho. Sob WSGI fica desligado: lá cada view async custaria um event loop.
+# O SLOW_QUERY_LOG é um middleware só-sync: ligado, o request todo volta a uma thread.
+ASYNC_POLLING = os.getenv("ASYNC_POLLING", "0") == "1"
 
 # ---------- Templates ----------
 TEMPLATES = [
@@ -124,6 +130,23 @@ DATABASES = {
     }
 }
 
+# ---------- Shards das salas (game/shards.py) ----------
+# ROOM_SHARDS=N espalha salas/jogadores/convites/eventos por N arquivos SQLite
+# (o shard 0 é o próprio default); usuários, perfis e amizades ficam no default.
+# Cada shard novo precisa de `manage.py migrate --database rooms_<i>`; depois de
+# mudar o N, `manage.py rebalance_rooms` leva as salas finalizadas para o shard certo.
+ROOM_SHARDS = max(1, int(os.getenv("ROOM_SHARDS", "1")))
+ROOM_SHARD_ALIASES = ["default"] + [f"rooms_{i}" for i in range(1, ROOM_SHARDS)]
+for _alias in ROOM_SHARD_ALIASES[1:]:
+    DATABASES[_alias] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": str(Path(DB_NAME).with_name(f"{_alias}.sqlite3")),
+    }
+if ROOM_SHARDS > 1:
+    DATABASE_ROUTERS = ["game.shards.RoomShardRouter"]
+    MIDDLEWARE.insert(MIDDLEWARE.index("django.contrib.sessions.middleware.SessionMiddleware"),
+                      "game.shards.ShardMiddleware")
+
 # ---------- Senhas ----------
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -143,10 +166,19 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"         # onde collectstatic escreve
 STATICFILES_DIRS = [BASE_DIR / "static"]       # seus assets locais
 
+# ---------- Uploads (avatares) ----------
+# Em produção o /media/ é servido pelo servidor web (mapeamento do PythonAnywhere)
+MEDIA_URL = "/media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
 # ---------- STORAGES ----------
 STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
     "staticfiles": {
-        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+        # manifest + compressão do WhiteNoise, e variantes WebP/AVIF das imagens
+        "BACKEND": "game.storage.OptimizedStaticFilesStorage",
     }
 }
 
@@ -162,7 +194,102 @@ LOGGING = {
         "console": {"class": "logging.StreamHandler"},
     },
     "root": {"handlers": ["console"], "level": LOG_LEVEL},
+    "loggers": {
+        # o Pillow loga cada plugin/chunk em DEBUG (barulho no collectstatic)
+        "PIL": {"level": "INFO"},
+    },
+}
+
+# ---------- Log de queries lentas (opt-in) ----------
+# SLOW_QUERY_LOG=1 liga o middleware; relatório com `python manage.py slowqueries`
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "0") == "1"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "50"))
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", str(BASE_DIR / "slow_queries.jsonl"))
+
+# ---------- Avatares ----------
+# Miniaturas geradas num pool de threads; AVATAR_SINCRONO=1 processa no próprio request
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", str(5 * 1024 * 1024)))
+AVATAR_MAX_LADO = int(os.getenv("AVATAR_MAX_LADO", "4096"))
+AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", "2"))
+AVATAR_SINCRONO = os.getenv("AVATAR_SINCRONO", "0") == "1"
+
+# ---------- Histórico das salas ----------
+# snapshot do estado a cada N eventos (reconstruir custa no máximo ~N eventos)
+ROOM_SNAPSHOT_EVERY = int(os.getenv("ROOM_SNAPSHOT_EVERY", "50"))
+ROOM_ARCHIVE_DIR = os.getenv("ROOM_ARCHIVE_DIR", str(BASE_DIR / "arquivo_salas"))
+
+# ---------- Salas ativas em memória (game/salas_quentes.py) ----------
+# só com um processo (runserver / gunicorn --workers 1 --threads N)
+HOT_ROOMS = os.getenv("HOT_ROOMS", "0") == "1"
+HOT_ROOM_FLUSH_MOVES = int(os.getenv("HOT_ROOM_FLUSH_MOVES", "20"))
+HOT_ROOM_FLUSH_SECONDS = float(os.getenv("HOT_ROOM_FLUSH_SECONDS", "2"))
+HOT_ROOM_JOURNAL = os.getenv("HOT_ROOM_JOURNAL", str(BASE_DIR / "hot_rooms.journal"))
+HOT_ROOM_FSYNC = os.getenv("HOT_ROOM_FSYNC", "0") == "1"
+
+# ---------- Prazo de turno (game/prazos.py) ----------
+# segundos para o jogador da vez jogar antes do dado automático; 0 (padrão)
+# desliga. Ligado, cada processo web sobe a thread do worker (TURN_WORKER) e
+# salas paradas passam a ser jogadas — e encerradas — sozinhas.
+TURN_TIMEOUT = float(os.getenv("TURN_TIMEOUT", "0"))
+# rodadas seguidas só de jogadas automáticas que encerram a sala sem vencedor
+TURN_ABANDON_AFTER = int(os.getenv("TURN_ABANDON_AFTER", "3"))
+# thread (worker em cada processo web) | off (só o `manage.py run_turn_deadlines`)
+TURN_WORKER = os.getenv("TURN_WORKER", "thread")
+TURN_WHEEL_TICK = float(os.getenv("TURN_WHEEL_TICK", "1"))
+# cada worker relê do banco os prazos que vencem logo (processo reiniciado, outros processos)
+TURN_RESYNC_SECONDS = float(os.getenv("TURN_RESYNC_SECONDS", "30"))
+
+# ---------- Presença nas salas (game/presenca.py) ----------
+# heartbeats só no cache: com mais de um processo, aponte para um cache compartilhado.
+# Cache próprio (CACHES["presence"], uma entrada por sala): no LocMem padrão, de
+# 300 entradas, o descarte derrubaria a presença de salas com gente olhando
+PRESENCE_CACHE = os.getenv("PRESENCE_CACHE", "presence")
+# sem poll há tanto tempo = offline; cada processo regrava o heartbeat no máximo a cada REFRESH
+PRESENCE_TTL = float(os.getenv("PRESENCE_TTL", "30"))
+PRESENCE_REFRESH = float(os.getenv("PRESENCE_REFRESH", "10"))
+# o lobby esconde salas sem ninguém online (o ?ocultar_vazias=0|1 troca por request)
+LOBBY_HIDE_EMPTY = os.getenv("LOBBY_HIDE_EMPTY", "0") == "1"
+
+# ---------- Espectadores (game/espectadores.py) ----------
+# um snapshot JSON por (sala, versão) no cache, compartilhado por todos os espectadores
+SPECTATOR_SNAPSHOT_TTL = int(os.getenv("SPECTATOR_SNAPSHOT_TTL", "60"))
+# versão publicada a cada jogada; TTL curto porque o LocMem é por processo
+SPECTATOR_VERSION_TTL = float(os.getenv("SPECTATOR_VERSION_TTL", "2"))
+# quanto um request espera outro processo remontar o snapshot antes de remontar junto
+SPECTATOR_WAIT = float(os.getenv("SPECTATOR_WAIT", "0.5"))
+
+# ---------- Estado do singleplayer (game/estado_single.py) ----------
+# cache_banco (padrão) | cache | banco | sessao (tudo no django_session, como antes)
+SINGLEPLAYER_STORE = os.getenv("SINGLEPLAYER_STORE", "cache_banco")
+SINGLEPLAYER_CACHE = os.getenv("SINGLEPLAYER_CACHE", "singleplayer")
+# cache próprio: o LocMem padrão guarda só 300 entradas, e cada partida usa 2.
+# Com mais de um processo, troque por um cache compartilhado (Redis/Memcached)
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "singleplayer": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "singleplayer",
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("SINGLEPLAYER_CACHE_ENTRIES", "20000"))},
+    },
+    "presence": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "presence",
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("PRESENCE_CACHE_ENTRIES", "20000"))},
+    },
 }
+# no cache_banco, o banco recebe a partida a cada N dados (e no começo/fim)
+SINGLEPLAYER_DB_EVERY = int(os.getenv("SINGLEPLAYER_DB_EVERY", "10"))
+
+# ---------- Ranking (game/ranking.py) ----------
+# cada processo recarrega as árvores do ranking (RankBucket) depois disso, para
+# pegar o que os outros processos gravaram
+RANKING_TTL = float(os.getenv("RANKING_TTL", "30"))
+
+# ---------- Rating multiplayer (game/ratings.py) ----------
+# mudou algum? `manage.py recompute_ratings` refaz todos a partir do histórico
+RATING_INICIAL = float(os.getenv("RATING_INICIAL", "1500"))
+RATING_K = float(os.getenv("RATING_K", "32"))
+RATING_ESCALA = float(os.getenv("RATING_ESCALA", "400"))
 
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "game:tela_inicial"
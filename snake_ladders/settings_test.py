@@ -0,0 +1,15 @@
+"""
+Settings da suíte de testes (o manage.py usa com `test`): as de sempre, mais
+o rooms_1 e o router das salas, para o ShardsBancoTest ter um banco de teste
+de verdade no segundo shard. O router deixa nele só as tabelas de sala; com um
+shard só (ROOM_SHARD_ALIASES) manda tudo para o default e ninguém abre conexão
+no rooms_1. Um deploy de um shard só continua com o DATABASES que configurou.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, DB_NAME, Path
+
+DATABASES.setdefault("rooms_1", {
+    "ENGINE": "django.db.backends.sqlite3",
+    "NAME": str(Path(DB_NAME).with_name("rooms_1.sqlite3")),
+})
+DATABASE_ROUTERS = ["game.shards.RoomShardRouter"]
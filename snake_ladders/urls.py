@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
@@ -6,3 +8,6 @@ urlpatterns = [
     path("", include("game.urls")),
     path("", include("django.contrib.auth.urls")),  # login/logout/password
 ]
+
+# uploads servidos pelo Django só em dev (static() não faz nada com DEBUG=False)
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
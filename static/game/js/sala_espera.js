@@ -0,0 +1,65 @@
+// Sala em lobby: atualiza a lista de jogadores e recarrega quando a partida começa
+(function () {
+  const infoUrl = document.currentScript.dataset.infoUrl;
+  if (!infoUrl) return;
+
+  const poll = setInterval(async () => {
+    try {
+      const r = await fetch(infoUrl);
+      const data = await r.json();
+      if (data.status === "active") {
+        clearInterval(poll);
+        location.reload();
+        return;
+      }
+
+      const ul = document.getElementById("room-players");
+      const countSpan = document.getElementById("room-player-count");
+
+      if (!ul) return;
+      ul.innerHTML = "";
+
+      // atualiza texto da contagem mesmo se não tiver players
+      const qtd = (data.players && data.players.length) ? data.players.length : 0;
+      if (countSpan) {
+        countSpan.textContent = `${qtd}/4 jogadores`;
+      }
+
+      if (!data.players || !data.players.length) {
+        const li = document.createElement("li");
+        li.className = "muted";
+        li.textContent = "Nenhum jogador conectado ainda.";
+        ul.appendChild(li);
+        return;
+      }
+
+      data.players.forEach(p => {
+        const li = document.createElement("li");
+        li.className = "room-player-item";
+
+        if (p.avatar) {
+          const img = document.createElement("img");
+          img.className = "avatar-mini";
+          img.src = p.avatar;
+          img.alt = "";
+          img.width = img.height = 32;
+          li.appendChild(img);
+        }
+
+        if (p.is_host) {
+          const badge = document.createElement("span");
+          badge.className = "badge-host";
+          badge.textContent = "Host";
+          li.appendChild(badge);
+        }
+
+        const nameSpan = document.createElement("span");
+        nameSpan.textContent = p.username;
+        li.appendChild(nameSpan);
+        ul.appendChild(li);
+      });
+    } catch (e) {
+      console.error(e);
+    }
+  }, 1500);
+})();
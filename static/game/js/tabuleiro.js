@@ -22,13 +22,14 @@
   const COLS = parseInt(grid.dataset.colunas, 10) || 10;
 
   // Lê dados do backend com segurança
-  const POSICOES   = getJSON("js-posicoes", []);
-  const COBRAS     = getJSON("js-cobras", {});
-  const ESCADAS    = getJSON("js-escadas", {});
-  const ULT        = getJSON("js-ultimo-mov", null);
-  const STATUS     = getJSON("js-status", "andamento");
-  const JOG_ATUAL  = getJSON("js-jogador-atual", 0);
-  const CASA_FINAL = getJSON("js-casa-final", 100);
+  const DADOS      = getJSON("js-tabuleiro", {}) || {};
+  const POSICOES   = DADOS.posicoes ?? [];
+  const COBRAS     = DADOS.cobras ?? {};
+  const ESCADAS    = DADOS.escadas ?? {};
+  const ULT        = DADOS.ultimo_mov ?? null;
+  const STATUS     = DADOS.status ?? "andamento";
+  const JOG_ATUAL  = DADOS.jogador_atual ?? 0;
+  const CASA_FINAL = DADOS.casa_final ?? 100;
 
   // Garante o grid CSS
   grid.style.gridTemplateColumns = `repeat(${COLS}, 1fr)`;
@@ -89,6 +90,20 @@
   // ----- SVG (cobras/escadas) -----
   const svg = byId("camada-svg");
 
+  // Se o servidor mandou o overlay pronto (img cacheável), não desenhamos nada
+  // aqui: ele usa viewBox normalizado e acompanha o grid sem redesenhar no resize.
+  // Só caímos no desenho local se a imagem falhar.
+  const overlayImg = byId("camada-overlay");
+  let overlayDoServidor = !!overlayImg;
+  if (overlayImg) {
+    overlayImg.addEventListener("error", () => {
+      overlayDoServidor = false;
+      overlayImg.remove();
+      svg.removeAttribute("hidden");
+      desenharLigacoes();
+    });
+  }
+
   function centroDaCasa(n) {
     const el = grid.querySelector(`.celula[data-casa="${n}"]`);
     if (!el) return { x: 0, y: 0 };
@@ -257,6 +272,11 @@
             callback && callback();
           }, 250);
         } else {
+          // penalidade/rebote não têm caminho para frente: só reposiciona
+          if (POSICOES[jogador] !== para) {
+            POSICOES[jogador] = para;
+            desenharPinos(POSICOES);
+          }
           callback && callback();
         }
         return;
@@ -269,7 +289,8 @@
     passo1();
   }
 
-  function desenharTudoEAniMar() {
+  function desenharLigacoes() {
+    if (overlayDoServidor) return;
     atualizarViewBoxSVG();
     limparSVG();
 
@@ -280,6 +301,10 @@
     Object.entries(COBRAS).forEach(([cabeca, cauda]) => {
       desenharLigacao(parseInt(cabeca, 10), parseInt(cauda, 10), "cobra", false);
     });
+  }
+
+  function desenharTudoEAniMar() {
+    desenharLigacoes();
 
     animarMovimento(ULT, () => {
       scrollLogBottom();
@@ -295,10 +320,12 @@
 
   let resizeTimer = null;
   window.addEventListener("resize", () => {
+    // com o overlay do servidor o resize não custa nada
+    if (overlayDoServidor) return;
     if (resizeTimer) clearTimeout(resizeTimer);
     resizeTimer = setTimeout(() => {
       requestAnimationFrame(() => {
-        desenharTudoEAniMar();
+        desenharLigacoes();
         scrollLogBottom();
       });
     }, 120);
@@ -0,0 +1,180 @@
+// ---- Integração multiplayer ----
+(function () {
+  const script   = document.currentScript;
+  const stateUrl = script.dataset.stateUrl;
+  const moveUrl  = script.dataset.moveUrl;
+
+  const btnMover       = document.getElementById("btn-rolar-mp");
+  const listaPosicoes  = document.getElementById("mp-lista-posicoes");
+  const resultadoElem  = document.getElementById("mp-resultado");
+  const vezElem        = document.getElementById("mp-vez");
+  const qtdJogElem     = document.getElementById("mp-qtd-jogadores");
+  const ultimoDadoElem = document.getElementById("mp-ultimo-dado");
+  const msgElem        = document.getElementById("mp-mensagem");
+
+  const csrfToken = document.querySelector("#csrf-form input[name=csrfmiddlewaretoken]").value;
+
+  let finished = false;
+  let pollId = null;
+  let you = null;
+  let meIndex = 0;
+  let posicoes = []; // espelho local para animar o "de" -> "para"
+
+  function escapeHtml(s) {
+    return String(s)
+      .replace(/&/g, "&amp;")
+      .replace(/</g, "&lt;")
+      .replace(/>/g, "&gt;")
+      .replace(/"/g, "&quot;")
+      .replace(/'/g, "&#039;");
+  }
+
+  function renderLog(logRounds) {
+    const wrap = document.getElementById("mp-log");
+    if (!wrap) return;
+
+    if (!logRounds || !logRounds.length) {
+      wrap.innerHTML = '<p class="muted">O log aparecerá aqui.</p>';
+      return;
+    }
+
+    let html = "";
+    logRounds.forEach((rodada, idx) => {
+      html += `<section class="rodada">
+        <h3><strong>Rodada ${idx + 1}</strong></h3>
+        <ul class="eventos">`;
+      if (!rodada || rodada.length === 0) {
+        html += `<li class="muted">— Sem eventos nesta rodada —</li>`;
+      } else {
+        rodada.forEach(ev => {
+          let texto = escapeHtml(ev?.texto || "");
+          let user = "";
+          let msg = texto;
+
+          if (ev?.username) {
+            const uname = escapeHtml(ev.username);
+            user = `<span class="jog-label player-${(ev.order ?? 0) + 1}">${uname}</span> `;
+
+            const lowerMsg = msg.toLowerCase();
+            const lowerName = uname.toLowerCase();
+            if (lowerMsg.indexOf(lowerName) === 0) {
+              msg = msg.slice(uname.length).trimStart();
+              msg = msg.replace(/^[-:–—]+/, "").trimStart();
+            }
+          }
+
+          html += `<li>${user}${msg}</li>`;
+        });
+      }
+      html += `</ul></section>`;
+    });
+
+    wrap.innerHTML = html;
+  }
+
+  function aplicarPosicoesEListas(data) {
+    // lista visual direita
+    listaPosicoes.innerHTML = "";
+    data.players.forEach(p => {
+      const li = document.createElement("li");
+      li.textContent = `${p.username} — casa ${p.position}` + (p.username === data.current_turn && data.is_active ? " (vez)" : "")
+        + (p.online === false ? " (offline)" : "");
+      listaPosicoes.appendChild(li);
+    });
+
+    // pinos no tabuleiro
+    posicoes = data.players.map(p => p.position);
+    if (window.Tabuleiro && typeof window.Tabuleiro.setPositions === "function") {
+      window.Tabuleiro.setPositions(posicoes);
+    }
+
+    qtdJogElem.textContent = data.players.length;
+  }
+
+  function atualizarEstado() {
+    if (finished) return;
+
+    fetch(stateUrl)
+      .then(r => r.json())
+      .then(data => {
+        you = data.you;
+        meIndex = Math.max(0, data.players.findIndex(p => p.username === you));
+
+        aplicarPosicoesEListas(data);
+        renderLog(data.log_rounds); // <-- atualiza o log
+
+        if (!data.is_active) {
+          finished = true;
+          msgElem.textContent = "Partida finalizada.";
+          vezElem.textContent = "";
+          if (btnMover) btnMover.disabled = true;
+          if (pollId) clearInterval(pollId);
+          return;
+        }
+
+        if (data.spectator || !btnMover) {
+          // espectador: só acompanha (o payload é o mesmo para todos, sem "you")
+          vezElem.textContent = "Vez de " + (data.current_turn || "aguardando jogadores...");
+        } else if (data.current_turn === data.you) {
+          vezElem.textContent = "É a sua vez!";
+          btnMover.disabled = false;
+        } else {
+          vezElem.textContent = "Vez de " + (data.current_turn || "aguardando jogadores...");
+          btnMover.disabled = true;
+        }
+      })
+      .catch(console.error);
+  }
+
+  function enviarMovimento() {
+    if (finished) return;
+
+    const posAntes = posicoes[meIndex] ?? 0;
+
+    fetch(moveUrl, {
+      method: "POST",
+      headers: { "X-CSRFToken": csrfToken, "X-Requested-With": "XMLHttpRequest" },
+    })
+    .then(r => {
+      if (!r.ok) return r.text().then(t => { throw new Error(t || "Erro ao mover"); });
+      return r.json();
+    })
+    .then(data => {
+      if (!data.ok) { resultadoElem.textContent = data.error || "Movimento inválido."; return; }
+
+      ultimoDadoElem.textContent = data.dice;
+
+      // Mensagem
+      let msg = `Você rolou ${data.dice} e foi para a casa ${data.new_position}.`;
+      if (data.pre_jump !== null && data.pre_jump !== data.new_position) {
+        msg += data.new_position > data.pre_jump ? " Subiu por uma escada!" : " Desceu por uma cobra!";
+      }
+      resultadoElem.textContent = msg;
+
+      // Anima no mesmo padrão do single
+      if (window.Tabuleiro && typeof window.Tabuleiro.animateMove === "function") {
+        window.Tabuleiro.animateMove({
+          jogador: meIndex,
+          de: posAntes,
+          para: data.new_position,
+          pre_jump: data.pre_jump
+        });
+      }
+
+      if (data.finished) {
+        finished = true;
+        msgElem.textContent = "Partida finalizada! Vencedor: " + data.winner;
+        btnMover.disabled = true;
+        vezElem.textContent = "";
+        if (pollId) clearInterval(pollId);
+      } else {
+        atualizarEstado(); // puxa novo estado e atualiza o log logo após o lance
+      }
+    })
+    .catch(e => { resultadoElem.textContent = "Erro: " + e.message; console.error(e); });
+  }
+
+  if (btnMover) btnMover.addEventListener("click", enviarMovimento);
+  atualizarEstado();
+  pollId = setInterval(atualizarEstado, 1500);
+})();
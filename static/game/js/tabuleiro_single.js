@@ -0,0 +1,447 @@
+// Singleplayer: envia jogadas via fetch para evitar recarregar a página.
+// Partida nova + navegador com fetch: joga local (regras.js) com os dados
+// comprometidos pelo servidor, e só fala com ele no início e no fim.
+(function () {
+var script = document.currentScript;
+window.addEventListener("DOMContentLoaded", function () {
+  var form = document.getElementById("form-jogar");
+  if (!form) return;
+
+  var btn = document.getElementById("btn-rolar");
+  var logCol = document.querySelector(".painel-esq .log-coluna");
+  var painelDir = document.querySelector(".painel-dir");
+  if (!painelDir) return;
+
+  var cardsDir = painelDir.querySelectorAll(".card");
+  var statusCard = cardsDir[0] || null;
+  var posCard = cardsDir[cardsDir.length - 1] || null;
+  var statusPs = statusCard ? statusCard.querySelectorAll("p") : [];
+  var mensagemEl = statusCard ? statusCard.querySelector(".mensagem") : null;
+  var listaPos = posCard ? posCard.querySelector(".lista-posicoes") : null;
+
+  function escapeHtml(s) {
+    return String(s || "")
+      .replace(/&/g, "&amp;")
+      .replace(/</g, "&lt;")
+      .replace(/>/g, "&gt;")
+      .replace(/"/g, "&quot;")
+      .replace(/'/g, "&#039;");
+  }
+
+  function renderLog(logRounds) {
+    if (!logCol) return;
+    if (!Array.isArray(logRounds) || !logRounds.length) {
+      logCol.innerHTML = '<p class="muted">O log aparecerá aqui.</p>';
+      return;
+    }
+    var html = "";
+    logRounds.forEach(function (rodada, idx) {
+      html += '<section class="rodada">';
+      html += '<h3><strong>Rodada ' + (idx + 1) + "</strong></h3>";
+      html += '<ul class="eventos">';
+      if (!rodada || !rodada.length) {
+        html += '<li class="muted">— Sem eventos nesta rodada —</li>';
+      } else {
+        rodada.forEach(function (ev) {
+          if (!ev) return;
+          var texto = escapeHtml(ev.texto || "");
+          // Sem jogador: mostra só o texto
+          if (ev.jogador === null || ev.jogador === undefined) {
+            html += "<li>" + texto + "</li>";
+          } else {
+            var j = (ev.jogador | 0) + 1;
+            var label = "Jogador " + j;
+            var msg = texto;
+
+            // Se o texto já começa com "Jogador X", removemos esse prefixo
+            var lowerMsg = msg.toLowerCase();
+            var lowerLabel = label.toLowerCase();
+            if (lowerMsg.indexOf(lowerLabel) === 0) {
+              msg = msg.slice(label.length).trimStart();
+              // remove possíveis separadores tipo ":", "-", "–", "—"
+              msg = msg.replace(/^[-:–—]+/, "").trimStart();
+            }
+
+            html +=
+              '<li><span class="jog-label player-' +
+              j +
+              '">' +
+              label +
+              "</span> " +
+              msg +
+              "</li>";
+          }
+        });
+      }
+      html += "</ul></section>";
+    });
+    logCol.innerHTML = html;
+    logCol.scrollTop = logCol.scrollHeight;
+  }
+
+  function renderPosicoes(posicoes) {
+    if (!listaPos || !Array.isArray(posicoes)) return;
+    var html = "";
+    posicoes.forEach(function (p, i) {
+      html += "<li>Jogador " + (i + 1) + ": casa " + p + "</li>";
+    });
+    listaPos.innerHTML = html;
+  }
+
+  function updateStatus(data) {
+    if (!statusPs || !statusPs.length) return;
+
+    var jogadorAtual = (data.jogador_atual || 0) | 0;
+    var ultimoDado = data.ultimo_dado;
+
+    if (statusPs[2]) {
+      statusPs[2].innerHTML = "<strong>Vez do jogador:</strong> " + (jogadorAtual + 1);
+    }
+    if (statusPs[3]) {
+      statusPs[3].innerHTML = "<strong>Último dado:</strong> " + (ultimoDado == null ? "—" : ultimoDado);
+    }
+
+    // pega o último evento do log_rodadas
+    var mensagem = "";
+    if (Array.isArray(data.log_rodadas)) {
+      outer: for (var i = data.log_rodadas.length - 1; i >= 0; i--) {
+        var rodada = data.log_rodadas[i];
+        if (!rodada) continue;
+        for (var j = rodada.length - 1; j >= 0; j--) {
+          var ev = rodada[j];
+          if (ev && ev.texto) {
+            mensagem = ev.texto;
+            break outer;
+          }
+        }
+      }
+    }
+
+    // fallback caso log venha vazio por algum motivo
+    if (!mensagem && data.mensagem) {
+      mensagem = data.mensagem;
+    }
+
+    if (mensagemEl) {
+      mensagemEl.textContent = mensagem || "";
+    }
+  }
+
+  var enviando = false;
+
+  function animarSequencia(movimentos, fim) {
+    var k = 0;
+    (function proximo() {
+      if (k >= movimentos.length) {
+        fim();
+        return;
+      }
+      var m = movimentos[k++];
+      if (mensagemEl && m.mensagem) mensagemEl.textContent = m.mensagem;
+      window.Tabuleiro.animateMove({
+        jogador: m.jogador,
+        de:      m.de,
+        para:    m.para,
+        pre_salto: m.pre_salto
+      }, function () {
+        setTimeout(proximo, 150);
+      });
+    })();
+  }
+
+  function aplicarResposta(data) {
+    if (!data) return;
+
+    var status = data.status || "andamento";
+    var finalizado = status === "finalizado";
+    var jogadorAtual = (data.jogador_atual || 0) | 0;
+    var ult = data.ultimo_movimento || data.ultimo_mov || null;
+
+    function aposAnimacao() {
+      if (Array.isArray(data.log_rodadas)) {
+        renderLog(data.log_rodadas);
+      }
+      if (Array.isArray(data.posicoes)) {
+        renderPosicoes(data.posicoes);
+      }
+      updateStatus(data);
+
+      if (btn) {
+        if (finalizado) {
+          btn.disabled = true;
+        } else {
+          // botão habilitado apenas quando for a vez do jogador humano
+          btn.disabled = jogadorAtual !== 0;
+        }
+      }
+
+      // Se a vez for de máquina (índice != 0) e não finalizou, agenda jogada automática
+      if (!finalizado && jogadorAtual !== 0) {
+        setTimeout(function () {
+          if (!enviando) {
+            form.requestSubmit();
+          }
+        }, 250);
+      }
+    }
+
+    // anima primeiro, depois chama aposAnimacao
+    var movimentos = Array.isArray(data.movimentos) ? data.movimentos : [];
+    if (window.Tabuleiro && typeof window.Tabuleiro.animateMove === "function" && movimentos.length > 1) {
+      // lote: humano + máquinas, em ordem; no fim sincroniza com as posições do servidor
+      animarSequencia(movimentos, function () {
+        if (Array.isArray(data.posicoes)) window.Tabuleiro.setPositions(data.posicoes);
+        aposAnimacao();
+      });
+    } else if (window.Tabuleiro && typeof window.Tabuleiro.animateMove === "function" && ult) {
+      window.Tabuleiro.animateMove({
+        jogador: ult.jogador,
+        de:      ult.de,
+        para:    ult.para,
+        pre_salto: ult.pre_salto
+      }, aposAnimacao);
+    } else if (window.Tabuleiro && typeof window.Tabuleiro.setPositions === "function" && Array.isArray(data.posicoes)) {
+      window.Tabuleiro.setPositions(data.posicoes);
+      aposAnimacao();
+    } else {
+      aposAnimacao();
+    }
+  }
+
+  // ---------------------------
+  // Modo local (ver game/partida_local.py)
+  // ---------------------------
+  var CHAVE_LOCAL = "partida_local";
+  var urls = script ? script.dataset : {};
+  var local = null;
+
+  function csrf() {
+    var el = form.querySelector("input[name=csrfmiddlewaretoken]");
+    return el ? el.value : "";
+  }
+
+  function postJSON(url, corpo) {
+    return fetch(url, {
+      method: "POST",
+      headers: { "X-CSRFToken": csrf(), "Content-Type": "application/json" },
+      body: corpo ? JSON.stringify(corpo) : "{}"
+    }).then(function (resp) {
+      return resp.json().then(function (data) {
+        if (!resp.ok) throw Object.assign(new Error(data.error || "Erro " + resp.status), { data: data });
+        return data;
+      });
+    });
+  }
+
+  function salvarLocal() {
+    try { sessionStorage.setItem(CHAVE_LOCAL, JSON.stringify(local)); } catch (e) { /* cota/privado */ }
+  }
+
+  function lerLocal() {
+    try { return JSON.parse(sessionStorage.getItem(CHAVE_LOCAL) || "null"); } catch (e) { return null; }
+  }
+
+  function estadoInicial() {
+    var el = document.getElementById("js-tabuleiro");
+    try { return el ? JSON.parse(el.textContent) : {}; } catch (e) { return {}; }
+  }
+
+  function respostaLocal(movimentos) {
+    var p = local.partida;
+    return {
+      posicoes: p.posicoes,
+      ultimo_movimento: p.ultimo_movimento,
+      movimentos: movimentos,
+      status: p.status,
+      jogador_atual: p.jogador_atual,
+      ultimo_dado: p.ultimo_dado,
+      mensagem: p.mensagem,
+      rodada_atual: p.rodada_atual,
+      log_rodadas: p.log_rodadas
+    };
+  }
+
+  // garante dados suficientes para a jogada do humano + uma volta das máquinas
+  function garantirDados() {
+    var precisa = 3 * local.partida.posicoes.length;
+    if (local.dados.length - local.jogadas.length >= precisa) return Promise.resolve();
+    return fetch(urls.dadosUrl + "?de=" + local.dados.length, { headers: { "Accept": "application/json" } })
+      .then(function (resp) { return resp.json(); })
+      .then(function (data) {
+        if (!data.ok) throw new Error(data.error || "Sem dados.");
+        local.dados = local.dados.concat(data.dados);
+      });
+  }
+
+  function jogarLocal() {
+    enviando = true;
+    if (btn) btn.disabled = true;
+    garantirDados()
+      .then(function () {
+        var p = local.partida;
+        var movimentos = [];
+        do {
+          var dado = local.dados[local.jogadas.length];
+          var m = window.Regras.aplicarJogada(p, dado, local.casa_final);
+          local.jogadas.push({ jogador: m.jogador, dado: dado, para: m.para });
+          movimentos.push(Object.assign({ mensagem: p.mensagem }, m));
+        } while (p.status !== "finalizado" && p.jogador_atual !== 0);
+        salvarLocal();
+        aplicarResposta(respostaLocal(movimentos));
+        if (p.status === "finalizado") finalizarLocal();
+      })
+      .catch(function (err) {
+        console.error(err);
+        if (mensagemEl) mensagemEl.textContent = "Falha ao buscar dados: " + err.message;
+        if (btn) btn.disabled = false;
+      })
+      .finally(function () {
+        enviando = false;
+      });
+  }
+
+  function hexParaBytes(hex) {
+    var out = new Uint8Array(hex.length / 2);
+    for (var i = 0; i < out.length; i++) out[i] = parseInt(hex.substr(i * 2, 2), 16);
+    return out;
+  }
+
+  function bytesParaHex(buf) {
+    return Array.prototype.map.call(new Uint8Array(buf), function (b) {
+      return ("0" + b.toString(16)).slice(-2);
+    }).join("");
+  }
+
+  // confere sha256(seed) == compromisso e refaz os dados com HMAC-SHA256(seed, contador)
+  function conferirRevelacao(seed, commit, dados) {
+    var subtle = window.crypto && window.crypto.subtle;
+    if (!subtle) return Promise.resolve(null);
+    var chave = hexParaBytes(seed);
+    return subtle.digest("SHA-256", chave).then(function (h) {
+      if (bytesParaHex(h) !== commit) return false;
+      return subtle.importKey("raw", chave, { name: "HMAC", hash: "SHA-256" }, false, ["sign"])
+        .then(function (k) {
+          var gerados = [];
+          function bloco(contador) {
+            if (gerados.length >= dados.length) {
+              return dados.every(function (d, i) { return d === gerados[i]; });
+            }
+            var msg = new DataView(new ArrayBuffer(8));
+            msg.setUint32(0, Math.floor(contador / 4294967296));
+            msg.setUint32(4, contador >>> 0);
+            return subtle.sign("HMAC", k, msg.buffer).then(function (sig) {
+              new Uint8Array(sig).forEach(function (b) {
+                if (b < 252) gerados.push(b % 6 + 1);
+              });
+              return bloco(contador + 1);
+            });
+          }
+          return bloco(0);
+        });
+    });
+  }
+
+  function trocarPorJogarNovamente() {
+    var link = document.createElement("a");
+    link.className = "btn";
+    link.href = urls.reiniciarUrl;
+    link.textContent = "Jogar novamente";
+    var fim = document.createElement("p");
+    fim.innerHTML = "<strong>Fim de jogo!</strong>";
+    form.replaceWith(fim, link);
+  }
+
+  function finalizarLocal() {
+    var enviado = local;
+    postJSON(urls.finalizarUrl, { jogadas: enviado.jogadas })
+      .catch(function (err) {
+        console.error(err);
+        if (mensagemEl) mensagemEl.textContent = "Partida não validada pelo servidor: " + err.message;
+        return err.data || null;
+      })
+      .then(function (data) {
+        try { sessionStorage.removeItem(CHAVE_LOCAL); } catch (e) { /* ignora */ }
+        trocarPorJogarNovamente();
+        if (!data || !data.seed) return;
+        return conferirRevelacao(data.seed, enviado.commit, enviado.dados.slice(0, enviado.jogadas.length))
+          .then(function (ok) {
+            if (ok === false) console.warn("Revelação do seed não confere com o compromisso/dados recebidos.");
+          });
+      });
+  }
+
+  function iniciarLocal() {
+    var inicial = estadoInicial();
+    var salvo = lerLocal();
+    if (salvo && urls.commit && salvo.commit === urls.commit) {
+      // recarregou a página no meio da partida local
+      local = salvo;
+      aplicarResposta(respostaLocal([]));
+      if (local.partida.status === "finalizado") finalizarLocal();
+      return;
+    }
+    if (inicial.status !== "andamento" || inicial.ultimo_mov) return;
+    if (btn) btn.disabled = true;
+    postJSON(urls.iniciarUrl)
+      .then(function (data) {
+        local = {
+          commit: data.commit,
+          dados: data.dados,
+          partida: data.partida,
+          casa_final: data.casa_final,
+          jogadas: []
+        };
+        salvarLocal();
+      })
+      .catch(function (err) {
+        console.warn("Modo local indisponível, jogando pelo servidor.", err);
+      })
+      .finally(function () {
+        if (btn) btn.disabled = false;
+      });
+  }
+
+  function onSubmit(e) {
+    e.preventDefault();
+    if (enviando) return;
+    if (local) {
+      if (local.partida.status !== "finalizado") jogarLocal();
+      return;
+    }
+    enviando = true;
+    if (btn) btn.disabled = true;
+
+    var fd = new FormData(form);
+
+    fetch(form.action, {
+      method: "POST",
+      headers: {
+        "X-Requested-With": "XMLHttpRequest"
+      },
+      body: fd
+    })
+      .then(function (resp) {
+        var ct = resp.headers.get("Content-Type") || "";
+        if (ct.indexOf("application/json") === -1) {
+          throw new Error("Resposta inesperada do servidor (não é JSON). Verifique a view 'jogar_rodada'.");
+        }
+        return resp.json();
+      })
+      .then(function (data) {
+        aplicarResposta(data);
+      })
+      .catch(function (err) {
+        console.error(err);
+        // Fallback: volta ao comportamento antigo com recarregamento completo
+        form.removeEventListener("submit", onSubmit);
+        form.submit();
+      })
+      .finally(function () {
+        enviando = false;
+      });
+  }
+
+  form.addEventListener("submit", onSubmit);
+  if (urls.iniciarUrl && window.Regras && window.fetch) iniciarLocal();
+});
+})();
@@ -0,0 +1,19 @@
+// Toggle do dropdown de notificações
+document.addEventListener("DOMContentLoaded", function () {
+  const wrapper = document.getElementById("notif-wrapper");
+  const bell = document.getElementById("notif-bell");
+  const dropdown = document.getElementById("notif-dropdown");
+
+  if (!wrapper || !bell || !dropdown) return;
+
+  bell.addEventListener("click", function (e) {
+    e.stopPropagation();
+    wrapper.classList.toggle("is-open");
+  });
+
+  document.addEventListener("click", function (e) {
+    if (!wrapper.contains(e.target)) {
+      wrapper.classList.remove("is-open");
+    }
+  });
+});
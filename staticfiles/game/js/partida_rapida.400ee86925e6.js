@@ -0,0 +1,31 @@
+// Partida rápida: espera na fila e vai para a sala quando o grupo fecha
+(function () {
+  const script = document.currentScript;
+  const statusUrl = script.dataset.statusUrl;
+  const lobbyUrl = script.dataset.lobbyUrl;
+  if (!statusUrl) return;
+
+  const naFilaElem = document.getElementById("rapida-na-fila");
+  const esperaElem = document.getElementById("rapida-espera");
+
+  const poll = setInterval(async () => {
+    try {
+      const r = await fetch(statusUrl);
+      const data = await r.json();
+      if (data.status === "matched") {
+        clearInterval(poll);
+        location.href = data.url;
+        return;
+      }
+      if (data.status !== "waiting") {
+        clearInterval(poll);
+        location.href = lobbyUrl;
+        return;
+      }
+      if (naFilaElem) naFilaElem.textContent = data.na_fila;
+      if (esperaElem) esperaElem.textContent = Math.round(data.espera_s);
+    } catch (e) {
+      console.error(e);
+    }
+  }, 1500);
+})();
@@ -0,0 +1,79 @@
+// Regras do singleplayer no navegador: espelho de services.calcular_destino /
+// services.aplicar_jogada (mesmas mensagens, mesmo formato de partida).
+// O servidor refaz tudo no finalizar, então qualquer divergência aqui derruba a partida.
+(function () {
+  function aplicarCobrasEscadas(pos, cobras, escadas) {
+    if (escadas.hasOwnProperty(pos)) return escadas[pos] | 0;
+    if (cobras.hasOwnProperty(pos)) return cobras[pos] | 0;
+    return pos;
+  }
+
+  function calcularDestino(pos, dado, casaFinal, cobras, escadas) {
+    var bruto = pos + dado;
+    if (bruto === casaFinal) return [bruto, bruto];
+    if (bruto < casaFinal) return [bruto, aplicarCobrasEscadas(bruto, cobras, escadas)];
+    var rebatido = casaFinal - (bruto - casaFinal);
+    return [rebatido, aplicarCobrasEscadas(rebatido, cobras, escadas)];
+  }
+
+  function registrarEvento(partida, jogador, mensagem) {
+    (partida.log = partida.log || []).push(mensagem);
+    if (!partida.log_rodadas || !partida.log_rodadas.length) partida.log_rodadas = [[]];
+    partida.log_rodadas[partida.log_rodadas.length - 1].push({ jogador: jogador, texto: mensagem });
+  }
+
+  function passarVez(partida, i) {
+    var proximo = (i + 1) % partida.posicoes.length;
+    partida.jogador_atual = proximo;
+    if (proximo === 0) {
+      partida.rodada_atual = (partida.rodada_atual || 1) + 1;
+      partida.log_rodadas.push([]);
+    }
+  }
+
+  // altera `partida` no lugar e devolve {jogador, de, para, dado, pre_salto}
+  function aplicarJogada(partida, dado, casaFinal) {
+    var cobras = partida.cobras || {};
+    var escadas = partida.escadas || {};
+    var i = partida.jogador_atual | 0;
+    var posAtual = partida.posicoes[i];
+
+    var streak = partida.streak_seis = partida.streak_seis || partida.posicoes.map(function () { return 0; });
+    streak[i] = dado === 6 ? streak[i] + 1 : 0;
+    var penalizado = streak[i] >= 3;
+
+    var preSalto, destino, mensagem;
+    if (penalizado) {
+      streak[i] = 0;
+      preSalto = null;
+      destino = 0;
+      mensagem = "Jogador " + (i + 1) + " tirou 6 três vezes seguidas e foi penalizado: volta ao início.";
+    } else {
+      var r = calcularDestino(posAtual, dado, casaFinal, cobras, escadas);
+      preSalto = r[0];
+      destino = r[1];
+      var extra = "";
+      if (destino !== preSalto) extra = destino > preSalto ? " (subiu por escada)" : " (desceu por cobra)";
+      mensagem = "Jogador " + (i + 1) + " rolou " + dado + " e foi da casa " + posAtual + " para " + destino + extra + ".";
+      if (destino === casaFinal) {
+        partida.status = "finalizado";
+        mensagem += " Jogador " + (i + 1) + " venceu!";
+      }
+    }
+
+    partida.posicoes[i] = destino;
+    partida.ultimo_dado = dado;
+    partida.mensagem = mensagem;
+    registrarEvento(partida, i, mensagem);
+    var movimento = { jogador: i, de: posAtual, para: destino, dado: dado, pre_salto: preSalto };
+    partida.ultimo_movimento = movimento;
+
+    if (partida.status !== "finalizado") {
+      if (dado === 6 && !penalizado) partida.mensagem += " Tirou 6 e joga novamente!";
+      else passarVez(partida, i);
+    }
+    return movimento;
+  }
+
+  window.Regras = { calcularDestino: calcularDestino, aplicarJogada: aplicarJogada };
+})();